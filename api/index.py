@@ -15,6 +15,11 @@ from http.server import BaseHTTPRequestHandler
 import psycopg
 from psycopg.rows import dict_row
 
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    ConnectionPool = None
+
 # Configuration
 STRATEGY_NAME = "hourly_limit_ws"
 STABLE_STRATEGY_NAME = "stable_buy_ws"
@@ -22,14 +27,31 @@ BATCH_STRATEGY_NAME = "batch_buy_ws"
 ORIGINAL_GAP_STRATEGY_NAME = "original_gap"
 CACHE_TTL = 60  # Increased from 15 to 60 seconds - data doesn't change that frequently
 _cache = {"data": None, "timestamp": 0}
+# Kept across invocations of a warm function instance
+# (self-contained: src/ is not part of the Vercel bundle)
+_pool = None
 
 
 def get_db_connection():
-    """Get database connection"""
+    """Get database connection (pooled when psycopg_pool is available)"""
+    global _pool
     database_url = os.getenv("DATABASE_URL")
     if not database_url:
         raise ValueError("DATABASE_URL not found")
-    return psycopg.connect(database_url)
+    if ConnectionPool is None:
+        return psycopg.connect(database_url)
+    if _pool is None:
+        _pool = ConnectionPool(
+            database_url,
+            min_size=1,
+            max_size=int(os.getenv("DB_POOL_MAX_SIZE", "2")),
+            check=ConnectionPool.check_connection,
+            close_returns=True,  # conn.close() returns it to the pool
+            max_idle=float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+            max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+            open=True,
+        )
+    return _pool.getconn()
 
 
 def _safe_float(value, default=0.0):
@@ -45,6 +67,20 @@ def _safe_float(value, default=0.0):
         return default
 
 
+# orders.price_num / size_num / sell_price_num (NUMERIC copies of the text
+# columns); None until the first query tells whether they exist
+_typed_columns = None
+
+
+def _order_number(row, column, default=0.0):
+    """Typed NUMERIC column when present, else the text column parsed"""
+    value = row.get(f"{column}_num")
+    if value is None:
+        return _safe_float(row.get(column), default)
+    value = float(value)
+    return default if value != value else value  # NaN: text was not a number
+
+
 def get_trading_records():
     """Get trading records from database with caching"""
     current_time = time.time()
@@ -55,28 +91,43 @@ def get_trading_records():
 
     print("[Cache Miss] Querying database...")
 
+    global _typed_columns
     conn = get_db_connection()
     cur = conn.cursor(row_factory=dict_row)
-
-    # Optimized query: reduce LIMIT for better performance
-    cur.execute(
+    try:
+        typed = (
+            ", price_num, size_num, sell_price_num"
+            if _typed_columns is not False
+            else ""
+        )
+        # Optimized query: reduce LIMIT for better performance
+        query = f"""
+            SELECT instId, ordId, create_time, state,
+                   price, size, sell_time, side, sell_price, flag{typed}
+            FROM orders
+            WHERE flag IN (%s, %s, %s, %s)
+            ORDER BY create_time DESC
+            LIMIT 300
         """
-        SELECT instId, ordId, create_time, state,
-               price, size, sell_time, side, sell_price, flag
-        FROM orders
-        WHERE flag IN (%s, %s, %s, %s)
-        ORDER BY create_time DESC
-        LIMIT 300
-    """,
-        (
+        params = (
             STRATEGY_NAME,
             STABLE_STRATEGY_NAME,
             BATCH_STRATEGY_NAME,
             ORIGINAL_GAP_STRATEGY_NAME,
-        ),
-    )
-
-    rows = cur.fetchall()
+        )
+        try:
+            cur.execute(query, params)
+            _typed_columns = bool(typed)
+        except psycopg.errors.UndefinedColumn:
+            # Database not migrated yet: text columns only
+            conn.rollback()
+            _typed_columns = False
+            cur.execute(query.replace(typed, ""), params)
+
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
 
     # Process data - separate by strategy
     cryptos = defaultdict(
@@ -131,9 +182,9 @@ def get_trading_records():
 
     for row in rows:
         inst_id = row["instid"]
-        buy_price = _safe_float(row.get("price"))
-        sell_price = _safe_float(row.get("sell_price"))
-        size = _safe_float(row.get("size"))
+        buy_price = _order_number(row, "price")
+        sell_price = _order_number(row, "sell_price")
+        size = _order_number(row, "size")
         state = row["state"] or "active"
         strategy_flag = row.get("flag") or STRATEGY_NAME
         display_buy_price = (
@@ -213,9 +264,6 @@ def get_trading_records():
     _cache["data"] = result
     _cache["timestamp"] = current_time
 
-    cur.close()
-    conn.close()
-
     return result
 
 
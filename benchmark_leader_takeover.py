@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Leader takeover benchmark
+Measures how long a hot standby takes to acquire the leader lease after the
+leader process is killed (crash) or frozen with SIGSTOP (hang).
+
+Usage:
+    python benchmark_leader_takeover.py [--dsn postgresql://localhost/postgres]
+                                        [--runs 5] [--lease 5] [--poll 0.5]
+                                        [--scenarios crash,hang]
+
+Needs a local Postgres (14+ for the hang scenario: idle_session_timeout);
+--dsn defaults to BENCHMARK_DATABASE_URL. The leader runs in a child
+process, the standby in this one. Position recovery after takeover
+(start_trading) is not included; it is logged by the trading process.
+"""
+
+import argparse
+import logging
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from core.leader_election import LeaderLease  # noqa: E402
+
+LOCK_NAME = "benchmark_leader_takeover"
+
+
+def run_leader(options):
+    """Child process: take the lease, report READY and hold it until killed"""
+    acquired = threading.Event()
+    lease = LeaderLease(
+        acquired.set,
+        lambda: os._exit(1),
+        conninfo=options.dsn,
+        name=LOCK_NAME,
+        lease_seconds=options.lease,
+        poll_seconds=options.poll,
+    )
+    lease.start()
+    if not acquired.wait(30):
+        sys.exit("leader could not acquire the lease")
+    print("READY", flush=True)
+    while True:
+        time.sleep(1)
+
+
+def measure(options, scenario):
+    """One takeover: returns seconds from kill/freeze to standby acquire"""
+    leader = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--role", "leader"]
+        + ["--dsn", options.dsn, "--lease", str(options.lease)]
+        + ["--poll", str(options.poll)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        if leader.stdout.readline().strip() != "READY":
+            raise RuntimeError("leader process failed to start")
+
+        acquired_at = []
+        acquired = threading.Event()
+        standby = LeaderLease(
+            lambda: (acquired_at.append(time.perf_counter()), acquired.set()),
+            lambda: None,
+            conninfo=options.dsn,
+            name=LOCK_NAME,
+            lease_seconds=options.lease,
+            poll_seconds=options.poll,
+        )
+        standby.start()
+        # Fail at a random point of the standby's poll cycle and the leader's
+        # renewal cycle (a fixed delay lines every run up with a poll)
+        time.sleep(options.poll * 2 + random.uniform(0, options.lease / 3))
+        if acquired.is_set():
+            raise RuntimeError("standby acquired the lease while the leader held it")
+
+        failed_at = time.perf_counter()
+        if scenario == "crash":
+            leader.kill()
+        else:
+            leader.send_signal(signal.SIGSTOP)
+        if not acquired.wait(options.lease * 4 + 10):
+            raise RuntimeError(f"no takeover after {scenario}")
+        standby.release()
+        return acquired_at[0] - failed_at
+    finally:
+        if leader.poll() is None:
+            leader.kill()  # SIGKILL also ends a stopped process
+        leader.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--dsn",
+        default=os.getenv(
+            "BENCHMARK_DATABASE_URL", "postgresql://postgres@localhost:5432/postgres"
+        ),
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--lease", type=float, default=5.0)
+    parser.add_argument("--poll", type=float, default=0.5)
+    parser.add_argument("--scenarios", default="crash,hang")
+    parser.add_argument("--role", choices=["bench", "leader"], default="bench")
+    options = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    if options.role == "leader":
+        run_leader(options)
+        return
+
+    print(f"lease={options.lease}s poll={options.poll}s runs={options.runs}")
+    print(f"{'scenario':>10} | {'min':>7} | {'median':>7} | {'max':>7}")
+    for scenario in options.scenarios.split(","):
+        takeovers = [measure(options, scenario) for _ in range(options.runs)]
+        print(
+            f"{scenario:>10} | {min(takeovers):>6.2f}s | "
+            f"{statistics.median(takeovers):>6.2f}s | {max(takeovers):>6.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
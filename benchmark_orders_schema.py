@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Orders schema query benchmark
+Runs EXPLAIN (ANALYZE, BUFFERS) on the hot open-position queries (recovery,
+memory sync, position index, sell path, bulk sell) with the text-column
+predicates and with the typed-column predicates, and reports execution time,
+buffers touched and the access path of each.
+
+Usage:
+    python benchmark_orders_schema.py [--runs 5]
+
+Needs DATABASE_URL. Only SELECTs are analyzed; nothing is written. The
+typed variants need migrate_orders_schema.py to have run (at least
+--install-only; without the backfill they read incomplete columns).
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+import psycopg
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from core.memory_sync import OPEN_ORDERS_QUERY  # noqa: E402
+from core.order_sync import RECOVERY_QUERY  # noqa: E402
+from core.orders_schema import (  # noqa: E402
+    LEGACY_OPEN_SQL,
+    LEGACY_UNSOLD_SQL,
+    TYPED_OPEN_SQL,
+    TYPED_UNSOLD_SQL,
+    typed_migration_status,
+)
+from core.position_index import UNSOLD_ORDERS_QUERY  # noqa: E402
+
+FLAGS = ["hourly_limit_ws", "stable_buy_ws", "batch_buy_ws", "original_gap"]
+
+SELL_PATH_QUERY = """
+    SELECT COUNT(*) FROM orders
+    WHERE instId = %s AND flag = %s AND {open_position}
+"""
+BULK_SELL_QUERY = """
+    SELECT instId, ordId, flag, state, size, sell_order_id
+    FROM orders
+    WHERE instId = ANY(%s) AND flag = ANY(%s)
+      AND {open_position}
+      AND sell_time IS NOT NULL
+      AND sell_time <= %s
+    ORDER BY create_time ASC
+"""
+
+
+def queries(open_sql: str, unsold_sql: str, inst_ids: list):
+    """(name, sql, params) of the hot queries for one predicate pair"""
+    now_ms = int(time.time() * 1000)
+    day_ago_ms = now_ms - 24 * 3600 * 1000
+    return [
+        (
+            "recover (all flags)",
+            RECOVERY_QUERY.format(open_position=open_sql),
+            (FLAGS, day_ago_ms, 100),
+        ),
+        (
+            "memory sync (1 flag)",
+            OPEN_ORDERS_QUERY.format(open_position=open_sql),
+            (FLAGS[0],),
+        ),
+        (
+            "position index load",
+            UNSOLD_ORDERS_QUERY.format(unsold=unsold_sql),
+            (FLAGS, now_ms - 2 * 3600 * 1000),
+        ),
+        (
+            "sell path count",
+            SELL_PATH_QUERY.format(open_position=open_sql),
+            (inst_ids[0] if inst_ids else "BTC-USDT", FLAGS[0]),
+        ),
+        (
+            "bulk sell",
+            BULK_SELL_QUERY.format(open_position=open_sql),
+            (inst_ids or ["BTC-USDT"], FLAGS, now_ms),
+        ),
+    ]
+
+
+def access_paths(plan: dict) -> list:
+    """Scan nodes of a JSON plan, e.g. 'Index Scan idx_orders_flag'"""
+    paths = []
+    node_type = plan.get("Node Type", "")
+    if "Scan" in node_type:
+        name = plan.get("Index Name") or plan.get("Relation Name", "")
+        paths.append(f"{node_type} {name}".strip())
+    for child in plan.get("Plans", []):
+        paths.extend(access_paths(child))
+    return paths
+
+
+def explain(cur, sql: str, params: tuple, runs: int):
+    """Median execution ms, median shared buffers, access paths"""
+    times, buffers, paths = [], [], []
+    for _ in range(runs):
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+        result = cur.fetchone()[0]
+        result = json.loads(result) if isinstance(result, str) else result
+        plan = result[0]
+        times.append(plan["Execution Time"])
+        top = plan["Plan"]
+        buffers.append(
+            top.get("Shared Hit Blocks", 0) + top.get("Shared Read Blocks", 0)
+        )
+        paths = access_paths(top)
+    return statistics.median(times), statistics.median(buffers), paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=5)
+    options = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        sys.exit("DATABASE_URL not found in environment variables")
+
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM orders")
+        total_rows = cur.fetchone()[0]
+        cur.execute(
+            f"""
+            SELECT instId FROM orders WHERE {LEGACY_OPEN_SQL}
+            GROUP BY instId ORDER BY COUNT(*) DESC LIMIT 20
+            """
+        )
+        inst_ids = [row[0] for row in cur.fetchall()]
+        status = typed_migration_status(conn)
+
+        variants = [("text", LEGACY_OPEN_SQL, LEGACY_UNSOLD_SQL)]
+        if status["columns"]:
+            variants.append(("typed", TYPED_OPEN_SQL, TYPED_UNSOLD_SQL))
+        print(f"orders rows={total_rows} runs={options.runs} migration={status}")
+        if not status["columns"]:
+            print("typed columns missing: run migrate_orders_schema.py for 'after'")
+
+        print(
+            f"{'query':<22} | {'columns':>7} | {'exec ms':>8} | {'buffers':>7} | "
+            f"access path"
+        )
+        results = {}
+        for label, open_sql, unsold_sql in variants:
+            for name, sql, params in queries(open_sql, unsold_sql, inst_ids):
+                exec_ms, blocks, paths = explain(cur, sql, params, options.runs)
+                results[(name, label)] = exec_ms
+                print(
+                    f"{name:<22} | {label:>7} | {exec_ms:>8.2f} | {blocks:>7.0f} | "
+                    f"{', '.join(paths)}"
+                )
+        if len(variants) > 1:
+            print()
+            for name, _, _ in queries(LEGACY_OPEN_SQL, LEGACY_UNSOLD_SQL, inst_ids):
+                before, after = results[(name, "text")], results[(name, "typed")]
+                speedup = before / after if after else float("inf")
+                print(f"{name:<22} | {before:.2f}ms -> {after:.2f}ms ({speedup:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
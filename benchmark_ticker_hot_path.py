@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ticker hot path benchmark
+Measures on_ticker_message throughput (ticks/sec) for 36, 300 and 1000
+instruments: the handler before the precomputed trigger table (loaded from
+git at --baseline-rev) against the current handler with the table.
+
+Usage:
+    python benchmark_ticker_hot_path.py [--ticks 200000] [--sizes 36,300,1000]
+                                        [--repeat 5] [--baseline-rev REV]
+
+No network or database access: prices stay above the limit price
+(the common no-signal case), so no buy/sell work is dispatched.
+"""
+
+import argparse
+import inspect
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import types
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from core.batch_buy_strategy import BatchBuyStrategy  # noqa: E402
+from core.stable_buy_strategy import StableBuyStrategy  # noqa: E402
+from core.trading_utils import calculate_limit_price  # noqa: E402
+from core.websocket_handlers import on_ticker_message  # noqa: E402
+
+try:
+    from core.trigger_table import TriggerTable
+except ImportError:
+    TriggerTable = None
+
+REFERENCE_PRICE = 100.0
+LIMIT_PERCENT = 90.0
+# Parent of the commit that added the trigger table (per-tick limit calc)
+BASELINE_REV = "7747424^"
+
+
+def load_baseline_handler(rev):
+    """on_ticker_message as of rev, compiled from `git show`"""
+    source = subprocess.run(
+        ["git", "show", f"{rev}:src/core/websocket_handlers.py"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    module = types.ModuleType("baseline_websocket_handlers")
+    module.__package__ = "core"  # Relative imports resolve in this tree
+    exec(compile(source, f"{rev}:websocket_handlers.py", "exec"), module.__dict__)
+    return module.on_ticker_message
+
+
+def _unexpected(*args, **kwargs):
+    raise AssertionError("benchmark ticks must not produce signals")
+
+
+def build_messages(inst_ids, ticks):
+    """Pre-encode ticker frames (one ticker per frame, as OKX pushes them)"""
+    rng = random.Random(42)
+    messages = []
+    for i in range(ticks):
+        instId = inst_ids[i % len(inst_ids)]
+        last = REFERENCE_PRICE * rng.uniform(0.95, 1.05)
+        messages.append(
+            json.dumps(
+                {
+                    "arg": {"channel": "tickers", "instId": instId},
+                    "data": [{"instId": instId, "last": f"{last:.6f}"}],
+                }
+            )
+        )
+    return messages
+
+
+def run(handler, n_instruments, ticks, use_trigger_table):
+    """Run one benchmark pass of handler and return ticks/sec"""
+    inst_ids = [f"C{i:04d}-USDT" for i in range(n_instruments)]
+    crypto_limits = {instId: LIMIT_PERCENT for instId in inst_ids}
+    reference_prices = {instId: REFERENCE_PRICE for instId in inst_ids}
+    lock = threading.Lock()
+
+    kwargs = {}
+    if use_trigger_table:
+        table = TriggerTable(calculate_limit_price)
+        table.rebuild(reference_prices, crypto_limits)
+        kwargs["trigger_table"] = table
+
+    messages = build_messages(inst_ids, ticks)
+    args = (
+        crypto_limits,
+        {},  # current_prices
+        reference_prices,
+        {},  # reference_price_fetch_time
+        {},  # reference_price_fetch_attempts
+        {},  # pending_buys
+        {},  # active_orders
+        {},  # stable_active_orders
+        {},  # stable_pending_buys
+        StableBuyStrategy(),
+        {},  # batch_active_orders
+        {},  # batch_pending_buys
+        BatchBuyStrategy(),
+        {},  # gap_active_orders
+        {},  # gap_pending_buys
+        lock,
+        _unexpected,  # fetch_current_hour_open_price
+        calculate_limit_price,
+        _unexpected,  # process_buy_signal
+        _unexpected,  # process_stable_buy_signal
+        _unexpected,  # process_batch_buy_signal
+        _unexpected,  # process_gap_buy_signal
+        _unexpected,  # check_gap_recent_buy
+        _unexpected,  # check_2h_gain_filter
+        None,  # thread_pool
+    )
+
+    start = time.perf_counter()
+    for msg in messages:
+        handler(None, msg, *args, **kwargs)
+    elapsed = time.perf_counter() - start
+    return ticks / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--ticks", type=int, default=200000)
+    parser.add_argument("--sizes", default="36,300,1000")
+    parser.add_argument("--repeat", type=int, default=5, help="best of N runs")
+    parser.add_argument(
+        "--baseline-rev",
+        default=BASELINE_REV,
+        help="git revision of the per-tick limit calc handler",
+    )
+    options = parser.parse_args()
+
+    # Keep handler logging out of the measurement
+    logging.disable(logging.WARNING)
+
+    modes = [("baseline", load_baseline_handler(options.baseline_rev), False)]
+    if (
+        TriggerTable is not None
+        and "trigger_table" in inspect.signature(on_ticker_message).parameters
+    ):
+        modes.append(("trigger table", on_ticker_message, True))
+    else:
+        modes.append(("current", on_ticker_message, False))
+
+    print(f"baseline: {options.baseline_rev}")
+    print(f"{'instruments':>12} | " + " | ".join(f"{m:>20}" for m, _, _ in modes))
+    for size in [int(s) for s in options.sizes.split(",")]:
+        # Interleave modes and keep the best run of each to damp machine noise
+        results = [0.0] * len(modes)
+        for _ in range(options.repeat):
+            for i, (_, handler, flag) in enumerate(modes):
+                results[i] = max(results[i], run(handler, size, options.ticks, flag))
+        row = " | ".join(f"{r:>13,.0f} tick/s" for r in results)
+        speedup = f"  ({results[1] / results[0]:.2f}x)" if len(results) > 1 else ""
+        print(f"{size:>12} | {row}{speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebSocket vs REST order latency benchmark
+Places and cancels orders through WsOrderGateway and through the REST
+TradeAPI against a local stand-in for OKX (HTTP + private WebSocket), and
+reports per-call latency percentiles and concurrent throughput.
+
+Usage:
+    python benchmark_ws_orders.py [--orders 500] [--latency-ms 0]
+                                  [--concurrency 8]
+
+--latency-ms adds the same server-side delay to every REST and WebSocket
+response (a stand-in for exchange processing / network distance). The
+stand-in speaks plain HTTP and ws://, so TLS costs are not included; both
+clients keep their connection open, as they do in production.
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Measure the transports, not the shared rate limiter
+os.environ["RATE_LIMITER_ENABLED"] = "false"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from okx.Trade import TradeAPI  # noqa: E402
+from websockets.sync.server import serve  # noqa: E402
+
+from core.ws_order_gateway import WsOrderGateway  # noqa: E402
+
+_ord_ids = iter(range(10**12, 10**13))
+_ord_ids_lock = threading.Lock()
+
+
+def _ack(order: dict) -> dict:
+    with _ord_ids_lock:
+        ordId = str(next(_ord_ids))
+    return {
+        "ordId": order.get("ordId") or ordId,
+        "clOrdId": order.get("clOrdId", ""),
+        "tag": "",
+        "ts": str(int(time.time() * 1000)),
+        "sCode": "0",
+        "sMsg": "",
+    }
+
+
+def start_rest_server(delay: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like the real endpoint
+        disable_nagle_algorithm = True  # Headers and body go out as separate writes
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if not self.headers.get("OK-ACCESS-SIGN"):
+                self.send_error(401)
+                return
+            orders = body if isinstance(body, list) else [body]
+            time.sleep(delay)
+            payload = json.dumps(
+                {"code": "0", "msg": "", "data": [_ack(o) for o in orders]}
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_ws_server(delay: float):
+    def handler(conn):
+        for raw in conn:
+            if raw == "ping":
+                conn.send("pong")
+                continue
+            m = json.loads(raw)
+            if m.get("op") == "login":
+                conn.send(json.dumps({"event": "login", "code": "0", "msg": ""}))
+                continue
+
+            def respond(m=m):
+                time.sleep(delay)
+                conn.send(
+                    json.dumps(
+                        {
+                            "id": m["id"],
+                            "op": m["op"],
+                            "code": "0",
+                            "msg": "",
+                            "data": [_ack(o) for o in m["args"]],
+                        }
+                    )
+                )
+
+            # Answer out of order, as the exchange may
+            threading.Thread(target=respond, daemon=True).start()
+
+    server = serve(handler, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(api, orders: int, concurrency: int):
+    """Place + cancel each order; returns (latencies ms, orders/sec)"""
+    order = dict(instId="BTC-USDT", tdMode="cash", side="buy", ordType="limit")
+    order.update(px="100", sz="0.01")
+
+    def one(_):
+        start = time.perf_counter()
+        result = api.place_order(**order)
+        placed = time.perf_counter()
+        api.cancel_order(instId="BTC-USDT", ordId=result["data"][0]["ordId"])
+        if result.get("code") != "0":
+            raise RuntimeError(f"order rejected: {result}")
+        return (placed - start) * 1000, (time.perf_counter() - placed) * 1000
+
+    for _ in range(20):  # Warm up connections
+        one(None)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(orders)))
+    return latencies, orders / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    options = parser.parse_args()
+    logging.disable(logging.WARNING)
+    delay = options.latency_ms / 1000
+
+    rest_server = start_rest_server(delay)
+    ws_server = start_ws_server(delay)
+    rest = TradeAPI(
+        "key",
+        "secret",
+        "pass",
+        flag="0",
+        domain=f"http://127.0.0.1:{rest_server.server_address[1]}",
+    )
+    gateway = WsOrderGateway(
+        "key",
+        "secret",
+        "pass",
+        url=f"ws://127.0.0.1:{ws_server.socket.getsockname()[1]}",
+    )
+    threading.Thread(target=gateway.run_forever, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not gateway.is_ready():
+        if time.monotonic() > deadline:
+            sys.exit("gateway did not log in to the stand-in server")
+        time.sleep(0.01)
+
+    print(
+        f"orders={options.orders} latency={options.latency_ms:.0f}ms "
+        f"(server-side) concurrency={options.concurrency}"
+    )
+    print(
+        f"{'transport':>9} | {'conc':>4} | {'place p50':>9} | {'p99':>7} | "
+        f"{'cancel p50':>10} | {'orders/s':>8}"
+    )
+    for concurrency in (1, options.concurrency):
+        for name, api in (("rest", rest), ("websocket", gateway)):
+            latencies, rate = run(api, options.orders, concurrency)
+            place = [p for p, _ in latencies]
+            cancel = [c for _, c in latencies]
+            print(
+                f"{name:>9} | {concurrency:>4} | "
+                f"{statistics.median(place):>7.2f}ms | "
+                f"{percentile(place, 0.99):>5.2f}ms | "
+                f"{statistics.median(cancel):>8.2f}ms | {rate:>8.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
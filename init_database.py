@@ -10,7 +10,19 @@ import sys
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
-from utils.db_connection import DB_TYPE, init_orders_table  # noqa: E402
+from core.change_feed import install_change_tracking  # noqa: E402
+from core.orders_schema import (  # noqa: E402
+    backfill_typed_columns,
+    install_typed_columns,
+    mark_typed_migration,
+)
+from utils.blacklist_manager import BlacklistManager  # noqa: E402
+from utils.db_connection import (  # noqa: E402
+    DB_TYPE,
+    get_database_connection,
+    get_db_cursor,
+    init_orders_table,
+)
 
 
 def main():
@@ -18,6 +30,22 @@ def main():
     print(f"🔧 Initializing database ({DB_TYPE})...")
     try:
         init_orders_table()
+        with get_db_cursor() as cursor:
+            install_change_tracking(cursor)
+        print("✅ orders.updated_at change tracking installed")
+        with get_db_cursor() as cursor:
+            install_typed_columns(cursor)
+        conn = get_database_connection()
+        try:
+            backfill_typed_columns(conn)
+            mark_typed_migration(conn)
+        finally:
+            conn.close()
+        print("✅ orders typed columns installed and backfilled")
+        if BlacklistManager().install_change_trigger():
+            print("✅ Blacklist change notification trigger installed")
+        else:
+            print("⚠️ Blacklist change trigger not installed (TTL refresh only)")
         print("✅ Database tables initialized successfully")
         return 0
     except Exception as e:
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Migrate orders to typed columns.
+
+Steps (each idempotent, safe to re-run or interrupt):
+1) Install NUMERIC price_num/size_num/sell_price_num, the state_code enum,
+   the trigger keeping them in sync with the text columns, and partial
+   indexes on the open-position predicate (built CONCURRENTLY)
+2) Backfill rows written before the trigger, in id-range batches
+3) Verify no row's typed columns disagree with its text columns
+4) Record the migration; trading processes started afterwards read the
+   typed columns (ORDERS_TYPED_READS=auto), running ones keep the text
+   columns, which stay written - both work during the transition
+
+Usage:
+    python migrate_orders_schema.py [--status] [--install-only]
+                                    [--batch-size 5000]
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+import psycopg
+
+# Ensure src is importable
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from core.orders_schema import (  # noqa: E402
+    TYPED_BACKFILL_BATCH_SIZE,
+    backfill_typed_columns,
+    count_typed_mismatches,
+    install_typed_columns,
+    mark_typed_migration,
+    typed_migration_status,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate orders to typed columns")
+    parser.add_argument(
+        "--status", action="store_true", help="Show migration status and exit"
+    )
+    parser.add_argument(
+        "--install-only",
+        action="store_true",
+        help="Install columns, trigger and indexes without backfilling",
+    )
+    parser.add_argument("--batch-size", type=int, default=TYPED_BACKFILL_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        logging.error("DATABASE_URL not found in environment variables")
+        sys.exit(1)
+
+    # Autocommit: CREATE INDEX CONCURRENTLY cannot run in a transaction
+    conn = psycopg.connect(database_url, autocommit=True, connect_timeout=10)
+    try:
+        status = typed_migration_status(conn)
+        logging.info("Status: %s", status)
+        if args.status:
+            if status["columns"]:
+                logging.info(
+                    "Rows with typed columns out of sync: %s",
+                    count_typed_mismatches(conn),
+                )
+            return
+
+        cur = conn.cursor()
+        try:
+            install_typed_columns(cur, concurrently=True)
+        finally:
+            cur.close()
+        logging.info("Installed typed columns, trigger and partial indexes")
+        if args.install_only:
+            return
+
+        def progress(done_id, max_id, updated):
+            logging.info(
+                "Backfill: id %s/%s, %s rows updated", done_id, max_id, updated
+            )
+
+        updated = backfill_typed_columns(conn, args.batch_size, progress)
+        logging.info("Backfill done, %s rows updated", updated)
+
+        mismatches = count_typed_mismatches(conn)
+        if mismatches:
+            logging.error(
+                "%s rows still out of sync, migration not recorded (re-run)",
+                mismatches,
+            )
+            sys.exit(1)
+        mark_typed_migration(conn)
+        logging.info(
+            "✅ Migration recorded: processes started from now on read typed columns"
+        )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Asyncio Engine
+Runs the market-data sockets, periodic checks, deferred work and blocking
+REST/DB calls from a single event loop (opt-in via ENGINE_MODE=asyncio)
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+logger = logging.getLogger(__name__)
+
+# Blocking calls (REST, DB, strategy signal handlers) in flight at once
+ASYNC_ENGINE_MAX_CONCURRENCY = int(os.getenv("ASYNC_ENGINE_MAX_CONCURRENCY", "16"))
+WS_PING_INTERVAL_SECONDS = 20
+
+
+class _SocketAdapter:
+    """Minimal WebSocketApp stand-in so ws_ref users can keep calling .send()"""
+
+    def __init__(self, engine: "AsyncEngine", conn):
+        self._engine = engine
+        self._conn = conn
+
+    def send(self, data: str):
+        """Thread-safe send (queued on the event loop)"""
+        return asyncio.run_coroutine_threadsafe(
+            self._conn.send(data), self._engine.loop
+        )
+
+
+class AsyncEngine:
+    """Single event loop replacing the per-socket, ping and timer threads
+
+    Blocking work is never run on the loop itself: submit() hands it to a
+    bounded executor, so strategy code and REST/DB clients are reused as-is.
+    submit() mirrors ThreadPoolExecutor.submit and may be called from any
+    thread, so the engine can be passed wherever a thread_pool is expected.
+    """
+
+    def __init__(self, max_concurrency: int = ASYNC_ENGINE_MAX_CONCURRENCY):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="engine"
+        )
+        self._thread: Optional[threading.Thread] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._started = threading.Event()
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.timers = 0
+        self.errors = 0
+
+    @staticmethod
+    def available() -> bool:
+        """True if the asyncio WebSocket client is installed"""
+        return websockets is not None
+
+    def start(self):
+        """Start the event loop thread (idempotent)"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run_loop, daemon=True, name="AsyncEngine"
+        )
+        self._thread.start()
+        self._started.wait()
+        logger.warning(
+            f"✅ Asyncio engine started (max concurrency {self.max_concurrency})"
+        )
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._started.set)
+        self.loop.run_forever()
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ------------------------------------------------------------------
+    # Blocking work
+    # ------------------------------------------------------------------
+
+    def _run_blocking(self, fn: Callable, args: tuple):
+        with self._stats_lock:
+            self.in_flight += 1
+            if self.in_flight > self.max_in_flight:
+                self.max_in_flight = self.in_flight
+        try:
+            return fn(*args)
+        except Exception as e:
+            with self._stats_lock:
+                self.errors += 1
+            logger.error(f"Engine task {getattr(fn, '__name__', fn)} failed: {e}")
+            raise
+        finally:
+            with self._stats_lock:
+                self.in_flight -= 1
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Run fn(*args) on the bounded executor (thread-safe)"""
+        with self._stats_lock:
+            self.submitted += 1
+        return self._executor.submit(self._run_blocking, fn, args)
+
+    def call_later(self, delay_seconds: float, fn: Callable, *args):
+        """Run fn(*args) on the executor after delay_seconds (no sleeping thread)"""
+        with self._stats_lock:
+            self.timers += 1
+
+        def _fire():
+            with self._stats_lock:
+                self.timers -= 1
+            self.submit(fn, *args)
+
+        self.loop.call_soon_threadsafe(
+            lambda: self.loop.call_later(max(delay_seconds, 0), _fire)
+        )
+
+    # ------------------------------------------------------------------
+    # Long-running tasks
+    # ------------------------------------------------------------------
+
+    def _create_task(self, name: str, coro):
+        def _schedule():
+            self._tasks[name] = self.loop.create_task(coro, name=name)
+
+        self.loop.call_soon_threadsafe(_schedule)
+
+    def run_periodic(self, name: str, interval_seconds: float, fn: Callable):
+        """Run fn() every interval_seconds on the executor (never overlapping)"""
+
+        async def _periodic():
+            while True:
+                await asyncio.sleep(interval_seconds)
+                try:
+                    await asyncio.wrap_future(self.submit(fn))
+                except Exception:
+                    await asyncio.sleep(interval_seconds)  # Wait on error
+
+        self._create_task(name, _periodic())
+
+    def add_socket(
+        self,
+        name: str,
+        url: str,
+        on_message: Callable,
+        on_open: Callable,
+        ws_ref: dict,
+        ws_lock: threading.Lock,
+        inline: bool = True,
+        on_close: Optional[Callable] = None,
+    ):
+        """Run a reconnecting WebSocket on the loop
+
+        Args:
+            name: Task name (e.g. "ticker")
+            url: WebSocket URL
+            on_message: Existing handler, called as on_message(ws, msg_string)
+            on_open: Existing open handler (sends subscriptions via ws.send)
+            ws_ref: {"ws": ...} holder used for unsubscribe
+            ws_lock: Lock guarding ws_ref
+            inline: Handle frames on the loop; set False when the handler can
+                block (frames are then handled in order on the executor)
+            on_close: Optional callback on disconnect, called as on_close(ws)
+        """
+        self._create_task(
+            name,
+            self._socket_loop(
+                name, url, on_message, on_open, ws_ref, ws_lock, inline, on_close
+            ),
+        )
+
+    async def _ping_loop(self, conn):
+        while True:
+            await asyncio.sleep(WS_PING_INTERVAL_SECONDS)
+            await conn.send("ping")
+
+    async def _socket_loop(
+        self, name, url, on_message, on_open, ws_ref, ws_lock, inline, on_close
+    ):
+        # Same reconnection parameters as the threaded connect_websocket
+        initial_delay = float(os.getenv("WS_RECONNECT_INITIAL_DELAY", "1.0"))
+        max_delay = float(os.getenv("WS_RECONNECT_MAX_DELAY", "300"))
+        backoff_multiplier = float(os.getenv("WS_RECONNECT_BACKOFF_MULTIPLIER", "2.0"))
+        min_stable_time = float(os.getenv("WS_MIN_STABLE_TIME", "60.0"))
+
+        reconnect_delay = initial_delay
+        while True:
+            connected_at = None
+            ping_task = None
+            try:
+                async with websockets.connect(
+                    url, ping_interval=None, max_size=None
+                ) as conn:
+                    connected_at = time.time()
+                    adapter = _SocketAdapter(self, conn)
+                    with ws_lock:
+                        ws_ref["ws"] = adapter
+
+                    # on_open sleeps between subscribe batches - keep it off the loop
+                    await self.loop.run_in_executor(self._executor, on_open, adapter)
+                    ping_task = asyncio.create_task(self._ping_loop(conn))
+
+                    def _handle(raw):
+                        try:
+                            on_message(adapter, raw)
+                        except Exception as e:
+                            logger.error(f"{name} message handler error: {e}")
+
+                    async for raw in conn:
+                        if inline:
+                            _handle(raw)
+                        else:
+                            await self.loop.run_in_executor(
+                                self._executor, _handle, raw
+                            )
+                logger.warning(f"{name} WebSocket closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{name} WebSocket connection failed: {e}")
+            finally:
+                if ping_task is not None:
+                    ping_task.cancel()
+                with ws_lock:
+                    ws_ref["ws"] = None
+                if on_close is not None:
+                    on_close(None)
+
+            if connected_at and time.time() - connected_at >= min_stable_time:
+                reconnect_delay = initial_delay
+            logger.warning(f"Retrying {name} in {reconnect_delay} seconds...")
+            await asyncio.sleep(reconnect_delay)
+            reconnect_delay = min(reconnect_delay * backoff_multiplier, max_delay)
+
+    # ------------------------------------------------------------------
+    # Monitoring
+    # ------------------------------------------------------------------
+
+    def dead_tasks(self) -> List[str]:
+        """Names of long-running tasks that have exited"""
+        return [name for name, task in list(self._tasks.items()) if task.done()]
+
+    def format_stats(self) -> str:
+        with self._stats_lock:
+            return (
+                f"⚙️ Engine: tasks={len(self._tasks)}, "
+                f"in_flight={self.in_flight}/{self.max_concurrency} "
+                f"(max {self.max_in_flight}), submitted={self.submitted}, "
+                f"timers={self.timers}, errors={self.errors}, "
+                f"threads={threading.active_count()}"
+            )
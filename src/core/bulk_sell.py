@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bulk Sell Executor
+Collects the sells due at the :55 boundary and executes them with OKX
+batch-order calls, one batched confirmation and one DB transaction
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Set, Tuple
+
+from .advisory_lock import acquire_sell_locks
+from .instrument_state import instrument_lock
+from .okx_functions import meets_min_size
+from .order_history import HISTORY_MAX_PAGES, HISTORY_WINDOW_SLACK_SECONDS
+from .order_state import get_order_state_cache, is_terminal
+from .orders_schema import open_position_sql
+from .position_index import record_closed
+from .rate_limiter import PRIORITY_SELL, at_priority
+from .signal_processing import get_sell_signal_lock
+from .task_runner import schedule_later
+
+logger = logging.getLogger(__name__)
+
+BULK_SELL_ENABLED = os.getenv("BULK_SELL_ENABLED", "true").lower() == "true"
+# Sells triggered within this window are executed together
+BULK_SELL_WINDOW_SECONDS = float(os.getenv("BULK_SELL_WINDOW_SECONDS", "0.25"))
+# Max wait for fills to be confirmed (pushed state) before batch REST lookup
+BULK_SELL_CONFIRM_SECONDS = float(os.getenv("BULK_SELL_CONFIRM_SECONDS", "3"))
+# Orders-history passes for sells still unconfirmed (history can lag fills)
+BULK_SELL_HISTORY_ATTEMPTS = int(os.getenv("BULK_SELL_HISTORY_ATTEMPTS", "3"))
+OKX_BATCH_ORDER_LIMIT = 20  # Max orders per /trade/batch-orders call
+OKX_ORDERS_HISTORY_LIMIT = 100
+
+# (instId, strategy_type)
+SellKey = Tuple[str, str]
+
+
+class BulkSellExecutor:
+    """Batch execution for due sells, falling back to per-instrument sells
+
+    Only the common case is batched: filled buy orders with no sell order
+    linked yet. Anything else (partial fills, an existing sell_order_id,
+    rejected or unconfirmed orders) is handed to the per-instrument
+    fallback, which already knows how to verify and retry those.
+    """
+
+    def __init__(
+        self,
+        get_trade_api_func: Callable,
+        get_db_connection_func: Callable,
+        format_number_func: Callable,
+        play_sound_func: Callable,
+        strategies: Dict[str, Tuple[str, dict]],
+        lock,
+        fallback_func: Callable[[str, str], None],
+        window_seconds: float = BULK_SELL_WINDOW_SECONDS,
+    ):
+        """
+        Args:
+            strategies: strategy_type -> (strategy_name/flag, active orders dict)
+            fallback_func: Per-instrument sell, called as
+                fallback_func(instId, strategy_type)
+        """
+        self.get_trade_api = get_trade_api_func
+        self.get_db_connection = get_db_connection_func
+        self.format_number = format_number_func
+        self.play_sound = play_sound_func
+        self.strategies = strategies
+        self.lock = lock
+        self.fallback = fallback_func
+        self.window_seconds = window_seconds
+        self._pending: Set[SellKey] = set()
+        self._pending_lock = threading.Lock()
+
+    def submit(self, instId: str, strategy_type: str):
+        """Queue a due sell; the first one in a window arms the flush"""
+        with self._pending_lock:
+            arm = not self._pending
+            self._pending.add((instId, strategy_type))
+        if arm:
+            schedule_later(self.window_seconds, self._flush)
+
+    def _flush(self):
+        with self._pending_lock:
+            keys = list(self._pending)
+            self._pending.clear()
+        if not keys:
+            return
+        try:
+            self.execute(keys)
+        except Exception as e:
+            logger.error(f"❌ BULK SELL error, falling back to per-instrument: {e}")
+            for instId, strategy_type in keys:
+                self.fallback(instId, strategy_type)
+
+    @at_priority(PRIORITY_SELL)
+    def execute(self, keys: List[SellKey]):
+        """Sell every due order for the given (instId, strategy_type) pairs"""
+        started = time.time()
+        now = datetime.now()
+        boundary = now.replace(minute=55, second=0, microsecond=0)
+        if now < boundary:
+            boundary = now
+
+        fallback: Set[SellKey] = set()
+        held: Dict[SellKey, threading.Lock] = {}
+        lease = None
+        try:
+            for key in keys:
+                strategy_name = self.strategies[key[1]][0]
+                sell_lock = get_sell_signal_lock(key[0], strategy_name)
+                if sell_lock.acquire(blocking=False):
+                    held[key] = sell_lock
+                else:
+                    logger.debug(f"BULK SELL: {key[0]} ({key[1]}) already selling")
+            # Cross-process locks for everything held locally, in one round-trip
+            by_pair = {(self.strategies[key[1]][0], key[0]): key for key in held}
+            lease, acquired = acquire_sell_locks(self.get_db_connection, by_pair)
+            for pair in set(by_pair) - acquired:
+                logger.warning(
+                    f"🔒 BULK SELL: {pair[1]} ({pair[0]}) in progress in another process"
+                )
+            locked = [by_pair[pair] for pair in acquired]
+            if locked:
+                self._execute_locked(locked, fallback, started, boundary)
+        finally:
+            if lease is not None:
+                lease.release()
+            for sell_lock in held.values():
+                sell_lock.release()
+
+        for instId, strategy_type in fallback:
+            self.fallback(instId, strategy_type)
+
+    def _execute_locked(
+        self,
+        keys: List[SellKey],
+        fallback: Set[SellKey],
+        started: float,
+        boundary: datetime,
+    ):
+        api = self.get_trade_api()
+        if api is None:
+            fallback.update(keys)
+            return
+
+        flag_to_type = {name: st for st, (name, _) in self.strategies.items()}
+        wanted = set(keys)
+        rows_by_key: Dict[SellKey, List[tuple]] = {key: [] for key in keys}
+        # Unsold rows left per sold key after finalize (incl. not yet due)
+        unsold: Dict[SellKey, int] = {}
+
+        conn = self.get_db_connection()
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute(
+                    f"""
+                    SELECT instId, ordId, flag, state, size, sell_order_id
+                    FROM orders
+                    WHERE instId = ANY(%s) AND flag = ANY(%s)
+                      AND {open_position_sql()}
+                      AND sell_time IS NOT NULL
+                      AND sell_time <= %s
+                    ORDER BY create_time ASC
+                    """,
+                    (
+                        sorted({instId for instId, _ in keys}),
+                        sorted({self.strategies[st][0] for _, st in keys}),
+                        int(datetime.now().timestamp() * 1000),
+                    ),
+                )
+                for instId, ordId, flag, state, size, sell_order_id in cur.fetchall():
+                    key = (instId, flag_to_type.get(flag))
+                    if key in wanted:
+                        rows_by_key[key].append((ordId, state, size, sell_order_id))
+            finally:
+                cur.close()
+
+            # Batch only instruments whose due orders are all plain filled buys
+            to_place = []
+            for key, rows in rows_by_key.items():
+                clean = rows and all(
+                    state == "filled" and not sell_order_id and float(size or 0) > 0
+                    for _, state, size, sell_order_id in rows
+                )
+                if not clean:
+                    fallback.add(key)
+                    continue
+                # OKX rejects sizes below minSz: leave dust to the fallback
+                dust = [
+                    ordId
+                    for ordId, _, size, _ in rows
+                    if not meets_min_size(
+                        key[0], self.format_number(float(size), key[0])
+                    )
+                ]
+                if dust:
+                    logger.warning(
+                        f"🧹 BULK SELL: {key[0]} ({key[1]}) size below minSz for "
+                        f"{dust}, not batching"
+                    )
+                    fallback.add(key)
+                    continue
+                for ordId, _, size, _ in rows:
+                    to_place.append(
+                        (key, ordId, self.format_number(float(size), key[0]))
+                    )
+
+            placed = self._place(api, to_place, fallback)
+            placed_ms = (time.time() - started) * 1000
+            if not placed:
+                return
+
+            # Link sell orders to their buys in one batch before confirming
+            cur = conn.cursor()
+            try:
+                cur.executemany(
+                    "UPDATE orders SET sell_order_id = %s "
+                    "WHERE instId = %s AND ordId = %s",
+                    [(sell_id, key[0], ordId) for key, ordId, _, sell_id in placed],
+                )
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.warning(f"⚠️ BULK SELL: could not link sell_order_id: {e}")
+            finally:
+                cur.close()
+
+            fills = self._confirm(
+                api, [sell_id for _, _, _, sell_id in placed], int(started * 1000)
+            )
+
+            sold = []
+            last_fill_ms = 0
+            for key, ordId, size_str, sell_id in placed:
+                order = fills.get(sell_id)
+                sell_price = 0.0
+                if order is not None and order.get("state") == "filled":
+                    try:
+                        sell_price = float(
+                            order.get("avgPx") or order.get("fillPx") or 0
+                        )
+                    except (ValueError, TypeError):
+                        sell_price = 0.0
+                if sell_price <= 0:
+                    # Linked sell_order_id lets the fallback poll instead of re-selling
+                    fallback.add(key)
+                    continue
+                sold.append((key, ordId, size_str, sell_price, sell_id))
+                last_fill_ms = max(last_fill_ms, int(order.get("fillTime") or 0))
+
+            # Finalize all confirmed sells in one transaction
+            if sold:
+                cur = conn.cursor()
+                try:
+                    cur.executemany(
+                        "UPDATE orders SET state = %s, sell_price = %s "
+                        "WHERE instId = %s AND ordId = %s",
+                        [
+                            (
+                                "sold out",
+                                self.format_number(
+                                    sell_price, key[0], kind="fill_price"
+                                ),
+                                key[0],
+                                ordId,
+                            )
+                            for key, ordId, _, sell_price, _ in sold
+                        ],
+                    )
+                    cur.execute(
+                        f"""
+                        SELECT instId, flag, COUNT(*) FROM orders
+                        WHERE instId = ANY(%s) AND flag = ANY(%s)
+                          AND {open_position_sql(include_pending=True)}
+                        GROUP BY instId, flag
+                        """,
+                        (
+                            sorted({key[0] for key, *_ in sold}),
+                            sorted({self.strategies[key[1]][0] for key, *_ in sold}),
+                        ),
+                    )
+                    for instId, flag, count in cur.fetchall():
+                        unsold[(instId, flag_to_type.get(flag))] = count
+                    conn.commit()
+                    for key, ordId, *_ in sold:
+                        record_closed(self.strategies[key[1]][0], key[0], ordId)
+                except Exception as e:
+                    conn.rollback()
+                    logger.error(f"❌ BULK SELL DB finalize failed: {e}")
+                    fallback.update(key for key, *_ in sold)
+                    sold = []
+                finally:
+                    cur.close()
+        finally:
+            conn.close()
+
+        for key, ordId, size_str, sell_price, sell_id in sold:
+            logger.warning(
+                f"✅ BULK SELL SAVED: {key[0]} ({key[1]}), price={sell_price:.6f}, "
+                f"size={size_str}, amount={sell_price * float(size_str):.2f} USDT, "
+                f"ordId={ordId}, sell_ordId={sell_id}"
+            )
+        if sold:
+            self.play_sound("sell")
+
+        # Drop instruments with no unsold orders left; others (e.g. later
+        # batch buys not due yet) keep their entry minus the sold ordIds
+        sold_by_key: Dict[SellKey, Dict[str, float]] = {}
+        for key, ordId, size_str, *_ in sold:
+            sold_by_key.setdefault(key, {})[ordId] = float(size_str)
+        for key, sold_sizes in sold_by_key.items():
+            if key in fallback:
+                continue
+            orders_dict = self.strategies[key[1]][1]
+            with instrument_lock(self.lock, key[0]):
+                if unsold.get(key, 0) == 0:
+                    orders_dict.pop(key[0], None)
+                    continue
+                order_info = orders_dict.get(key[0])
+                if order_info is None:
+                    continue
+                if "ordIds" in order_info:
+                    order_info["ordIds"] = [
+                        ordId
+                        for ordId in order_info["ordIds"]
+                        if ordId not in sold_sizes
+                    ]
+                if "total_size" in order_info:
+                    order_info["total_size"] = max(
+                        order_info["total_size"] - sum(sold_sizes.values()), 0.0
+                    )
+                # Allow the remaining orders' sells to trigger when due
+                order_info["sell_triggered"] = False
+
+        last_fill = (
+            f"last fill +{(last_fill_ms / 1000 - boundary.timestamp()) * 1000:.0f}ms"
+            if last_fill_ms
+            else "no fills"
+        )
+        logger.warning(
+            f"⏱️ BULK SELL: {len(sold)}/{len(placed)} orders sold across "
+            f"{len(keys)} instruments, placed +{placed_ms:.0f}ms, {last_fill} "
+            f"after {boundary.strftime('%H:%M:%S')}, "
+            f"done +{(time.time() - boundary.timestamp()) * 1000:.0f}ms, "
+            f"{len(fallback)} fallback"
+        )
+
+    def _place(self, api, to_place: list, fallback: Set[SellKey]) -> list:
+        """Place market sells in batch calls; returns (key, ordId, sz, sell_ordId)"""
+        placed = []
+        for i in range(0, len(to_place), OKX_BATCH_ORDER_LIMIT):
+            chunk = to_place[i : i + OKX_BATCH_ORDER_LIMIT]
+            try:
+                result = api.place_multiple_orders(
+                    [
+                        {
+                            "instId": key[0],
+                            "tdMode": "cash",
+                            "side": "sell",
+                            "ordType": "market",
+                            "sz": size_str,
+                            "tgtCcy": "base_ccy",
+                        }
+                        for key, _, size_str in chunk
+                    ]
+                )
+                data = result.get("data") or []
+            except Exception as e:
+                logger.error(f"❌ BULK SELL batch order call failed: {e}")
+                data = []
+
+            for j, (key, ordId, size_str) in enumerate(chunk):
+                entry = data[j] if j < len(data) else {}
+                sell_id = entry.get("ordId")
+                if entry.get("sCode") == "0" and sell_id:
+                    placed.append((key, ordId, size_str, sell_id))
+                else:
+                    logger.error(
+                        f"❌ BULK SELL rejected: {key[0]} ({key[1]}), ordId={ordId}, "
+                        f"sCode={entry.get('sCode')}, sMsg={entry.get('sMsg')}"
+                    )
+                    fallback.add(key)
+        return placed
+
+    def _confirm(self, api, sell_ids: List[str], since_ms: int) -> Dict[str, dict]:
+        """Terminal state of each sell order: pushed state first, then paged
+        orders-history lookups for whatever is still unknown"""
+        fills: Dict[str, dict] = {}
+        cache = get_order_state_cache()
+        deadline = time.monotonic() + BULK_SELL_CONFIRM_SECONDS
+        if cache.is_live():
+            for sell_id in sell_ids:
+                order = cache.wait_for(
+                    sell_id, is_terminal, max(deadline - time.monotonic(), 0)
+                )
+                if order is not None and is_terminal(order):
+                    fills[sell_id] = order
+        else:
+            time.sleep(0.5)  # Let market orders fill before the history lookup
+
+        for attempt in range(BULK_SELL_HISTORY_ATTEMPTS):
+            missing = {sell_id for sell_id in sell_ids if sell_id not in fills}
+            if not missing:
+                break
+            if attempt:
+                time.sleep(1)  # Fills can reach orders-history late
+            try:
+                for order in self._history_since(api, missing, since_ms):
+                    cache.update(order)
+                    fills[order["ordId"]] = order
+            except Exception as e:
+                logger.warning(f"⚠️ BULK SELL orders history lookup failed: {e}")
+        return fills
+
+    def _history_since(self, api, wanted: Set[str], since_ms: int) -> List[dict]:
+        """Market orders among wanted ordIds, paging orders-history back (with
+        `after`) until all are found or the page is older than since_ms"""
+        found: List[dict] = []
+        # cTime is OKX's clock, since_ms ours
+        since_ms -= int(HISTORY_WINDOW_SLACK_SECONDS * 1000)
+        after = ""
+        for _ in range(HISTORY_MAX_PAGES):
+            result = api.get_orders_history(
+                instType="SPOT",
+                ordType="market",
+                after=after,
+                limit=str(OKX_ORDERS_HISTORY_LIMIT),
+            )
+            if result.get("code") not in (None, "0"):
+                raise RuntimeError(f"code={result.get('code')}: {result.get('msg')}")
+            page = result.get("data") or []
+            for order in page:
+                if order.get("ordId") in wanted:
+                    found.append(order)
+            if len(found) == len(wanted) or len(page) < OKX_ORDERS_HISTORY_LIMIT:
+                break
+            oldest = page[-1]
+            if int(oldest.get("cTime") or 0) < since_ms:
+                break  # Past the batch start: older pages cannot hold its sells
+            after = oldest.get("ordId", "")
+        return found
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Orders Change Feed
+Trigger-maintained orders.updated_at plus an in-process watermark, so
+reconciliation fetches only the rows changed since the previous sync
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ORDERS_CHANGE_FEED_ENABLED = (
+    os.getenv("ORDERS_CHANGE_FEED_ENABLED", "true").lower() == "true"
+)
+# Changes are re-read this far behind the watermark: a transaction stamps
+# updated_at before it commits, so a slow commit can land behind rows
+# already seen (re-applying a row is harmless)
+CHANGE_FEED_OVERLAP_SECONDS = float(os.getenv("CHANGE_FEED_OVERLAP_SECONDS", "60"))
+# Full scan as a consistency audit (deleted rows, missed changes)
+MEMORY_SYNC_AUDIT_INTERVAL_SECONDS = float(
+    os.getenv("MEMORY_SYNC_AUDIT_INTERVAL_SECONDS", "3600")
+)
+
+# Column list of change rows; position_index.apply_changes reads the first six
+CHANGE_COLUMNS = (
+    "flag, instId, ordId, state, create_time, sell_price, size, price, updated_at"
+)
+
+CHANGE_TRACKING_DDL = (
+    """
+    ALTER TABLE orders
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION orders_touch_updated_at()
+    RETURNS trigger AS $$
+    BEGIN
+        NEW.updated_at := clock_timestamp();
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS orders_updated_at ON orders",
+    """
+    CREATE TRIGGER orders_updated_at
+    BEFORE INSERT OR UPDATE ON orders
+    FOR EACH ROW EXECUTE FUNCTION orders_touch_updated_at()
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_orders_updated_at ON orders(updated_at)",
+)
+
+
+def install_change_tracking(cursor):
+    """Add orders.updated_at, its trigger and index (idempotent)"""
+    for statement in CHANGE_TRACKING_DDL:
+        cursor.execute(statement)
+
+
+def has_change_tracking(conn) -> bool:
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT
+                EXISTS (SELECT 1 FROM information_schema.columns
+                        WHERE table_name = 'orders' AND column_name = 'updated_at'),
+                EXISTS (SELECT 1 FROM pg_trigger
+                        WHERE tgname = 'orders_updated_at' AND NOT tgisinternal)
+            """
+        )
+        column, trigger = cur.fetchone()
+        return bool(column and trigger)
+    finally:
+        cur.close()
+
+
+class OrdersChangeFeed:
+    """Watermark over orders.updated_at (database clock)
+
+    The watermark is only set by a full scan (mark_full_scan) and advanced
+    by fetch_changes, so a process that has not scanned yet never skips
+    changes.
+    """
+
+    def __init__(
+        self,
+        overlap_seconds: float = CHANGE_FEED_OVERLAP_SECONDS,
+        audit_interval_seconds: float = MEMORY_SYNC_AUDIT_INTERVAL_SECONDS,
+    ):
+        self.overlap_seconds = overlap_seconds
+        self.audit_interval_seconds = audit_interval_seconds
+        self.available = False
+        self.watermark: Optional[datetime] = None
+        self._last_full_scan = 0.0  # monotonic
+        self.delta_syncs = 0
+        self.full_syncs = 0
+        self.rows_fetched = 0
+
+    def ensure(self, conn, installed: Optional[bool] = None) -> bool:
+        """Check for (and if missing install) change tracking on orders
+
+        Args:
+            installed: Already known from the schema registry (skips the probe)
+        """
+        try:
+            if installed is None:
+                installed = has_change_tracking(conn)
+            if not installed:
+                cur = conn.cursor()
+                try:
+                    install_change_tracking(cur)
+                finally:
+                    cur.close()
+                conn.commit()
+                logger.warning("✅ Installed orders.updated_at change tracking")
+            self.available = True
+        except Exception as e:
+            logger.warning(f"⚠️ Orders change tracking unavailable: {e}")
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            self.available = False
+        return self.available
+
+    def delta_ready(self) -> bool:
+        """A delta sync may run (else a full scan is needed)"""
+        return (
+            self.available
+            and self.watermark is not None
+            and time.monotonic() - self._last_full_scan < self.audit_interval_seconds
+        )
+
+    def database_now(self, conn) -> Optional[datetime]:
+        """Watermark for a full scan about to start"""
+        if not self.available:
+            return None
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT clock_timestamp()")
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
+
+    def mark_full_scan(self, started_at: Optional[datetime]):
+        """A full scan that began at started_at (database time) completed"""
+        self.full_syncs += 1
+        self._last_full_scan = time.monotonic()
+        if started_at is not None:
+            self.watermark = started_at
+
+    def fetch_changes(self, conn, flags: Iterable[str]) -> List[tuple]:
+        """Rows of flags changed since the watermark (CHANGE_COLUMNS order)
+
+        Advances the watermark to the newest updated_at returned.
+        """
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                f"""
+                SELECT {CHANGE_COLUMNS}
+                FROM orders
+                WHERE updated_at > %s::timestamptz - make_interval(secs => %s)
+                  AND flag = ANY(%s)
+                ORDER BY updated_at
+                """,
+                (self.watermark, self.overlap_seconds, sorted(set(flags))),
+            )
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+        if rows:
+            self.watermark = max(self.watermark, rows[-1][-1])
+        self.delta_syncs += 1
+        self.rows_fetched += len(rows)
+        return rows
+
+    def format_stats(self, reset: bool = False) -> str:
+        line = (
+            f"🧾 Orders change feed: available={self.available}, "
+            f"delta syncs={self.delta_syncs}, full syncs={self.full_syncs}, "
+            f"rows fetched={self.rows_fetched}"
+        )
+        if reset:
+            self.delta_syncs = self.full_syncs = self.rows_fetched = 0
+        return line
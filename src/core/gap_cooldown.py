@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gap Strategy Global Cooldown
+Last gap buy time held in memory: loaded once from the database, updated by
+this process's buys, and by other processes' buys via Postgres NOTIFY, so
+the tick thread's cooldown check never does I/O
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+import psycopg
+
+from .leader_election import direct_conninfo
+from .task_runner import spawn
+
+logger = logging.getLogger(__name__)
+
+GAP_COOLDOWN_NOTIFY_CHANNEL = "gap_buy"
+GAP_COOLDOWN_NOTIFY_ENABLED = (
+    os.getenv("GAP_COOLDOWN_NOTIFY_ENABLED", "true").lower() == "true"
+)
+# While the last load failed, cooldown checks retry it in the background
+# at most this often
+GAP_COOLDOWN_RETRY_SECONDS = float(os.getenv("GAP_COOLDOWN_RETRY_SECONDS", "30"))
+
+
+class GapCooldown:
+    """Global (all instruments) cooldown after any gap-strategy buy
+
+    LISTEN needs a session, so the listener connects directly (not through
+    the PgBouncer pooler); NOTIFY is sent on a pooled connection.
+    """
+
+    def __init__(
+        self,
+        get_db: Callable,
+        strategy_name: str,
+        cooldown_seconds: float,
+        database_url: str = "",
+        notify_enabled: bool = GAP_COOLDOWN_NOTIFY_ENABLED,
+    ):
+        self.get_db = get_db
+        self.strategy_name = strategy_name
+        self.cooldown_seconds = cooldown_seconds
+        self.conninfo = direct_conninfo(database_url) if database_url else ""
+        self.notify_enabled = notify_enabled and bool(self.conninfo)
+        self.last_buy_ts = 0.0  # Epoch seconds of the latest known gap buy
+        self._load_failed = False
+        self._load_attempt_at = 0.0  # monotonic
+        self._retry_lock = threading.Lock()
+        self._retrying = False
+        self.load_failures = 0
+        self._listening = False
+        self._listener_thread: Optional[threading.Thread] = None
+        self.notifies_sent = 0
+        self.notifies_received = 0
+
+    def start(self):
+        """Load the latest gap buy from the database and start the listener"""
+        self.load()
+        if self.notify_enabled and self._listener_thread is None:
+            self._listener_thread = threading.Thread(
+                target=self._listen_loop, daemon=True, name="GapCooldownListener"
+            )
+            self._listener_thread.start()
+
+    def load(self) -> bool:
+        self._load_attempt_at = time.monotonic()
+        conn = None
+        try:
+            conn = self.get_db()
+            cur = conn.cursor()
+            try:
+                cur.execute(
+                    """
+                    SELECT MAX(create_time) FROM orders
+                    WHERE side = 'buy' AND flag = %s AND create_time >= %s
+                    """,
+                    (
+                        self.strategy_name,
+                        int((time.time() - self.cooldown_seconds) * 1000),
+                    ),
+                )
+                row = cur.fetchone()
+            finally:
+                cur.close()
+        except Exception as e:
+            self._load_failed = True
+            self.load_failures += 1
+            logger.warning(f"⚠️ Gap cooldown load failed: {e}")
+            return False
+        finally:
+            if conn is not None:
+                conn.close()
+        self._load_failed = False
+        if row and row[0]:
+            self.observe(float(row[0]) / 1000.0)
+        return True
+
+    def _retry_load_if_failed(self):
+        """Reload in the background while the last load failed (throttled)
+
+        Without the listener nothing else would ever load again, leaving the
+        cooldown empty for the life of the process.
+        """
+        if not self._load_failed:
+            return
+        if time.monotonic() - self._load_attempt_at < GAP_COOLDOWN_RETRY_SECONDS:
+            return
+        with self._retry_lock:
+            if self._retrying:
+                return
+            self._retrying = True
+        spawn(self._retry_load)
+
+    def _retry_load(self):
+        try:
+            if self.load():
+                logger.warning("✅ Gap cooldown loaded after earlier failure")
+        finally:
+            self._retrying = False
+
+    def observe(self, buy_ts: float):
+        """A gap buy happened at buy_ts (keeps the latest)"""
+        if buy_ts > self.last_buy_ts:
+            self.last_buy_ts = buy_ts
+
+    def record(self, buy_ts: float):
+        """This process bought: update memory now, tell other processes"""
+        self.observe(buy_ts)
+        if self.notify_enabled:
+            spawn(self._notify, buy_ts)
+
+    def is_active(self, now: Optional[float] = None) -> bool:
+        """Cooldown running (no I/O; a failed load is retried in the background)"""
+        self._retry_load_if_failed()
+        now = time.time() if now is None else now
+        return now - self.last_buy_ts < self.cooldown_seconds
+
+    def _notify(self, buy_ts: float):
+        conn = None
+        try:
+            conn = self.get_db()
+            cur = conn.cursor()
+            try:
+                cur.execute(
+                    "SELECT pg_notify(%s, %s)",
+                    (GAP_COOLDOWN_NOTIFY_CHANNEL, f"{self.strategy_name}:{buy_ts}"),
+                )
+            finally:
+                cur.close()
+            conn.commit()
+            self.notifies_sent += 1
+        except Exception as e:
+            logger.warning(f"⚠️ Gap cooldown NOTIFY failed: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _on_notify(self, payload: str):
+        strategy_name, _, ts = payload.rpartition(":")
+        if strategy_name != self.strategy_name:
+            return
+        try:
+            self.observe(float(ts))
+        except ValueError:
+            return
+        self.notifies_received += 1
+
+    def _listen_loop(self):
+        """Hold a dedicated connection on LISTEN (reloads after reconnecting)"""
+        retry_delay = 5
+        while True:
+            try:
+                with psycopg.connect(self.conninfo, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {GAP_COOLDOWN_NOTIFY_CHANNEL}")
+                    self._listening = True
+                    retry_delay = 5
+                    # Pick up any buy missed while (re)connecting
+                    self.load()
+                    logger.info(
+                        f"👂 Listening for gap buys on '{GAP_COOLDOWN_NOTIFY_CHANNEL}'"
+                    )
+                    while True:
+                        received = False
+                        for notify in conn.notifies(timeout=60):
+                            self._on_notify(notify.payload)
+                            received = True
+                        if not received:
+                            # Idle: keep the connection alive / detect drops
+                            conn.execute("SELECT 1")
+            except Exception as e:
+                logger.warning(
+                    f"⚠️ Gap cooldown listener disconnected ({e}), retrying in "
+                    f"{retry_delay}s"
+                )
+            self._listening = False
+            time.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 300)
+
+    def format_stats(self) -> str:
+        remaining = max(0.0, self.cooldown_seconds - (time.time() - self.last_buy_ts))
+        return (
+            f"⏳ Gap cooldown: {remaining:.0f}s remaining, "
+            f"listening={self._listening}, notifies sent={self.notifies_sent}, "
+            f"received={self.notifies_received}, load failures={self.load_failures}"
+        )
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instrument Metadata
+SPOT instrument precision (tickSz/lotSz/minSz) preloaded in one call, cached
+on disk, and compiled into exact decimal quantizers for order formatting
+"""
+
+import json
+import logging
+import os
+import time
+from decimal import ROUND_DOWN, ROUND_HALF_EVEN, Decimal, InvalidOperation
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+INSTRUMENT_CACHE_PATH = os.getenv("INSTRUMENT_CACHE_PATH", "instrument_cache.json")
+# Tick/lot sizes change rarely (OKX announces them); refetch after this long
+INSTRUMENT_CACHE_TTL_SECONDS = float(
+    os.getenv("INSTRUMENT_CACHE_TTL_SECONDS", str(12 * 3600))
+)
+
+
+def count_decimal_places(s: str) -> int:
+    if "." in s:
+        return len(s.split(".")[-1].rstrip("0"))
+    return 0
+
+
+def precision_from_instrument(inst: dict) -> Dict:
+    """get_instruments row -> precision info (the format cached per instId)"""
+    tick_sz = inst.get("tickSz", "")
+    lot_sz = inst.get("lotSz", "")
+    min_sz = inst.get("minSz", "")
+    return {
+        "tickSz": tick_sz,
+        "tickPrecision": count_decimal_places(tick_sz),
+        "lotSz": lot_sz,
+        "lotPrecision": count_decimal_places(lot_sz),
+        "minSz": min_sz,
+        "minPrecision": count_decimal_places(min_sz),
+    }
+
+
+def _step(value: str) -> Optional[Decimal]:
+    try:
+        step = Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return step if step > 0 else None
+
+
+class InstrumentQuantizer:
+    """Rounds prices to tickSz and sizes to lotSz with exact decimals
+
+    Built once per instrument so formatting an order does no I/O and no
+    string parsing of the instrument's sizes. Order sizes and prices round
+    down: a size never exceeds the balance being sold and a buy price never
+    exceeds its limit. Recorded fill prices round to the nearest tick, as
+    format_number always did, so stored prices carry no downward bias.
+    """
+
+    __slots__ = ("instId", "tick_sz", "lot_sz", "min_sz")
+
+    def __init__(self, instId: str, precision_info: Dict):
+        self.instId = instId
+        self.tick_sz = _step(precision_info.get("tickSz", ""))
+        self.lot_sz = _step(precision_info.get("lotSz", ""))
+        self.min_sz = _step(precision_info.get("minSz", "")) or Decimal(0)
+
+    @staticmethod
+    def _quantize(value, step: Optional[Decimal], rounding=ROUND_DOWN) -> Decimal:
+        amount = Decimal(str(value))
+        if step is None:
+            return amount
+        return (amount / step).to_integral_value(rounding=rounding) * step
+
+    @staticmethod
+    def _format(amount: Decimal) -> str:
+        text = format(amount, "f")
+        if "." in text:
+            text = text.rstrip("0").rstrip(".")
+        return text or "0"
+
+    def price(self, value) -> str:
+        return self._format(self._quantize(value, self.tick_sz))
+
+    def fill_price(self, value) -> str:
+        return self._format(self._quantize(value, self.tick_sz, ROUND_HALF_EVEN))
+
+    def size(self, value) -> str:
+        return self._format(self._quantize(value, self.lot_sz))
+
+    def meets_min_size(self, size) -> bool:
+        """Whether size, rounded to lotSz, is at least minSz"""
+        return self._quantize(size, self.lot_sz) >= self.min_sz
+
+
+def load_cache(
+    path: str = INSTRUMENT_CACHE_PATH, ttl_seconds: float = INSTRUMENT_CACHE_TTL_SECONDS
+) -> Optional[Dict[str, Dict]]:
+    """Precision info per instId from the disk cache (None if missing/expired)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Ignoring instrument cache {path}: {e}")
+        return None
+    age = time.time() - cached.get("fetched_at", 0)
+    if not 0 <= age <= ttl_seconds:
+        logger.info(f"📊 Instrument cache {path} expired ({age:.0f}s old)")
+        return None
+    return cached.get("instruments") or None
+
+
+def save_cache(precisions: Dict[str, Dict], path: str = INSTRUMENT_CACHE_PATH):
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": time.time(), "instruments": precisions}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"⚠️ Could not write instrument cache {path}: {e}")
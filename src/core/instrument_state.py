@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instrument State Registry
+Per-instrument tick state behind striped, instrumented locks
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Number of lock stripes (instruments hash onto stripes)
+LOCK_STRIPES = int(os.getenv("LOCK_STRIPES", "16"))
+
+
+class LockStats:
+    """Wait/hold counters for one lock (updated only while the lock is held)"""
+
+    __slots__ = (
+        "acquisitions",
+        "contended",
+        "wait_total",
+        "wait_max",
+        "hold_total",
+        "hold_max",
+    )
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+
+    def record_wait(self, waited: float):
+        self.acquisitions += 1
+        if waited > 0:
+            self.contended += 1
+            self.wait_total += waited
+            if waited > self.wait_max:
+                self.wait_max = waited
+
+    def record_hold(self, held: float):
+        self.hold_total += held
+        if held > self.hold_max:
+            self.hold_max = held
+
+    def merge(self, other: "LockStats"):
+        self.acquisitions += other.acquisitions
+        self.contended += other.contended
+        self.wait_total += other.wait_total
+        self.wait_max = max(self.wait_max, other.wait_max)
+        self.hold_total += other.hold_total
+        self.hold_max = max(self.hold_max, other.hold_max)
+
+    def copy(self) -> "LockStats":
+        stats = LockStats()
+        stats.merge(self)
+        return stats
+
+    def format(self) -> str:
+        n = max(self.acquisitions, 1)
+        return (
+            f"acq={self.acquisitions} contended={self.contended} "
+            f"({self.contended / n * 100:.1f}%), "
+            f"wait avg={self.wait_total / n * 1e6:.1f}us "
+            f"max={self.wait_max * 1e3:.2f}ms, "
+            f"hold avg={self.hold_total / n * 1e6:.1f}us "
+            f"max={self.hold_max * 1e3:.2f}ms"
+        )
+
+
+class InstrumentedLock:
+    """threading.Lock that records wait and hold times"""
+
+    __slots__ = ("name", "stats", "_lock", "_acquired_at")
+
+    def __init__(self, name: str = "lock"):
+        self.name = name
+        self.stats = LockStats()
+        self._lock = threading.Lock()
+        self._acquired_at = 0.0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        return self._acquire_timed(blocking, timeout) is not None
+
+    def _acquire_timed(self, blocking: bool, timeout: float) -> Optional[float]:
+        """Acquire and return seconds waited (0.0 if uncontended), None on failure"""
+        if self._lock.acquire(False):
+            waited = 0.0
+        else:
+            if not blocking:
+                return None
+            start = time.perf_counter()
+            if not self._lock.acquire(True, timeout):
+                return None
+            waited = time.perf_counter() - start
+        self.stats.record_wait(waited)
+        self._acquired_at = time.perf_counter()
+        return waited
+
+    def release(self):
+        self.stats.record_hold(time.perf_counter() - self._acquired_at)
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def snapshot_stats(self, reset: bool = False) -> LockStats:
+        """Copy (and optionally reset) stats; briefly takes the lock"""
+        with self:
+            stats = self.stats.copy()
+            if reset:
+                self.stats.reset()
+        return stats
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class StripedLock:
+    """Striped replacement for the global state lock
+
+    `with lock:` acquires every stripe in order, so existing code that guards
+    cross-instrument work keeps its old semantics. Per-instrument sections
+    use `lock.for_key(instId)` and only contend with the same stripe.
+    """
+
+    def __init__(self, stripes: int = LOCK_STRIPES, name: str = "state"):
+        self.name = name
+        self._stripes: List[InstrumentedLock] = [
+            InstrumentedLock(f"{name}[{i}]") for i in range(max(stripes, 1))
+        ]
+        # Acquire-all (global) stats, updated while stripe 0 is held
+        self.global_stats = LockStats()
+        self._global_acquired_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._stripes)
+
+    def stripe_index(self, key: str) -> int:
+        return hash(key) % len(self._stripes)
+
+    def for_key(self, key: str) -> InstrumentedLock:
+        """Lock covering a single instrument"""
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def stripes(self) -> List[InstrumentedLock]:
+        return list(self._stripes)
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        waited_total = 0.0
+        acquired: List[InstrumentedLock] = []
+        for stripe in self._stripes:
+            waited = stripe._acquire_timed(blocking, timeout)
+            if waited is None:
+                for held in reversed(acquired):
+                    held.release()
+                return False
+            waited_total += waited
+            acquired.append(stripe)
+        self.global_stats.record_wait(waited_total)
+        self._global_acquired_at = time.perf_counter()
+        return True
+
+    def release(self):
+        self.global_stats.record_hold(time.perf_counter() - self._global_acquired_at)
+        for stripe in reversed(self._stripes):
+            stripe.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def snapshot_stats(self, reset: bool = False) -> Tuple[LockStats, LockStats]:
+        """Return (global acquire-all stats, merged per-stripe stats)"""
+        stripe_stats = LockStats()
+        for stripe in self._stripes:
+            stripe_stats.merge(stripe.snapshot_stats(reset=reset))
+        with self._stripes[0]:
+            global_stats = self.global_stats.copy()
+            if reset:
+                self.global_stats.reset()
+        return global_stats, stripe_stats
+
+    def format_stats(self, reset: bool = False) -> str:
+        global_stats, stripe_stats = self.snapshot_stats(reset=reset)
+        return (
+            f"🔒 Lock stats ({len(self._stripes)} stripes) | "
+            f"global: {global_stats.format()} | stripes: {stripe_stats.format()}"
+        )
+
+
+def instrument_lock(lock, instId: str):
+    """Per-instrument lock if `lock` is striped, else the lock itself"""
+    for_key = getattr(lock, "for_key", None)
+    return for_key(instId) if for_key is not None else lock
+
+
+class InstrumentState:
+    """Tick-path state for one instrument"""
+
+    __slots__ = ("instId", "last_price", "last_tick_time", "tick_count")
+
+    def __init__(self, instId: str):
+        self.instId = instId
+        self.last_price: Optional[float] = None
+        self.last_tick_time = 0.0
+        self.tick_count = 0
+
+
+class InstrumentStateRegistry:
+    """instId -> InstrumentState, guarded by a StripedLock
+
+    The registry's lock doubles as the process-wide state lock: per-instrument
+    work takes one stripe, cross-instrument work takes all of them.
+    """
+
+    def __init__(self, stripes: int = LOCK_STRIPES):
+        self.lock = StripedLock(stripes)
+        self._states: Dict[str, InstrumentState] = {}
+        self._by_stripe: List[Dict[str, InstrumentState]] = [
+            {} for _ in range(len(self.lock))
+        ]
+
+    def get(self, instId: str) -> InstrumentState:
+        """Get (or create) the state for an instrument"""
+        state = self._states.get(instId)
+        if state is None:
+            # setdefault is atomic, so concurrent creators agree on one object
+            # (no lock: callers may already hold this instrument's stripe)
+            state = self._states.setdefault(instId, InstrumentState(instId))
+            self._by_stripe[self.lock.stripe_index(instId)].setdefault(instId, state)
+        return state
+
+    def lock_for(self, instId: str) -> InstrumentedLock:
+        return self.lock.for_key(instId)
+
+    def record_tick(self, instId: str, price: float) -> bool:
+        """Record a tick; returns True if the price is unchanged
+
+        Call with lock_for(instId) held.
+        """
+        state = self.get(instId)
+        unchanged = state.last_price == price
+        state.last_price = price
+        state.last_tick_time = time.time()
+        state.tick_count += 1
+        return unchanged
+
+    def remove(self, instId: str):
+        with self.lock.for_key(instId):
+            self._states.pop(instId, None)
+            self._by_stripe[self.lock.stripe_index(instId)].pop(instId, None)
+
+    def snapshot(self) -> Dict[str, Tuple[Optional[float], float, int]]:
+        """instId -> (last_price, last_tick_time, tick_count)
+
+        Consistent per stripe; takes one stripe at a time so the tick path
+        is never stalled behind a full scan.
+        """
+        result: Dict[str, Tuple[Optional[float], float, int]] = {}
+        for index, stripe in enumerate(self.lock.stripes()):
+            with stripe:
+                for instId, state in list(self._by_stripe[index].items()):
+                    result[instId] = (
+                        state.last_price,
+                        state.last_tick_time,
+                        state.tick_count,
+                    )
+        return result
+
+    def __len__(self) -> int:
+        return len(self._states)
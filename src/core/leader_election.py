@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Leader Election
+Hot standby for the trading process: every instance keeps its WebSocket
+subscriptions and in-memory state warm, and only the holder of a Postgres
+advisory-lock lease trades
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import psycopg
+
+from .advisory_lock import advisory_key
+
+logger = logging.getLogger(__name__)
+
+LEADER_ELECTION_ENABLED = (
+    os.getenv("LEADER_ELECTION_ENABLED", "false").lower() == "true"
+)
+# Instances sharing this name compete for the same lease
+LEADER_LOCK_NAME = os.getenv("LEADER_LOCK_NAME", "websocket_limit_trading")
+# A leader that stops renewing for this long loses the lease (server-side
+# idle_session_timeout), so a hung process is replaced, not just a dead one
+LEADER_LEASE_SECONDS = float(os.getenv("LEADER_LEASE_SECONDS", "5"))
+# How often a standby retries the lock (upper bound on takeover after a crash)
+LEADER_POLL_SECONDS = float(os.getenv("LEADER_POLL_SECONDS", "0.5"))
+LEADER_CONNECT_TIMEOUT = int(os.getenv("LEADER_CONNECT_TIMEOUT", "5"))
+# A leader whose last successful renewal is this fraction of the lease old
+# stops trading: the server may hand the lease over at 1.0
+LEADER_FENCE_FRACTION = float(os.getenv("LEADER_FENCE_FRACTION", "0.8"))
+
+
+def direct_conninfo(database_url: str) -> str:
+    """Neon pooler URL -> direct endpoint URL
+
+    Session advisory locks and session settings do not survive PgBouncer in
+    transaction mode, so the lease needs a direct connection.
+    """
+    parts = urlsplit(database_url)
+    if "-pooler." in parts.netloc:
+        return urlunsplit(parts._replace(netloc=parts.netloc.replace("-pooler.", ".")))
+    return database_url
+
+
+def _default_conninfo() -> str:
+    return os.getenv("LEADER_DATABASE_URL", "") or direct_conninfo(
+        os.getenv("DATABASE_URL", "")
+    )
+
+
+class LeaderLease:
+    """Session advisory lock held on a dedicated connection
+
+    The lock is released by Postgres when the leader's session ends: at once
+    when the process dies (socket closed), or after LEADER_LEASE_SECONDS of
+    missed renewals when it hangs (idle_session_timeout). A standby polls
+    pg_try_advisory_lock and calls on_acquired the moment it gets the lock.
+    on_lost is called if the leader's own session goes away; the leader can
+    no longer tell whether another instance is trading and must stop.
+
+    Renewals are bounded by statement_timeout, TCP keepalives and
+    tcp_user_timeout, all below the lease, so a partition fails the renewal
+    instead of blocking it. A fence thread also disables trading and calls
+    on_lost once the last successful renewal is LEADER_FENCE_FRACTION of the
+    lease old, whether or not the renewal ever returns.
+    """
+
+    def __init__(
+        self,
+        on_acquired: Callable[[], None],
+        on_lost: Callable[[], None],
+        conninfo: Optional[str] = None,
+        name: str = LEADER_LOCK_NAME,
+        lease_seconds: float = LEADER_LEASE_SECONDS,
+        poll_seconds: float = LEADER_POLL_SECONDS,
+    ):
+        self.on_acquired = on_acquired
+        self.on_lost = on_lost
+        self.conninfo = conninfo or _default_conninfo()
+        self.name = name
+        self.key = advisory_key("leader", name, "")
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.is_leader = False
+        self.acquired_at: Optional[float] = None  # monotonic
+        self.renewed_at: Optional[float] = None  # monotonic, last renewal
+        self.fenced = 0
+        self.standby_since = time.monotonic()
+        self.attempts = 0
+        self.connect_errors = 0
+        self._conn: Optional[psycopg.Connection] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lost_lock = threading.Lock()
+        self._lost = False
+
+    def start(self):
+        """Start competing for the lease in a background thread (idempotent)"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="LeaderLease"
+        )
+        self._thread.start()
+
+    def _connect(self) -> psycopg.Connection:
+        # A renewal must fail well inside the lease: one renewal interval for
+        # the query, about two for the socket to be declared dead
+        renew_ms = max(1, int(self.lease_seconds * 1000 / 3))
+        keepalive_seconds = max(1, int(self.lease_seconds / 3))
+        conn = psycopg.connect(
+            self.conninfo,
+            autocommit=True,
+            connect_timeout=LEADER_CONNECT_TIMEOUT,
+            keepalives=1,
+            keepalives_idle=keepalive_seconds,
+            keepalives_interval=1,
+            keepalives_count=keepalive_seconds,
+            tcp_user_timeout=renew_ms * 2,
+        )
+        conn.execute(
+            "SELECT set_config('statement_timeout', %s, false)", (str(renew_ms),)
+        )
+        try:
+            # Renewals are the only traffic, so an idle session means a
+            # leader that stopped renewing: let the server end it
+            conn.execute(
+                "SELECT set_config('idle_session_timeout', %s, false)",
+                (str(int(self.lease_seconds * 1000)),),
+            )
+        except psycopg.Error as e:
+            logger.warning(
+                f"⚠️ idle_session_timeout unavailable ({e}); the lease only "
+                f"lapses when the leader's connection drops"
+            )
+        return conn
+
+    def _close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _run(self):
+        renew_every = self.lease_seconds / 3
+        while not self._stop.is_set():
+            if self.is_leader:
+                if not self._renew():
+                    return  # on_lost handles the rest
+                self._stop.wait(renew_every)
+            else:
+                self.try_acquire()
+                if not self.is_leader:
+                    self._stop.wait(self.poll_seconds)
+
+    def try_acquire(self) -> bool:
+        """One non-blocking attempt; calls on_acquired when it succeeds"""
+        self.attempts += 1
+        try:
+            if self._conn is None or self._conn.closed:
+                self._conn = self._connect()
+            row = self._conn.execute(
+                "SELECT pg_try_advisory_lock(%s)", (self.key,)
+            ).fetchone()
+        except Exception as e:
+            self.connect_errors += 1
+            logger.warning(f"⚠️ Leader lease check failed: {e}")
+            self._close()
+            return False
+        if not row[0]:
+            return False
+
+        self.is_leader = True
+        self.acquired_at = self.renewed_at = time.monotonic()
+        logger.warning(
+            f"👑 Leader lease '{self.name}' acquired after "
+            f"{self.acquired_at - self.standby_since:.1f}s in standby"
+        )
+        threading.Thread(target=self._fence, daemon=True, name="LeaderFence").start()
+        self.on_acquired()
+        return True
+
+    def _renew(self) -> bool:
+        try:
+            self._conn.execute("SELECT 1")
+        except Exception as e:
+            self._lose(f"renewal failed: {e}", close=True)
+            return False
+        self.renewed_at = time.monotonic()
+        return True
+
+    def _fence(self):
+        """Stop trading once renewals are too old, even if one is blocked"""
+        while not self._stop.wait(self.lease_seconds / 10):
+            if not self.is_leader or self.check_fence():
+                return
+
+    def check_fence(self) -> bool:
+        """True (and the lease given up) if the last renewal is too old"""
+        age = time.monotonic() - self.renewed_at
+        if age < self.lease_seconds * LEADER_FENCE_FRACTION:
+            return False
+        self.fenced += 1
+        self._lose(f"no renewal for {age:.1f}s")
+        return True
+
+    def _lose(self, reason: str, close: bool = False):
+        """Stop trading and call on_lost, once, from renewal or fence
+
+        The fence leaves the connection to on_lost: a renewal may still be
+        blocked on it in the lease thread.
+        """
+        with self._lost_lock:
+            if self._lost:
+                return
+            self._lost = True
+        set_trading_enabled(False)
+        logger.error(f"❌ Leader lease '{self.name}' lost: {reason}")
+        self.is_leader = False
+        if close:
+            self._close()
+        self.on_lost()
+
+    def release(self):
+        """Stop and hand the lease over immediately (on shutdown)"""
+        self._stop.set()
+        if self.is_leader and self._conn is not None:
+            try:
+                self._conn.execute("SELECT pg_advisory_unlock(%s)", (self.key,))
+            except Exception as e:
+                logger.warning(f"⚠️ Leader lease release failed: {e}")
+        self.is_leader = False
+        self._close()
+
+    def format_stats(self) -> str:
+        if self.is_leader:
+            state = f"leader for {time.monotonic() - self.acquired_at:.0f}s"
+        else:
+            state = f"standby for {time.monotonic() - self.standby_since:.0f}s"
+        return (
+            f"👑 Leader lease '{self.name}': {state}, attempts={self.attempts}, "
+            f"connect errors={self.connect_errors}, fenced={self.fenced}"
+        )
+
+
+_trading_enabled = not LEADER_ELECTION_ENABLED
+
+
+def set_trading_enabled(enabled: bool):
+    global _trading_enabled
+    _trading_enabled = enabled
+
+
+def is_trading_enabled() -> bool:
+    """False while this instance is a standby (always True without election)
+
+    Checked by the ticker evaluator before any strategy signals a buy.
+    """
+    return _trading_enabled
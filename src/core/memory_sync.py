@@ -8,12 +8,238 @@ Syncs active_orders with database to prevent memory leaks
 import logging
 import threading
 import time
-from datetime import datetime
-from typing import Any, Dict, Optional
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set
+
+from .orders_schema import open_position_sql
+from .position_index import get_position_index
+from .sharding import owns_instrument
 
 logger = logging.getLogger(__name__)
 
 
+# Open positions per (flag, instId): the rows reconciliation works from
+# ({open_position}: orders_schema.open_position_sql())
+OPEN_ORDERS_QUERY = """
+    SELECT DISTINCT instId, ordId, create_time, size, price
+    FROM orders
+    WHERE flag = %s
+      AND {open_position}
+    ORDER BY instId, create_time DESC
+"""
+
+
+def _group_open_orders(rows, label: str) -> Dict[str, Dict]:
+    """(instId, ordId, create_time, size, price) rows, newest first ->
+    instId -> order summary (batch positions collect all their ordIds)"""
+    db_orders = {}
+    for instId, ordId, create_time, size, price in rows:
+        if label == "batch":
+            if instId not in db_orders:
+                db_orders[instId] = {
+                    "ordIds": [],
+                    "create_time": create_time,
+                    "total_size": 0.0,
+                    "price": price,
+                }
+            db_orders[instId]["ordIds"].append(ordId)
+            if create_time > db_orders[instId]["create_time"]:
+                db_orders[instId]["create_time"] = create_time
+                db_orders[instId]["price"] = price
+            try:
+                db_orders[instId]["total_size"] += float(size) if size else 0.0
+            except (ValueError, TypeError):
+                logger.debug(
+                    f"Invalid batch size in DB for {instId}, " f"ordId={ordId}: {size}"
+                )
+        elif instId not in db_orders:
+            db_orders[instId] = {
+                "ordId": ordId,
+                "create_time": create_time,
+                "size": size,
+                "price": price,
+            }
+    return db_orders
+
+
+def _reconcile_strategy(
+    label: str,
+    db_orders: Dict[str, Dict],
+    active_dict: Dict,
+    pending_dict: Dict,
+    lock: threading.Lock,
+    stable_strategy: Optional[Any],
+    batch_strategy: Optional[Any],
+    scope: Optional[Set[str]] = None,
+):
+    """Make active_dict match db_orders
+
+    scope=None: db_orders holds every open position (full scan); stale
+    pending_buys are cleaned too. Otherwise only the instIds in scope are
+    reconciled (delta sync: db_orders holds their open positions).
+    """
+    db_active_instIds = set(db_orders)
+    with lock:
+        # Get current memory state
+        memory_active_instIds = set(active_dict.keys())
+        memory_pending_instIds = set(pending_dict.keys())
+        if scope is not None:
+            memory_active_instIds &= scope
+
+        # Find inconsistencies
+        # 1. In memory but not in DB (already sold) - REMOVE from memory
+        stale_in_memory = memory_active_instIds - db_active_instIds
+        for instId in stale_in_memory:
+            del active_dict[instId]
+            if label == "batch" and batch_strategy is not None:
+                batch_strategy.reset_crypto(instId)
+            logger.warning(
+                f"🧹 [{label}] Cleaned stale memory: {instId} "
+                f"(sold in DB but still in active_orders)"
+            )
+
+        # 2. In DB but not in memory (missing) - ADD to memory
+        # (only positions of this worker's shard when sharded)
+        missing_in_memory = {
+            instId
+            for instId in db_active_instIds - set(active_dict.keys())
+            if owns_instrument(instId)
+        }
+        for instId in missing_in_memory:
+            order_info = db_orders[instId]
+            create_dt = datetime.fromtimestamp(order_info["create_time"] / 1000)
+            # Calculate next hour close time
+            sell_time = create_dt.replace(minute=55, second=0, microsecond=0)
+            sell_time = sell_time + timedelta(hours=1)
+
+            if label == "batch":
+                active_dict[instId] = {
+                    "ordIds": order_info["ordIds"],
+                    "buy_price": (
+                        float(order_info["price"]) if order_info["price"] else 0
+                    ),
+                    "buy_time": create_dt,
+                    "next_hour_close_time": sell_time,
+                    "sell_triggered": False,
+                    "total_size": order_info["total_size"],
+                }
+            else:
+                active_dict[instId] = {
+                    "ordId": order_info["ordId"],
+                    "buy_price": (
+                        float(order_info["price"]) if order_info["price"] else 0
+                    ),
+                    "buy_time": create_dt,
+                    "next_hour_close_time": sell_time,
+                    "sell_triggered": False,
+                }
+            ord_info = (
+                f"ordIds={order_info['ordIds']}"
+                if label == "batch"
+                else f"ordId={order_info['ordId']}"
+            )
+            logger.warning(
+                f"🔄 [{label}] Restored missing memory: "
+                f"{instId}, {ord_info} "
+                f"(exists in DB but not in memory)"
+            )
+
+        # 3. Clean up stale pending_buys (shouldn't persist long)
+        stale_pending = set()
+        if scope is None:
+            stale_pending = (
+                memory_pending_instIds - db_active_instIds - memory_active_instIds
+            )
+        for instId in stale_pending:
+            del pending_dict[instId]
+            if label == "stable" and stable_strategy is not None:
+                stable_strategy.clear_signal(instId)
+            elif label == "batch" and batch_strategy is not None:
+                if instId not in active_dict:
+                    batch_strategy.reset_crypto(instId)
+            logger.warning(f"🧹 [{label}] Cleaned stale pending_buys: {instId}")
+
+        if scope is None and not (
+            stale_in_memory or missing_in_memory or stale_pending
+        ):
+            logger.info(
+                f"✅ [{label}] Memory in sync: "
+                f"{len(memory_active_instIds)} active, "
+                f"{len(memory_pending_instIds)} pending"
+            )
+
+
+def _sync_changes(conn, change_feed, strategies, lock, stable_strategy, batch_strategy):
+    """Delta sync: reconcile only positions with orders changed since the
+    last sync (one change query, one open-orders query for those positions)"""
+    flags = [strategy[0] for strategy in strategies]
+    position_index = get_position_index()
+
+    def fetch():
+        return change_feed.fetch_changes(conn, flags)
+
+    if position_index is None:
+        rows = fetch()
+    else:
+        rows = position_index.apply_changes(flags, fetch)
+        if rows is None:
+            # A reload is running: fetching now would advance the watermark
+            # past rows the index never sees, so leave them to the next sync
+            logger.info("⏭️ Memory delta sync skipped: position index reloading")
+            return
+
+    changed: Dict[str, Set[str]] = {}
+    for row in rows:
+        changed.setdefault(row[0], set()).add(row[1])
+    if not changed:
+        logger.info("✅ Memory in sync: no order changes since last sync")
+        return
+
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"""
+            SELECT DISTINCT flag, instId, ordId, create_time, size, price
+            FROM orders
+            WHERE flag = ANY(%s)
+              AND instId = ANY(%s)
+              AND {open_position_sql()}
+            ORDER BY instId, create_time DESC
+            """,
+            (sorted(changed), sorted(set().union(*changed.values()))),
+        )
+        open_rows = cur.fetchall()
+    finally:
+        cur.close()
+
+    for strategy_flag, active_dict, pending_dict, label in strategies:
+        scope = changed.get(strategy_flag)
+        if not scope:
+            continue
+        db_orders = _group_open_orders(
+            [
+                row[1:]
+                for row in open_rows
+                if row[0] == strategy_flag and row[1] in scope
+            ],
+            label,
+        )
+        _reconcile_strategy(
+            label,
+            db_orders,
+            active_dict,
+            pending_dict,
+            lock,
+            stable_strategy,
+            batch_strategy,
+            scope=scope,
+        )
+    logger.info(
+        f"✅ Memory delta sync: {len(rows)} changed orders in "
+        f"{sum(len(instIds) for instIds in changed.values())} positions"
+    )
+
+
 def sync_active_orders_with_db(
     get_db_connection_func,
     active_orders: Dict,
@@ -31,187 +257,79 @@ def sync_active_orders_with_db(
     gap_strategy_name: str = "original_gap",
     stable_strategy: Optional[Any] = None,
     batch_strategy: Optional[Any] = None,
+    change_feed: Optional[Any] = None,
 ):
     """Sync active_orders with database to fix inconsistencies
 
     This function:
     1. Clears memory entries for orders that are sold out in DB
     2. Adds memory entries for orders that are unsold in DB
+    3. Reloads the open position index (duplicate-buy check)
+
+    ✅ OPTIMIZED: With a change_feed, only orders changed since the last
+    sync are fetched; the full scan runs first and then as a periodic audit.
 
     Should be called:
     - On startup
     - Periodically (e.g., every 5 minutes)
     """
+    # Strategy configurations
+    strategies = [
+        (strategy_name, active_orders, pending_buys, "original"),
+        (stable_strategy_name, stable_active_orders, stable_pending_buys, "stable"),
+        (batch_strategy_name, batch_active_orders, batch_pending_buys, "batch"),
+        (gap_strategy_name, gap_active_orders, gap_pending_buys, "gap"),
+    ]
     try:
         conn = get_db_connection_func()
         try:
-            cur = conn.cursor()
+            if change_feed is not None and change_feed.delta_ready():
+                _sync_changes(
+                    conn,
+                    change_feed,
+                    strategies,
+                    lock,
+                    stable_strategy,
+                    batch_strategy,
+                )
+                return
 
-            # Strategy configurations
-            strategies = [
-                (strategy_name, active_orders, pending_buys, "original"),
-                (
-                    stable_strategy_name,
-                    stable_active_orders,
-                    stable_pending_buys,
-                    "stable",
-                ),
-                (batch_strategy_name, batch_active_orders, batch_pending_buys, "batch"),
-                (gap_strategy_name, gap_active_orders, gap_pending_buys, "gap"),
-            ]
-
-            for strategy_flag, active_dict, pending_dict, label in strategies:
-                # Get all unsold orders from DB for this strategy
-                cur.execute(
-                    """
-                    SELECT DISTINCT instId, ordId, create_time, size, price
-                    FROM orders
-                    WHERE flag = %s
-                      AND state IN ('filled', 'partially_filled')
-                      AND (sell_price IS NULL OR sell_price = '')
-                    ORDER BY instId, create_time DESC
-                    """,
-                    (strategy_flag,),
+            # Changes committed from here on are picked up by the next delta
+            scan_started = (
+                change_feed.database_now(conn) if change_feed is not None else None
+            )
+
+            # ✅ NEW: Reload the open position index used by the duplicate-buy check
+            position_index = get_position_index()
+            if position_index is not None:
+                position_index.reload(
+                    [strategy[0] for strategy in strategies],
+                    conn,
                 )
-                db_unsold = cur.fetchall()
-
-                # Build set of instIds that should be in memory
-                db_active_instIds = set()
-                db_orders = {}
-                for row in db_unsold:
-                    instId = row[0]
-                    ordId = row[1]
-                    create_time = row[2]
-                    size = row[3]
-                    price = row[4]
-                    db_active_instIds.add(instId)
-                    if label == "batch":
-                        if instId not in db_orders:
-                            db_orders[instId] = {
-                                "ordIds": [],
-                                "create_time": create_time,
-                                "total_size": 0.0,
-                                "price": price,
-                            }
-                        db_orders[instId]["ordIds"].append(ordId)
-                        if create_time > db_orders[instId]["create_time"]:
-                            db_orders[instId]["create_time"] = create_time
-                            db_orders[instId]["price"] = price
-                        try:
-                            db_orders[instId]["total_size"] += (
-                                float(size) if size else 0.0
-                            )
-                        except (ValueError, TypeError):
-                            logger.debug(
-                                f"Invalid batch size in DB for {instId}, "
-                                f"ordId={ordId}: {size}"
-                            )
-                    else:
-                        if instId not in db_orders:
-                            db_orders[instId] = {
-                                "ordId": ordId,
-                                "create_time": create_time,
-                                "size": size,
-                                "price": price,
-                            }
-
-                with lock:
-                    # Get current memory state
-                    memory_active_instIds = set(active_dict.keys())
-                    memory_pending_instIds = set(pending_dict.keys())
-
-                    # Find inconsistencies
-                    # 1. In memory but not in DB (already sold) - REMOVE from memory
-                    stale_in_memory = memory_active_instIds - db_active_instIds
-                    for instId in stale_in_memory:
-                        del active_dict[instId]
-                        if label == "batch" and batch_strategy is not None:
-                            batch_strategy.reset_crypto(instId)
-                        logger.warning(
-                            f"🧹 [{label}] Cleaned stale memory: {instId} "
-                            f"(sold in DB but still in active_orders)"
-                        )
-
-                    # 2. In DB but not in memory (missing) - ADD to memory
-                    missing_in_memory = db_active_instIds - memory_active_instIds
-                    for instId in missing_in_memory:
-                        order_info = db_orders[instId]
-                        create_dt = datetime.fromtimestamp(
-                            order_info["create_time"] / 1000
-                        )
-                        # Calculate next hour close time
-                        sell_time = create_dt.replace(
-                            minute=55, second=0, microsecond=0
-                        )
-                        from datetime import timedelta
-
-                        sell_time = sell_time + timedelta(hours=1)
-
-                        if label == "batch":
-                            active_dict[instId] = {
-                                "ordIds": order_info["ordIds"],
-                                "buy_price": (
-                                    float(order_info["price"])
-                                    if order_info["price"]
-                                    else 0
-                                ),
-                                "buy_time": create_dt,
-                                "next_hour_close_time": sell_time,
-                                "sell_triggered": False,
-                                "total_size": order_info["total_size"],
-                            }
-                        else:
-                            active_dict[instId] = {
-                                "ordId": order_info["ordId"],
-                                "buy_price": (
-                                    float(order_info["price"])
-                                    if order_info["price"]
-                                    else 0
-                                ),
-                                "buy_time": create_dt,
-                                "next_hour_close_time": sell_time,
-                                "sell_triggered": False,
-                            }
-                        ord_info = (
-                            f"ordIds={order_info['ordIds']}"
-                            if label == "batch"
-                            else f"ordId={order_info['ordId']}"
-                        )
-                        logger.warning(
-                            f"🔄 [{label}] Restored missing memory: "
-                            f"{instId}, {ord_info} "
-                            f"(exists in DB but not in memory)"
-                        )
-
-                    # 3. Clean up stale pending_buys (shouldn't persist long)
-                    stale_pending = (
-                        memory_pending_instIds
-                        - db_active_instIds
-                        - memory_active_instIds
+
+            cur = conn.cursor()
+            try:
+                for strategy_flag, active_dict, pending_dict, label in strategies:
+                    # Get all unsold orders from DB for this strategy
+                    cur.execute(
+                        OPEN_ORDERS_QUERY.format(open_position=open_position_sql()),
+                        (strategy_flag,),
                     )
-                    for instId in stale_pending:
-                        del pending_dict[instId]
-                        if label == "stable" and stable_strategy is not None:
-                            stable_strategy.clear_signal(instId)
-                        elif label == "batch" and batch_strategy is not None:
-                            if instId not in active_dict:
-                                batch_strategy.reset_crypto(instId)
-                        logger.warning(
-                            f"🧹 [{label}] Cleaned stale pending_buys: {instId}"
-                        )
-
-                    if (
-                        not stale_in_memory
-                        and not missing_in_memory
-                        and not stale_pending
-                    ):
-                        logger.info(
-                            f"✅ [{label}] Memory in sync: "
-                            f"{len(memory_active_instIds)} active, "
-                            f"{len(memory_pending_instIds)} pending"
-                        )
-
-            cur.close()
+                    db_orders = _group_open_orders(cur.fetchall(), label)
+                    _reconcile_strategy(
+                        label,
+                        db_orders,
+                        active_dict,
+                        pending_dict,
+                        lock,
+                        stable_strategy,
+                        batch_strategy,
+                    )
+            finally:
+                cur.close()
+
+            if change_feed is not None:
+                change_feed.mark_full_scan(scan_started)
         finally:
             conn.close()
 
@@ -237,11 +355,13 @@ def start_periodic_sync(
     gap_strategy_name: str = "original_gap",
     stable_strategy: Optional[Any] = None,
     batch_strategy: Optional[Any] = None,
+    change_feed: Optional[Any] = None,
 ):
     """Start periodic memory sync in background thread
 
     Args:
         interval_seconds: How often to sync (default: 300 seconds = 5 minutes)
+        change_feed: OrdersChangeFeed for delta syncs (full scans without)
     """
 
     def sync_loop():
@@ -266,6 +386,7 @@ def start_periodic_sync(
                     gap_strategy_name,
                     stable_strategy,
                     batch_strategy,
+                    change_feed=change_feed,
                 )
             except Exception as e:
                 logger.error(f"❌ Periodic sync error: {e}")
@@ -20,6 +20,13 @@ from okx.MarketData import MarketAPI
 from okx.PublicData import PublicAPI
 from okx.Trade import TradeAPI
 
+from .instrument_meta import (
+    InstrumentQuantizer,
+    load_cache,
+    precision_from_instrument,
+    save_cache,
+)
+
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 import logging  # noqa: E402
 import sys  # noqa: E402
@@ -40,8 +47,13 @@ _trade_api: Optional[TradeAPI] = None
 _market_api: Optional[MarketAPI] = None
 _public_api: Optional[PublicAPI] = None
 
+from .rate_limiter import rate_limited  # noqa: E402
+from .ws_order_gateway import WS_ORDERS_ENABLED, OrderRoutingAPI  # noqa: E402
+
 # Cache for instrument precision info
 _instrument_precision_cache: Dict[str, Dict] = {}
+# ✅ OPTIMIZED: Compiled per-instrument quantizers (built once from the cache)
+_quantizers: Dict[str, InstrumentQuantizer] = {}
 
 
 # def pre_buy(instId,marketDataAPI):
@@ -128,9 +140,14 @@ def get_trade_api(
             logging.debug("Simulation mode: TradeAPI not initialized (no API keys)")
             return None
         try:
-            _trade_api = TradeAPI(
-                api_key, api_secret, api_passphrase, False, trading_flag
+            # ✅ NEW: Every REST call waits for its endpoint's token bucket
+            _trade_api = rate_limited(
+                TradeAPI(api_key, api_secret, api_passphrase, False, trading_flag),
+                "trade",
             )
+            # ✅ NEW: Place/cancel over the private WebSocket when it is logged in
+            if WS_ORDERS_ENABLED:
+                _trade_api = OrderRoutingAPI(_trade_api)
         except Exception as e:
             if simulation_mode:
                 logging.warning(
@@ -152,7 +169,7 @@ def get_market_api(trading_flag: str = "0") -> MarketAPI:
     """
     global _market_api
     if _market_api is None:
-        _market_api = MarketAPI(flag=trading_flag)
+        _market_api = rate_limited(MarketAPI(flag=trading_flag), "market")
     return _market_api
 
 
@@ -167,7 +184,7 @@ def get_public_api(trading_flag: str = "0") -> PublicAPI:
     """
     global _public_api
     if _public_api is None:
-        _public_api = PublicAPI(flag=trading_flag)
+        _public_api = rate_limited(PublicAPI(flag=trading_flag), "public")
     return _public_api
 
 
@@ -197,25 +214,7 @@ def get_instrument_precision(
         if result.get("code") == "0" and result.get("data"):
             instruments = result["data"]
             if instruments and len(instruments) > 0:
-                inst = instruments[0]
-                tick_sz = inst.get("tickSz", "")
-                lot_sz = inst.get("lotSz", "")
-                min_sz = inst.get("minSz", "")
-
-                # Calculate precision (decimal places)
-                def count_decimal_places(s: str) -> int:
-                    if "." in s:
-                        return len(s.split(".")[-1].rstrip("0"))
-                    return 0
-
-                precision_info = {
-                    "tickSz": tick_sz,
-                    "tickPrecision": count_decimal_places(tick_sz),
-                    "lotSz": lot_sz,
-                    "lotPrecision": count_decimal_places(lot_sz),
-                    "minSz": min_sz,
-                    "minPrecision": count_decimal_places(min_sz),
-                }
+                precision_info = precision_from_instrument(instruments[0])
 
                 # Cache the result
                 _instrument_precision_cache[instId] = precision_info
@@ -229,9 +228,80 @@ def get_instrument_precision(
     return None
 
 
-def format_number(number, instId: Optional[str] = None, trading_flag: str = "0"):
+def preload_instrument_precision(trading_flag: str = "0") -> int:
+    """Fill the precision cache for every SPOT instrument at startup
+
+    Uses the disk cache while it is fresh, otherwise one get_instruments
+    call for all SPOT instruments (instead of one call per instId the first
+    time an order for it is formatted).
+
+    Returns:
+        Number of instruments cached
+    """
+    precisions = load_cache()
+    source = "disk cache"
+    if precisions is None:
+        try:
+            result = get_public_api(trading_flag).get_instruments(instType="SPOT")
+        except Exception as e:
+            logging.warning(f"⚠️ Instrument preload failed, fetching on demand: {e}")
+            return 0
+        if result.get("code") != "0" or not result.get("data"):
+            logging.warning(
+                f"⚠️ Instrument preload failed, fetching on demand: "
+                f"{result.get('msg', 'Unknown error')}"
+            )
+            return 0
+        precisions = {
+            inst["instId"]: precision_from_instrument(inst)
+            for inst in result["data"]
+            if inst.get("instId")
+        }
+        save_cache(precisions)
+        source = "get_instruments"
+    _instrument_precision_cache.update(precisions)
+    _quantizers.clear()
+    logging.warning(f"✅ Preloaded {len(precisions)} SPOT instruments ({source})")
+    return len(precisions)
+
+
+def get_quantizer(
+    instId: str, trading_flag: str = "0"
+) -> Optional[InstrumentQuantizer]:
+    """Compiled quantizer for instId (REST only if it was never preloaded)"""
+    quantizer = _quantizers.get(instId)
+    if quantizer is None:
+        precision_info = get_instrument_precision(
+            instId, use_cache=True, trading_flag=trading_flag
+        )
+        if not precision_info:
+            return None
+        quantizer = InstrumentQuantizer(instId, precision_info)
+        _quantizers[instId] = quantizer
+    return quantizer
+
+
+def meets_min_size(instId: str, size, trading_flag: str = "0") -> bool:
+    """Whether size, rounded to lotSz, reaches minSz (True if unknown)
+
+    OKX rejects orders below minSz, so callers skip them instead of sending.
+    """
+    quantizer = get_quantizer(instId, trading_flag)
+    return quantizer is None or quantizer.meets_min_size(size)
+
+
+def get_precision_cache() -> Dict[str, Dict]:
+    """The instrument precision cache (state snapshots save and restore it)"""
+    return _instrument_precision_cache
+
+
+def format_number(
+    number, instId: Optional[str] = None, trading_flag: str = "0", kind: str = "size"
+):
     """Format number according to OKX precision requirements
-    If instId is provided, uses OKX instrument precision (lotSz) for better accuracy
+    If instId is provided, rounds with exact decimals to the instrument's
+    lotSz (sizes, down), tickSz (kind="price": order prices, down) or tickSz
+    (kind="fill_price": recorded fill/sell prices, to nearest)
     Falls back to heuristic precision if instrument info is not available
 
     Args:
@@ -239,26 +309,19 @@ def format_number(number, instId: Optional[str] = None, trading_flag: str = "0")
         instId: Optional instrument ID (e.g., 'BTC-USDT')
             to use instrument-specific precision
         trading_flag: Trading flag ("0"=production, "1"=demo)
+        kind: "size", "price" or "fill_price"
     """
     number = float(number)
 
     # Try to use OKX instrument precision if instId is provided
     if instId:
-        precision_info = get_instrument_precision(
-            instId, use_cache=True, trading_flag=trading_flag
-        )
-        if precision_info:
-            lot_precision = precision_info.get("lotPrecision", 0)
-            lot_sz = float(precision_info.get("lotSz", "1"))
-
-            # Round to lotSz increment
-            if lot_sz > 0:
-                rounded = round(number / lot_sz) * lot_sz
-                # Format with appropriate precision
-                if lot_precision > 0:
-                    return f"{rounded:.{lot_precision}f}".rstrip("0").rstrip(".")
-                else:
-                    return f"{int(rounded)}"
+        quantizer = get_quantizer(instId, trading_flag)
+        if quantizer is not None:
+            if kind == "price":
+                return quantizer.price(number)
+            if kind == "fill_price":
+                return quantizer.fill_price(number)
+            return quantizer.size(number)
 
     # Fallback to original heuristic precision
     if number > 100:
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Order History Lookup
+Resolves fill times of many orders at once from paged OKX orders-history and
+fills-history queries, instead of one get_order call per order
+"""
+
+import logging
+import os
+import time
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from .order_state import get_order_state_cache
+
+logger = logging.getLogger(__name__)
+
+# Records per page (OKX maximum for every history endpoint)
+OKX_HISTORY_PAGE_LIMIT = 100
+# orders-history keeps 7 days; older orders are in orders-history-archive
+OKX_ORDERS_HISTORY_DAYS = 7
+# DB create_time is stamped locally around placement, so the window starts
+# this far before the oldest candidate
+HISTORY_WINDOW_SLACK_SECONDS = float(os.getenv("HISTORY_WINDOW_SLACK_SECONDS", "300"))
+# Runaway guard per endpoint; the time window normally ends paging first
+HISTORY_MAX_PAGES = int(os.getenv("HISTORY_MAX_PAGES", "50"))
+
+
+def _record_time(record: dict, fields: Iterable[str]) -> Optional[int]:
+    """First non-empty millisecond timestamp among fields"""
+    for field in fields:
+        try:
+            value = int(record.get(field) or 0)
+        except (ValueError, TypeError):
+            continue
+        if value:
+            return value
+    return None
+
+
+class FillHistory:
+    """Fill times (epoch ms) for a set of ordIds, resolved in pages
+
+    Sources, each only for the ordIds still unresolved:
+    1. Current snapshots in the order state cache (no API call)
+    2. orders-history (7 days), bounded server-side by begin
+    3. orders-history-archive, when the window reaches past 7 days
+    4. fills-history, latest fill per order, paged back to the window start
+
+    After resolve(), complete is False when a source failed or hit
+    HISTORY_MAX_PAGES, i.e. an unresolved ordId may simply not have been
+    reached (rather than having no fills in the window).
+    """
+
+    def __init__(self, api, inst_type: str = "SPOT"):
+        self.api = api
+        self.inst_type = inst_type
+        self.calls = 0
+        self.complete = True
+
+    def resolve(self, ord_ids: Iterable[str], begin_ms: int) -> Dict[str, int]:
+        wanted = set(ord_ids)
+        fill_times: Dict[str, int] = {}
+        self.complete = True
+        if not wanted:
+            return fill_times
+        begin_ms = int(begin_ms - HISTORY_WINDOW_SLACK_SECONDS * 1000)
+
+        cache = get_order_state_cache()
+        for ordId in wanted:
+            order = cache.get(ordId)
+            fill_ms = _record_time(order, ("fillTime",)) if order else None
+            if fill_ms:
+                fill_times[ordId] = fill_ms
+                cache.push_hits += 1
+
+        sources = [("get_orders_history", True)]
+        archive_from_ms = (time.time() - OKX_ORDERS_HISTORY_DAYS * 86400) * 1000
+        if begin_ms < archive_from_ms:
+            sources.append(("get_orders_history_archive", True))
+        sources.append(("get_fills_history", False))
+
+        for method, is_orders in sources:
+            remaining = wanted - fill_times.keys()
+            if not remaining:
+                break
+            try:
+                if is_orders:
+                    self._scan_orders(method, remaining, begin_ms, fill_times)
+                else:
+                    self._scan_fills(remaining, begin_ms, fill_times)
+            except Exception as e:
+                self.complete = False
+                logger.warning(f"⚠️ Order history lookup via {method} failed: {e}")
+        return fill_times
+
+    def _pages(
+        self,
+        call: Callable,
+        cursor_field: str,
+        time_fields: tuple,
+        begin_ms: int,
+        **params,
+    ) -> Iterator[dict]:
+        """Records newest first, page by page, until older than begin_ms"""
+        after = ""
+        for _ in range(HISTORY_MAX_PAGES):
+            result = call(
+                instType=self.inst_type,
+                after=after,
+                limit=str(OKX_HISTORY_PAGE_LIMIT),
+                **params,
+            )
+            self.calls += 1
+            if result.get("code") != "0":
+                raise RuntimeError(f"code={result.get('code')}: {result.get('msg')}")
+            data = result.get("data") or []
+            yield from data
+            if len(data) < OKX_HISTORY_PAGE_LIMIT:
+                return
+            oldest = _record_time(data[-1], time_fields)
+            if oldest is not None and oldest < begin_ms:
+                return
+            after = data[-1].get(cursor_field, "")
+            if not after:
+                return
+        self.complete = False
+        logger.warning(
+            f"⚠️ Order history stopped after {HISTORY_MAX_PAGES} pages "
+            f"before reaching the window start"
+        )
+
+    def _scan_orders(
+        self, method: str, remaining: set, begin_ms: int, fill_times: Dict[str, int]
+    ):
+        cache = get_order_state_cache()
+        for order in self._pages(
+            getattr(self.api, method),
+            "ordId",
+            ("cTime",),
+            begin_ms,
+            begin=str(begin_ms),
+        ):
+            ordId = order.get("ordId")
+            if ordId not in remaining:
+                continue
+            cache.update(order)
+            fill_ms = _record_time(order, ("fillTime",))
+            if fill_ms:
+                fill_times[ordId] = fill_ms
+                remaining.discard(ordId)
+                if not remaining:
+                    return
+
+    def _scan_fills(self, remaining: set, begin_ms: int, fill_times: Dict[str, int]):
+        # Several fills per order: keep the latest (matches get_order fillTime)
+        latest: Dict[str, int] = {}
+        for fill in self._pages(
+            self.api.get_fills_history, "billId", ("fillTime", "ts"), begin_ms
+        ):
+            ordId = fill.get("ordId")
+            fill_ms = _record_time(fill, ("fillTime", "ts"))
+            if ordId in remaining and fill_ms:
+                latest[ordId] = max(latest.get(ordId, 0), fill_ms)
+        fill_times.update(latest)
@@ -15,6 +15,10 @@ from typing import Optional, Tuple
 
 from okx.Trade import TradeAPI
 
+from .okx_functions import meets_min_size
+from .order_state import fetch_order
+from .position_index import record_closed, record_insert
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,11 +30,14 @@ def _get_sell_price_with_fallback(
     current_prices: dict,
     lock: Optional[threading.Lock],
     requested_size: Optional[float] = None,
+    wait_seconds: float = 0.0,
 ) -> Tuple[float, str, list, bool]:
     """Get sell price with fallback chain: avgPx/fillPx -> current_prices -> ticker
 
     Args:
         requested_size: The original order size to verify full fill (optional)
+        wait_seconds: Max wait for the order to finish (pushed state), or the
+            delay before the REST lookup when the orders stream is down
 
     Returns:
         Tuple of (sell_price, price_source, failure_chain, is_confirmed_filled)
@@ -47,7 +54,9 @@ def _get_sell_price_with_fallback(
     try:
         # Step 1: Try get_order API (prefer avgPx, then fillPx)
         # ✅ CRITICAL: Only use price if order is FULLY filled
-        order_result = tradeAPI.get_order(instId=instId, ordId=order_id)
+        order_result = fetch_order(
+            tradeAPI, instId, order_id, wait_seconds=wait_seconds
+        )
         if order_result.get("code") == "0" and order_result.get("data"):
             order_info = order_result["data"][0]
             avg_px = order_info.get("avgPx", "")
@@ -188,9 +197,14 @@ def buy_limit_order(
                 f"instead of limit={limit_price:.6f} (current < limit)"
             )
 
-    buy_price = format_number_func(actual_price, instId)
+    buy_price = format_number_func(actual_price, instId, kind="price")
     size = format_number_func(size, instId)
 
+    # ✅ FIX: OKX rejects sizes below minSz; don't send them
+    if not meets_min_size(instId, size):
+        logger.warning(f"🧹 BUY: {instId} size={size} below minSz, not placing order")
+        return None
+
     if simulation_mode:
         ordId = f"HLW-SIM-{uuid.uuid4().hex[:12]}"
         amount_usdt = float(buy_price) * float(size)
@@ -222,10 +236,14 @@ def buy_limit_order(
                         # If limit order price > market price, it may fill immediately at market price
                         order_info = None
                         for check_attempt in range(3):
-                            time.sleep(0.5)
                             try:
-                                order_result = tradeAPI.get_order(
-                                    instId=instId, ordId=ordId
+                                # Resolves on the fill push when the orders stream is live
+                                order_result = fetch_order(
+                                    tradeAPI,
+                                    instId,
+                                    ordId,
+                                    wait_seconds=0.5,
+                                    wait_for="fill",
                                 )
                                 if order_result.get("code") == "0" and order_result.get(
                                     "data"
@@ -266,7 +284,7 @@ def buy_limit_order(
                                 )
                                 # Update buy_price to actual fill price for database
                                 buy_price = format_number_func(
-                                    actual_fill_price, instId
+                                    actual_fill_price, instId, kind="fill_price"
                                 )
                                 size = format_number_func(actual_fill_size, instId)
                             else:
@@ -340,6 +358,7 @@ def buy_limit_order(
             ),
         )
         conn.commit()
+        record_insert(strategy_name, instId, ordId, order_state, create_time)
         amount_usdt = float(buy_price) * float(size)
         logger.warning(
             f"✅ BUY SAVED: {instId}, price={buy_price}, size={size}, "
@@ -407,32 +426,8 @@ def _execute_market_sell(
         # This ensures we only reuse sell orders that belong to this exact buy order
         cur_check = conn.cursor()
         try:
-            # ✅ FIX: Verify sell_order_id column exists (runtime check, fails fast if missing)
-            # Schema migration should be done via init_database.py, not in hot path
-            try:
-                cur_check.execute(
-                    """
-                    SELECT column_name FROM information_schema.columns 
-                    WHERE table_schema = 'public' 
-                      AND table_name = 'orders' 
-                      AND column_name = 'sell_order_id'
-                    """
-                )
-                column_exists = cur_check.fetchone() is not None
-                if not column_exists:
-                    logger.error(
-                        f"❌ CRITICAL: sell_order_id column is missing from orders table! "
-                        f"Please run 'python init_database.py' to add the column. "
-                        f"Sell order linkage will not work for {instId}, ordId={ordId}"
-                    )
-                    # Continue without linkage rather than failing completely
-            except Exception as e:
-                logger.error(
-                    f"❌ CRITICAL: Could not verify sell_order_id column existence: {e}. "
-                    f"Sell order linkage may not work for {instId}, ordId={ordId}"
-                )
-                # Continue without linkage rather than failing completely
-
+            # ✅ OPTIMIZED: sell_order_id is guaranteed by the startup schema
+            # self-check (schema_registry), so no information_schema probe here
             # Check for existing sell_order_id for this specific buy order
             try:
                 cur_check.execute(
@@ -444,8 +439,8 @@ def _execute_market_sell(
                     existing_sell_order_id = row[0]
                     # Verify the sell order still exists and check its state
                     try:
-                        order_result = tradeAPI.get_order(
-                            instId=instId, ordId=existing_sell_order_id
+                        order_result = fetch_order(
+                            tradeAPI, instId, existing_sell_order_id
                         )
                         if order_result.get("code") == "0" and order_result.get("data"):
                             order_info = order_result["data"][0]
@@ -481,7 +476,7 @@ def _execute_market_sell(
                                 if is_confirmed_filled and sell_price > 0:
                                     # Update database to mark as sold out
                                     sell_price_str = format_number_func(
-                                        sell_price, instId
+                                        sell_price, instId, kind="fill_price"
                                     )
                                     cur_check.execute(
                                         "UPDATE orders SET state = %s, sell_price = %s "
@@ -494,6 +489,7 @@ def _execute_market_sell(
                                         ),
                                     )
                                     conn.commit()
+                                    record_closed(strategy_name, instId, ordId)
 
                                     sell_amount_usdt = (
                                         float(sell_price) * size_float
@@ -593,7 +589,7 @@ def _execute_market_sell(
                                         # Prepare UPDATE statement with or without sell_price
                                         if sell_price > 0:
                                             sell_price_str = format_number_func(
-                                                sell_price, instId
+                                                sell_price, instId, kind="fill_price"
                                             )
                                             cur_check.execute(
                                                 "UPDATE orders SET state = %s, sell_price = %s, sell_order_id = NULL "
@@ -633,6 +629,7 @@ def _execute_market_sell(
                                             )
 
                                         conn.commit()
+                                        record_closed(strategy_name, instId, ordId)
                                         return True
                                 else:
                                     # No partial fill, safe to clear linkage
@@ -672,6 +669,14 @@ def _execute_market_sell(
             try:
                 # ✅ CRITICAL: Only place order on first attempt, then poll same order_id
                 if order_id is None:
+                    # ✅ FIX: OKX rejects sizes below minSz (dust, e.g. the
+                    # remainder of a partial fill); don't send them
+                    if not meets_min_size(instId, size_str):
+                        logger.error(
+                            f"❌ {strategy_name} {log_prefix}: {instId}, ordId={ordId}, "
+                            f"size={size_str} below minSz, not placing sell order"
+                        )
+                        return False
                     result = tradeAPI.place_order(
                         instId=instId,
                         tdMode="cash",
@@ -738,7 +743,7 @@ def _execute_market_sell(
 
                 # ✅ Poll the same order_id (don't place new order on retry)
                 if order_id:
-                    time.sleep(0.5 if attempt == 0 else 2)  # Shorter wait first time
+                    # Shorter wait first time; returns as soon as the fill is pushed
                     sell_price, price_source, failure_chain, is_confirmed_filled = (
                         _get_sell_price_with_fallback(
                             instId,
@@ -748,6 +753,7 @@ def _execute_market_sell(
                             current_prices,
                             lock,
                             requested_size=size_float,
+                            wait_seconds=0.5 if attempt == 0 else 2,
                         )
                     )
 
@@ -808,7 +814,7 @@ def _execute_market_sell(
             )
             return False
 
-        sell_price_str = format_number_func(sell_price, instId)
+        sell_price_str = format_number_func(sell_price, instId, kind="fill_price")
 
         cur.execute(
             "UPDATE orders SET state = %s, sell_price = %s "
@@ -829,6 +835,7 @@ def _execute_market_sell(
                 f"ordId={ordId}, no rows updated"
             )
             return False
+        record_closed(strategy_name, instId, ordId)
 
         sell_amount_usdt = float(sell_price) * size_float if sell_price > 0 else 0
         logger.warning(
@@ -912,9 +919,16 @@ def buy_stable_order(
                 f"instead of limit={limit_price:.6f} (current < limit)"
             )
 
-    buy_price = format_number_func(actual_price, instId)
+    buy_price = format_number_func(actual_price, instId, kind="price")
     size = format_number_func(size, instId)
 
+    # ✅ FIX: OKX rejects sizes below minSz; don't send them
+    if not meets_min_size(instId, size):
+        logger.warning(
+            f"🧹 STABLE BUY: {instId} size={size} below minSz, not placing order"
+        )
+        return None
+
     if simulation_mode:
         ordId = f"STB-SIM-{uuid.uuid4().hex[:12]}"
         amount_usdt = float(buy_price) * float(size)
@@ -944,10 +958,14 @@ def buy_stable_order(
                     if ordId:
                         # ✅ FIX: Immediately check order status to get actual fill price
                         # If limit order price > market price, it fills immediately at market price
-                        time.sleep(0.5)  # Wait a bit for order to be processed
                         try:
-                            order_result = tradeAPI.get_order(
-                                instId=instId, ordId=ordId
+                            # Wait a bit for order to be processed (returns on fill push)
+                            order_result = fetch_order(
+                                tradeAPI,
+                                instId,
+                                ordId,
+                                wait_seconds=0.5,
+                                wait_for="fill",
                             )
                             if order_result.get("code") == "0" and order_result.get(
                                 "data"
@@ -973,7 +991,7 @@ def buy_stable_order(
                                     )
                                     # Update buy_price to actual fill price for database
                                     buy_price = format_number_func(
-                                        actual_fill_price, instId
+                                        actual_fill_price, instId, kind="fill_price"
                                     )
                                     size = format_number_func(actual_fill_size, instId)
                                 else:
@@ -1049,6 +1067,7 @@ def buy_stable_order(
             ),
         )
         conn.commit()
+        record_insert(strategy_name, instId, ordId, order_state, create_time)
         amount_usdt = float(buy_price) * float(size)
         logger.warning(
             f"✅ STABLE BUY SAVED: {instId}, price={buy_price}, size={size}, "
@@ -1132,9 +1151,16 @@ def buy_batch_order(
                 f"instead of limit={limit_price:.6f} (current < limit)"
             )
 
-    buy_price = format_number_func(actual_price, instId)
+    buy_price = format_number_func(actual_price, instId, kind="price")
     size = format_number_func(size, instId)
 
+    # ✅ FIX: OKX rejects sizes below minSz; don't send them
+    if not meets_min_size(instId, size):
+        logger.warning(
+            f"🧹 BATCH BUY: {instId} size={size} below minSz, not placing order"
+        )
+        return None
+
     if simulation_mode:
         ordId = f"BAT-SIM-{uuid.uuid4().hex[:12]}"
         amount_usdt = float(buy_price) * float(size)
@@ -1164,10 +1190,14 @@ def buy_batch_order(
                     if ordId:
                         # ✅ FIX: Immediately check order status to get actual fill price
                         # If limit order price > market price, it fills immediately at market price
-                        time.sleep(0.5)  # Wait a bit for order to be processed
                         try:
-                            order_result = tradeAPI.get_order(
-                                instId=instId, ordId=ordId
+                            # Wait a bit for order to be processed (returns on fill push)
+                            order_result = fetch_order(
+                                tradeAPI,
+                                instId,
+                                ordId,
+                                wait_seconds=0.5,
+                                wait_for="fill",
                             )
                             if order_result.get("code") == "0" and order_result.get(
                                 "data"
@@ -1193,7 +1223,7 @@ def buy_batch_order(
                                     )
                                     # Update buy_price to actual fill price for database
                                     buy_price = format_number_func(
-                                        actual_fill_price, instId
+                                        actual_fill_price, instId, kind="fill_price"
                                     )
                                     size = format_number_func(actual_fill_size, instId)
                                 else:
@@ -1267,6 +1297,7 @@ def buy_batch_order(
             ),
         )
         conn.commit()
+        record_insert(strategy_name, instId, ordId, order_state, create_time)
         amount_usdt = float(buy_price) * float(size)
         logger.warning(
             f"✅ BATCH BUY SAVED: {instId}, batch={batch_index + 1}, price={buy_price}, size={size}, "
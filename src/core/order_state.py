@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Order State Cache
+Push-based order tracking fed by the OKX private `orders` WebSocket channel
+"""
+
+import base64
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+import websocket
+
+logger = logging.getLogger(__name__)
+
+# How many orders to keep (oldest evicted first)
+ORDER_STATE_CACHE_MAX = int(os.getenv("ORDER_STATE_CACHE_MAX", "5000"))
+ORDERS_WS_ENABLED = os.getenv("ORDERS_WS_ENABLED", "true").lower() == "true"
+
+PRIVATE_WS_URL = "wss://ws.okx.com:8443/ws/v5/private"
+PRIVATE_WS_DEMO_URL = "wss://wspap.okx.com:8443/ws/v5/private?brokerId=9999"
+
+TERMINAL_STATES = ("filled", "canceled", "mmp_canceled")
+
+
+def is_terminal(order: dict) -> bool:
+    return order.get("state") in TERMINAL_STATES
+
+
+def has_fill(order: dict) -> bool:
+    try:
+        return float(order.get("accFillSz") or 0) > 0
+    except (ValueError, TypeError):
+        return False
+
+
+WAIT_PREDICATES: Dict[str, Callable[[dict], bool]] = {
+    "terminal": is_terminal,
+    "fill": lambda order: has_fill(order) or is_terminal(order),
+}
+
+
+class OrderStateCache:
+    """ordId -> latest order snapshot, with waiters woken on every update
+
+    Snapshots pushed while the private stream is subscribed carry the
+    stream epoch. While that epoch is still live the snapshot is current
+    (any later change would have been pushed), so callers can skip REST.
+    Terminal snapshots are final regardless of where they came from.
+    """
+
+    def __init__(self, max_orders: int = ORDER_STATE_CACHE_MAX):
+        self.max_orders = max_orders
+        self._orders: "OrderedDict[str, dict]" = OrderedDict()
+        self._epochs: Dict[str, int] = {}  # ordId -> stream epoch (0 = REST)
+        self._cond = threading.Condition()
+        self._epoch = 0
+        self._live = False
+        self.push_updates = 0
+        self.rest_updates = 0
+        self.push_hits = 0
+        self.rest_fetches = 0
+
+    # Stream lifecycle -------------------------------------------------
+
+    def mark_live(self):
+        """Private stream subscribed: start a new epoch"""
+        with self._cond:
+            self._epoch += 1
+            self._live = True
+
+    def mark_down(self):
+        """Private stream lost: pushed snapshots may now be stale"""
+        with self._cond:
+            self._live = False
+            self._cond.notify_all()
+
+    def is_live(self) -> bool:
+        return self._live
+
+    # Updates ----------------------------------------------------------
+
+    def update(self, order: dict, pushed: bool = False):
+        """Store an order snapshot (ignoring ones older than what we have)"""
+        ordId = order.get("ordId")
+        if not ordId:
+            return
+        with self._cond:
+            current = self._orders.get(ordId)
+            if current is not None:
+                if is_terminal(current) and not is_terminal(order):
+                    return
+                if int(order.get("uTime") or 0) < int(current.get("uTime") or 0):
+                    return
+            self._orders[ordId] = order
+            self._orders.move_to_end(ordId)
+            self._epochs[ordId] = self._epoch if pushed and self._live else 0
+            if pushed:
+                self.push_updates += 1
+            else:
+                self.rest_updates += 1
+            while len(self._orders) > self.max_orders:
+                old_id, _ = self._orders.popitem(last=False)
+                self._epochs.pop(old_id, None)
+            self._cond.notify_all()
+
+    # Reads ------------------------------------------------------------
+
+    def _current(self, ordId: str) -> Optional[dict]:
+        """Snapshot known to be up to date (call with _cond held)"""
+        order = self._orders.get(ordId)
+        if order is None:
+            return None
+        if is_terminal(order):
+            return order
+        if self._live and self._epochs.get(ordId) == self._epoch:
+            return order
+        return None
+
+    def get(self, ordId: str) -> Optional[dict]:
+        """Latest snapshot if it is known to be current, else None"""
+        with self._cond:
+            return self._current(ordId)
+
+    def wait_for(
+        self, ordId: str, predicate: Callable[[dict], bool], timeout: float
+    ) -> Optional[dict]:
+        """Block until a current snapshot satisfies predicate
+
+        Returns the snapshot, or the latest current snapshot (which may not
+        satisfy predicate) on timeout, or None if nothing current is known.
+        Returns early if the stream goes down.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                order = self._current(ordId)
+                if order is not None and predicate(order):
+                    return order
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._live:
+                    return order
+                self._cond.wait(remaining)
+
+    def format_stats(self, reset: bool = False) -> str:
+        with self._cond:
+            line = (
+                f"📨 Order state: {len(self._orders)} orders, "
+                f"live={self._live} (epoch {self._epoch}), "
+                f"push updates={self.push_updates}, rest updates={self.rest_updates}, "
+                f"push hits={self.push_hits}, rest fetches={self.rest_fetches}"
+            )
+            if reset:
+                self.push_updates = 0
+                self.rest_updates = 0
+                self.push_hits = 0
+                self.rest_fetches = 0
+        return line
+
+
+_order_state_cache = OrderStateCache()
+
+
+def get_order_state_cache() -> OrderStateCache:
+    """Process-wide order state cache"""
+    return _order_state_cache
+
+
+def fetch_order(
+    tradeAPI,
+    instId: str,
+    ordId: str,
+    wait_seconds: float = 0.0,
+    wait_for: str = "terminal",
+) -> dict:
+    """get_order that resolves from pushed state when possible
+
+    With the private stream live, waits up to wait_seconds for a pushed
+    update matching wait_for ("terminal" or "fill") and returns the current
+    pushed snapshot without touching REST. Otherwise sleeps wait_seconds
+    (the old polling delay) and falls back to tradeAPI.get_order, whose
+    result also feeds the cache.
+
+    Returns:
+        A get_order-shaped response: {"code": "0", "data": [order], ...}
+    """
+    cache = _order_state_cache
+    if cache.is_live():
+        order = cache.wait_for(ordId, WAIT_PREDICATES[wait_for], wait_seconds)
+        if order is not None:
+            cache.push_hits += 1
+            return {"code": "0", "msg": "", "data": [order], "source": "push"}
+    else:
+        order = cache.get(ordId)
+        if order is not None:
+            cache.push_hits += 1
+            return {"code": "0", "msg": "", "data": [order], "source": "push"}
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+
+    cache.rest_fetches += 1
+    result = tradeAPI.get_order(instId=instId, ordId=ordId)
+    if result.get("code") == "0" and result.get("data"):
+        cache.update(result["data"][0])
+    return result
+
+
+def _login_args(api_key: str, secret: str, passphrase: str) -> dict:
+    """Private channel login payload (same signing as okx_ws_buy.sign)"""
+    ts = str(int(datetime.now().timestamp()))
+    mac = hmac.new(
+        bytes(secret, encoding="utf8"),
+        bytes(ts + "GET" + "/users/self/verify", encoding="utf-8"),
+        digestmod="sha256",
+    )
+    return {
+        "apiKey": api_key,
+        "passphrase": passphrase,
+        "timestamp": ts,
+        "sign": base64.b64encode(mac.digest()).decode(encoding="utf-8"),
+    }
+
+
+class PrivateOrdersStream:
+    """Logged-in `orders` channel client publishing into OrderStateCache
+
+    on_open/on_message follow the WebSocketApp callback signature, so the
+    same object can be driven by run_forever() (thread mode) or by
+    AsyncEngine.add_socket (asyncio mode).
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        secret: str,
+        passphrase: str,
+        demo: bool = False,
+        cache: Optional[OrderStateCache] = None,
+    ):
+        self.api_key = api_key
+        self.secret = secret
+        self.passphrase = passphrase
+        self.url = PRIVATE_WS_DEMO_URL if demo else PRIVATE_WS_URL
+        self.cache = cache or _order_state_cache
+
+    def on_open(self, ws):
+        logger.warning("Private orders WebSocket opened, logging in")
+        self.cache.mark_down()
+        ws.send(
+            json.dumps(
+                {
+                    "op": "login",
+                    "args": [_login_args(self.api_key, self.secret, self.passphrase)],
+                }
+            )
+        )
+
+    def on_message(self, ws, msg_string):
+        if msg_string == "pong":
+            return
+        try:
+            m = json.loads(msg_string)
+            ev = m.get("event")
+            if ev == "login":
+                if m.get("code") == "0":
+                    ws.send(
+                        json.dumps(
+                            {
+                                "op": "subscribe",
+                                "args": [{"channel": "orders", "instType": "SPOT"}],
+                            }
+                        )
+                    )
+                else:
+                    logger.error(f"❌ Private orders login failed: {msg_string}")
+            elif ev == "subscribe":
+                self.cache.mark_live()
+                logger.warning("✅ Subscribed to private orders channel")
+            elif ev == "error":
+                logger.error(f"Private orders WebSocket error: {msg_string}")
+            elif m.get("data"):
+                for order in m["data"]:
+                    self.cache.update(order, pushed=True)
+        except Exception as e:
+            logger.error(f"Private orders message error: {e}")
+
+    def on_close(self, ws, close_status_code=None, close_msg=None):
+        self.cache.mark_down()
+        logger.warning(
+            f"Private orders WebSocket closed: code={close_status_code}, "
+            f"msg={close_msg}"
+        )
+
+    def run_forever(self):
+        """Thread-mode loop: connect, keep alive with pings, reconnect"""
+        reconnect_delay = 1.0
+        while True:
+            connected_at = time.time()
+            try:
+                ws = websocket.WebSocketApp(
+                    self.url,
+                    on_open=self.on_open,
+                    on_message=self.on_message,
+                    on_error=lambda ws, error: logger.warning(
+                        f"Private orders WebSocket error: {error}"
+                    ),
+                    on_close=self.on_close,
+                )
+
+                def send_ping(ws=ws):
+                    while True:
+                        time.sleep(20)
+                        try:
+                            ws.send("ping")
+                        except Exception:
+                            break
+
+                threading.Thread(
+                    target=send_ping, daemon=True, name="OrdersWSPing"
+                ).start()
+                ws.run_forever()
+            except Exception as e:
+                logger.error(f"Private orders WebSocket connection failed: {e}")
+            self.cache.mark_down()
+            if time.time() - connected_at >= 60:
+                reconnect_delay = 1.0
+            time.sleep(reconnect_delay)
+            reconnect_delay = min(reconnect_delay * 2, 60.0)
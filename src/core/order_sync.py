@@ -4,6 +4,10 @@
 Order Synchronization and Recovery
 Handles syncing orders between memory and database, and recovering lost orders
 
+Every strategy is described by a StrategySpec; sync and recovery each run one
+query covering all strategy flags and dispatch the rows to per-strategy
+handlers, so a pass costs one round-trip however many strategies it covers.
+
 Recommended DB indexes for performance:
     CREATE INDEX idx_orders_flag_state_sell_price ON orders(flag, state, sell_price)
         WHERE sell_price IS NULL OR sell_price = '';
@@ -16,10 +20,98 @@ import os
 import threading
 import time
 from datetime import datetime, timedelta
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
+
+from .order_history import FillHistory
+from .orders_schema import open_position_sql
+from .rate_limiter import PRIORITY_RECOVERY, at_priority
+from .sharding import owns_instrument
+from .task_runner import spawn
 
 logger = logging.getLogger(__name__)
 
+# A buy whose fillTime an incomplete history lookup missed is deferred to the
+# next pass, but at most this many passes, and not once it is this old: then
+# its create_time is used as before
+RECOVERY_MAX_DEFERRALS = int(os.getenv("RECOVERY_MAX_DEFERRALS", "3"))
+RECOVERY_MAX_DEFER_AGE_SECONDS = float(
+    os.getenv("RECOVERY_MAX_DEFER_AGE_SECONDS", "7200")
+)
+
+# Memory orders already sold in the DB, sold ordIds grouped per position
+SOLD_OUT_QUERY = """
+    SELECT flag, instId, array_agg(ordId)
+    FROM orders
+    WHERE flag = ANY(%s)
+      AND ordId = ANY(%s)
+      AND state = 'sold out'
+    GROUP BY flag, instId
+"""
+
+# Filled, unsold buys of every flag, newest first, at most %s rows per flag
+# ({open_position}: orders_schema.open_position_sql())
+RECOVERY_QUERY = """
+    SELECT flag, instId, ordId, create_time, state, size
+    FROM (
+        SELECT flag, instId, ordId, create_time, state, size,
+               ROW_NUMBER() OVER (
+                   PARTITION BY flag ORDER BY create_time DESC
+               ) AS flag_rank
+        FROM orders
+        WHERE flag = ANY(%s)
+          AND {open_position}
+          AND create_time > %s
+    ) candidates
+    WHERE flag_rank <= %s
+    ORDER BY flag, create_time DESC
+"""
+
+
+def next_sell_time(fill_time: datetime) -> datetime:
+    """Sell at the next hour's 55th minute after the fill"""
+    # ✅ FIX: Always add 1 hour to ensure we sell at next hour's close
+    return fill_time.replace(minute=55, second=0, microsecond=0) + timedelta(hours=1)
+
+
+class StrategySpec:
+    """One strategy's row in the reconciliation table
+
+    Args:
+        label: Name used in logs ("original", "stable", ...)
+        flag: orders.flag of the strategy
+        orders: The strategy's in-memory active orders dict
+        dict_name: Name of that dict in logs
+        sell: Sell signal function, called with instId
+        grouped: Positions hold several buys ("ordIds"), as batch does
+    """
+
+    def __init__(
+        self,
+        label: str,
+        flag: str,
+        orders: Dict,
+        dict_name: str,
+        sell: Callable,
+        grouped: bool = False,
+    ):
+        self.label = label
+        self.flag = flag
+        self.orders = orders
+        self.dict_name = dict_name
+        self.sell = sell
+        self.grouped = grouped
+
+    def ord_ids(self, order_info: Dict) -> List[str]:
+        if self.grouped:
+            return list(order_info.get("ordIds", []))
+        ordId = order_info.get("ordId")
+        return [ordId] if ordId else []
+
+    def is_sold(self, order_info: Dict, sold_ord_ids: set) -> bool:
+        """Single buy sold, or every buy of a grouped position sold"""
+        ord_ids = self.ord_ids(order_info)
+        return bool(ord_ids) and all(ordId in sold_ord_ids for ordId in ord_ids)
+
 
 class OrderSyncManager:
     """Manages order synchronization and recovery from database"""
@@ -41,6 +133,9 @@ class OrderSyncManager:
         process_stable_sell_signal: Callable,
         process_batch_sell_signal: Callable,
         simulation_mode: bool = False,
+        gap_strategy_name: Optional[str] = None,
+        gap_active_orders: Optional[Dict] = None,
+        process_gap_sell_signal: Optional[Callable] = None,
     ):
         """Initialize OrderSyncManager
 
@@ -59,6 +154,9 @@ class OrderSyncManager:
             process_sell_signal: Function to process sell signal (original)
             process_stable_sell_signal: Function to process sell signal (stable)
             process_batch_sell_signal: Function to process sell signal (batch)
+            gap_strategy_name: Strategy name for gap orders (optional)
+            gap_active_orders: Dict of active orders (gap strategy)
+            process_gap_sell_signal: Function to process sell signal (gap)
         """
         import os
 
@@ -83,167 +181,103 @@ class OrderSyncManager:
             os.getenv("DEEP_RECOVERY_INTERVAL_SECONDS", "86400")
         )  # Default 24 hours
         self.deep_recovery_execution_times: list = []  # Track execution times
+        # ordId -> passes its recovery was deferred for a missing fillTime
+        self._deferrals: Dict[str, int] = {}
+
+        # ✅ OPTIMIZED: One table drives sync and recovery for every strategy
+        self.strategies: List[StrategySpec] = [
+            StrategySpec(
+                "original",
+                strategy_name,
+                active_orders,
+                "active_orders",
+                process_sell_signal,
+            ),
+            StrategySpec(
+                "stable",
+                stable_strategy_name,
+                stable_active_orders,
+                "stable_active_orders",
+                process_stable_sell_signal,
+            ),
+            StrategySpec(
+                "batch",
+                batch_strategy_name,
+                batch_active_orders,
+                "batch_active_orders",
+                process_batch_sell_signal,
+                grouped=True,
+            ),
+        ]
+        if gap_strategy_name and gap_active_orders is not None:
+            self.strategies.append(
+                StrategySpec(
+                    "gap",
+                    gap_strategy_name,
+                    gap_active_orders,
+                    "gap_active_orders",
+                    process_gap_sell_signal or process_sell_signal,
+                )
+            )
+        self._orders_by_flag = {spec.flag: spec.orders for spec in self.strategies}
 
     def sync_orders_from_database(self):
-        """Sync active_orders, stable_active_orders, and batch_active_orders with database state
+        """Sync every strategy's active orders with database state
         This handles cases where external processes or manual operations
         sold orders but websocket_limit_trading.py memory still thinks they're active
         """
         try:
+            with self.lock:
+                snapshot = [
+                    (spec, list(spec.orders.items())) for spec in self.strategies
+                ]
+            all_ordIds = set()
+            for spec, orders in snapshot:
+                for _, order_info in orders:
+                    all_ordIds.update(spec.ord_ids(order_info))
+            if not all_ordIds:
+                return
+
+            # ✅ OPTIMIZED: One query for all strategies, grouped per position
             conn = self.get_db_connection()
             cur = conn.cursor()
-
-            # ✅ FIX: Check original strategy orders
-            with self.lock:
-                orders_to_check = list(self.active_orders.items())
-
-            # Build mapping of ordId -> instId for batch querying
-            ordId_to_instId = {}
-            all_ordIds = []
-            for instId, order_info in orders_to_check:
-                ordId = order_info.get("ordId")
-                if not ordId:
-                    continue
-                ordId_to_instId[ordId] = instId
-                all_ordIds.append(ordId)
-
-            # Batch query all orders in a single query
-            if all_ordIds:
-                try:
-                    cur.execute(
-                        """
-                        SELECT instId, ordId, state FROM orders
-                        WHERE ordId = ANY(%s) AND flag = %s
-                        """,
-                        (all_ordIds, self.strategy_name),
-                    )
-                    rows = cur.fetchall()
-
-                    # Build a map of (instId, ordId) -> state
-                    db_states = {
-                        (row[0], row[1]): row[2] if row[2] else "" for row in rows
-                    }
-
-                    # Find orders that are sold out
-                    orders_to_remove = []
-                    for ordId, instId in ordId_to_instId.items():
-                        state = db_states.get((instId, ordId), "")
-                        if state == "sold out":
-                            orders_to_remove.append((instId, ordId))
-
-                    # Remove sold orders from memory
-                    if orders_to_remove:
-                        with self.lock:
-                            for instId, ordId in orders_to_remove:
-                                if (
-                                    instId in self.active_orders
-                                    and self.active_orders[instId].get("ordId") == ordId
-                                ):
-                                    logger.warning(
-                                        f"🔄 SYNC: {instId} (original) ordId={ordId} already sold in DB, "
-                                        f"removing from active_orders"
-                                    )
-                                    del self.active_orders[instId]
-                except Exception as e:
-                    logger.debug(f"Error checking original orders: {e}")
-
-            # ✅ FIX: Check stable strategy orders
-            with self.lock:
-                stable_orders_to_check = list(self.stable_active_orders.items())
-
-            stable_ordId_to_instId = {}
-            stable_all_ordIds = []
-            for instId, order_info in stable_orders_to_check:
-                ordId = order_info.get("ordId")
-                if not ordId:
-                    continue
-                stable_ordId_to_instId[ordId] = instId
-                stable_all_ordIds.append(ordId)
-
-            if stable_all_ordIds:
-                try:
-                    cur.execute(
-                        """
-                        SELECT instId, ordId, state FROM orders
-                        WHERE ordId = ANY(%s) AND flag = %s
-                        """,
-                        (stable_all_ordIds, self.stable_strategy_name),
-                    )
-                    rows = cur.fetchall()
-
-                    db_states = {
-                        (row[0], row[1]): row[2] if row[2] else "" for row in rows
-                    }
-
-                    stable_orders_to_remove = []
-                    for ordId, instId in stable_ordId_to_instId.items():
-                        state = db_states.get((instId, ordId), "")
-                        if state == "sold out":
-                            stable_orders_to_remove.append((instId, ordId))
-
-                    if stable_orders_to_remove:
-                        with self.lock:
-                            for instId, ordId in stable_orders_to_remove:
-                                if (
-                                    instId in self.stable_active_orders
-                                    and self.stable_active_orders[instId].get("ordId")
-                                    == ordId
-                                ):
-                                    logger.warning(
-                                        f"🔄 SYNC: {instId} (stable) ordId={ordId} already sold in DB, "
-                                        f"removing from stable_active_orders"
-                                    )
-                                    del self.stable_active_orders[instId]
-                except Exception as e:
-                    logger.debug(f"Error checking stable orders: {e}")
-
-            # ✅ FIX: Check batch strategy orders
+            try:
+                cur.execute(
+                    SOLD_OUT_QUERY,
+                    (
+                        sorted({spec.flag for spec in self.strategies}),
+                        sorted(all_ordIds),
+                    ),
+                )
+                rows = cur.fetchall()
+            finally:
+                cur.close()
+                conn.close()
+
+            sold = {(flag, instId): set(ordIds) for flag, instId, ordIds in rows}
+            if not sold:
+                return
             with self.lock:
-                batch_orders_to_check = list(self.batch_active_orders.items())
-
-            batch_instIds_to_check = []
-            for instId, order_info in batch_orders_to_check:
-                ordIds = order_info.get("ordIds", [])
-                if ordIds:
-                    batch_instIds_to_check.append((instId, ordIds))
-
-            if batch_instIds_to_check:
-                try:
-                    # For batch orders, check if any instId has all orders sold out
-                    for instId, ordIds in batch_instIds_to_check:
-                        cur.execute(
-                            """
-                            SELECT ordId, state FROM orders
-                            WHERE ordId = ANY(%s) AND flag = %s AND instId = %s
-                            """,
-                            (ordIds, self.batch_strategy_name, instId),
-                        )
-                        rows = cur.fetchall()
-
-                        # Build map of ordId -> state
-                        db_states = {row[0]: row[1] if row[1] else "" for row in rows}
-
-                        # Check if all orders are sold out
-                        all_sold = all(
-                            db_states.get(ordId, "") == "sold out" for ordId in ordIds
+                for spec, orders in snapshot:
+                    for instId, _ in orders:
+                        sold_ordIds = sold.get((spec.flag, instId))
+                        order_info = spec.orders.get(instId)
+                        # Re-checked under the lock: the position may have
+                        # been replaced since the snapshot
+                        if not sold_ordIds or order_info is None:
+                            continue
+                        if not spec.is_sold(order_info, sold_ordIds):
+                            continue
+                        logger.warning(
+                            f"🔄 SYNC: {instId} ({spec.label}) "
+                            f"ordIds={spec.ord_ids(order_info)} already sold in DB, "
+                            f"removing from {spec.dict_name}"
                         )
-
-                        if all_sold:
-                            with self.lock:
-                                if instId in self.batch_active_orders:
-                                    logger.warning(
-                                        f"🔄 SYNC: {instId} (batch) all orders sold in DB, "
-                                        f"removing from batch_active_orders"
-                                    )
-                                    del self.batch_active_orders[instId]
-                except Exception as e:
-                    logger.debug(f"Error checking batch orders: {e}")
-
-            cur.close()
-            conn.close()
+                        del spec.orders[instId]
         except Exception as e:
             logger.error(f"Error in sync_orders_from_database: {e}")
 
+    @at_priority(PRIORITY_RECOVERY)
     def recover_orders_from_database(self, now: datetime):
         """Reverse validation: find filled orders in DB that should be sold
 
@@ -303,427 +337,19 @@ class OrderSyncManager:
             threading_module.Thread(target=run_deep_recovery, daemon=True).start()
 
         try:
-            conn = self.get_db_connection()
-            cur = conn.cursor()
-
-            # Recover original strategy orders
             # Only check orders from last N hours to reduce DB load (configurable)
             recovery_hours = int(os.getenv("RECOVERY_HOURS", "24"))
             recovery_limit = int(os.getenv("RECOVERY_LIMIT", "100"))
             cutoff_time = int(
                 (now - timedelta(hours=recovery_hours)).timestamp() * 1000
             )
-            cur.execute(
-                """
-                SELECT instId, ordId, create_time, state, size
-                FROM orders
-                WHERE flag = %s
-                  AND state IN ('filled', 'partially_filled')
-                  AND (sell_price IS NULL OR sell_price = '')
-                  AND create_time > %s
-                ORDER BY create_time DESC
-                LIMIT %s
-                """,
-                (self.strategy_name, cutoff_time, recovery_limit),
+            self._recover_pass(
+                now, cutoff_time, recovery_limit, tag="RECOVER", verbose=True
             )
-            rows = cur.fetchall()
-
-            # Rate limiting for OKX API calls (environment-configurable)
-            api = self.get_trade_api()
-            api_call_count = 0
-            max_api_calls_per_cycle = int(os.getenv("RECOVERY_MAX_API_CALLS", "20"))
-            api_call_delay = float(os.getenv("RECOVERY_API_CALL_DELAY", "0.1"))
-
-            for row in rows:
-                instId = row[0]
-                ordId = row[1]
-                create_time_ms = row[2]
-                db_state = row[3]
-                db_size = row[4]
-
-                # Check if already in active_orders
-                with self.lock:
-                    if instId in self.active_orders:
-                        continue
-
-                # Get fillTime from OKX API
-                fill_time = None
-                next_hour = None
-
-                if (
-                    not self.simulation_mode
-                    and api is not None
-                    and api_call_count < max_api_calls_per_cycle
-                ):
-                    try:
-                        result = api.get_order(instId=instId, ordId=ordId)
-                        api_call_count += 1
-                        if api_call_count < max_api_calls_per_cycle:
-                            time.sleep(api_call_delay)
-
-                        if result and result.get("data") and len(result["data"]) > 0:
-                            order_data = result["data"][0]
-                            fill_time_ms = order_data.get("fillTime", "")
-                            if fill_time_ms and fill_time_ms != "":
-                                try:
-                                    fill_time = datetime.fromtimestamp(
-                                        int(fill_time_ms) / 1000
-                                    )
-                                    logger.info(
-                                        f"✅ RECOVER: Using OKX fillTime for {instId}, ordId={ordId}: "
-                                        f"{fill_time.strftime('%Y-%m-%d %H:%M:%S')}"
-                                    )
-                                except (ValueError, TypeError) as e:
-                                    logger.warning(
-                                        f"⚠️ RECOVER: Invalid fillTime from OKX: {fill_time_ms}, "
-                                        f"falling back to create_time: {e}"
-                                    )
-                    except Exception as e:
-                        logger.warning(
-                            f"⚠️ RECOVER: Failed to get order from OKX for {instId}, "
-                            f"ordId={ordId}: {e}, falling back to create_time"
-                        )
-                elif api_call_count >= max_api_calls_per_cycle:
-                    logger.debug(
-                        f"⏸️ RECOVER: API rate limit reached ({max_api_calls_per_cycle} calls), "
-                        f"using create_time for remaining orders"
-                    )
-
-                # Fallback to create_time if fillTime not available
-                if fill_time is None:
-                    fill_time = datetime.fromtimestamp(create_time_ms / 1000)
-                    logger.info(
-                        f"📝 RECOVER: Using create_time as fallback for {instId}, ordId={ordId} "
-                        f"(API unavailable or rate limited)"
-                    )
-
-                # Calculate next_hour_close_time from fill_time
-                # ✅ FIX: Always sell at next hour's 55 minutes
-                # Calculate next hour's 55 minutes
-                next_hour = fill_time.replace(minute=55, second=0, microsecond=0)
-                # Always add 1 hour to ensure we sell at next hour's close
-                next_hour = next_hour + timedelta(hours=1)
-
-                # Only recover if past sell time
-                if now >= next_hour:
-                    logger.warning(
-                        f"🔄 RECOVER: Found filled order not in memory: {instId}, "
-                        f"ordId={ordId}, state={db_state}, fill_time={fill_time.strftime('%Y-%m-%d %H:%M:%S')}, "
-                        f"recovering to active_orders"
-                    )
-
-                    # Restore to active_orders
-                    with self.lock:
-                        self.active_orders[instId] = {
-                            "ordId": ordId,
-                            "next_hour_close_time": next_hour,
-                            "sell_triggered": False,
-                            "fill_time": fill_time,
-                            "last_sell_attempt_time": None,
-                        }
-
-                    # Trigger sell immediately
-                    logger.warning(
-                        f"⏰ RECOVER SELL: {instId} (original), "
-                        f"triggering sell for recovered order"
-                    )
-                    import threading
-
-                    threading.Thread(
-                        target=self.process_sell_signal, args=(instId,), daemon=True
-                    ).start()
-
-            # Recover stable strategy orders
-            cur.execute(
-                """
-                SELECT instId, ordId, create_time, state, size
-                FROM orders
-                WHERE flag = %s
-                  AND state IN ('filled', 'partially_filled')
-                  AND (sell_price IS NULL OR sell_price = '')
-                  AND create_time > %s
-                ORDER BY create_time DESC
-                LIMIT %s
-                """,
-                (self.stable_strategy_name, cutoff_time, recovery_limit),
-            )
-            rows = cur.fetchall()
-
-            # Reset API call count for stable strategy recovery
-            # (reuse the same rate limiting from original strategy recovery)
-            stable_api_call_count = api_call_count
-
-            for row in rows:
-                instId = row[0]
-                ordId = row[1]
-                create_time_ms = row[2]
-                db_state = row[3]
-                db_size = row[4]
-
-                with self.lock:
-                    if instId in self.stable_active_orders:
-                        continue
-
-                # Get fillTime from OKX API (same logic as original strategy)
-                fill_time = None
-                next_hour = None
-
-                if (
-                    not self.simulation_mode
-                    and api is not None
-                    and stable_api_call_count < max_api_calls_per_cycle
-                ):
-                    try:
-                        result = api.get_order(instId=instId, ordId=ordId)
-                        stable_api_call_count += 1
-                        if stable_api_call_count < max_api_calls_per_cycle:
-                            time.sleep(api_call_delay)
-
-                        if result and result.get("data") and len(result["data"]) > 0:
-                            order_data = result["data"][0]
-                            fill_time_ms = order_data.get("fillTime", "")
-                            if fill_time_ms and fill_time_ms != "":
-                                try:
-                                    fill_time = datetime.fromtimestamp(
-                                        int(fill_time_ms) / 1000
-                                    )
-                                    logger.info(
-                                        f"✅ RECOVER: Using OKX fillTime for stable {instId}, ordId={ordId}: "
-                                        f"{fill_time.strftime('%Y-%m-%d %H:%M:%S')}"
-                                    )
-                                except (ValueError, TypeError) as e:
-                                    logger.warning(
-                                        f"⚠️ RECOVER: Invalid fillTime from OKX for stable {instId}: {fill_time_ms}, "
-                                        f"falling back to create_time: {e}"
-                                    )
-                    except Exception as e:
-                        logger.warning(
-                            f"⚠️ RECOVER: Failed to get order from OKX for stable {instId}, "
-                            f"ordId={ordId}: {e}, falling back to create_time"
-                        )
-                elif stable_api_call_count >= max_api_calls_per_cycle:
-                    logger.debug(
-                        f"⏸️ RECOVER: API rate limit reached ({max_api_calls_per_cycle} calls), "
-                        f"using create_time for remaining stable orders"
-                    )
-
-                # Fallback to create_time if fillTime not available
-                if fill_time is None:
-                    fill_time = datetime.fromtimestamp(create_time_ms / 1000)
-                    logger.info(
-                        f"📝 RECOVER: Using create_time as fallback for stable {instId}, ordId={ordId} "
-                        f"(API unavailable or rate limited)"
-                    )
-
-                # Calculate next_hour_close_time from fill_time
-                # ✅ FIX: Always sell at next hour's 55 minutes
-                # Calculate next hour's 55 minutes
-                next_hour = fill_time.replace(minute=55, second=0, microsecond=0)
-                # Always add 1 hour to ensure we sell at next hour's close
-                next_hour = next_hour + timedelta(hours=1)
-
-                # Only recover if past sell time
-                if now >= next_hour:
-                    logger.warning(
-                        f"🔄 RECOVER: Found stable order not in memory: {instId}, "
-                        f"ordId={ordId}, state={db_state}, fill_time={fill_time.strftime('%Y-%m-%d %H:%M:%S')}, "
-                        f"recovering to stable_active_orders"
-                    )
-
-                    with self.lock:
-                        self.stable_active_orders[instId] = {
-                            "ordId": ordId,
-                            "next_hour_close_time": next_hour,
-                            "sell_triggered": False,
-                            "fill_time": fill_time,
-                            "last_sell_attempt_time": None,
-                        }
-
-                    # Trigger sell immediately
-                    logger.warning(
-                        f"⏰ RECOVER SELL: {instId} (stable), "
-                        f"triggering sell for recovered order"
-                    )
-                    import threading
-
-                    threading.Thread(
-                        target=self.process_stable_sell_signal,
-                        args=(instId,),
-                        daemon=True,
-                    ).start()
-
-            # Recover batch strategy orders
-            cur.execute(
-                """
-                SELECT instId, ordId, create_time, state, size
-                FROM orders
-                WHERE flag = %s
-                  AND state IN ('filled', 'partially_filled')
-                  AND (sell_price IS NULL OR sell_price = '')
-                  AND create_time > %s
-                ORDER BY create_time DESC
-                LIMIT %s
-                """,
-                (self.batch_strategy_name, cutoff_time, recovery_limit),
-            )
-            rows = cur.fetchall()
-
-            # Group batch orders by instId
-            batch_orders_by_inst = {}
-            for row in rows:
-                instId = row[0]
-                ordId = row[1]
-                create_time_ms = row[2]
-                db_state = row[3]
-                db_size = row[4]
-
-                if instId not in batch_orders_by_inst:
-                    batch_orders_by_inst[instId] = []
-                batch_orders_by_inst[instId].append(
-                    {
-                        "ordId": ordId,
-                        "create_time_ms": create_time_ms,
-                        "db_state": db_state,
-                        "db_size": db_size,
-                    }
-                )
-
-            # Reset API call count for batch strategy recovery
-            batch_api_call_count = stable_api_call_count
-
-            for instId, orders in batch_orders_by_inst.items():
-                with self.lock:
-                    if instId in self.batch_active_orders:
-                        continue
-
-                # ✅ FIX: Get fillTime from all orders and use the latest one
-                # This ensures next_hour_close_time is correct even if later batches fill much later
-                latest_fill_time = None
-                latest_create_time_ms = None
-                ordIds = []
-                total_size = 0.0
-
-                # Collect all order info first
-                for order_info in orders:
-                    ordId = order_info["ordId"]
-                    create_time_ms = order_info["create_time_ms"]
-                    db_size = order_info["db_size"]
-                    ordIds.append(ordId)
-                    total_size += float(db_size) if db_size else 0.0
-
-                    # Track latest create_time as fallback
-                    if (
-                        latest_create_time_ms is None
-                        or create_time_ms > latest_create_time_ms
-                    ):
-                        latest_create_time_ms = create_time_ms
-
-                # ✅ FIX: Try to get fillTime from OKX API for all orders to find the latest
-                # This ensures we use the actual latest fill time, not just the first order's
-                if (
-                    not self.simulation_mode
-                    and api is not None
-                    and batch_api_call_count < max_api_calls_per_cycle
-                    and orders
-                ):
-                    # Check all orders to find the latest fillTime
-                    for order_info in orders:
-                        if batch_api_call_count >= max_api_calls_per_cycle:
-                            break
-                        ordId = order_info["ordId"]
-                        try:
-                            result = api.get_order(instId=instId, ordId=ordId)
-                            batch_api_call_count += 1
-                            if batch_api_call_count < max_api_calls_per_cycle:
-                                time.sleep(api_call_delay)
-
-                            if (
-                                result
-                                and result.get("data")
-                                and len(result["data"]) > 0
-                            ):
-                                order_data = result["data"][0]
-                                fill_time_ms = order_data.get("fillTime", "")
-                                if fill_time_ms and fill_time_ms != "":
-                                    try:
-                                        fill_time = datetime.fromtimestamp(
-                                            int(fill_time_ms) / 1000
-                                        )
-                                        # Track the latest fill_time across all orders
-                                        if (
-                                            latest_fill_time is None
-                                            or fill_time > latest_fill_time
-                                        ):
-                                            latest_fill_time = fill_time
-                                    except (ValueError, TypeError) as e:
-                                        logger.warning(
-                                            f"⚠️ RECOVER: Invalid fillTime from OKX for batch {instId}, ordId={ordId}: {fill_time_ms}, "
-                                            f"skipping: {e}"
-                                        )
-                        except Exception as e:
-                            logger.warning(
-                                f"⚠️ RECOVER: Failed to get order from OKX for batch {instId}, "
-                                f"ordId={ordId}: {e}, skipping"
-                            )
-
-                    if latest_fill_time:
-                        logger.info(
-                            f"✅ RECOVER: Using latest OKX fillTime for batch {instId}: "
-                            f"{latest_fill_time.strftime('%Y-%m-%d %H:%M:%S')} "
-                            f"(checked {min(len(orders), batch_api_call_count)} orders)"
-                        )
-
-                # Fallback to latest create_time if fillTime not available
-                if latest_fill_time is None:
-                    latest_fill_time = datetime.fromtimestamp(
-                        latest_create_time_ms / 1000
-                    )
-                    logger.info(
-                        f"📝 RECOVER: Using create_time as fallback for batch {instId} "
-                        f"(API unavailable or rate limited)"
-                    )
-
-                # Calculate next_hour_close_time from latest fill_time
-                next_hour = latest_fill_time.replace(minute=55, second=0, microsecond=0)
-                next_hour = next_hour + timedelta(hours=1)
-
-                # Only recover if past sell time
-                if now >= next_hour:
-                    logger.warning(
-                        f"🔄 RECOVER: Found batch orders not in memory: {instId}, "
-                        f"ordIds={ordIds}, fill_time={latest_fill_time.strftime('%Y-%m-%d %H:%M:%S')}, "
-                        f"recovering to batch_active_orders"
-                    )
-
-                    # Restore to batch_active_orders
-                    with self.lock:
-                        self.batch_active_orders[instId] = {
-                            "ordIds": ordIds,
-                            "next_hour_close_time": next_hour,
-                            "sell_triggered": False,
-                            "fill_time": latest_fill_time,
-                            "last_sell_attempt_time": None,
-                            "total_size": total_size,
-                        }
-
-                    # Trigger sell immediately
-                    logger.warning(
-                        f"⏰ RECOVER SELL: {instId} (batch), "
-                        f"triggering sell for recovered orders"
-                    )
-                    import threading
-
-                    threading.Thread(
-                        target=self.process_batch_sell_signal,
-                        args=(instId,),
-                        daemon=True,
-                    ).start()
-
-            cur.close()
-            conn.close()
         except Exception as e:
             logger.error(f"Error in recover_orders_from_database: {e}")
 
+    @at_priority(PRIORITY_RECOVERY)
     def deep_recover_orders_from_database(self, now: datetime):
         """Deep recovery: checks older orders (7 days) with higher limit (500)
 
@@ -734,9 +360,6 @@ class OrderSyncManager:
             now: Current datetime for time comparison
         """
         try:
-            conn = self.get_db_connection()
-            cur = conn.cursor()
-
             # Deep recovery: configurable window and limit
             deep_recovery_days = int(os.getenv("DEEP_RECOVERY_DAYS", "7"))
             deep_recovery_limit = int(os.getenv("DEEP_RECOVERY_LIMIT", "500"))
@@ -748,399 +371,283 @@ class OrderSyncManager:
                 f"🔍 DEEP RECOVER: Scanning last {deep_recovery_days} days (limit {deep_recovery_limit}) for stuck orders"
             )
 
-            # Recover original strategy orders
-            cur.execute(
-                """
-                SELECT instId, ordId, create_time, state, size
-                FROM orders
-                WHERE flag = %s
-                  AND state IN ('filled', 'partially_filled')
-                  AND (sell_price IS NULL OR sell_price = '')
-                  AND create_time > %s
-                ORDER BY create_time DESC
-                LIMIT %s
-                """,
-                (self.strategy_name, cutoff_time, deep_recovery_limit),
+            recovered_count = self._recover_pass(
+                now, cutoff_time, deep_recovery_limit, tag="DEEP RECOVER", verbose=False
             )
-            rows = cur.fetchall()
 
-            if len(rows) >= deep_recovery_limit:
+            if recovered_count > 0:
                 logger.warning(
-                    f"⚠️ DEEP RECOVER: Hit {deep_recovery_limit} limit for original strategy, "
-                    f"there may be more stuck orders"
+                    f"✅ DEEP RECOVER: Recovered {recovered_count} stuck order(s)"
                 )
+            else:
+                logger.info("✅ DEEP RECOVER: No stuck orders found")
 
-            # Rate limiting for OKX API calls (environment-configurable)
-            api = self.get_trade_api()
-            api_call_count = 0
-            max_api_calls_per_cycle = int(
-                os.getenv("DEEP_RECOVERY_MAX_API_CALLS", "50")
-            )  # Higher limit for deep recovery
-            api_call_delay = float(os.getenv("DEEP_RECOVERY_API_CALL_DELAY", "0.1"))
-
-            recovered_count = 0
-            for row in rows:
-                instId = row[0]
-                ordId = row[1]
-                create_time_ms = row[2]
-                db_state = row[3]
-                db_size = row[4]
-
-                # Check if already in active_orders
-                with self.lock:
-                    if instId in self.active_orders:
-                        continue
-
-                # Get fillTime from OKX API
-                fill_time = None
-                next_hour = None
-
-                if (
-                    not self.simulation_mode
-                    and api is not None
-                    and api_call_count < max_api_calls_per_cycle
-                ):
-                    try:
-                        result = api.get_order(instId=instId, ordId=ordId)
-                        api_call_count += 1
-                        if api_call_count < max_api_calls_per_cycle:
-                            time.sleep(api_call_delay)
-
-                        if result and result.get("data") and len(result["data"]) > 0:
-                            order_data = result["data"][0]
-                            fill_time_ms = order_data.get("fillTime", "")
-                            if fill_time_ms and fill_time_ms != "":
-                                try:
-                                    fill_time = datetime.fromtimestamp(
-                                        int(fill_time_ms) / 1000
-                                    )
-                                except (ValueError, TypeError):
-                                    pass
-                    except Exception as e:
-                        logger.debug(
-                            f"⚠️ DEEP RECOVER: Failed to get order from OKX for {instId}, "
-                            f"ordId={ordId}: {e}, falling back to create_time"
-                        )
-
-                # Fallback to create_time if fillTime not available
-                if fill_time is None:
-                    fill_time = datetime.fromtimestamp(create_time_ms / 1000)
-
-                # Calculate next_hour_close_time from fill_time
-                # ✅ FIX: Always sell at next hour's 55 minutes
-                # Calculate next hour's 55 minutes
-                next_hour = fill_time.replace(minute=55, second=0, microsecond=0)
-                # Always add 1 hour to ensure we sell at next hour's close
-                next_hour = next_hour + timedelta(hours=1)
-
-                # Only recover if past sell time
-                if now >= next_hour:
-                    logger.warning(
-                        f"🔄 DEEP RECOVER: Found stuck original order: {instId}, "
-                        f"ordId={ordId}, state={db_state}, fill_time={fill_time.strftime('%Y-%m-%d %H:%M:%S')}, "
-                        f"recovering to active_orders"
-                    )
-
-                    # ✅ FIX: Restore to active_orders (original strategy), not stable_active_orders
-                    with self.lock:
-                        self.active_orders[instId] = {
-                            "ordId": ordId,
-                            "next_hour_close_time": next_hour,
-                            "sell_triggered": False,
-                            "fill_time": fill_time,
-                            "last_sell_attempt_time": None,
-                        }
+        except Exception as e:
+            logger.error(f"Error in deep_recover_orders_from_database: {e}")
 
-                    # ✅ FIX: Trigger original strategy sell signal, not stable
-                    logger.warning(
-                        f"⏰ DEEP RECOVER SELL: {instId} (original), "
-                        f"triggering sell for recovered order"
-                    )
-                    import threading
+    def _recover_pass(
+        self, now: datetime, cutoff_time: int, limit: int, tag: str, verbose: bool
+    ) -> int:
+        """Fetch candidates of every strategy in one query and dispatch them
 
-                    threading.Thread(
-                        target=self.process_sell_signal,
-                        args=(instId,),
-                        daemon=True,
-                    ).start()
-                    recovered_count += 1
+        Args:
+            now: Current datetime for time comparison
+            cutoff_time: Oldest create_time (ms) considered
+            limit: Newest candidates fetched per strategy flag
+            tag: Log prefix ("RECOVER" / "DEEP RECOVER")
+            verbose: Log per-order fill time sources
 
-            # Recover stable strategy orders
+        Returns:
+            Number of positions recovered
+        """
+        conn = self.get_db_connection()
+        cur = conn.cursor()
+        try:
             cur.execute(
-                """
-                SELECT instId, ordId, create_time, state, size
-                FROM orders
-                WHERE flag = %s
-                  AND state IN ('filled', 'partially_filled')
-                  AND (sell_price IS NULL OR sell_price = '')
-                  AND create_time > %s
-                ORDER BY create_time DESC
-                LIMIT %s
-                """,
-                (self.stable_strategy_name, cutoff_time, deep_recovery_limit),
+                RECOVERY_QUERY.format(open_position=open_position_sql()),
+                (sorted({spec.flag for spec in self.strategies}), cutoff_time, limit),
             )
             rows = cur.fetchall()
+        finally:
+            cur.close()
+            conn.close()
 
-            if len(rows) >= deep_recovery_limit:
+        # Candidates: owned by this shard and not already in memory
+        candidates: Dict[str, list] = {}
+        with self.lock:
+            for flag, instId, *rest in rows:
+                spec_orders = self._orders_by_flag.get(flag)
+                if spec_orders is None or instId in spec_orders:
+                    continue
+                if owns_instrument(instId):
+                    candidates.setdefault(flag, []).append((instId, *rest))
+
+        fill_times, complete = self._resolve_fill_times(candidates, tag)
+        # Forget deferrals of buys no longer waiting (recovered or sold)
+        waiting = {row[1] for spec_rows in candidates.values() for row in spec_rows}
+        for ordId in list(self._deferrals):
+            if ordId not in waiting:
+                self._deferrals.pop(ordId, None)
+        recovered_count = 0
+        for spec in self.strategies:
+            spec_rows = candidates.get(spec.flag, [])
+            if not verbose and sum(1 for row in rows if row[0] == spec.flag) >= limit:
                 logger.warning(
-                    f"⚠️ DEEP RECOVER: Hit {deep_recovery_limit} limit for stable strategy, "
+                    f"⚠️ {tag}: Hit {limit} limit for {spec.label} strategy, "
                     f"there may be more stuck orders"
                 )
+            handler = self._recover_grouped if spec.grouped else self._recover_single
+            recovered_count += handler(
+                spec, spec_rows, now, fill_times, complete, tag, verbose
+            )
+        return recovered_count
 
-            api_call_count = 0
-            for row in rows:
-                instId = row[0]
-                ordId = row[1]
-                create_time_ms = row[2]
-                db_state = row[3]
-                db_size = row[4]
-
-                with self.lock:
-                    if instId in self.stable_active_orders:
-                        continue
+    def _resolve_fill_times(self, candidates: Dict[str, list], tag: str):
+        """fillTime of every candidate from paged OKX order history
 
-                # Get fillTime from OKX API (same logic as original strategy)
-                fill_time = None
-                next_hour = None
+        Returns:
+            (ordId -> fill datetime, whether the lookup covered the window)
+        """
+        rows = [row for spec_rows in candidates.values() for row in spec_rows]
+        api = self.get_trade_api()
+        if not rows or self.simulation_mode or api is None:
+            return {}, True
+
+        # ✅ OPTIMIZED: A few history pages instead of one get_order per order
+        history = FillHistory(api)
+        fill_ms = history.resolve([row[1] for row in rows], min(row[2] for row in rows))
+        logger.info(
+            f"📚 {tag}: Resolved {len(fill_ms)}/{len(rows)} fill times "
+            f"from order history in {history.calls} call(s)"
+        )
+        fill_times = {
+            ordId: datetime.fromtimestamp(ms / 1000) for ordId, ms in fill_ms.items()
+        }
+        return fill_times, history.complete
+
+    def _defer(
+        self,
+        ordIds: List[str],
+        create_time_ms: int,
+        now: datetime,
+        spec: StrategySpec,
+        instId: str,
+        tag: str,
+    ) -> bool:
+        """Whether to wait another pass for fill times the lookup missed
+
+        False once the buys were deferred RECOVERY_MAX_DEFERRALS times or are
+        older than RECOVERY_MAX_DEFER_AGE_SECONDS, so a history source that
+        keeps failing (or is deeper than HISTORY_MAX_PAGES) cannot hold a
+        position back forever.
+        """
+        deferred = max(self._deferrals.get(ordId, 0) for ordId in ordIds)
+        age = (now - datetime.fromtimestamp(create_time_ms / 1000)).total_seconds()
+        if deferred < RECOVERY_MAX_DEFERRALS and age < RECOVERY_MAX_DEFER_AGE_SECONDS:
+            for ordId in ordIds:
+                self._deferrals[ordId] = deferred + 1
+            logger.debug(
+                f"⏸️ {tag}: No fillTime yet for {spec.label} {instId}, "
+                f"ordIds={ordIds}, deferring ({deferred + 1}/{RECOVERY_MAX_DEFERRALS})"
+            )
+            return True
+        for ordId in ordIds:
+            self._deferrals.pop(ordId, None)
+        logger.warning(
+            f"⚠️ {tag}: No fillTime for {spec.label} {instId}, ordIds={ordIds} "
+            f"after {deferred} deferred pass(es), age {age / 3600:.1f}h: "
+            f"recovering from create_time"
+        )
+        return False
+
+    def _restore(
+        self,
+        spec: StrategySpec,
+        instId: str,
+        order_info: Dict,
+        tag: str,
+    ):
+        """Put a recovered position back in memory and trigger its sell"""
+        with self.lock:
+            spec.orders[instId] = order_info
+        logger.warning(
+            f"⏰ {tag} SELL: {instId} ({spec.label}), "
+            f"triggering sell for recovered order"
+        )
+        spawn(spec.sell, instId)
+
+    def _recover_single(
+        self,
+        spec: StrategySpec,
+        rows: list,
+        now: datetime,
+        fill_times: Dict[str, datetime],
+        complete: bool,
+        tag: str,
+        verbose: bool,
+    ) -> int:
+        """One position per buy (original, stable, gap)"""
+        recovered_count = 0
+        for instId, ordId, create_time_ms, db_state, _ in rows:
+            with self.lock:
+                if instId in spec.orders:
+                    continue
 
-                if (
-                    not self.simulation_mode
-                    and api is not None
-                    and api_call_count < max_api_calls_per_cycle
+            fill_time = fill_times.get(ordId)
+            if fill_time is None:
+                # Not reached by the lookup: retry next pass rather than
+                # guess an early sell time (bounded, see _defer)
+                if not complete and self._defer(
+                    [ordId], create_time_ms, now, spec, instId, tag
                 ):
-                    try:
-                        result = api.get_order(instId=instId, ordId=ordId)
-                        api_call_count += 1
-                        if api_call_count < max_api_calls_per_cycle:
-                            time.sleep(api_call_delay)
-
-                        if result and result.get("data") and len(result["data"]) > 0:
-                            order_data = result["data"][0]
-                            fill_time_ms = order_data.get("fillTime", "")
-                            if fill_time_ms and fill_time_ms != "":
-                                try:
-                                    fill_time = datetime.fromtimestamp(
-                                        int(fill_time_ms) / 1000
-                                    )
-                                    logger.info(
-                                        f"✅ DEEP RECOVER: Using OKX fillTime for stable {instId}, ordId={ordId}: "
-                                        f"{fill_time.strftime('%Y-%m-%d %H:%M:%S')}"
-                                    )
-                                except (ValueError, TypeError) as e:
-                                    logger.warning(
-                                        f"⚠️ DEEP RECOVER: Invalid fillTime from OKX for stable {instId}: {fill_time_ms}, "
-                                        f"falling back to create_time: {e}"
-                                    )
-                    except Exception as e:
-                        logger.debug(
-                            f"⚠️ DEEP RECOVER: Failed to get order from OKX for stable {instId}, "
-                            f"ordId={ordId}: {e}, falling back to create_time"
-                        )
-
-                # Fallback to create_time if fillTime not available
-                if fill_time is None:
-                    fill_time = datetime.fromtimestamp(create_time_ms / 1000)
-
-                # Calculate next_hour_close_time from fill_time
-                # ✅ FIX: Always sell at next hour's 55 minutes
-                # Calculate next hour's 55 minutes
-                next_hour = fill_time.replace(minute=55, second=0, microsecond=0)
-                # Always add 1 hour to ensure we sell at next hour's close
-                next_hour = next_hour + timedelta(hours=1)
-
-                # Only recover if past sell time
-                if now >= next_hour:
-                    logger.warning(
-                        f"🔄 DEEP RECOVER: Found stuck stable order: {instId}, "
-                        f"ordId={ordId}, state={db_state}, fill_time={fill_time.strftime('%Y-%m-%d %H:%M:%S')}, "
-                        f"recovering to stable_active_orders"
+                    continue
+                # No fill in OKX history (simulation mode / outside retention)
+                fill_time = datetime.fromtimestamp(create_time_ms / 1000)
+                if verbose and complete:
+                    logger.info(
+                        f"📝 {tag}: Using create_time as fallback for {spec.label} "
+                        f"{instId}, ordId={ordId} (not in OKX history)"
                     )
 
-                    with self.lock:
-                        self.stable_active_orders[instId] = {
-                            "ordId": ordId,
-                            "next_hour_close_time": next_hour,
-                            "sell_triggered": False,
-                            "fill_time": fill_time,
-                            "last_sell_attempt_time": None,
-                        }
+            next_hour = next_sell_time(fill_time)
+            # Only recover if past sell time
+            if now < next_hour:
+                continue
+            logger.warning(
+                f"🔄 {tag}: Found {spec.label} order not in memory: {instId}, "
+                f"ordId={ordId}, state={db_state}, fill_time={fill_time.strftime('%Y-%m-%d %H:%M:%S')}, "
+                f"recovering to {spec.dict_name}"
+            )
+            self._restore(
+                spec,
+                instId,
+                {
+                    "ordId": ordId,
+                    "next_hour_close_time": next_hour,
+                    "sell_triggered": False,
+                    "fill_time": fill_time,
+                    "last_sell_attempt_time": None,
+                },
+                tag,
+            )
+            recovered_count += 1
+        return recovered_count
 
-                    import threading
+    def _recover_grouped(
+        self,
+        spec: StrategySpec,
+        rows: list,
+        now: datetime,
+        fill_times: Dict[str, datetime],
+        complete: bool,
+        tag: str,
+        verbose: bool,
+    ) -> int:
+        """One position per instrument holding all its buys (batch)"""
+        orders_by_inst: Dict[str, list] = {}
+        for instId, ordId, create_time_ms, _, db_size in rows:
+            orders_by_inst.setdefault(instId, []).append(
+                (ordId, create_time_ms, db_size)
+            )
 
-                    threading.Thread(
-                        target=self.process_stable_sell_signal,
-                        args=(instId,),
-                        daemon=True,
-                    ).start()
-                    recovered_count += 1
+        recovered_count = 0
+        for instId, orders in orders_by_inst.items():
+            with self.lock:
+                if instId in spec.orders:
+                    continue
 
-            # Recover batch strategy orders
-            cur.execute(
-                """
-                SELECT instId, ordId, create_time, state, size
-                FROM orders
-                WHERE flag = %s
-                  AND state IN ('filled', 'partially_filled')
-                  AND (sell_price IS NULL OR sell_price = '')
-                  AND create_time > %s
-                ORDER BY create_time DESC
-                LIMIT %s
-                """,
-                (self.batch_strategy_name, cutoff_time, deep_recovery_limit),
+            ordIds = [ordId for ordId, _, _ in orders]
+            total_size = sum(
+                float(db_size) if db_size else 0.0 for *_, db_size in orders
             )
-            rows = cur.fetchall()
-
-            if len(rows) >= deep_recovery_limit:
-                logger.warning(
-                    f"⚠️ DEEP RECOVER: Hit {deep_recovery_limit} limit for batch strategy, "
-                    f"there may be more stuck orders"
+            missing = [ordId for ordId in ordIds if ordId not in fill_times]
+            if (
+                missing
+                and not complete
+                and self._defer(
+                    missing,
+                    min(create_time_ms for _, create_time_ms, _ in orders),
+                    now,
+                    spec,
+                    instId,
+                    tag,
                 )
-
-            # Group batch orders by instId
-            batch_orders_by_inst = {}
-            for row in rows:
-                instId = row[0]
-                ordId = row[1]
-                create_time_ms = row[2]
-                db_state = row[3]
-                db_size = row[4]
-
-                if instId not in batch_orders_by_inst:
-                    batch_orders_by_inst[instId] = []
-                batch_orders_by_inst[instId].append(
-                    {
-                        "ordId": ordId,
-                        "create_time_ms": create_time_ms,
-                        "db_state": db_state,
-                        "db_size": db_size,
-                    }
+            ):
+                continue
+            if missing and verbose and complete:
+                logger.info(
+                    f"📝 {tag}: Using create_time as fallback for {spec.label} "
+                    f"{instId}, ordIds={missing} (not in OKX history)"
                 )
 
-            api_call_count = 0
-            for instId, orders in batch_orders_by_inst.items():
-                with self.lock:
-                    if instId in self.batch_active_orders:
-                        continue
-
-                # ✅ FIX: Get fillTime from all orders and use the latest one
-                # This ensures next_hour_close_time is correct even if later batches fill much later
-                latest_fill_time = None
-                latest_create_time_ms = None
-                ordIds = []
-                total_size = 0.0
-
-                # Collect all order info first
-                for order_info in orders:
-                    ordId = order_info["ordId"]
-                    create_time_ms = order_info["create_time_ms"]
-                    db_size = order_info["db_size"]
-                    ordIds.append(ordId)
-                    total_size += float(db_size) if db_size else 0.0
-
-                    # Track latest create_time as fallback
-                    if (
-                        latest_create_time_ms is None
-                        or create_time_ms > latest_create_time_ms
-                    ):
-                        latest_create_time_ms = create_time_ms
-
-                # ✅ FIX: Try to get fillTime from OKX API for all orders to find the latest
-                # This ensures we use the actual latest fill time, not just the first order's
-                if (
-                    api is not None
-                    and api_call_count < max_api_calls_per_cycle
-                    and orders
-                ):
-                    # Check all orders to find the latest fillTime
-                    for order_info in orders:
-                        if api_call_count >= max_api_calls_per_cycle:
-                            break
-                        ordId = order_info["ordId"]
-                        try:
-                            result = api.get_order(instId=instId, ordId=ordId)
-                            api_call_count += 1
-                            if api_call_count < max_api_calls_per_cycle:
-                                time.sleep(api_call_delay)
-
-                            if (
-                                result
-                                and result.get("data")
-                                and len(result["data"]) > 0
-                            ):
-                                order_data = result["data"][0]
-                                fill_time_ms = order_data.get("fillTime", "")
-                                if fill_time_ms and fill_time_ms != "":
-                                    try:
-                                        fill_time = datetime.fromtimestamp(
-                                            int(fill_time_ms) / 1000
-                                        )
-                                        # Track the latest fill_time across all orders
-                                        if (
-                                            latest_fill_time is None
-                                            or fill_time > latest_fill_time
-                                        ):
-                                            latest_fill_time = fill_time
-                                    except (ValueError, TypeError):
-                                        pass
-                        except Exception as e:
-                            logger.debug(
-                                f"⚠️ DEEP RECOVER: Failed to get order from OKX for batch {instId}, "
-                                f"ordId={ordId}: {e}, skipping"
-                            )
-
-                    if latest_fill_time:
-                        logger.info(
-                            f"✅ DEEP RECOVER: Using latest OKX fillTime for batch {instId}: "
-                            f"{latest_fill_time.strftime('%Y-%m-%d %H:%M:%S')} "
-                            f"(checked {min(len(orders), api_call_count)} orders)"
-                        )
-
-                # Fallback to latest create_time if fillTime not available
-                if latest_fill_time is None:
-                    latest_fill_time = datetime.fromtimestamp(
-                        latest_create_time_ms / 1000
-                    )
-
-                # Calculate next_hour_close_time from latest fill_time
-                next_hour = latest_fill_time.replace(minute=55, second=0, microsecond=0)
-                next_hour = next_hour + timedelta(hours=1)
-
-                # Only recover if past sell time
-                if now >= next_hour:
-                    logger.warning(
-                        f"🔄 DEEP RECOVER: Found stuck batch orders: {instId}, "
-                        f"ordIds={ordIds}, fill_time={latest_fill_time.strftime('%Y-%m-%d %H:%M:%S')}, "
-                        f"recovering to batch_active_orders"
-                    )
-
-                    with self.lock:
-                        self.batch_active_orders[instId] = {
-                            "ordIds": ordIds,
-                            "next_hour_close_time": next_hour,
-                            "sell_triggered": False,
-                            "fill_time": latest_fill_time,
-                            "last_sell_attempt_time": None,
-                            "total_size": total_size,
-                        }
-
-                    import threading
-
-                    threading.Thread(
-                        target=self.process_batch_sell_signal,
-                        args=(instId,),
-                        daemon=True,
-                    ).start()
-                    recovered_count += 1
-
-            cur.close()
-            conn.close()
-
-            if recovered_count > 0:
-                logger.warning(
-                    f"✅ DEEP RECOVER: Recovered {recovered_count} stuck order(s)"
-                )
-            else:
-                logger.info("✅ DEEP RECOVER: No stuck orders found")
+            # ✅ FIX: Use the latest fillTime of all buys, so next_hour_close_time
+            # is correct even if later batches fill much later
+            latest_fill_time = max(
+                fill_times.get(ordId) or datetime.fromtimestamp(create_time_ms / 1000)
+                for ordId, create_time_ms, _ in orders
+            )
 
-        except Exception as e:
-            logger.error(f"Error in deep_recover_orders_from_database: {e}")
+            next_hour = next_sell_time(latest_fill_time)
+            # Only recover if past sell time
+            if now < next_hour:
+                continue
+            logger.warning(
+                f"🔄 {tag}: Found {spec.label} orders not in memory: {instId}, "
+                f"ordIds={ordIds}, fill_time={latest_fill_time.strftime('%Y-%m-%d %H:%M:%S')}, "
+                f"recovering to {spec.dict_name}"
+            )
+            self._restore(
+                spec,
+                instId,
+                {
+                    "ordIds": ordIds,
+                    "next_hour_close_time": next_hour,
+                    "sell_triggered": False,
+                    "fill_time": latest_fill_time,
+                    "last_sell_attempt_time": None,
+                    "total_size": total_size,
+                },
+                tag,
+            )
+            recovered_count += 1
+        return recovered_count
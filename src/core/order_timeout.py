@@ -11,6 +11,10 @@ import time
 from datetime import datetime, timedelta
 from typing import Any, Optional
 
+from .order_state import fetch_order
+from .position_index import record_state
+from .sell_scheduler import set_sell_deadline
+
 logger = logging.getLogger(__name__)
 
 # Environment-configurable timeout
@@ -49,8 +53,13 @@ def check_and_cancel_unfilled_order_after_timeout(
     batch_pending_buys: dict,
     batch_strategy_name: str,
     lock,
+    wait_seconds: Optional[float] = None,
 ):
-    """Check order status after timeout, cancel if not filled"""
+    """Check order status after timeout, cancel if not filled
+
+    wait_seconds overrides the in-thread wait (ORDER_TIMEOUT_SECONDS); pass 0
+    when the call itself was already deferred via task_runner.schedule_later.
+    """
     if (
         simulation_mode
         or ordId.startswith("HLW-SIM-")
@@ -60,7 +69,10 @@ def check_and_cancel_unfilled_order_after_timeout(
         return
 
     try:
-        time.sleep(ORDER_TIMEOUT_SECONDS)
+        if wait_seconds is None:
+            wait_seconds = ORDER_TIMEOUT_SECONDS
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
 
         with lock:
             order_exists = False
@@ -80,7 +92,7 @@ def check_and_cancel_unfilled_order_after_timeout(
                 return
 
         try:
-            result = tradeAPI.get_order(instId=instId, ordId=ordId)
+            result = fetch_order(tradeAPI, instId, ordId)
             if result and result.get("data") and len(result["data"]) > 0:
                 order_data = result["data"][0]
                 acc_fill_sz = order_data.get("accFillSz", "0")
@@ -166,6 +178,7 @@ def check_and_cancel_unfilled_order_after_timeout(
                                 ),
                             )
                         conn.commit()
+                        record_state(strategy_name, instId, ordId, "partially_filled")
                         cur.close()
                     finally:
                         conn.close()
@@ -189,7 +202,7 @@ def check_and_cancel_unfilled_order_after_timeout(
                         ):
                             active_orders[instId]["filled_size"] = filled_size
                             active_orders[instId]["fill_price"] = price_float
-                            active_orders[instId]["next_hour_close_time"] = next_hour
+                            set_sell_deadline(active_orders, instId, next_hour)
                             active_orders[instId]["fill_time"] = fill_time
                             nxt = next_hour.strftime("%H:%M:%S")
                             logger.warning(
@@ -202,9 +215,7 @@ def check_and_cancel_unfilled_order_after_timeout(
                         ):
                             stable_active_orders[instId]["filled_size"] = filled_size
                             stable_active_orders[instId]["fill_price"] = price_float
-                            stable_active_orders[instId][
-                                "next_hour_close_time"
-                            ] = next_hour
+                            set_sell_deadline(stable_active_orders, instId, next_hour)
                             stable_active_orders[instId]["fill_time"] = fill_time
                             nxt = next_hour.strftime("%H:%M:%S")
                             logger.warning(
@@ -220,9 +231,7 @@ def check_and_cancel_unfilled_order_after_timeout(
                                 batch_active_orders[instId].get("filled_size", 0.0)
                                 + filled_size
                             )
-                            batch_active_orders[instId][
-                                "next_hour_close_time"
-                            ] = next_hour
+                            set_sell_deadline(batch_active_orders, instId, next_hour)
                             batch_active_orders[instId]["fill_time"] = fill_time
                             nxt = next_hour.strftime("%H:%M:%S")
                             logger.warning(
@@ -247,6 +256,7 @@ def check_and_cancel_unfilled_order_after_timeout(
                             ("canceled", instId, ordId, strategy_name),
                         )
                         conn.commit()
+                        record_state(strategy_name, instId, ordId, "canceled")
                         cur.close()
                     finally:
                         conn.close()
@@ -395,6 +405,7 @@ def check_and_cancel_unfilled_order_after_timeout(
                                 ),
                             )
                         conn.commit()
+                        record_state(strategy_name, instId, ordId, "filled")
 
                         with lock:
                             if (
@@ -403,9 +414,7 @@ def check_and_cancel_unfilled_order_after_timeout(
                             ):
                                 active_orders[instId]["filled_size"] = filled_size
                                 active_orders[instId]["fill_price"] = price_float
-                                active_orders[instId][
-                                    "next_hour_close_time"
-                                ] = next_hour
+                                set_sell_deadline(active_orders, instId, next_hour)
                                 active_orders[instId]["fill_time"] = fill_time
                                 nxt = next_hour.strftime("%H:%M:%S")
                                 logger.warning(
@@ -420,9 +429,9 @@ def check_and_cancel_unfilled_order_after_timeout(
                                     "filled_size"
                                 ] = filled_size
                                 stable_active_orders[instId]["fill_price"] = price_float
-                                stable_active_orders[instId][
-                                    "next_hour_close_time"
-                                ] = next_hour
+                                set_sell_deadline(
+                                    stable_active_orders, instId, next_hour
+                                )
                                 stable_active_orders[instId]["fill_time"] = fill_time
                                 nxt = next_hour.strftime("%H:%M:%S")
                                 logger.warning(
@@ -439,9 +448,9 @@ def check_and_cancel_unfilled_order_after_timeout(
                                     batch_active_orders[instId].get("filled_size", 0.0)
                                     + filled_size
                                 )
-                                batch_active_orders[instId][
-                                    "next_hour_close_time"
-                                ] = next_hour
+                                set_sell_deadline(
+                                    batch_active_orders, instId, next_hour
+                                )
                                 batch_active_orders[instId]["fill_time"] = fill_time
                                 nxt = next_hour.strftime("%H:%M:%S")
                                 logger.warning(
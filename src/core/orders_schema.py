@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Typed Orders Columns
+NUMERIC copies of the VARCHAR price/size/sell_price columns and an enum copy
+of state, kept in sync by a trigger, with partial indexes on the
+open-position predicate
+
+Migration (expand / backfill / switch):
+1. install_typed_columns adds the columns, trigger and indexes; every write
+   through the text columns fills the typed ones from then on
+2. backfill_typed_columns fills rows written before, then
+   mark_typed_migration records completion in schema_migrations
+3. Processes that see the record (schema registry / detect_typed_reads)
+   read the typed columns; until then, and for readers not switched yet,
+   the text columns stay authoritative and are still written as before
+
+The typed values mirror the text exactly: '' / NULL map to NULL, text that
+is not a number maps to NaN (so it still counts as a sell price), and
+unrecognised states map to 'unknown'.
+"""
+
+import logging
+import os
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# auto: typed reads once the backfill is recorded; true / false force it
+ORDERS_TYPED_READS = os.getenv("ORDERS_TYPED_READS", "auto").lower()
+TYPED_BACKFILL_BATCH_SIZE = int(os.getenv("TYPED_BACKFILL_BATCH_SIZE", "5000"))
+
+TYPED_MIGRATION_NAME = "orders_typed_columns"
+ORDER_STATES = (
+    "live",
+    "partially_filled",
+    "filled",
+    "selling",
+    "sold out",
+    "canceled",
+    "unknown",
+)
+
+# Open position: filled buy without a sell price (recover, memory sync, sell)
+LEGACY_OPEN_SQL = (
+    "state IN ('filled', 'partially_filled') "
+    "AND (sell_price IS NULL OR sell_price = '')"
+)
+TYPED_OPEN_SQL = (
+    "state_code IN ('filled', 'partially_filled') AND sell_price_num IS NULL"
+)
+# Unsold: open positions plus buys whose fill is not recorded yet
+LEGACY_UNSOLD_SQL = (
+    "(state IN ('filled', 'partially_filled', '') OR state IS NULL) "
+    "AND (sell_price IS NULL OR sell_price = '')"
+)
+TYPED_UNSOLD_SQL = (
+    "(state_code IN ('filled', 'partially_filled') OR state_code IS NULL) "
+    "AND sell_price_num IS NULL"
+)
+
+_STATE_LIST = ", ".join(f"'{state}'" for state in ORDER_STATES)
+
+TYPED_COLUMNS_DDL = (
+    f"""
+    DO $$ BEGIN
+        CREATE TYPE orders_state AS ENUM ({_STATE_LIST});
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """,
+    """
+    ALTER TABLE orders
+    ADD COLUMN IF NOT EXISTS price_num NUMERIC,
+    ADD COLUMN IF NOT EXISTS size_num NUMERIC,
+    ADD COLUMN IF NOT EXISTS sell_price_num NUMERIC,
+    ADD COLUMN IF NOT EXISTS state_code orders_state
+    """,
+    r"""
+    CREATE OR REPLACE FUNCTION orders_text_to_numeric(value TEXT)
+    RETURNS NUMERIC LANGUAGE sql IMMUTABLE AS $$
+        SELECT CASE
+            WHEN value IS NULL OR value = '' THEN NULL
+            WHEN value ~ '^\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\s*$'
+                THEN value::numeric
+            ELSE 'NaN'::numeric
+        END
+    $$
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION orders_text_to_state(value TEXT)
+    RETURNS orders_state LANGUAGE sql STABLE AS $$
+        SELECT CASE
+            WHEN value IS NULL OR value = '' THEN NULL
+            WHEN value IN ({_STATE_LIST}) THEN value::orders_state
+            ELSE 'unknown'::orders_state
+        END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION orders_sync_typed_columns()
+    RETURNS trigger AS $$
+    BEGIN
+        NEW.price_num := orders_text_to_numeric(NEW.price);
+        NEW.size_num := orders_text_to_numeric(NEW.size);
+        NEW.sell_price_num := orders_text_to_numeric(NEW.sell_price);
+        NEW.state_code := orders_text_to_state(NEW.state);
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS orders_typed_columns ON orders",
+    """
+    CREATE TRIGGER orders_typed_columns
+    BEFORE INSERT OR UPDATE OF price, size, sell_price, state ON orders
+    FOR EACH ROW EXECUTE FUNCTION orders_sync_typed_columns()
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        name VARCHAR(100) PRIMARY KEY,
+        completed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+)
+
+# Partial indexes: only unsold rows, a small fraction of the table
+TYPED_INDEXES = (
+    # Recovery / memory sync / bulk sell scans (flag, newest first)
+    (
+        "idx_orders_open_flag_time",
+        f"orders(flag, create_time DESC) INCLUDE (instId, ordId) "
+        f"WHERE {TYPED_OPEN_SQL}",
+    ),
+    # Per-instrument unsold checks and the position index
+    ("idx_orders_unsold_inst_flag", f"orders(instId, flag) WHERE {TYPED_UNSOLD_SQL}"),
+)
+
+# Rows whose typed columns do not match their text columns
+_TYPED_MISMATCH_SQL = """
+    (price_num IS DISTINCT FROM orders_text_to_numeric(price)
+     OR size_num IS DISTINCT FROM orders_text_to_numeric(size)
+     OR sell_price_num IS DISTINCT FROM orders_text_to_numeric(sell_price)
+     OR state_code IS DISTINCT FROM orders_text_to_state(state))
+"""
+
+
+def install_typed_columns(cursor, concurrently: bool = False):
+    """Add the typed columns, their trigger and partial indexes (idempotent)
+
+    concurrently builds the indexes without blocking writes (the cursor's
+    connection must then be in autocommit mode).
+    """
+    for statement in TYPED_COLUMNS_DDL:
+        cursor.execute(statement)
+    keyword = "CONCURRENTLY " if concurrently else ""
+    for name, definition in TYPED_INDEXES:
+        cursor.execute(f"CREATE INDEX {keyword}IF NOT EXISTS {name} ON {definition}")
+
+
+def backfill_typed_columns(
+    conn,
+    batch_size: int = TYPED_BACKFILL_BATCH_SIZE,
+    progress: Optional[Callable[[int, int, int], None]] = None,
+) -> int:
+    """Fill typed columns of rows written before the trigger existed
+
+    Walks the table in id ranges of batch_size, one transaction each, and
+    only rewrites rows that differ, so it can be interrupted and re-run.
+
+    Returns:
+        Number of rows updated
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT MIN(id), MAX(id) FROM orders")
+        low, high = cur.fetchone()
+        conn.commit()
+        updated = 0
+        if low is None:
+            return updated
+        for start in range(low, high + 1, batch_size):
+            cur.execute(
+                f"""
+                UPDATE orders
+                SET price_num = orders_text_to_numeric(price),
+                    size_num = orders_text_to_numeric(size),
+                    sell_price_num = orders_text_to_numeric(sell_price),
+                    state_code = orders_text_to_state(state)
+                WHERE id >= %s AND id < %s AND {_TYPED_MISMATCH_SQL}
+                """,
+                (start, start + batch_size),
+            )
+            updated += cur.rowcount
+            conn.commit()
+            if progress is not None:
+                progress(min(start + batch_size - 1, high), high, updated)
+        return updated
+    finally:
+        cur.close()
+
+
+def count_typed_mismatches(conn) -> int:
+    """Rows whose typed columns disagree with the text columns"""
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT COUNT(*) FROM orders WHERE {_TYPED_MISMATCH_SQL}")
+        return cur.fetchone()[0]
+    finally:
+        cur.close()
+
+
+def mark_typed_migration(conn):
+    """Record the completed backfill (switches auto-mode readers over)"""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            INSERT INTO schema_migrations (name) VALUES (%s)
+            ON CONFLICT (name) DO UPDATE SET completed_at = now()
+            """,
+            (TYPED_MIGRATION_NAME,),
+        )
+    finally:
+        cur.close()
+    conn.commit()
+
+
+def typed_migration_status(conn) -> dict:
+    """Which migration steps are in place"""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT
+                EXISTS (SELECT 1 FROM information_schema.columns
+                        WHERE table_name = 'orders' AND column_name = 'state_code'),
+                EXISTS (SELECT 1 FROM pg_trigger
+                        WHERE tgname = 'orders_typed_columns' AND NOT tgisinternal),
+                to_regclass('schema_migrations') IS NOT NULL
+            """
+        )
+        columns, trigger, has_migrations = cur.fetchone()
+        backfilled = False
+        if has_migrations:
+            cur.execute(
+                "SELECT 1 FROM schema_migrations WHERE name = %s",
+                (TYPED_MIGRATION_NAME,),
+            )
+            backfilled = cur.fetchone() is not None
+        return {
+            "columns": bool(columns),
+            "trigger": bool(trigger),
+            "backfilled": backfilled,
+        }
+    finally:
+        cur.close()
+
+
+_typed_reads = False
+
+
+def configure_typed_reads(backfilled: bool, mode: str = ORDERS_TYPED_READS) -> bool:
+    """Set typed reads from an already known migration state (schema registry)"""
+    global _typed_reads
+    if mode in ("true", "false"):
+        _typed_reads = mode == "true"
+    else:
+        _typed_reads = backfilled
+    if _typed_reads:
+        logger.info("✅ Orders queries read typed columns")
+    return _typed_reads
+
+
+def detect_typed_reads(conn, mode: str = ORDERS_TYPED_READS) -> bool:
+    """Decide once (at startup) whether hot queries use the typed columns"""
+    if mode in ("true", "false"):
+        return configure_typed_reads(mode == "true", mode)
+    try:
+        status = typed_migration_status(conn)
+        if not all(status.values()):
+            logger.info(f"📝 Orders typed columns not ready {status}, text reads")
+        return configure_typed_reads(all(status.values()), mode)
+    except Exception as e:
+        logger.warning(f"⚠️ Orders typed column check failed: {e}")
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        return configure_typed_reads(False, mode)
+
+
+def typed_reads_enabled() -> bool:
+    return _typed_reads
+
+
+def open_position_sql(include_pending: bool = False) -> str:
+    """WHERE fragment for unsold buys, typed or text per detect_typed_reads
+
+    Args:
+        include_pending: Also match buys whose fill is not recorded yet
+    """
+    if include_pending:
+        return TYPED_UNSOLD_SQL if _typed_reads else LEGACY_UNSOLD_SQL
+    return TYPED_OPEN_SQL if _typed_reads else LEGACY_OPEN_SQL
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Open Position Index
+In-process index of unsold orders per (flag, instId), answering the
+duplicate-buy check without a database round-trip
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .orders_schema import open_position_sql
+
+logger = logging.getLogger(__name__)
+
+POSITION_INDEX_ENABLED = os.getenv("POSITION_INDEX_ENABLED", "true").lower() == "true"
+# Reloaded by every memory sync (MEMORY_SYNC_INTERVAL_SECONDS, default 300s);
+# a flag not reloaded for this long is stale and the buy path queries the DB
+POSITION_INDEX_MAX_AGE_SECONDS = float(
+    os.getenv("POSITION_INDEX_MAX_AGE_SECONDS", "900")
+)
+# Orders older than this never block a buy (matches the duplicate check window)
+DUPLICATE_WINDOW_HOURS = 2
+
+# Same predicate as the duplicate check: bought, not canceled, not sold yet
+# ({unsold}: orders_schema.open_position_sql(include_pending=True))
+UNSOLD_ORDERS_QUERY = """
+    SELECT flag, instId, ordId, state, create_time FROM orders
+    WHERE flag = ANY(%s)
+      AND create_time > %s
+      AND {unsold}
+"""
+
+# (state, create_time_ms)
+Position = Tuple[str, int]
+
+
+def is_unsold(state, sell_price, create_time, cutoff_ms: int) -> bool:
+    """UNSOLD_ORDERS_QUERY's predicate for a single row"""
+    return (
+        state in ("filled", "partially_filled", "", None)
+        and not sell_price
+        and int(create_time) > cutoff_ms
+    )
+
+
+class OpenPositionIndex:
+    """(flag, instId) -> {ordId: (state, create_time_ms)} of unsold orders
+
+    Seeded per flag from UNSOLD_ORDERS_QUERY and kept current by the code
+    paths that insert, fill, cancel and sell orders. Updates made while a
+    reload query is in flight are journaled and replayed on top of the
+    reloaded rows, so a reload never undoes a newer in-process change.
+    """
+
+    def __init__(self, max_age_seconds: float = POSITION_INDEX_MAX_AGE_SECONDS):
+        self.max_age_seconds = max_age_seconds
+        self._positions: Dict[Tuple[str, str], Dict[str, Position]] = {}
+        self._loaded_at: Dict[str, float] = {}  # flag -> monotonic load time
+        self._journal: Optional[List[tuple]] = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self.hits = 0
+        self.db_fallbacks = 0
+
+    # Updates ----------------------------------------------------------
+
+    def _apply(self, op: str, flag: str, instId: str, ordId: str, position=None):
+        key = (flag, instId)
+        if op == "set":
+            self._positions.setdefault(key, {})[ordId] = position
+        else:
+            orders = self._positions.get(key)
+            if orders is not None:
+                orders.pop(ordId, None)
+                if not orders:
+                    del self._positions[key]
+
+    def _record(self, op: str, flag: str, instId: str, ordId: str, position=None):
+        if not ordId:
+            return
+        with self._lock:
+            self._apply(op, flag, instId, str(ordId), position)
+            if self._journal is not None:
+                self._journal.append((op, flag, instId, str(ordId), position))
+
+    def add(
+        self, flag: str, instId: str, ordId: str, state: str = "", create_time=None
+    ):
+        """A buy order was inserted"""
+        if create_time is None:
+            create_time = int(time.time() * 1000)
+        self._record("set", flag, instId, ordId, (state or "", int(create_time)))
+
+    def update_state(self, flag: str, instId: str, ordId: str, state: str):
+        """A buy order filled / partially filled (canceled removes it)"""
+        if state == "canceled":
+            self.remove(flag, instId, ordId)
+            return
+        with self._lock:
+            current = self._positions.get((flag, instId), {}).get(str(ordId))
+        create_time = current[1] if current else int(time.time() * 1000)
+        self._record("set", flag, instId, ordId, (state or "", create_time))
+
+    def remove(self, flag: str, instId: str, ordId: str):
+        """A buy order was sold or canceled"""
+        self._record("remove", flag, instId, ordId)
+
+    def _refresh(
+        self, flags: List[str], fetch: Callable[[], list], replace: bool
+    ) -> Optional[list]:
+        """Run fetch() with in-process updates journaled, then apply its rows
+
+        replace=True: rows are all unsold orders of flags (UNSOLD_ORDERS_QUERY).
+        replace=False: rows are changed orders (flag, instId, ordId, state,
+        create_time, sell_price, ...), set or removed by their current state.
+
+        Returns:
+            The fetched rows, or None if another refresh is running
+        """
+        if not flags or not self._reload_lock.acquire(blocking=False):
+            return None
+        try:
+            with self._lock:
+                self._journal = []
+            rows = fetch()
+            cutoff_ms = int(
+                (datetime.now() - timedelta(hours=DUPLICATE_WINDOW_HOURS)).timestamp()
+                * 1000
+            )
+            with self._lock:
+                if replace:
+                    for key in [key for key in self._positions if key[0] in flags]:
+                        del self._positions[key]
+                for row in rows:
+                    flag, instId, ordId, state, create_time = row[:5]
+                    if replace or is_unsold(state, row[5], create_time, cutoff_ms):
+                        position = (state or "", int(create_time))
+                        self._apply("set", flag, instId, str(ordId), position)
+                    else:
+                        self._apply("remove", flag, instId, str(ordId))
+                for entry in self._journal:
+                    self._apply(*entry)
+                now = time.monotonic()
+                for flag in flags:
+                    self._loaded_at[flag] = now
+            return rows
+        finally:
+            with self._lock:
+                self._journal = None
+            self._reload_lock.release()
+
+    def reload(self, flags: Iterable[str], conn) -> bool:
+        """Replace the entries for flags with the current unsold rows
+
+        Returns:
+            False if another reload is running or the query failed
+        """
+        flags = sorted(set(flags))
+
+        def fetch():
+            cutoff_ms = int(
+                (datetime.now() - timedelta(hours=DUPLICATE_WINDOW_HOURS)).timestamp()
+                * 1000
+            )
+            cur = conn.cursor()
+            try:
+                cur.execute(
+                    UNSOLD_ORDERS_QUERY.format(
+                        unsold=open_position_sql(include_pending=True)
+                    ),
+                    (flags, cutoff_ms),
+                )
+                return cur.fetchall()
+            finally:
+                cur.close()
+
+        try:
+            rows = self._refresh(flags, fetch, replace=True)
+        except Exception as e:
+            logger.warning(f"⚠️ Position index reload failed for {flags}: {e}")
+            try:
+                conn.rollback()  # Leave the caller's connection usable
+            except Exception:
+                pass
+            return False
+        if rows is None:
+            return False
+        logger.info(
+            f"📒 Position index reloaded: {len(rows)} unsold orders for {flags}"
+        )
+        return True
+
+    def apply_changes(
+        self, flags: Iterable[str], fetch: Callable[[], list]
+    ) -> Optional[list]:
+        """Apply orders changed since the last sync (see change_feed)
+
+        fetch() runs the change query while in-process updates are
+        journaled, so a change row never undoes a newer in-process update.
+        Counts as a reload for staleness. Exceptions from fetch propagate.
+
+        Returns:
+            The changed rows, or None if a reload was already running
+        """
+        return self._refresh(sorted(set(flags)), fetch, replace=False)
+
+    # Reads ------------------------------------------------------------
+
+    def age(self, flag: str) -> Optional[float]:
+        loaded_at = self._loaded_at.get(flag)
+        return None if loaded_at is None else time.monotonic() - loaded_at
+
+    def is_stale(self, flag: str) -> bool:
+        age = self.age(flag)
+        return age is None or age > self.max_age_seconds
+
+    def find_unsold(self, flag: str, instId: str, since_ms: int) -> Optional[tuple]:
+        """Newest unsold order created after since_ms as (ordId, state, create_time)"""
+        with self._lock:
+            orders = self._positions.get((flag, instId))
+            if not orders:
+                return None
+            recent = [
+                (ordId, state, create_time)
+                for ordId, (state, create_time) in orders.items()
+                if create_time > since_ms
+            ]
+        return max(recent, key=lambda row: row[2]) if recent else None
+
+    def format_stats(self, reset: bool = False) -> str:
+        with self._lock:
+            positions = sum(len(orders) for orders in self._positions.values())
+            ages = {
+                flag: f"{time.monotonic() - loaded_at:.0f}s"
+                for flag, loaded_at in sorted(self._loaded_at.items())
+            }
+        line = (
+            f"📒 Position index: {positions} unsold orders in "
+            f"{len(self._positions)} positions, hits={self.hits}, "
+            f"db fallbacks={self.db_fallbacks}, age={ages}"
+        )
+        if reset:
+            self.hits = 0
+            self.db_fallbacks = 0
+        return line
+
+
+_position_index = OpenPositionIndex()
+
+
+def get_position_index() -> Optional[OpenPositionIndex]:
+    """Process-wide position index (None when disabled)"""
+    return _position_index if POSITION_INDEX_ENABLED else None
+
+
+def record_insert(flag: str, instId: str, ordId: str, state: str, create_time: int):
+    if POSITION_INDEX_ENABLED:
+        _position_index.add(flag, instId, ordId, state, create_time)
+
+
+def record_state(flag: str, instId: str, ordId: str, state: str):
+    if POSITION_INDEX_ENABLED:
+        _position_index.update_state(flag, instId, ordId, state)
+
+
+def record_closed(flag: str, instId: str, ordId: str):
+    """Order sold (sell_price set) or canceled"""
+    if POSITION_INDEX_ENABLED:
+        _position_index.remove(flag, instId, ordId)
+
+
+def find_recent_unsold(
+    conn, instId: str, flag: str, use_index: bool = True
+) -> Optional[tuple]:
+    """Duplicate-buy check: newest unsold order of flag/instId in the window
+
+    Answered from the position index; queries the database only when the
+    index is disabled or has not been reloaded for this flag recently, or
+    use_index is False (other processes' buys are not in the index).
+
+    Returns:
+        (ordId, state, create_time) or None
+    """
+    since_ms = int(
+        (datetime.now() - timedelta(hours=DUPLICATE_WINDOW_HOURS)).timestamp() * 1000
+    )
+    index = get_position_index()
+    if use_index and index is not None and not index.is_stale(flag):
+        index.hits += 1
+        return index.find_unsold(flag, instId, since_ms)
+
+    if index is not None:
+        index.db_fallbacks += 1
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"""
+            SELECT ordId, state, create_time FROM orders
+            WHERE instId = %s AND flag = %s
+              AND create_time > %s
+              AND {open_position_sql(include_pending=True)}
+            ORDER BY create_time DESC
+            LIMIT 1
+            """,
+            (instId, flag, since_ms),
+        )
+        return cur.fetchone()
+    finally:
+        cur.close()
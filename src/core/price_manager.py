@@ -6,15 +6,101 @@ Handles fetching and caching of hourly open prices for limit calculations
 """
 
 import logging
+import os
 import threading
 import time
+from collections import deque
 from datetime import datetime, timezone
-from typing import Dict, Optional, Tuple
+from typing import Deque, Dict, List, Optional, Tuple
 
 from okx.MarketData import MarketAPI
 
 logger = logging.getLogger(__name__)
 
+HOUR_MS = 3600 * 1000
+# Confirmed 1H candles kept per instrument (the 2h gain filter needs 2)
+CANDLE_HISTORY_HOURS = int(os.getenv("CANDLE_HISTORY_HOURS", "6"))
+# Minimum spacing between REST fallbacks for the same instrument on a cache miss
+CANDLE_FALLBACK_MIN_INTERVAL_SECONDS = float(
+    os.getenv("CANDLE_FALLBACK_MIN_INTERVAL_SECONDS", "60")
+)
+
+
+def current_hour_start_ms(now_ts: Optional[float] = None) -> int:
+    """Start of the current UTC hour in epoch milliseconds (OKX candle ts format)"""
+    if now_ts is None:
+        now_ts = time.time()
+    return int(now_ts * 1000) // HOUR_MS * HOUR_MS
+
+
+class HourlyCandleBuffer:
+    """Per-instrument ring buffer of confirmed 1H candles
+
+    Stores (hour_start_ms, close) pairs ordered oldest -> newest. Fed from the
+    candle1H WebSocket channel, so hourly lookups never need a REST round trip.
+    """
+
+    def __init__(self, max_hours: int = CANDLE_HISTORY_HOURS):
+        self.max_hours = max(max_hours, 3)
+        self._candles: Dict[str, Deque[Tuple[int, float]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, instId: str, hour_start_ms: int, close_price: float):
+        """Record a confirmed candle close (duplicates and late arrivals are merged)"""
+        if close_price <= 0:
+            return
+        with self._lock:
+            candles = self._candles.get(instId)
+            if candles is None:
+                candles = deque(maxlen=self.max_hours)
+                self._candles[instId] = candles
+
+            if not candles or candles[-1][0] < hour_start_ms:
+                candles.append((hour_start_ms, close_price))
+                return
+            if candles[-1][0] == hour_start_ms:
+                candles[-1] = (hour_start_ms, close_price)
+                return
+
+            # Out-of-order arrival (e.g. REST backfill after WS data): re-sort
+            merged = {ts: close for ts, close in candles}
+            merged[hour_start_ms] = close_price
+            candles.clear()
+            candles.extend(sorted(merged.items())[-self.max_hours :])
+
+    def get_close(self, instId: str, hour_start_ms: int) -> Optional[float]:
+        """Get the close of the candle starting at hour_start_ms, if buffered"""
+        with self._lock:
+            candles = self._candles.get(instId)
+            if not candles:
+                return None
+            for ts, close in reversed(candles):
+                if ts == hour_start_ms:
+                    return close
+                if ts < hour_start_ms:
+                    break
+        return None
+
+    def export(self) -> Dict[str, List[Tuple[int, float]]]:
+        """Buffered candles per instrument (for state snapshots)"""
+        with self._lock:
+            return {instId: list(candles) for instId, candles in self._candles.items()}
+
+    def restore(self, candles_by_inst: Dict[str, List[Tuple[int, float]]]):
+        """Merge candles saved by export()"""
+        for instId, candles in candles_by_inst.items():
+            for hour_start_ms, close_price in candles:
+                self.record(instId, hour_start_ms, close_price)
+
+    def remove(self, instId: str):
+        """Drop buffered candles for an instrument"""
+        with self._lock:
+            self._candles.pop(instId, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._candles)
+
 
 class PriceManager:
     """Manages reference prices (hourly open prices) for limit calculations"""
@@ -31,6 +117,11 @@ class PriceManager:
         self.reference_prices: Dict[str, float] = {}
         self.reference_price_fetch_time: Dict[str, float] = {}
         self.reference_price_fetch_attempts: Dict[str, int] = {}
+        # ✅ NEW: Confirmed 1H candles for the 2h gain filter (no REST per signal)
+        self.candle_buffer = HourlyCandleBuffer()
+        self._candle_fallback_time: Dict[str, float] = {}
+        # Last REST fallback per instrument: (2h-ago hour start ms, close or None)
+        self._candle_fallback_close: Dict[str, Tuple[int, Optional[float]]] = {}
 
     def fetch_current_hour_open_price(self, instId: str) -> Optional[float]:
         """Fetch current hour's open price for a cryptocurrency
@@ -114,7 +205,6 @@ class PriceManager:
                     # Reset fetch attempts on successful initialization
                     self.reference_price_fetch_attempts[instId] = 0
                 count += 1
-            time.sleep(0.1)  # Rate limiting
         logger.warning(
             f"✅ Initialized {count}/{len(crypto_limits)} reference prices "
             f"(current hour's open)"
@@ -155,6 +245,71 @@ class PriceManager:
                 del self.reference_price_fetch_time[instId]
             if instId in self.reference_price_fetch_attempts:
                 del self.reference_price_fetch_attempts[instId]
+        self.candle_buffer.remove(instId)
+        self._candle_fallback_time.pop(instId, None)
+        self._candle_fallback_close.pop(instId, None)
+
+    def _record_candle_rows(self, instId: str, rows: List[list]) -> int:
+        """Record confirmed rows from a get_candlesticks response into the buffer
+
+        Args:
+            instId: Instrument ID
+            rows: Candle rows [ts, o, h, l, c, vol, volCcy, volCcyQuote, confirm]
+
+        Returns:
+            Number of confirmed candles recorded
+        """
+        recorded = 0
+        # REST returns newest first; record oldest first
+        for row in reversed(rows):
+            try:
+                if len(row) >= 9 and str(row[8]) != "1":
+                    continue  # Current (unconfirmed) hour
+                self.candle_buffer.record(instId, int(row[0]), float(row[4]))
+                recorded += 1
+            except (TypeError, ValueError, IndexError):
+                continue
+        return recorded
+
+    def record_confirmed_candle(self, instId: str, candle_data: list):
+        """Record a candle1H WebSocket row into the buffer if it is confirmed
+
+        Args:
+            instId: Instrument ID
+            candle_data: Candle row from the candle1H channel
+        """
+        if isinstance(candle_data, list) and len(candle_data) >= 9:
+            if str(candle_data[8]) == "1":
+                self._record_candle_rows(instId, [candle_data])
+
+    def seed_candle_history(self, crypto_limits: Dict[str, float]):
+        """Seed the 1H candle buffer once at startup (WebSocket keeps it current)
+
+        Args:
+            crypto_limits: Dict of instId -> limit_percent
+        """
+        logger.warning("🔄 Seeding 1H candle history for 2h gain filter...")
+        count = 0
+        for instId in list(crypto_limits.keys()):
+            try:
+                result = self.market_api.get_candlesticks(
+                    instId=instId,
+                    bar="1H",
+                    limit=str(self.candle_buffer.max_hours + 1),
+                )
+                if result.get("code") == "0" and result.get("data"):
+                    if self._record_candle_rows(instId, result["data"]) > 0:
+                        count += 1
+                else:
+                    logger.debug(
+                        f"⚠️ Failed to seed candles for {instId}: "
+                        f"{result.get('msg', 'Unknown error')}"
+                    )
+            except Exception as e:
+                logger.debug(f"Error seeding candles for {instId}: {e}")
+        logger.warning(
+            f"✅ Seeded 1H candle history for {count}/{len(crypto_limits)} cryptos"
+        )
 
     def fetch_2h_ago_close_price(self, instId: str) -> Optional[float]:
         """Fetch closing price from 2 hours ago
@@ -173,6 +328,7 @@ class PriceManager:
 
             if result.get("code") == "0" and result.get("data"):
                 data = result["data"]
+                self._record_candle_rows(instId, data)
                 if data and len(data) >= 2:
                     # Data is ordered from newest to oldest
                     # data[0] = current hour, data[1] = 1 hour ago, data[2] = 2 hours ago
@@ -217,6 +373,48 @@ class PriceManager:
             logger.error(f"Error fetching 2h ago close for {instId}: {e}")
         return None
 
+    def get_2h_ago_close_price(self, instId: str) -> Optional[float]:
+        """Get closing price from 2 hours ago, served from the candle buffer
+
+        Falls back to REST only on a cold miss (e.g. instrument added after
+        startup), throttled per instrument so a miss can't cause a REST storm.
+
+        Args:
+            instId: Instrument ID
+
+        Returns:
+            Closing price from 2 hours ago or None if unavailable
+        """
+        return self._lookup_2h_ago_close(instId)[0]
+
+    def _lookup_2h_ago_close(self, instId: str) -> Tuple[Optional[float], bool]:
+        """Closing price from 2 hours ago, and whether the REST fallback was
+        throttled without a known value for that hour (the price is then None)
+        """
+        target_ms = current_hour_start_ms() - 2 * HOUR_MS
+        close_price = self.candle_buffer.get_close(instId, target_ms)
+        if close_price is not None:
+            return close_price, False
+
+        now_ts = time.time()
+        with self.lock:
+            last_fallback = self._candle_fallback_time.get(instId, 0)
+            if now_ts - last_fallback < CANDLE_FALLBACK_MIN_INTERVAL_SECONDS:
+                # ✅ FIX: Serve the last REST result for this hour while throttled
+                fallback_ms, close_price = self._candle_fallback_close.get(
+                    instId, (None, None)
+                )
+                if fallback_ms == target_ms and close_price is not None:
+                    return close_price, False
+                return None, True
+            self._candle_fallback_time[instId] = now_ts
+
+        logger.debug(f"📊 {instId} 2h ago candle not buffered, fetching via REST")
+        close_price = self.fetch_2h_ago_close_price(instId)
+        with self.lock:
+            self._candle_fallback_close[instId] = (target_ms, close_price)
+        return close_price, False
+
     def check_2h_gain_filter(
         self, instId: str, current_open_price: float, gain_threshold: float = 5.0
     ) -> Tuple[bool, Optional[float]]:
@@ -232,7 +430,15 @@ class PriceManager:
             should_skip_buy: True if gain > threshold (should skip buy)
             gain_percentage: Calculated gain percentage or None if failed
         """
-        close_2h_ago = self.fetch_2h_ago_close_price(instId)
+        close_2h_ago, throttled = self._lookup_2h_ago_close(instId)
+        if throttled:
+            # ✅ FIX: The last REST fallback failed moments ago; skip the buy
+            # (fail closed) until the next fallback is allowed
+            logger.debug(
+                f"⚠️ {instId} 2h ago close unavailable (REST fallback throttled), "
+                f"skipping buy (fail closed)"
+            )
+            return True, None
         if close_2h_ago is None or close_2h_ago <= 0:
             # If we can't get the 2h ago price, allow buy (fail open)
             logger.debug(
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OKX REST Rate Limiter
+Per-endpoint token buckets shared by every thread, wrapping the TradeAPI,
+MarketAPI and PublicAPI singletons; waiting calls are served by priority
+so sells always go before recovery traffic
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITER_ENABLED = os.getenv("RATE_LIMITER_ENABLED", "true").lower() == "true"
+# Fraction of OKX's documented limit actually used (headroom for clock skew
+# and other clients on the same key/IP)
+RATE_LIMIT_SAFETY = float(os.getenv("RATE_LIMIT_SAFETY", "0.8"))
+
+# Priorities (lower is served first)
+PRIORITY_SELL = 0
+PRIORITY_BUY = 1
+PRIORITY_NORMAL = 2
+PRIORITY_RECOVERY = 3
+
+# OKX documented limits: method -> (requests, per seconds). Trade endpoints
+# are per user ID, market/public data per IP.
+OKX_RATE_LIMITS: Dict[str, Tuple[int, float]] = {
+    # TradeAPI
+    "place_order": (60, 2),
+    "place_multiple_orders": (300, 2),
+    "cancel_order": (60, 2),
+    "cancel_multiple_orders": (300, 2),
+    "amend_order": (60, 2),
+    "get_order": (60, 2),
+    "get_order_list": (60, 2),
+    "get_orders_history": (40, 2),
+    "get_orders_history_archive": (20, 2),
+    "get_fills": (60, 2),
+    "get_fills_history": (10, 2),
+    # MarketAPI
+    "get_tickers": (20, 2),
+    "get_ticker": (20, 2),
+    "get_orderbook": (40, 2),
+    "get_candlesticks": (40, 2),
+    "get_history_candlesticks": (20, 2),
+    # PublicAPI
+    "get_instruments": (20, 2),
+}
+DEFAULT_RATE_LIMIT: Tuple[int, float] = (10, 2)
+
+_priority: ContextVar[int] = ContextVar("okx_priority", default=PRIORITY_NORMAL)
+
+
+@contextmanager
+def priority(level: int):
+    """Run the enclosed OKX calls at the given priority (this thread/task)"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def at_priority(level: int):
+    """Decorator: every OKX call made by the function runs at this priority"""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with priority(level):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TokenBucket:
+    """Blocking token bucket that serves waiters in priority order"""
+
+    def __init__(self, name: str, capacity: float, refill_per_second: float):
+        self.name = name
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters: list = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        # Stats
+        self.calls = 0
+        self.throttled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.refill_per_second
+        )
+        self._updated = now
+
+    def acquire(self, level: int = PRIORITY_NORMAL) -> float:
+        """Take one token, waiting behind higher-priority callers
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        with self._cond:
+            ticket = (level, next(self._seq))
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._waiters[0] == ticket and self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    if self._waiters[0] == ticket:
+                        timeout = (1 - self._tokens) / self.refill_per_second
+                    else:
+                        timeout = None  # Woken when the head takes its token
+                    self._cond.wait(timeout)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            self.calls += 1
+            if waited > 0.001:
+                self.throttled += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+        return waited
+
+    def reset_stats(self):
+        with self._cond:
+            self.calls = self.throttled = 0
+            self.wait_total = self.wait_max = 0.0
+
+
+class RateLimiter:
+    """One TokenBucket per (group, endpoint), created on first use"""
+
+    def __init__(
+        self, safety: float = RATE_LIMIT_SAFETY, enabled: bool = RATE_LIMITER_ENABLED
+    ):
+        self.safety = safety
+        self.enabled = enabled
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, group: str, method: str) -> TokenBucket:
+        key = f"{group}.{method}"
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    requests, per_seconds = OKX_RATE_LIMITS.get(
+                        method, DEFAULT_RATE_LIMIT
+                    )
+                    allowed = max(requests * self.safety, 1.0)
+                    bucket = TokenBucket(key, allowed, allowed / per_seconds)
+                    self._buckets[key] = bucket
+        return bucket
+
+    def acquire(self, group: str, method: str, level: Optional[int] = None) -> float:
+        if not self.enabled:
+            return 0.0
+        return self.bucket(group, method).acquire(
+            _priority.get() if level is None else level
+        )
+
+    def format_stats(self, reset: bool = False) -> str:
+        """Throttle waits per endpoint (only endpoints that were called)"""
+        parts = []
+        for key, bucket in sorted(self._buckets.items()):
+            if not bucket.calls:
+                continue
+            avg_ms = (
+                bucket.wait_total / bucket.throttled * 1000 if bucket.throttled else 0
+            )
+            parts.append(
+                f"{key}: {bucket.calls} calls, {bucket.throttled} throttled "
+                f"(avg {avg_ms:.0f}ms, max {bucket.wait_max * 1000:.0f}ms)"
+            )
+            if reset:
+                bucket.reset_stats()
+        return "🚦 OKX rate limits: " + ("; ".join(parts) if parts else "no calls")
+
+
+class RateLimitedAPI:
+    """Proxy for a python-okx API client: each call waits for its bucket"""
+
+    def __init__(self, api, group: str, limiter: RateLimiter):
+        self._api = api
+        self._group = group
+        self._limiter = limiter
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._api, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        group, limiter = self._group, self._limiter
+
+        def call(*args, **kwargs):
+            limiter.acquire(group, name)
+            return attr(*args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+
+_limiter = RateLimiter()
+
+
+def get_rate_limiter() -> RateLimiter:
+    return _limiter
+
+
+def rate_limited(api, group: str):
+    """Wrap an OKX API client in the shared limiter (no-op when disabled)"""
+    if not RATE_LIMITER_ENABLED or api is None:
+        return api
+    return RateLimitedAPI(api, group, _limiter)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hour-Rollover Reference Prices
+Takes each instrument's new-hour reference price from the first candle1H
+frame (or, until one arrives, the first ticker) of the hour, with parallel
+rate-limited REST only for instruments still missing after a deadline
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional
+
+from .price_manager import HOUR_MS, current_hour_start_ms
+from .task_runner import schedule_later
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_ROLLOVER_ENABLED = (
+    os.getenv("REFERENCE_ROLLOVER_ENABLED", "true").lower() == "true"
+)
+# Seconds after the hour before REST is used for instruments with no update
+ROLLOVER_REST_DEADLINE_SECONDS = float(
+    os.getenv("ROLLOVER_REST_DEADLINE_SECONDS", "15")
+)
+# Requests are paced by the shared OKX rate limiter (get_candlesticks bucket)
+ROLLOVER_REST_CONCURRENCY = int(os.getenv("ROLLOVER_REST_CONCURRENCY", "5"))
+
+
+class ReferenceRollover:
+    """Tracks which instruments have the current hour's reference price
+
+    on_reference(instId, price) installs a price taken from a ticker or REST
+    (candle frames are applied by the candle handler itself). Readiness per
+    hour - how long until every instrument had a reference - is logged.
+    """
+
+    def __init__(
+        self,
+        on_reference: Callable[[str, float], None],
+        fetch_open_price: Callable[[str], Optional[float]],
+        instruments: Callable[[], Iterable[str]],
+    ):
+        self.on_reference = on_reference
+        self.fetch_open_price = fetch_open_price
+        self.instruments = instruments
+        self.hour_ms = current_hour_start_ms()
+        self._pending: set = set()
+        self._sources: Dict[str, int] = {}
+        self._started_at = 0.0  # monotonic, at the hour boundary
+        self._ready_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+        self._rest_pool = ThreadPoolExecutor(
+            max_workers=ROLLOVER_REST_CONCURRENCY, thread_name_prefix="RolloverREST"
+        )
+        self.last_report = ""
+
+    def start(self):
+        """Arm the timer for the next hour boundary"""
+        self._schedule_next_hour()
+
+    def _schedule_next_hour(self):
+        delay = (self.hour_ms + HOUR_MS) / 1000 - time.time()
+        schedule_later(max(delay, 0.0), self._on_hour)
+
+    def _on_hour(self):
+        # Timers may fire a little early: round to the hour being entered
+        self.begin_hour(current_hour_start_ms(time.time() + 1))
+        self._schedule_next_hour()
+        schedule_later(
+            ROLLOVER_REST_DEADLINE_SECONDS, self._rest_fallback, self.hour_ms
+        )
+
+    def begin_hour(self, hour_ms: int):
+        with self._lock:
+            if self._pending:
+                self._report_locked(complete=False)
+            self.hour_ms = hour_ms
+            self._pending = set(self.instruments())
+            self._sources = {}
+            self._started_at = time.monotonic()
+            self._ready_seconds = None
+        logger.warning(
+            f"🕐 Hour {self._hour_label()}: waiting for {len(self._pending)} "
+            f"reference prices from WebSocket"
+        )
+
+    def is_pending(self, instId: str) -> bool:
+        """Lock-free hot-path check: no reference for this hour yet"""
+        return instId in self._pending
+
+    def _mark_ready(self, instId: str, source: str) -> bool:
+        with self._lock:
+            if instId not in self._pending:
+                return False
+            self._pending.discard(instId)
+            self._sources[source] = self._sources.get(source, 0) + 1
+            if not self._pending:
+                self._ready_seconds = time.monotonic() - self._started_at
+                self._report_locked(complete=True)
+            return True
+
+    def observe_candle(self, instId: str, candle_ts_ms: int):
+        """Candle handler applied a frame's open price as the reference"""
+        if instId in self._pending and candle_ts_ms >= self.hour_ms:
+            self._mark_ready(instId, "candle")
+
+    def observe_tick(self, instId: str, last_price: float):
+        """First ticker of the hour: provisional reference until a candle frame"""
+        if instId not in self._pending or time.time() * 1000 < self.hour_ms:
+            return
+        if last_price > 0 and self._mark_ready(instId, "ticker"):
+            self.on_reference(instId, last_price)
+
+    def _rest_fallback(self, hour_ms: int):
+        with self._lock:
+            if hour_ms != self.hour_ms or not self._pending:
+                return
+            missing = sorted(self._pending)
+        logger.warning(
+            f"⚠️ {len(missing)} reference prices missing "
+            f"{ROLLOVER_REST_DEADLINE_SECONDS:.0f}s into hour {self._hour_label()}, "
+            f"fetching over REST"
+        )
+        for instId in missing:
+            self._rest_pool.submit(self._fetch_one, instId, hour_ms)
+
+    def _fetch_one(self, instId: str, hour_ms: int):
+        if hour_ms != self.hour_ms or instId not in self._pending:
+            return
+        try:
+            price = self.fetch_open_price(instId)
+        except Exception as e:
+            logger.warning(f"⚠️ REST reference fetch failed for {instId}: {e}")
+            return
+        if price and price > 0 and hour_ms == self.hour_ms:
+            if self._mark_ready(instId, "rest"):
+                self.on_reference(instId, price)
+
+    def discard(self, instId: str):
+        """Instrument removed from the system"""
+        with self._lock:
+            self._pending.discard(instId)
+
+    def _hour_label(self) -> str:
+        return datetime.fromtimestamp(self.hour_ms / 1000).strftime("%H:00")
+
+    def _report_locked(self, complete: bool):
+        sources = ", ".join(f"{k}={v}" for k, v in sorted(self._sources.items()))
+        ready = sum(self._sources.values())
+        total = ready + len(self._pending)
+        elapsed = time.monotonic() - self._started_at
+        if complete:
+            self.last_report = (
+                f"⏱️ Hour {self._hour_label()}: all {total} references ready "
+                f"in {elapsed:.2f}s ({sources})"
+            )
+        else:
+            self.last_report = (
+                f"⏱️ Hour {self._hour_label()}: only {ready}/{total} references "
+                f"ready after {elapsed:.0f}s ({sources}), "
+                f"missing {sorted(self._pending)[:10]}"
+            )
+        logger.warning(self.last_report)
+
+    def format_stats(self) -> str:
+        with self._lock:
+            pending = len(self._pending)
+        if pending:
+            return (
+                f"⏱️ Hour {self._hour_label()}: {pending} references still pending "
+                f"after {time.monotonic() - self._started_at:.0f}s"
+            )
+        return self.last_report or "⏱️ Reference rollover: waiting for first hour"
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Deadline Scheduler
+One timer thread owning all deferred work (order timeouts, batch delays);
+due callbacks are dispatched to worker threads, nothing sleeps on a deadline
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledTask:
+    """Handle returned by DeadlineScheduler.call_later (supports cancel)"""
+
+    __slots__ = ("deadline", "fn", "args", "cancelled")
+
+    def __init__(self, deadline: float, fn: Callable, args: tuple):
+        self.deadline = deadline
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class DeadlineScheduler:
+    """Min-heap of deadlines served by a single timer thread
+
+    The timer thread only waits on a condition until the earliest deadline
+    and hands due tasks to `dispatch` (e.g. thread_pool.submit), so deferred
+    work never occupies a worker while it waits.
+    """
+
+    def __init__(self, dispatch: Callable[..., object], name: str = "Scheduler"):
+        self.dispatch = dispatch
+        self.name = name
+        self._heap: List[Tuple[float, int, ScheduledTask]] = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.fired = 0
+        self.cancelled = 0
+        self.errors = 0
+        self.max_lateness = 0.0
+
+    def start(self):
+        """Start the timer thread (idempotent, also done on first call_later)"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, daemon=True, name=self.name
+            )
+            self._thread.start()
+
+    def call_later(self, delay_seconds: float, fn: Callable, *args) -> ScheduledTask:
+        """Run fn(*args) via dispatch after delay_seconds (thread-safe)"""
+        return self.call_at(time.monotonic() + max(delay_seconds, 0), fn, *args)
+
+    def call_at(self, deadline: float, fn: Callable, *args) -> ScheduledTask:
+        """Run fn(*args) via dispatch at a time.monotonic() deadline"""
+        task = ScheduledTask(deadline, fn, args)
+        self.start()
+        with self._cond:
+            heapq.heappush(self._heap, (deadline, next(self._counter), task))
+            # Wake the timer only if this is the new earliest deadline
+            if self._heap[0][2] is task:
+                self._cond.notify()
+        return task
+
+    def pending(self) -> int:
+        return len(self._heap)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                _, _, task = heapq.heappop(self._heap)
+                if task.cancelled:
+                    self.cancelled += 1
+                    continue
+                lateness = time.monotonic() - task.deadline
+                if lateness > self.max_lateness:
+                    self.max_lateness = lateness
+                self.fired += 1
+
+            try:
+                self.dispatch(task.fn, *task.args)
+            except Exception as e:
+                self.errors += 1
+                logger.error(
+                    f"Scheduler dispatch failed for "
+                    f"{getattr(task.fn, '__name__', task.fn)}: {e}"
+                )
+
+    def format_stats(self, reset: bool = False) -> str:
+        with self._cond:
+            line = (
+                f"⏲️ Scheduler: pending={len(self._heap)}, fired={self.fired}, "
+                f"cancelled={self.cancelled}, errors={self.errors}, "
+                f"max lateness={self.max_lateness * 1e3:.1f}ms"
+            )
+            if reset:
+                self.fired = 0
+                self.cancelled = 0
+                self.errors = 0
+                self.max_lateness = 0.0
+        return line
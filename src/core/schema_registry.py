@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Schema Registry
+Introspects the orders table once at startup (columns and types, indexes,
+triggers, recorded migrations) so modules branch on cached capabilities
+instead of querying information_schema on hot paths
+"""
+
+import logging
+import os
+from typing import Dict, List, Optional, Set
+
+from .orders_schema import TYPED_INDEXES, TYPED_MIGRATION_NAME
+
+logger = logging.getLogger(__name__)
+
+# Add columns the trading code needs but an older database lacks (else the
+# self-check fails and the process does not start)
+SCHEMA_AUTO_MIGRATE = os.getenv("SCHEMA_AUTO_MIGRATE", "true").lower() == "true"
+
+# Column -> accepted data types (Postgres folds unquoted names to lowercase)
+REQUIRED_ORDER_COLUMNS: Dict[str, tuple] = {
+    "id": ("integer", "bigint"),
+    "instid": ("character varying", "text"),
+    "flag": ("character varying", "text"),
+    "ordid": ("character varying", "text"),
+    "create_time": ("bigint",),
+    "state": ("character varying", "text"),
+    "price": ("character varying", "text"),
+    "size": ("character varying", "text"),
+    "sell_time": ("bigint",),
+    "side": ("character varying", "text"),
+    "sell_price": ("character varying", "text"),
+    # Links a buy to its market sell (duplicate-sell protection)
+    "sell_order_id": ("character varying", "text"),
+}
+# Required columns an older schema may lack: column -> DDL adding it
+AUTO_MIGRATE_COLUMNS = {
+    "sell_price": "ALTER TABLE orders ADD COLUMN IF NOT EXISTS sell_price VARCHAR(50)",
+    "sell_order_id": (
+        "ALTER TABLE orders ADD COLUMN IF NOT EXISTS sell_order_id VARCHAR(100)"
+    ),
+}
+# Indexes the hot queries are planned around (missing ones are reported)
+RECOMMENDED_INDEXES = (
+    "idx_orders_ordid",
+    "idx_orders_flag_create_time",
+    "idx_orders_flag_instid",
+)
+
+
+class SchemaError(RuntimeError):
+    """The orders table cannot support this version of the trading code"""
+
+
+class SchemaCapabilities:
+    """Snapshot of the orders table, read once by introspect()"""
+
+    def __init__(
+        self,
+        columns: Dict[str, str],
+        indexes: Dict[str, str],
+        triggers: Set[str],
+        migrations: Set[str],
+    ):
+        self.columns = columns  # name -> data_type
+        self.indexes = indexes  # name -> definition
+        self.triggers = triggers
+        self.migrations = migrations
+        self.migrated_columns: List[str] = []  # Added by auto-migration
+
+    def has_column(self, name: str) -> bool:
+        return name.lower() in self.columns
+
+    def has_index(self, name: str) -> bool:
+        return name.lower() in self.indexes
+
+    @property
+    def change_tracking(self) -> bool:
+        """orders.updated_at maintained by trigger (delta memory syncs)"""
+        return self.has_column("updated_at") and "orders_updated_at" in self.triggers
+
+    @property
+    def typed_columns(self) -> bool:
+        """Typed columns installed and backfilled (typed reads)"""
+        return (
+            self.has_column("state_code")
+            and "orders_typed_columns" in self.triggers
+            and TYPED_MIGRATION_NAME in self.migrations
+        )
+
+    def missing_columns(self) -> List[str]:
+        return [name for name in REQUIRED_ORDER_COLUMNS if name not in self.columns]
+
+    def mistyped_columns(self) -> List[str]:
+        """'name: actual (expected a / b)' for required columns of another type"""
+        problems = []
+        for name, types in REQUIRED_ORDER_COLUMNS.items():
+            actual = self.columns.get(name)
+            if actual is not None and actual not in types:
+                problems.append(f"{name}: {actual} (expected {' / '.join(types)})")
+        return problems
+
+    def format_report(self) -> str:
+        """Startup self-check, one line per capability"""
+
+        def line(ok: bool, text: str, missing_mark: str = "⚠️") -> str:
+            return f"   {'✅' if ok else missing_mark} {text}"
+
+        missing = self.missing_columns()
+        mistyped = self.mistyped_columns()
+        lines = [
+            f"🩺 Schema self-check: orders has {len(self.columns)} columns, "
+            f"{len(self.indexes)} indexes",
+            line(
+                not missing,
+                "required columns"
+                + (f" (missing: {', '.join(missing)})" if missing else ""),
+                "❌",
+            ),
+            line(
+                not mistyped,
+                "column types" + (f" ({'; '.join(mistyped)})" if mistyped else ""),
+                "❌",
+            ),
+        ]
+        if self.migrated_columns:
+            lines.append(
+                f"   🔧 added by auto-migration: {', '.join(self.migrated_columns)}"
+            )
+        lines.append(
+            line(
+                self.change_tracking,
+                (
+                    "change tracking (updated_at trigger): delta memory syncs"
+                    if self.change_tracking
+                    else "change tracking not installed: full-scan memory syncs"
+                ),
+                "➖",
+            )
+        )
+        lines.append(
+            line(
+                self.typed_columns,
+                (
+                    "typed columns backfilled: typed open-position queries"
+                    if self.typed_columns
+                    else "typed columns not migrated: text-column queries "
+                    "(run migrate_orders_schema.py)"
+                ),
+                "➖",
+            )
+        )
+        for name in RECOMMENDED_INDEXES:
+            lines.append(line(self.has_index(name), f"index {name}"))
+        if self.typed_columns:
+            for name, _ in TYPED_INDEXES:
+                lines.append(line(self.has_index(name), f"index {name}"))
+        return "\n".join(lines)
+
+
+def introspect(conn) -> SchemaCapabilities:
+    """Read columns, indexes, triggers and migrations of orders (4 queries)"""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT column_name, data_type FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'orders'
+            """
+        )
+        columns = {name.lower(): data_type for name, data_type in cur.fetchall()}
+        cur.execute(
+            """
+            SELECT indexname, indexdef FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = 'orders'
+            """
+        )
+        indexes = {name.lower(): definition for name, definition in cur.fetchall()}
+        cur.execute(
+            """
+            SELECT t.tgname FROM pg_trigger t
+            JOIN pg_class c ON c.oid = t.tgrelid
+            WHERE c.relname = 'orders' AND NOT t.tgisinternal
+            """
+        )
+        triggers = {row[0] for row in cur.fetchall()}
+        migrations: Set[str] = set()
+        cur.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+        if cur.fetchone()[0]:
+            cur.execute("SELECT name FROM schema_migrations")
+            migrations = {row[0] for row in cur.fetchall()}
+    finally:
+        cur.close()
+    conn.commit()
+    return SchemaCapabilities(columns, indexes, triggers, migrations)
+
+
+def _auto_migrate(conn, capabilities: SchemaCapabilities) -> SchemaCapabilities:
+    """Add missing auto-migratable columns, then re-introspect"""
+    added = [
+        name for name in capabilities.missing_columns() if name in AUTO_MIGRATE_COLUMNS
+    ]
+    if not added:
+        return capabilities
+    cur = conn.cursor()
+    try:
+        for name in added:
+            cur.execute(AUTO_MIGRATE_COLUMNS[name])
+    finally:
+        cur.close()
+    conn.commit()
+    logger.warning(f"🔧 Added missing orders column(s): {', '.join(added)}")
+    capabilities = introspect(conn)
+    capabilities.migrated_columns = added
+    return capabilities
+
+
+_capabilities: Optional[SchemaCapabilities] = None
+
+
+def load_schema_capabilities(
+    conn, auto_migrate: bool = SCHEMA_AUTO_MIGRATE
+) -> SchemaCapabilities:
+    """Introspect once, migrate what is safe to, log the self-check report
+
+    Raises:
+        SchemaError: orders misses required columns or has them mistyped
+    """
+    global _capabilities
+    capabilities = introspect(conn)
+    if not capabilities.columns:
+        raise SchemaError("orders table not found (run python init_database.py)")
+    if auto_migrate:
+        capabilities = _auto_migrate(conn, capabilities)
+    _capabilities = capabilities
+    report = capabilities.format_report()
+    missing = capabilities.missing_columns()
+    mistyped = capabilities.mistyped_columns()
+    if missing or mistyped:
+        logger.error(report)
+        raise SchemaError(
+            f"orders schema incompatible: missing={missing}, mistyped={mistyped} "
+            f"(run python init_database.py)"
+        )
+    logger.warning(report)
+    return capabilities
+
+
+def get_schema_capabilities() -> Optional[SchemaCapabilities]:
+    """Capabilities loaded at startup (None before load_schema_capabilities)"""
+    return _capabilities
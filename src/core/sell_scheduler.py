@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sell Scheduler
+Min-heap of sell deadlines (next_hour_close_time) fired at the exact time
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on a single wait, so wall-clock adjustments are picked up
+MAX_WAIT_SECONDS = 30.0
+
+# (deadline_ts, seq, strategy_type, instId, ordId)
+HeapEntry = Tuple[float, int, str, str, str]
+
+
+def _order_key(order_info: dict) -> str:
+    """ordId identifying the order (first ordId for batch orders)"""
+    ordId = order_info.get("ordId")
+    if ordId:
+        return str(ordId)
+    ordIds = order_info.get("ordIds") or []
+    return str(ordIds[0]) if ordIds else ""
+
+
+class SellScheduler:
+    """Sleeps until the earliest next_hour_close_time and fires its sell
+
+    Entries are replaced, not updated in place: the latest (deadline, ordId)
+    per (strategy, instId) is tracked separately and superseded heap entries
+    are skipped when popped (lazy deletion), so schedule/unschedule are
+    O(log n)/O(1). The fire callback must re-validate the order under its
+    own lock; entries are only a hint of when to look.
+    """
+
+    def __init__(self, fire_func: Callable[[str, str], None]):
+        self.fire_func = fire_func
+        self._heap: List[HeapEntry] = []
+        self._latest: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.fired = 0
+        self.max_lateness = 0.0
+
+    def start(self):
+        """Start the scheduler thread (idempotent)"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, daemon=True, name="SellScheduler"
+            )
+            self._thread.start()
+        logger.warning(f"✅ Sell scheduler started ({len(self._latest)} deadlines)")
+
+    def schedule(self, strategy_type: str, instId: str, order_info: dict) -> bool:
+        """(Re)schedule the sell for an order from its next_hour_close_time
+
+        Returns:
+            True if a deadline was scheduled
+        """
+        next_hour_close = order_info.get("next_hour_close_time")
+        if not isinstance(next_hour_close, datetime):
+            return False
+        deadline = next_hour_close.timestamp()
+        ordId = _order_key(order_info)
+        key = (strategy_type, instId)
+        with self._cond:
+            if self._latest.get(key) == (deadline, ordId):
+                return True
+            self._latest[key] = (deadline, ordId)
+            heapq.heappush(
+                self._heap,
+                (deadline, next(self._counter), strategy_type, instId, ordId),
+            )
+            if self._heap[0][0] == deadline:
+                self._cond.notify()
+        return True
+
+    def unschedule(self, strategy_type: str, instId: str):
+        """Forget the pending sell for an order (its heap entry is skipped)"""
+        with self._cond:
+            self._latest.pop((strategy_type, instId), None)
+
+    def next_deadline(self) -> Optional[datetime]:
+        with self._cond:
+            if not self._latest:
+                return None
+            return datetime.fromtimestamp(min(d for d, _ in self._latest.values()))
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    def _pop_due(self) -> HeapEntry:
+        """Block until a live entry is due and pop it (call with _cond held)"""
+        while True:
+            if not self._heap:
+                self._cond.wait(MAX_WAIT_SECONDS)
+                continue
+            deadline, _, strategy_type, instId, ordId = self._heap[0]
+            if self._latest.get((strategy_type, instId)) != (deadline, ordId):
+                heapq.heappop(self._heap)  # Superseded or unscheduled
+                continue
+            wait = deadline - time.time()
+            if wait > 0:
+                self._cond.wait(min(wait, MAX_WAIT_SECONDS))
+                continue
+            del self._latest[(strategy_type, instId)]
+            return heapq.heappop(self._heap)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline, _, strategy_type, instId, ordId = self._pop_due()
+                lateness = time.time() - deadline
+                self.fired += 1
+                if lateness > self.max_lateness:
+                    self.max_lateness = lateness
+            logger.debug(
+                f"⏰ Sell deadline reached: {instId} ({strategy_type}), "
+                f"ordId={ordId}, late by {lateness * 1e3:.0f}ms"
+            )
+            try:
+                self.fire_func(strategy_type, instId)
+            except Exception as e:
+                logger.error(f"Sell scheduler fire error for {instId}: {e}")
+
+    def format_stats(self, reset: bool = False) -> str:
+        with self._cond:
+            line = (
+                f"⏰ Sell scheduler: pending={len(self._latest)}, "
+                f"heap={len(self._heap)}, fired={self.fired}, "
+                f"max lateness={self.max_lateness * 1e3:.1f}ms"
+            )
+            if reset:
+                self.fired = 0
+                self.max_lateness = 0.0
+        return line
+
+
+class SellDeadlineDict(dict):
+    """active_orders dict that keeps a SellScheduler in step with its entries
+
+    Orders are created and recovered all over the codebase by assigning
+    orders[instId] = {...}; hooking assignment and deletion here keeps the
+    heap maintained without threading the scheduler through every caller.
+    In-place edits of next_hour_close_time must go through set_sell_deadline
+    (or reschedule): an earlier deadline would otherwise wait for the old
+    heap entry. A later one is also caught at fire time.
+    """
+
+    def __init__(self, strategy_type: str, scheduler: Optional[SellScheduler] = None):
+        super().__init__()
+        self.strategy_type = strategy_type
+        self.scheduler = scheduler
+
+    def __setitem__(self, instId, order_info):
+        super().__setitem__(instId, order_info)
+        if self.scheduler is not None and isinstance(order_info, dict):
+            self.scheduler.schedule(self.strategy_type, instId, order_info)
+
+    def __delitem__(self, instId):
+        super().__delitem__(instId)
+        if self.scheduler is not None:
+            self.scheduler.unschedule(self.strategy_type, instId)
+
+    def pop(self, instId, *default):
+        had = instId in self
+        value = super().pop(instId, *default)
+        if had and self.scheduler is not None:
+            self.scheduler.unschedule(self.strategy_type, instId)
+        return value
+
+    def reschedule(self, instId):
+        """Re-read the deadline of an entry edited in place"""
+        order_info = self.get(instId)
+        if self.scheduler is not None and isinstance(order_info, dict):
+            self.scheduler.schedule(self.strategy_type, instId, order_info)
+
+    def __reduce__(self):
+        # Pickle/copy as a plain dict (the scheduler is process-local)
+        return (dict, (dict(self),))
+
+
+def set_sell_deadline(orders: Dict, instId: str, next_hour_close_time: datetime):
+    """Move an order's sell deadline in place, keeping the scheduler in step"""
+    orders[instId]["next_hour_close_time"] = next_hour_close_time
+    if isinstance(orders, SellDeadlineDict):
+        orders.reschedule(instId)
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instrument Sharding
+Consistent-hash ring over live trading workers; membership is coordinated
+through a heartbeat table so each worker owns a deterministic subset of
+hour_limit instruments
+"""
+
+import bisect
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from .advisory_lock import CROSS_PROCESS_LOCKS
+
+logger = logging.getLogger(__name__)
+
+SHARD_ENABLED = os.getenv("SHARD_ENABLED", "false").lower() == "true"
+SHARD_WORKER_ID = os.getenv("SHARD_WORKER_ID", "") or (
+    f"{socket.gethostname()}-{os.getpid()}"
+)
+SHARD_HEARTBEAT_SECONDS = float(os.getenv("SHARD_HEARTBEAT_SECONDS", "5"))
+# A worker missing heartbeats for this long is dropped from the ring
+SHARD_MEMBER_TTL_SECONDS = float(os.getenv("SHARD_MEMBER_TTL_SECONDS", "20"))
+# A worker whose heartbeats fail for this long gives up its shard, one
+# heartbeat before its peers can drop it and take the instruments over
+SHARD_EXPIRE_SECONDS = max(
+    SHARD_HEARTBEAT_SECONDS, SHARD_MEMBER_TTL_SECONDS - SHARD_HEARTBEAT_SECONDS
+)
+# Virtual nodes per worker (more = more even split)
+SHARD_VNODES = int(os.getenv("SHARD_VNODES", "128"))
+
+WORKERS_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS trading_workers (
+        worker_id TEXT PRIMARY KEY,
+        started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        heartbeat_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), "big"
+    )
+
+
+class HashRing:
+    """Consistent hashing of instIds onto workers
+
+    Adding or removing one of N workers moves only ~1/N of the instruments,
+    so a membership change never reshuffles the whole universe.
+    """
+
+    def __init__(self, members: Iterable[str], vnodes: int = SHARD_VNODES):
+        self.members = sorted(set(members))
+        points: List[Tuple[int, str]] = sorted(
+            (_hash64(f"{member}#{i}"), member)
+            for member in self.members
+            for i in range(vnodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [member for _, member in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._hashes:
+            return None
+        i = bisect.bisect(self._hashes, _hash64(key)) % len(self._hashes)
+        return self._owners[i]
+
+
+class ShardCoordinator:
+    """Heartbeats this worker and recomputes its shard when membership changes
+
+    on_change(added, removed) is called with the instIds this worker gained
+    and lost; the first heartbeat reports the whole initial shard as added.
+    When heartbeats fail for SHARD_EXPIRE_SECONDS the whole shard is given
+    up through on_expired(removed) (on_change if not set): peers are about
+    to take those instruments over. The next successful heartbeat rejoins.
+    """
+
+    def __init__(
+        self,
+        get_db_connection_func: Callable,
+        universe: Iterable[str],
+        on_change: Callable[[Set[str], Set[str]], None],
+        worker_id: str = SHARD_WORKER_ID,
+        on_expired: Optional[Callable[[Set[str]], None]] = None,
+    ):
+        self.get_db_connection = get_db_connection_func
+        self.universe: Set[str] = set(universe)
+        self.on_change = on_change
+        self.on_expired = on_expired
+        self.worker_id = worker_id
+        self.ring = HashRing([])
+        self._owned: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.heartbeat_at: Optional[float] = None  # monotonic, last success
+        self.rebalances = 0
+        self.heartbeat_errors = 0
+        self.expirations = 0
+
+    def join(self) -> bool:
+        """Register this worker and compute the initial shard (blocking)
+
+        Returns:
+            False if the database could not be reached, or CROSS_PROCESS_LOCKS
+            is off (an instrument moving between workers would be sold by both)
+        """
+        if not CROSS_PROCESS_LOCKS:
+            logger.error(
+                "❌ SHARD_ENABLED requires CROSS_PROCESS_LOCKS=true: without it "
+                "an instrument moving between workers may be sold by both"
+            )
+            return False
+        conn = self.get_db_connection()
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute(WORKERS_TABLE_DDL)
+            finally:
+                cur.close()
+            conn.commit()
+        finally:
+            conn.close()
+        return self.heartbeat()
+
+    def start(self):
+        """Start the heartbeat thread (idempotent)"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="ShardHeartbeat"
+        )
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(SHARD_HEARTBEAT_SECONDS):
+            self.heartbeat()
+
+    def heartbeat(self) -> bool:
+        """Refresh our row, read live members and rebalance if they changed
+
+        Returns:
+            False if the database could not be reached
+        """
+        try:
+            conn = self.get_db_connection()
+            try:
+                cur = conn.cursor()
+                try:
+                    cur.execute(
+                        """
+                        INSERT INTO trading_workers (worker_id) VALUES (%s)
+                        ON CONFLICT (worker_id) DO UPDATE SET heartbeat_at = now()
+                        """,
+                        (self.worker_id,),
+                    )
+                    cur.execute(
+                        """
+                        SELECT worker_id FROM trading_workers
+                        WHERE heartbeat_at > now() - make_interval(secs => %s)
+                        """,
+                        (SHARD_MEMBER_TTL_SECONDS,),
+                    )
+                    members = {row[0] for row in cur.fetchall()}
+                finally:
+                    cur.close()
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            # Keep the current shard for a while (overlap is covered by
+            # CROSS_PROCESS_LOCKS), but give it up before peers take it over
+            self.heartbeat_errors += 1
+            logger.warning(f"⚠️ Shard heartbeat failed for {self.worker_id}: {e}")
+            self.expire_if_stale()
+            return False
+
+        self.heartbeat_at = time.monotonic()
+        members.add(self.worker_id)
+        if members != set(self.ring.members):
+            self._rebalance(HashRing(members))
+        return True
+
+    def expire_if_stale(self) -> bool:
+        """Give up the shard once heartbeats failed for SHARD_EXPIRE_SECONDS
+
+        Returns:
+            True if the shard was given up by this call
+        """
+        if self.heartbeat_at is None:
+            return False
+        silent = time.monotonic() - self.heartbeat_at
+        if silent < SHARD_EXPIRE_SECONDS:
+            return False
+        with self._lock:
+            removed, self._owned = self._owned, set()
+            # Any membership read later differs, so the next success rejoins
+            self.ring = HashRing([])
+        if not removed:
+            return False
+        self.expirations += 1
+        logger.error(
+            f"❌ No shard heartbeat for {silent:.0f}s: {self.worker_id} gives up "
+            f"{len(removed)} instruments before peers take them over"
+        )
+        try:
+            if self.on_expired is not None:
+                self.on_expired(removed)
+            else:
+                self.on_change(set(), removed)
+        except Exception as e:
+            logger.error(f"❌ Shard expiry handler failed: {e}")
+        return True
+
+    def discard(self, instId: str):
+        """Instrument removed from hour_limit (e.g. blacklisted)"""
+        with self._lock:
+            self.universe.discard(instId)
+            self._owned.discard(instId)
+
+    def _rebalance(self, ring: HashRing):
+        with self._lock:
+            self.ring = ring
+            owned = {
+                instId
+                for instId in self.universe
+                if ring.owner(instId) == self.worker_id
+            }
+            added = owned - self._owned
+            removed = self._owned - owned
+            self._owned = owned
+            self.rebalances += 1
+        logger.warning(
+            f"🧩 Shard membership: {len(ring.members)} workers {ring.members}, "
+            f"{self.worker_id} owns {len(owned)}/{len(self.universe)} instruments "
+            f"(+{len(added)} -{len(removed)})"
+        )
+        if added or removed:
+            try:
+                self.on_change(added, removed)
+            except Exception as e:
+                logger.error(f"❌ Shard change handler failed: {e}")
+
+    def owns(self, instId: str) -> bool:
+        return instId in self._owned
+
+    def owned(self) -> Set[str]:
+        return set(self._owned)
+
+    def leave(self):
+        """Stop heartbeating and deregister so peers take over immediately"""
+        self._stop.set()
+        try:
+            conn = self.get_db_connection()
+            try:
+                cur = conn.cursor()
+                cur.execute(
+                    "DELETE FROM trading_workers WHERE worker_id = %s",
+                    (self.worker_id,),
+                )
+                cur.close()
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Shard deregistration failed: {e}")
+
+    def format_stats(self) -> str:
+        return (
+            f"🧩 Shard {self.worker_id}: {len(self._owned)}/{len(self.universe)} "
+            f"instruments, workers={len(self.ring.members)}, "
+            f"rebalances={self.rebalances}, heartbeat errors={self.heartbeat_errors}, "
+            f"expirations={self.expirations}"
+        )
+
+
+_coordinator: Optional[ShardCoordinator] = None
+
+
+def set_coordinator(coordinator: Optional[ShardCoordinator]):
+    global _coordinator
+    _coordinator = coordinator
+
+
+def owns_instrument(instId: str) -> bool:
+    """Whether this worker is responsible for instId (always True unsharded)
+
+    Used by recovery paths so that only the owning worker restores and
+    sells a position found in the database.
+    """
+    return _coordinator is None or _coordinator.owns(instId)
@@ -14,6 +14,14 @@ import urllib.request
 from datetime import datetime, timedelta
 from typing import Any, Callable, Optional
 
+from .advisory_lock import CROSS_PROCESS_LOCKS, acquire_sell_lock, try_buy_lock
+from .batch_buy_strategy import BATCH_DELAY_SECONDS
+from .order_state import fetch_order
+from .orders_schema import open_position_sql
+from .position_index import find_recent_unsold, record_closed, record_state
+from .rate_limiter import PRIORITY_BUY, PRIORITY_SELL, at_priority
+from .task_runner import schedule_later, spawn
+
 logger = logging.getLogger(__name__)
 
 _sell_signal_locks: dict[str, threading.Lock] = {}
@@ -43,6 +51,7 @@ def _send_alert(message: str) -> None:
         logger.warning(f"Alert webhook failed: {e}")
 
 
+@at_priority(PRIORITY_BUY)
 def process_buy_signal(
     instId: str,
     limit_price: float,
@@ -108,28 +117,23 @@ def process_buy_signal(
 
         conn = get_db_connection_func()
         try:
-            # ✅ FIX: Database-level duplicate check to prevent multiple processes/instances
-            # from buying the same coin simultaneously
-            cur = conn.cursor()
-            # Check if there are any unsold orders in the last 2 hours
-            # This prevents duplicate buys during the entire trading cycle
-            # Include state='' to catch orders that are just created but not yet filled
-            two_hours_ago_ms = int(
-                (datetime.now() - timedelta(hours=2)).timestamp() * 1000
-            )
-            cur.execute(
-                """
-                SELECT ordId, state, create_time FROM orders
-                WHERE instId = %s AND flag = %s
-                  AND create_time > %s
-                  AND (state IN ('filled', 'partially_filled', '') OR state IS NULL)
-                  AND (sell_price IS NULL OR sell_price = '')
-                ORDER BY create_time DESC
-                LIMIT 1
-                """,
-                (instId, strategy_name, two_hours_ago_ms),
+            # ✅ FIX: Duplicate check to prevent buying the same coin twice
+            # Any unsold order in the last 2 hours blocks the buy for the entire
+            # trading cycle, including state='' (created but not yet filled)
+            # ✅ NEW: Cross-process guard, held until the buy insert commits
+            if not try_buy_lock(conn, strategy_name, instId):
+                logger.warning(
+                    f"🔒 DUPLICATE BUY BLOCKED: {instId} is being bought by another process"
+                )
+                with lock:
+                    if instId in pending_buys:
+                        del pending_buys[instId]
+                return
+            # ✅ OPTIMIZED: Answered from the in-process position index; the DB is
+            # only queried when the index is stale (or other processes may buy)
+            recent_unsold = find_recent_unsold(
+                conn, instId, strategy_name, use_index=not CROSS_PROCESS_LOCKS
             )
-            recent_unsold = cur.fetchone()
 
             # ✅ NEW: If no unsold orders in DB but instId is in active_orders,
             # clean up stale memory (memory leak fix)
@@ -142,8 +146,6 @@ def process_buy_signal(
                         )
                         del active_orders[instId]
 
-            cur.close()
-
             if recent_unsold:
                 logger.warning(
                     f"🚫 DUPLICATE BUY BLOCKED: {instId} already has unsold order "
@@ -185,11 +187,13 @@ def process_buy_signal(
                         on_order_created(instId, now)
 
                     if not simulation_mode:
-                        threading.Thread(
-                            target=check_and_cancel_unfilled_order_func,
-                            args=(instId, ordId, api, strategy_name),
-                            daemon=True,
-                        ).start()
+                        spawn(
+                            check_and_cancel_unfilled_order_func,
+                            instId,
+                            ordId,
+                            api,
+                            strategy_name,
+                        )
             else:
                 logger.error(
                     f"❌ Failed to create buy order for {instId}, cleaning up pending_buys"
@@ -206,6 +210,19 @@ def process_buy_signal(
                 del pending_buys[instId]
 
 
+def get_sell_signal_lock(instId: str, strategy_name: str) -> threading.Lock:
+    """Per-instId-per-strategy sell lock (shared with the bulk sell path)"""
+    # ✅ FIX: Use per-instId-per-strategy lock so different strategies can sell in parallel
+    # Same instId can have orders from original/stable/batch/gap - each strategy is independent
+    instId_lock_key = f"sell_{instId}_{strategy_name}"
+    if instId_lock_key not in _sell_signal_locks:
+        with _sell_signal_locks_guard:
+            if instId_lock_key not in _sell_signal_locks:
+                _sell_signal_locks[instId_lock_key] = threading.Lock()
+    return _sell_signal_locks[instId_lock_key]
+
+
+@at_priority(PRIORITY_SELL)
 def process_sell_signal(
     instId: str,
     strategy_name: str,
@@ -222,15 +239,7 @@ def process_sell_signal(
     Uses sell_time <= now to filter orders, which is based on fill_time, not create_time.
     This correctly handles late-filled orders from earlier hours.
     """
-    # ✅ FIX: Use per-instId-per-strategy lock so different strategies can sell in parallel
-    # Same instId can have orders from original/stable/batch/gap - each strategy is independent
-    instId_lock_key = f"sell_{instId}_{strategy_name}"
-    if instId_lock_key not in _sell_signal_locks:
-        with _sell_signal_locks_guard:
-            if instId_lock_key not in _sell_signal_locks:
-                _sell_signal_locks[instId_lock_key] = threading.Lock()
-
-    instId_lock = _sell_signal_locks[instId_lock_key]
+    instId_lock = get_sell_signal_lock(instId, strategy_name)
 
     # ✅ FIX: Use per-instId lock to prevent concurrent sells
     if not instId_lock.acquire(blocking=False):
@@ -239,6 +248,7 @@ def process_sell_signal(
         )
         return
 
+    sell_lease = None
     try:
         fail_count_key = f"{instId}:{strategy_name}"
         api = get_trade_api_func()
@@ -246,6 +256,18 @@ def process_sell_signal(
             logger.error(f"{strategy_name} TradeAPI not available for sell: {instId}")
             return
 
+        # ✅ NEW: Cross-process guard (another trading process may own this sell)
+        sell_lease = acquire_sell_lock(get_db_connection_func, strategy_name, instId)
+        if sell_lease is None:
+            logger.warning(
+                f"🔒 {strategy_name} Sell for {instId} in progress in another process, skipping"
+            )
+            with lock:
+                if instId in active_orders:
+                    # Retried by the :59 scan, which finds it sold or sells it
+                    active_orders[instId]["sell_triggered"] = False
+            return
+
         conn = get_db_connection_func()
         try:
             cur = conn.cursor()
@@ -258,11 +280,10 @@ def process_sell_signal(
                 # ✅ FIX: Filter by flag to only sell orders belonging to this strategy
                 # Same instId can have orders from different strategies (original/stable/batch)
                 cur.execute(
-                    """
+                    f"""
                     SELECT ordId, state, size, sell_time, create_time FROM orders
                     WHERE instId = %s AND flag = %s
-                      AND state IN ('filled', 'partially_filled')
-                      AND (sell_price IS NULL OR sell_price = '')
+                      AND {open_position_sql()}
                       AND sell_time IS NOT NULL
                       AND sell_time <= %s
                     ORDER BY create_time ASC
@@ -281,11 +302,10 @@ def process_sell_signal(
                     try:
                         cur_unsold = conn.cursor()
                         cur_unsold.execute(
-                            """
+                            f"""
                             SELECT COUNT(*) FROM orders
                             WHERE instId = %s AND flag = %s
-                              AND (state IN ('filled', 'partially_filled', '') OR state IS NULL)
-                              AND (sell_price IS NULL OR sell_price = '')
+                              AND {open_position_sql(include_pending=True)}
                             """,
                             (instId, strategy_name),
                         )
@@ -373,7 +393,7 @@ def process_sell_signal(
                         # ✅ FIX Issue 2: If partially_filled, verify actual filled size matches DB
                         if db_state == "partially_filled" and not simulation_mode:
                             try:
-                                order_result = api.get_order(instId=instId, ordId=ordId)
+                                order_result = fetch_order(api, instId, ordId)
                                 if order_result.get("code") == "0" and order_result.get(
                                     "data"
                                 ):
@@ -440,8 +460,8 @@ def process_sell_signal(
                             and api is not None
                             and not simulation_mode
                         ):
-                            order_result = api.get_order(
-                                instId=instId, ordId=existing_sell_order_id
+                            order_result = fetch_order(
+                                api, instId, existing_sell_order_id
                             )
                             if order_result.get("code") == "0" and order_result.get(
                                 "data"
@@ -462,6 +482,7 @@ def process_sell_signal(
                                             ("sold out", str(avg_px), instId, ordId),
                                         )
                                         conn.commit()
+                                        record_closed(strategy_name, instId, ordId)
                                         cur_price.close()
                                     else:
                                         cur_mark = conn.cursor()
@@ -471,6 +492,7 @@ def process_sell_signal(
                                             ("sold out", instId, ordId),
                                         )
                                         conn.commit()
+                                        record_closed(strategy_name, instId, ordId)
                                         cur_mark.close()
                                     logger.warning(
                                         f"{strategy_name} SELL already filled on exchange for {instId}, {ordId}; "
@@ -528,8 +550,8 @@ def process_sell_signal(
                                     and not simulation_mode
                                 ):
                                     try:
-                                        order_result = api.get_order(
-                                            instId=instId, ordId=sell_order_id
+                                        order_result = fetch_order(
+                                            api, instId, sell_order_id
                                         )
                                         if order_result.get(
                                             "code"
@@ -615,6 +637,7 @@ def process_sell_signal(
                                         ("filled", instId, ordId),
                                     )
                                     conn.commit()
+                                    record_state(strategy_name, instId, ordId, "filled")
                                     cur_revert.close()
                                     failed_sells += 1
                                     successful_sells -= 1
@@ -661,11 +684,10 @@ def process_sell_signal(
                     try:
                         cur_check = conn.cursor()
                         cur_check.execute(
-                            """
+                            f"""
                             SELECT COUNT(*) FROM orders
                             WHERE instId = %s AND flag = %s
-                              AND state IN ('filled', 'partially_filled')
-                              AND (sell_price IS NULL OR sell_price = '')
+                              AND {open_position_sql()}
                             """,
                             (instId, strategy_name),
                         )
@@ -695,10 +717,13 @@ def process_sell_signal(
                     f"{strategy_name} Reset sell_triggered for {instId} after exception to allow retry"
                 )
     finally:
+        if sell_lease is not None:
+            sell_lease.release()
         # ✅ FIX: Always release per-instId lock
         instId_lock.release()
 
 
+@at_priority(PRIORITY_BUY)
 def process_stable_buy_signal(
     instId: str,
     limit_price: float,
@@ -772,23 +797,20 @@ def process_stable_buy_signal(
         try:
             # Keep stable strategy behavior aligned with original strategy:
             # block duplicate unsold buys for this strategy.
-            cur = conn.cursor()
-            two_hours_ago_ms = int(
-                (datetime.now() - timedelta(hours=2)).timestamp() * 1000
-            )
-            cur.execute(
-                """
-                SELECT ordId, state, create_time FROM orders
-                WHERE instId = %s AND flag = %s
-                  AND create_time > %s
-                  AND (state IN ('filled', 'partially_filled', '') OR state IS NULL)
-                  AND (sell_price IS NULL OR sell_price = '')
-                ORDER BY create_time DESC
-                LIMIT 1
-                """,
-                (instId, strategy_name, two_hours_ago_ms),
+            if not try_buy_lock(conn, strategy_name, instId):
+                logger.warning(
+                    f"🔒 DUPLICATE STABLE BUY BLOCKED: {instId} is being bought "
+                    f"by another process"
+                )
+                with lock:
+                    if instId in stable_pending_buys:
+                        del stable_pending_buys[instId]
+                    if stable_strategy:
+                        stable_strategy.clear_signal(instId)
+                return
+            recent_unsold = find_recent_unsold(
+                conn, instId, strategy_name, use_index=not CROSS_PROCESS_LOCKS
             )
-            recent_unsold = cur.fetchone()
 
             if not recent_unsold:
                 with lock:
@@ -798,7 +820,6 @@ def process_stable_buy_signal(
                             f"(no unsold orders in DB but still in memory)"
                         )
                         del stable_active_orders[instId]
-            cur.close()
 
             if recent_unsold:
                 logger.warning(
@@ -837,11 +858,13 @@ def process_stable_buy_signal(
                     )
 
                     if not simulation_mode:
-                        threading.Thread(
-                            target=check_and_cancel_unfilled_order_func,
-                            args=(instId, ordId, api, strategy_name),
-                            daemon=True,
-                        ).start()
+                        spawn(
+                            check_and_cancel_unfilled_order_func,
+                            instId,
+                            ordId,
+                            api,
+                            strategy_name,
+                        )
             else:
                 logger.error(
                     f"❌ Failed to create stable buy order for {instId}, cleaning up"
@@ -862,6 +885,7 @@ def process_stable_buy_signal(
                 stable_strategy.clear_signal(instId)
 
 
+@at_priority(PRIORITY_BUY)
 def process_batch_buy_signal(
     instId: str,
     limit_price: float,
@@ -876,7 +900,7 @@ def process_batch_buy_signal(
     batch_pending_buys: dict,
     lock: threading.Lock,
     check_and_cancel_unfilled_order_func,
-    thread_pool=None,  # Optional thread pool for scheduling next batch
+    thread_pool=None,  # Unused: next batch is deferred via schedule_later
     process_batch_buy_signal_func=None,  # Optional callback to trigger next batch
     current_prices: Optional[
         dict
@@ -970,31 +994,23 @@ def process_batch_buy_signal(
         try:
             # ✅ DB-level duplicate check: only when starting new batch cycle (batch_index==0)
             # Prevents restart leak; does NOT block batch 2 or 3 of same cycle
-            if batch_index == 0:
-                cur = conn.cursor()
-                two_hours_ago_ms = int(
-                    (datetime.now() - timedelta(hours=2)).timestamp() * 1000
-                )
-                cur.execute(
-                    """
-                    SELECT ordId FROM orders
-                    WHERE instId = %s AND flag = %s
-                      AND create_time > %s
-                      AND (state IN ('filled', 'partially_filled', '') OR state IS NULL)
-                      AND (sell_price IS NULL OR sell_price = '')
-                    LIMIT 1
-                    """,
-                    (instId, strategy_name, two_hours_ago_ms),
+            if not try_buy_lock(conn, strategy_name, instId):
+                logger.warning(
+                    f"🔒 DUPLICATE BATCH BUY BLOCKED: {instId} is being bought "
+                    f"by another process"
                 )
-                if cur.fetchone():
+                clear_batch_pending(reset_strategy_if_idle=batch_index == 0)
+                return
+            if batch_index == 0:
+                if find_recent_unsold(
+                    conn, instId, strategy_name, use_index=not CROSS_PROCESS_LOCKS
+                ):
                     logger.warning(
                         f"🚫 DUPLICATE BATCH BUY BLOCKED: {instId} already has unsold "
                         f"batch order in last 2h, skipping new cycle"
                     )
-                    cur.close()
                     clear_batch_pending(reset_strategy_if_idle=True)
                     return
-                cur.close()
 
             ordId = buy_batch_order_func(
                 instId, actual_buy_price, size, batch_index, api, conn
@@ -1057,13 +1073,9 @@ def process_batch_buy_signal(
                                 f"✅ All batches completed for {instId}, cleared batch_pending_buys"
                             )
                     else:
-                        # ✅ FIX: Auto-schedule next batch using thread pool (bounded)
-                        # Schedule next batch check after 10 minutes (batch delay)
-                        # This avoids creating unbounded threads for sleep operations
-                        def schedule_next_batch_check():
-                            import time
-
-                            time.sleep(600)  # Wait for batch delay
+                        # ✅ OPTIMIZED: Next batch check is a scheduler timer, so no
+                        # thread-pool worker is held for the batch delay
+                        def next_batch_check():
                             if batch_strategy and batch_strategy.is_batch_active(
                                 instId
                             ):
@@ -1082,20 +1094,16 @@ def process_batch_buy_signal(
                                             f"❌ Cannot trigger next batch for {instId}: process_batch_buy_signal_func not provided"
                                         )
 
-                        # Use thread pool to avoid unbounded thread creation
-                        if thread_pool:
-                            thread_pool.submit(schedule_next_batch_check)
-                        else:
-                            threading.Thread(
-                                target=schedule_next_batch_check, daemon=True
-                            ).start()
+                        schedule_later(BATCH_DELAY_SECONDS, next_batch_check)
 
                     if not simulation_mode:
-                        threading.Thread(
-                            target=check_and_cancel_unfilled_order_func,
-                            args=(instId, ordId, api, strategy_name),
-                            daemon=True,
-                        ).start()
+                        spawn(
+                            check_and_cancel_unfilled_order_func,
+                            instId,
+                            ordId,
+                            api,
+                            strategy_name,
+                        )
             else:
                 logger.error(
                     f"❌ Failed to create batch buy order for {instId}, batch {batch_index + 1}"
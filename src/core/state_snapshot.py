@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Warm-Restart State Snapshots
+Periodic and shutdown snapshots of in-memory trading state (active orders,
+reference prices, strategy state, instrument precision) to a local file,
+so a restart resumes from memory instead of REST and DB rebuilds
+"""
+
+import logging
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from .orders_schema import open_position_sql
+
+logger = logging.getLogger(__name__)
+
+STATE_SNAPSHOT_ENABLED = os.getenv("STATE_SNAPSHOT_ENABLED", "true").lower() == "true"
+STATE_SNAPSHOT_PATH = os.getenv("STATE_SNAPSHOT_PATH", "state_snapshot.bin")
+STATE_SNAPSHOT_INTERVAL_SECONDS = float(
+    os.getenv("STATE_SNAPSHOT_INTERVAL_SECONDS", "30")
+)
+# Older snapshots are ignored (startup runs the full recovery instead)
+STATE_SNAPSHOT_MAX_AGE_SECONDS = float(
+    os.getenv("STATE_SNAPSHOT_MAX_AGE_SECONDS", "900")
+)
+
+# Header: magic, format version, crc32 of the compressed payload
+_MAGIC = b"OKXS"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct(">4sHI")
+
+# (flag, instId, ordId)
+OrderKey = Tuple[str, str, str]
+
+
+class SnapshotError(ValueError):
+    """Snapshot file is unreadable, corrupt or from another format version"""
+
+
+def encode(state: Dict[str, Any]) -> bytes:
+    payload = zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+    return _HEADER.pack(_MAGIC, SNAPSHOT_VERSION, zlib.crc32(payload)) + payload
+
+
+def decode(blob: bytes) -> Dict[str, Any]:
+    if len(blob) < _HEADER.size:
+        raise SnapshotError("truncated header")
+    magic, version, crc = _HEADER.unpack_from(blob)
+    if magic != _MAGIC:
+        raise SnapshotError("not a state snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"version {version}, expected {SNAPSHOT_VERSION}")
+    payload = blob[_HEADER.size :]
+    if zlib.crc32(payload) != crc:
+        raise SnapshotError("checksum mismatch")
+    try:
+        return pickle.loads(zlib.decompress(payload))
+    except Exception as e:
+        raise SnapshotError(f"undecodable payload: {e}")
+
+
+def save(state: Dict[str, Any], path: str = STATE_SNAPSHOT_PATH) -> int:
+    """Write atomically (temp file + rename); returns the size in bytes"""
+    blob = encode(state)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(blob)
+
+
+def load(
+    path: str = STATE_SNAPSHOT_PATH,
+    max_age_seconds: float = STATE_SNAPSHOT_MAX_AGE_SECONDS,
+) -> Optional[Dict[str, Any]]:
+    """Read a snapshot if present, intact and fresh enough (None otherwise)"""
+    try:
+        with open(path, "rb") as f:
+            state = decode(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, SnapshotError) as e:
+        logger.warning(f"⚠️ Ignoring state snapshot {path}: {e}")
+        return None
+    age = time.time() - state.get("saved_at", 0)
+    if age > max_age_seconds or age < 0:
+        logger.warning(
+            f"⚠️ Ignoring state snapshot {path}: {age:.0f}s old "
+            f"(max {max_age_seconds:.0f}s)"
+        )
+        return None
+    return state
+
+
+# Strategy state -------------------------------------------------------
+
+
+def capture_strategies(stable_strategy, batch_strategy) -> Dict[str, Any]:
+    state: Dict[str, Any] = {}
+    if stable_strategy is not None:
+        with stable_strategy.lock:
+            state["stable_price_history"] = {
+                instId: list(history)
+                for instId, history in stable_strategy.price_history.items()
+            }
+            state["stable_pending_signals"] = {
+                instId: dict(signal)
+                for instId, signal in stable_strategy.pending_signals.items()
+            }
+    if batch_strategy is not None:
+        with batch_strategy.lock:
+            state["batch_active_batches"] = {
+                instId: dict(batch, batch_states=list(batch.get("batch_states", [])))
+                for instId, batch in batch_strategy.active_batches.items()
+            }
+    return state
+
+
+def restore_strategies(state: Dict[str, Any], stable_strategy, batch_strategy):
+    if stable_strategy is not None:
+        with stable_strategy.lock:
+            for instId, history in state.get("stable_price_history", {}).items():
+                stable_strategy.price_history[instId] = deque(history)
+                stable_strategy._prune_history(instId)
+            stable_strategy.pending_signals.update(
+                state.get("stable_pending_signals", {})
+            )
+    if batch_strategy is not None:
+        with batch_strategy.lock:
+            batch_strategy.active_batches.update(state.get("batch_active_batches", {}))
+
+
+# Active orders --------------------------------------------------------
+
+
+def order_keys(flag: str, orders: Dict[str, Dict]) -> Set[OrderKey]:
+    """(flag, instId, ordId) of every order in an active orders dict"""
+    keys = set()
+    for instId, order_info in list(orders.items()):
+        ordIds = order_info.get("ordIds") or [order_info.get("ordId")]
+        keys.update((flag, instId, str(ordId)) for ordId in ordIds if ordId)
+    return keys
+
+
+def find_order_delta(
+    conn, flags: Iterable[str], snapshot_keys: Set[OrderKey], recovery_hours: int
+) -> Tuple[Set[OrderKey], Set[OrderKey]]:
+    """Compare snapshot orders with the database in one query
+
+    Returns:
+        (missing, stale): filled unsold orders the snapshot lacks (need the
+        full recovery), and snapshot orders since sold, canceled or deleted
+        (must not be restored)
+    """
+    cutoff_ms = int(
+        (datetime.now() - timedelta(hours=recovery_hours)).timestamp() * 1000
+    )
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"""
+            SELECT flag, instId, ordId,
+                   (state IS DISTINCT FROM 'canceled'
+                    AND (sell_price IS NULL OR sell_price = '')) AS is_open
+            FROM orders
+            WHERE flag = ANY(%s)
+              AND (
+                ({open_position_sql()} AND create_time > %s)
+                OR ordId = ANY(%s)
+              )
+            """,
+            (sorted(set(flags)), cutoff_ms, sorted({key[2] for key in snapshot_keys})),
+        )
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+
+    open_keys = {
+        (flag, instId, str(ordId)) for flag, instId, ordId, is_open in rows if is_open
+    }
+    return open_keys - snapshot_keys, snapshot_keys - open_keys
+
+
+class SnapshotWriter:
+    """Saves capture() every interval from a daemon thread, and on demand"""
+
+    def __init__(
+        self,
+        capture,
+        path: str = STATE_SNAPSHOT_PATH,
+        interval_seconds: float = STATE_SNAPSHOT_INTERVAL_SECONDS,
+    ):
+        self.capture = capture
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self._save_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.saves = 0
+        self.errors = 0
+        self.last_size = 0
+        self.last_duration_ms = 0.0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="StateSnapshot"
+        )
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.save()
+
+    def save(self) -> bool:
+        with self._save_lock:
+            start = time.perf_counter()
+            try:
+                state = self.capture()
+                state["saved_at"] = time.time()
+                self.last_size = save(state, self.path)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"⚠️ State snapshot save failed: {e}")
+                return False
+            self.last_duration_ms = (time.perf_counter() - start) * 1000
+            self.saves += 1
+            return True
+
+    def stop(self, final_save: bool = True):
+        self._stop.set()
+        if final_save:
+            self.save()
+
+    def format_stats(self) -> str:
+        return (
+            f"💾 State snapshot {self.path}: saves={self.saves}, "
+            f"errors={self.errors}, last={self.last_size / 1024:.1f}KB "
+            f"in {self.last_duration_ms:.1f}ms"
+        )
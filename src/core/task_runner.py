@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Background Task Runner
+Single entry point for fire-and-forget and deferred work, so the execution
+backend (threads or the asyncio engine) can be swapped in one place
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from .scheduler import DeadlineScheduler
+
+logger = logging.getLogger(__name__)
+
+SpawnFunc = Callable[..., Any]
+ScheduleFunc = Callable[..., Any]
+
+_spawner: Optional[SpawnFunc] = None
+_scheduler: Optional[ScheduleFunc] = None
+_default_scheduler: Optional[DeadlineScheduler] = None
+_default_scheduler_lock = threading.Lock()
+
+
+def set_spawner(spawner: Optional[SpawnFunc]):
+    """Install a backend for spawn() (e.g. AsyncEngine.submit); None = threads"""
+    global _spawner
+    _spawner = spawner
+
+
+def set_scheduler(scheduler: Optional[ScheduleFunc]):
+    """Install a backend for schedule_later(); None = shared DeadlineScheduler"""
+    global _scheduler
+    _scheduler = scheduler
+
+
+def spawn(target: Callable, *args, name: Optional[str] = None):
+    """Run target(*args) in the background"""
+    if _spawner is not None:
+        return _spawner(target, *args)
+    thread = threading.Thread(target=target, args=args, daemon=True, name=name)
+    thread.start()
+    return thread
+
+
+def schedule_later(delay_seconds: float, target: Callable, *args):
+    """Run target(*args) in the background after delay_seconds"""
+    if _scheduler is not None:
+        return _scheduler(delay_seconds, target, *args)
+    return _get_default_scheduler().call_later(delay_seconds, target, *args)
+
+
+def _get_default_scheduler() -> DeadlineScheduler:
+    """Shared timer thread dispatching due work through spawn()"""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = DeadlineScheduler(spawn)
+        return _default_scheduler
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conflating Ticker Ingest Queue
+Decouples WebSocket receive from strategy evaluation
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Evaluator workers consuming the newest price per instrument
+TICKER_EVALUATOR_WORKERS = int(os.getenv("TICKER_EVALUATOR_WORKERS", "2"))
+
+
+class StageTimer:
+    """Count / total / max latency for one pipeline stage"""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def format(self) -> str:
+        avg = self.total / self.count if self.count else 0.0
+        return f"avg={avg * 1e3:.2f}ms max={self.max * 1e3:.2f}ms"
+
+
+class ConflatingTickerQueue:
+    """Latest-price-wins slot per instrument, drained by evaluator workers
+
+    The receive thread only parses frames and calls offer(); if an instrument
+    already has an unprocessed price, the new tick overwrites it (conflation).
+    An instrument is never evaluated by two workers at once: ticks arriving
+    mid-evaluation wait in the slot and are re-queued when it finishes.
+    """
+
+    def __init__(
+        self,
+        evaluate_func: Callable[[str, float], None],
+        workers: int = TICKER_EVALUATOR_WORKERS,
+    ):
+        self.evaluate_func = evaluate_func
+        self.workers = max(workers, 1)
+        self._slots: Dict[str, Tuple[float, float]] = {}  # instId -> (price, recv_ts)
+        self._ready: Deque[str] = deque()
+        self._in_flight: Set[str] = set()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self.offered = 0
+        self.conflated = 0
+        self.evaluated = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.receive_stage = StageTimer()
+        self.queue_stage = StageTimer()
+        self.evaluate_stage = StageTimer()
+
+    def start(self):
+        """Start evaluator workers (idempotent)"""
+        with self._cond:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker_loop, daemon=True, name=f"TickerEval-{i}"
+                )
+                self._threads.append(thread)
+                thread.start()
+        logger.warning(f"✅ Ticker ingest queue started ({self.workers} evaluators)")
+
+    def offer(self, instId: str, price: float, recv_ts: float):
+        """Publish the latest price for an instrument (called by receive thread)"""
+        with self._cond:
+            self.offered += 1
+            if instId in self._slots:
+                self.conflated += 1
+                self._slots[instId] = (price, recv_ts)
+                return
+            self._slots[instId] = (price, recv_ts)
+            if instId not in self._in_flight:
+                self._ready.append(instId)
+                if len(self._ready) > self.max_depth:
+                    self.max_depth = len(self._ready)
+                self._cond.notify()
+
+    def record_receive(self, seconds: float):
+        """Record time spent parsing one frame on the receive thread"""
+        with self._cond:
+            self.receive_stage.record(seconds)
+
+    def depth(self) -> int:
+        return len(self._ready)
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._ready:
+                    self._cond.wait()
+                instId = self._ready.popleft()
+                price, recv_ts = self._slots.pop(instId)
+                self._in_flight.add(instId)
+
+            start = time.time()
+            failed = False
+            try:
+                self.evaluate_func(instId, price)
+            except Exception as e:
+                failed = True
+                logger.error(f"Ticker evaluation error for {instId}: {e}")
+            finished = time.time()
+
+            with self._cond:
+                self._in_flight.discard(instId)
+                if instId in self._slots:
+                    # Newer price arrived while evaluating
+                    self._ready.append(instId)
+                    self._cond.notify()
+                self.evaluated += 1
+                if failed:
+                    self.errors += 1
+                self.queue_stage.record(max(start - recv_ts, 0.0))
+                self.evaluate_stage.record(finished - start)
+
+    def format_stats(self, reset: bool = False) -> str:
+        """One-line metrics summary (optionally resetting counters)"""
+        with self._cond:
+            conflation_pct = self.conflated / self.offered * 100 if self.offered else 0
+            line = (
+                f"📥 Ticker ingest: depth={len(self._ready)} "
+                f"(max {self.max_depth}), offered={self.offered}, "
+                f"conflated={self.conflated} ({conflation_pct:.1f}%), "
+                f"evaluated={self.evaluated}, errors={self.errors} | "
+                f"receive {self.receive_stage.format()}, "
+                f"queue {self.queue_stage.format()}, "
+                f"evaluate {self.evaluate_stage.format()}"
+            )
+            if reset:
+                self._reset_metrics()
+        return line
@@ -123,7 +123,11 @@ def check_blacklist_before_buy(
         return False
 
     try:
-        blacklist_manager = BlacklistManager_class(logger=logger)
+        # ✅ OPTIMIZED: Use the process-wide in-memory blacklist (no DB round trip)
+        if hasattr(BlacklistManager_class, "get_shared_cache"):
+            blacklist_manager = BlacklistManager_class.get_shared_cache()
+        else:
+            blacklist_manager = BlacklistManager_class(logger=logger)
         base_currency = extract_base_currency_func(instId)
 
         if blacklist_manager.is_blacklisted(base_currency):
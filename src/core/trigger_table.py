@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Trigger Table
+Precomputed per-hour limit prices for the ticker hot path
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TriggerEntry:
+    """Precomputed buy trigger for one instrument (valid until the reference changes)"""
+
+    __slots__ = ("instId", "reference_price", "limit_percent", "limit_price")
+
+    def __init__(
+        self,
+        instId: str,
+        reference_price: float,
+        limit_percent: float,
+        limit_price: float,
+    ):
+        self.instId = instId
+        self.reference_price = reference_price
+        self.limit_percent = limit_percent
+        self.limit_price = limit_price
+
+
+class TriggerTable:
+    """instId -> TriggerEntry, recomputed only when a reference price changes
+
+    Entries are replaced, never mutated, so the tick path reads them with a
+    single dict lookup and no lock. Writers (candle handler, hourly reference
+    refresh) serialize on a private lock.
+    """
+
+    def __init__(
+        self, calculate_limit_price_func: Callable[[float, float, str], float]
+    ):
+        self.calculate_limit_price = calculate_limit_price_func
+        self._entries: Dict[str, TriggerEntry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, instId: str) -> Optional[TriggerEntry]:
+        """Get the current trigger for an instrument (lock-free)"""
+        return self._entries.get(instId)
+
+    def update(
+        self, instId: str, reference_price: float, limit_percent: float
+    ) -> Optional[TriggerEntry]:
+        """Recompute the trigger for an instrument if its inputs changed
+
+        Args:
+            instId: Instrument ID
+            reference_price: Current hour's open price
+            limit_percent: Limit percent from hour_limit
+
+        Returns:
+            The current TriggerEntry, or None if the reference price is invalid
+        """
+        if not reference_price or reference_price <= 0:
+            self.remove(instId)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(instId)
+            if (
+                entry is not None
+                and entry.reference_price == reference_price
+                and entry.limit_percent == limit_percent
+            ):
+                return entry
+
+            entry = TriggerEntry(
+                instId,
+                reference_price,
+                limit_percent,
+                self.calculate_limit_price(reference_price, limit_percent, instId),
+            )
+            self._entries[instId] = entry
+            return entry
+
+    def rebuild(
+        self, reference_prices: Dict[str, float], crypto_limits: Dict[str, float]
+    ):
+        """Recompute all triggers (e.g. after the hourly reference refresh)
+
+        Args:
+            reference_prices: Dict of instId -> current hour's open price
+            crypto_limits: Dict of instId -> limit_percent
+        """
+        for instId, limit_percent in list(crypto_limits.items()):
+            ref_price = reference_prices.get(instId)
+            if ref_price and ref_price > 0:
+                self.update(instId, ref_price, limit_percent)
+            else:
+                self.remove(instId)
+
+        with self._lock:
+            for instId in list(self._entries):
+                if instId not in crypto_limits:
+                    del self._entries[instId]
+        logger.info(f"📊 Trigger table rebuilt: {len(self._entries)} instruments")
+
+    def remove(self, instId: str):
+        """Drop the trigger for an instrument"""
+        with self._lock:
+            self._entries.pop(instId, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -7,13 +7,422 @@ Handles ticker and candle WebSocket messages
 
 import json
 import logging
+import os
 import threading
 import time
 from datetime import datetime
 from typing import Any, Optional
 
+from .instrument_state import instrument_lock
+from .leader_election import is_trading_enabled
+from .task_runner import spawn
+
 logger = logging.getLogger(__name__)
 
+# Stale pending timeouts for non-original strategies (read once, not per tick)
+STABLE_PENDING_TIMEOUT_SECONDS = int(os.getenv("STABLE_PENDING_TIMEOUT_SECONDS", "180"))
+BATCH_PENDING_TIMEOUT_SECONDS = int(os.getenv("BATCH_PENDING_TIMEOUT_SECONDS", "2400"))
+GAP_PENDING_TIMEOUT_SECONDS = int(os.getenv("GAP_PENDING_TIMEOUT_SECONDS", "180"))
+REDUCE_MARKET_DATA_LOGS = os.getenv("REDUCE_MARKET_DATA_LOGS", "true").lower() == "true"
+
+
+def _format_gain(gain_pct) -> str:
+    """2h gain for a blocked-buy log (None: filter failed closed)"""
+    if gain_pct is None:
+        return "unknown (2h close unavailable)"
+    return f"{gain_pct:.2f}% > 5%"
+
+
+def evaluate_ticker(
+    instId: str,
+    last_price: float,
+    crypto_limits: dict,
+    current_prices: dict,
+    reference_prices: dict,
+    reference_price_fetch_time: dict,
+    reference_price_fetch_attempts: dict,
+    pending_buys: dict,
+    active_orders: dict,
+    stable_active_orders: dict,
+    stable_pending_buys: dict,
+    stable_strategy: Optional[Any],
+    batch_active_orders: dict,
+    batch_pending_buys: dict,
+    batch_strategy: Optional[Any],
+    gap_active_orders: dict,
+    gap_pending_buys: dict,
+    lock: threading.Lock,
+    fetch_current_hour_open_price_func,
+    calculate_limit_price_func,
+    process_buy_signal_func,
+    process_stable_buy_signal_func,
+    process_batch_buy_signal_func,
+    process_gap_buy_signal_func,
+    check_gap_recent_buy_func,
+    check_2h_gain_filter_func,  # Function to check 2h gain filter
+    thread_pool=None,  # Optional thread pool for async processing
+    trigger_table=None,  # Optional precomputed limit prices (TriggerTable)
+    instrument_states=None,  # Optional InstrumentStateRegistry (tick state)
+    reference_rollover=None,  # Optional ReferenceRollover (new-hour references)
+):
+    """Run every strategy against one instrument's latest price
+
+    Shared by the inline ticker handler and the conflating ingest workers.
+    Per-instrument sections take only that instrument's stripe when `lock`
+    is a StripedLock, so ticks for different instruments don't contend.
+    """
+    inst_lock = instrument_lock(lock, instId)
+    # ✅ FIX: Price deduplication - skip original if unchanged,
+    # but still allow stable strategy update_price + check_stability
+    # Allows stability seconds to accumulate during flat markets
+    with inst_lock:
+        if instrument_states is not None:
+            price_unchanged = instrument_states.record_tick(instId, last_price)
+        else:
+            price_unchanged = current_prices.get(instId) == last_price
+        # Always update for consistency
+        current_prices[instId] = last_price
+
+        if (
+            instId in reference_price_fetch_attempts
+            and reference_price_fetch_attempts[instId] > 0
+        ):
+            reference_price_fetch_attempts[instId] = 0
+            logger.debug(
+                f"📊 Reset reference_price_fetch_attempts "
+                f"for {instId} on ticker update (coin is active)"
+            )
+
+    # Self-heal stale pending states for non-original strategies.
+    # Original pending has dedicated fast cleanup below.
+    # ✅ OPTIMIZED: Only take the lock when something is pending
+    # (unlocked membership test is a safe pre-check)
+    clear_stable_signal = False
+    clear_batch_state = False
+    if (
+        instId in stable_pending_buys
+        or instId in batch_pending_buys
+        or instId in gap_pending_buys
+    ):
+        now_ts = time.time()
+        with inst_lock:
+            if instId in stable_pending_buys and instId not in stable_active_orders:
+                stable_elapsed = now_ts - stable_pending_buys[instId]
+                if stable_elapsed > STABLE_PENDING_TIMEOUT_SECONDS:
+                    del stable_pending_buys[instId]
+                    clear_stable_signal = True
+                    logger.warning(
+                        f"🧹 Cleaned stale stable_pending_buys "
+                        f"for {instId} (pending {stable_elapsed:.1f}s)"
+                    )
+
+            if instId in batch_pending_buys and instId not in batch_active_orders:
+                batch_elapsed = now_ts - batch_pending_buys[instId]
+                if batch_elapsed > BATCH_PENDING_TIMEOUT_SECONDS:
+                    del batch_pending_buys[instId]
+                    clear_batch_state = True
+                    logger.warning(
+                        f"🧹 Cleaned stale batch_pending_buys "
+                        f"for {instId} (pending {batch_elapsed:.1f}s)"
+                    )
+
+            if instId in gap_pending_buys and instId not in gap_active_orders:
+                gap_elapsed = now_ts - gap_pending_buys[instId]
+                if gap_elapsed > GAP_PENDING_TIMEOUT_SECONDS:
+                    del gap_pending_buys[instId]
+                    logger.warning(
+                        f"🧹 Cleaned stale gap_pending_buys "
+                        f"for {instId} (pending {gap_elapsed:.1f}s)"
+                    )
+
+    if clear_stable_signal and stable_strategy is not None:
+        stable_strategy.clear_signal(instId)
+    if clear_batch_state and batch_strategy is not None:
+        batch_strategy.reset_crypto(instId)
+
+    # ✅ FIX: Always update stable strategy (even if price unchanged)
+    # Allows stability seconds to accumulate during flat markets
+    # Runs independently, outside main lock to avoid deadlock
+    # stable_strategy has its own RLock, so calling it is safe
+    if stable_strategy is not None:
+        stable_strategy.update_price(instId, last_price)
+
+    # ✅ NEW: First tick of a new hour stands in as its reference price
+    # until the candle1H frame with the real open arrives
+    if reference_rollover is not None and reference_rollover.is_pending(instId):
+        reference_rollover.observe_tick(instId, last_price)
+
+    # ✅ NEW: A hot standby keeps prices and strategy state warm, never signals
+    if not is_trading_enabled():
+        return
+
+    if stable_strategy is not None:
+        # Check if stable strategy has pending signal ready
+        limit_price_stable = stable_strategy.check_stability(instId)
+        if limit_price_stable:
+            # Check stable strategy state (thread-safe check)
+            with inst_lock:
+                if instId in stable_pending_buys and instId not in stable_active_orders:
+                    should_trigger_stable = True
+                else:
+                    should_trigger_stable = False
+
+            if should_trigger_stable:
+                # Price is stable, trigger buy
+                logger.warning(
+                    f"✅ STABLE BUY READY: {instId}, " f"limit={limit_price_stable:.6f}"
+                )
+                if thread_pool:
+                    thread_pool.submit(
+                        process_stable_buy_signal_func,
+                        instId,
+                        limit_price_stable,
+                    )
+                else:
+                    spawn(process_stable_buy_signal_func, instId, limit_price_stable)
+
+    # ✅ FIX: Skip original if price unchanged
+    # Already-active check done atomically later under lock
+    # Stable strategy already ran above, accumulates stability
+    if price_unchanged:
+        return
+
+    # ✅ OPTIMIZED: Precomputed trigger (one lookup + one compare)
+    # Limit price only changes when the reference price does
+    trigger = trigger_table.get(instId) if trigger_table is not None else None
+    if trigger is not None:
+        if last_price > trigger.limit_price:
+            return  # Common no-signal case
+        ref_price = trigger.reference_price
+        limit_percent = trigger.limit_percent
+    else:
+        # Get reference price and limit_percent under lock
+        with inst_lock:
+            ref_price = reference_prices.get(instId)
+            limit_percent = crypto_limits[instId]
+
+    if trigger is None and (ref_price is None or ref_price <= 0):
+        with inst_lock:
+            last_fetch = reference_price_fetch_time.get(instId, 0)
+            fetch_attempts = reference_price_fetch_attempts.get(instId, 0)
+            time_since_fetch = time.time() - last_fetch
+            min_wait = min(5 * (2 ** min(fetch_attempts, 4)), 60)
+
+            if time_since_fetch < min_wait:
+                logger.debug(
+                    f"⏳ Skipping reference price fetch "
+                    f"for {instId}: backoff "
+                    f"({time_since_fetch:.1f}s < {min_wait}s)"
+                )
+                return
+
+            reference_price_fetch_time[instId] = time.time()
+
+        logger.warning(
+            f"⚠️ No reference price for {instId}, " f"fetching current hour's open..."
+        )
+        ref_price = fetch_current_hour_open_price_func(instId)
+        if ref_price and ref_price > 0:
+            with inst_lock:
+                if instId not in pending_buys and instId not in active_orders:
+                    reference_prices[instId] = ref_price
+                    reference_price_fetch_attempts[instId] = 0
+                    if trigger_table is not None:
+                        trigger_table.update(instId, ref_price, limit_percent)
+        else:
+            with inst_lock:
+                reference_price_fetch_attempts[instId] = fetch_attempts + 1
+            logger.warning(
+                f"⚠️ Failed to get reference price for {instId}, "
+                f"skipping buy check (will retry after backoff, "
+                f"attempts={fetch_attempts + 1})"
+            )
+            return
+
+    if trigger is not None:
+        limit_price = trigger.limit_price
+    else:
+        limit_price = calculate_limit_price_func(ref_price, limit_percent, instId)
+
+    # Check stable strategy buy signal independently
+    # (before original strategy check)
+    # This allows stable strategy to register even when
+    # original strategy is active
+    if stable_strategy is not None and last_price <= limit_price:
+        # Check if not already registered or active
+        # for stable strategy
+        with inst_lock:
+            instId_not_in_stable = (
+                instId not in stable_pending_buys and instId not in stable_active_orders
+            )
+
+        if instId_not_in_stable:
+            # Check 2h gain filter for stable strategy too
+            should_skip_buy_stable, gain_pct_stable = check_2h_gain_filter_func(
+                instId, ref_price
+            )
+            if not should_skip_buy_stable:
+                # Register stable buy signal
+                # (will wait for stability)
+                # register_buy_signal uses its own RLock,
+                # safe to call outside main lock
+                if stable_strategy.register_buy_signal(instId, limit_price):
+                    with inst_lock:
+                        stable_pending_buys[instId] = time.time()
+                    logger.warning(
+                        f"📝 STABLE BUY SIGNAL REGISTERED: "
+                        f"{instId}, limit={limit_price:.6f}, "
+                        f"waiting for stability"
+                    )
+
+    # Check batch strategy buy signal independently
+    # (before original strategy check)
+    # This allows batch strategy to register even when
+    # other strategies are active
+    if batch_strategy is not None and last_price <= limit_price:
+        # Check if not already registered or active
+        # for batch strategy
+        with inst_lock:
+            instId_not_in_batch = (
+                instId not in batch_pending_buys and instId not in batch_active_orders
+            )
+
+        if instId_not_in_batch:
+            # Check 2h gain filter for batch strategy too
+            should_skip_buy_batch, gain_pct_batch = check_2h_gain_filter_func(
+                instId, ref_price
+            )
+            if not should_skip_buy_batch:
+                # Register batch buy signal
+                # (will trigger first batch immediately)
+                # register_buy_signal uses its own RLock,
+                # safe to call outside main lock
+                if batch_strategy.register_buy_signal(instId, limit_price):
+                    with inst_lock:
+                        batch_pending_buys[instId] = time.time()
+                    logger.warning(
+                        f"📝 BATCH BUY SIGNAL REGISTERED: {instId}, "
+                        f"limit={limit_price:.6f}, "
+                        f"batches=30/30/40 USDT"
+                    )
+                    # Trigger first batch immediately
+                    # ✅ FIX: Removed manual thread scheduling
+                    # to avoid thread storm
+                    # Batch strategy's get_next_batch() already
+                    # checks time delays
+                    # Subsequent batches will be triggered
+                    # automatically when time is ready
+                    if thread_pool:
+                        thread_pool.submit(
+                            process_batch_buy_signal_func,
+                            instId,
+                            limit_price,
+                        )
+                    else:
+                        spawn(process_batch_buy_signal_func, instId, limit_price)
+
+    # Original-gap strategy (cooldown-based)
+    if last_price <= limit_price:
+        with inst_lock:
+            instId_not_in_gap = (
+                instId not in gap_pending_buys and instId not in gap_active_orders
+            )
+
+        if instId_not_in_gap:
+            should_skip_buy_gap, gain_pct_gap = check_2h_gain_filter_func(
+                instId, ref_price
+            )
+            if should_skip_buy_gap:
+                msg = (
+                    f"🚫 {instId} GAP BUY BLOCKED "
+                    "by 2h gain filter: "
+                    f"gain={_format_gain(gain_pct_gap)} "
+                    f"(current_open=${ref_price:.6f})"
+                )
+                logger.warning(msg)
+            elif check_gap_recent_buy_func(instId):
+                logger.warning(
+                    f"⏳ {instId} GAP BUY BLOCKED: "
+                    "global cooldown (any gap buy within 30m)"
+                )
+            else:
+                with inst_lock:
+                    gap_pending_buys[instId] = time.time()
+                msg = (
+                    f"🧭 GAP BUY SIGNAL: {instId}, "
+                    f"current={last_price:.6f} <= "
+                    f"limit={limit_price:.6f} "
+                    f"(ref={ref_price:.6f}, {limit_percent}%)"
+                )
+                logger.warning(msg)
+                if thread_pool:
+                    thread_pool.submit(
+                        process_gap_buy_signal_func,
+                        instId,
+                        limit_price,
+                    )
+                else:
+                    spawn(process_gap_buy_signal_func, instId, limit_price)
+
+    if last_price <= limit_price:
+        # ✅ NEW: Check 2-hour gain filter before buying
+        should_skip_buy, gain_pct = check_2h_gain_filter_func(instId, ref_price)
+        if should_skip_buy:
+            logger.warning(
+                f"🚫 {instId} BUY BLOCKED by 2h gain filter: "
+                f"gain={_format_gain(gain_pct)} "
+                f"(current_open=${ref_price:.6f})"
+            )
+            return
+
+        with inst_lock:
+            # ✅ NEW: Check for stale pending_buys (timeout > 60s)
+            if instId in pending_buys:
+                pending_since = pending_buys[instId]
+                elapsed = time.time() - pending_since
+                if elapsed > 60:
+                    # Stale pending, clean up and allow retry
+                    logger.warning(
+                        f"🧹 Cleaned stale pending_buys for "
+                        f"{instId} (pending for {elapsed:.1f}s)"
+                    )
+                    del pending_buys[instId]
+                else:
+                    logger.debug(
+                        f"⏭️ {instId} ORIGIN SKIPPED: " f"pending for {elapsed:.1f}s"
+                    )
+                    return
+
+            if instId in active_orders:
+                logger.debug(f"⏭️ {instId} ORIGIN SKIPPED: " f"active order exists")
+                return
+
+            pending_buys[instId] = time.time()
+
+        gain_info = f", 2h_gain={gain_pct:.2f}%" if gain_pct is not None else ""
+        logger.warning(
+            f"🚀 BUY SIGNAL: {instId}, "
+            f"current={last_price:.6f} <= limit={limit_price:.6f} "
+            f"(ref={ref_price:.6f}, {limit_percent}%{gain_info})"
+        )
+        # ✅ OPTIMIZED: Use thread pool if available,
+        # otherwise create thread
+        if thread_pool:
+            thread_pool.submit(process_buy_signal_func, instId, limit_price)
+        else:
+            spawn(process_buy_signal_func, instId, limit_price)
+    else:
+        # Reduce high-frequency market data logging
+        if not REDUCE_MARKET_DATA_LOGS:
+            price_diff_pct = ((last_price - limit_price) / ref_price) * 100
+            if price_diff_pct < 2.0:
+                logger.debug(
+                    f"📊 {instId} close to limit: "
+                    f"current={last_price:.6f}, "
+                    f"limit={limit_price:.6f}, "
+                    f"diff={price_diff_pct:.2f}%"
+                )
+
 
 def on_ticker_message(
     ws,
@@ -43,8 +452,11 @@ def on_ticker_message(
     check_gap_recent_buy_func,
     check_2h_gain_filter_func,  # Function to check 2h gain filter
     thread_pool=None,  # Optional thread pool for async processing
+    trigger_table=None,  # Optional precomputed limit prices (TriggerTable)
+    instrument_states=None,  # Optional InstrumentStateRegistry (tick state)
+    reference_rollover=None,  # Optional ReferenceRollover (new-hour references)
 ):
-    """Handle ticker WebSocket messages"""
+    """Handle ticker WebSocket messages (strategies evaluated inline)"""
     if msg_string == "pong":
         return
 
@@ -64,400 +476,74 @@ def on_ticker_message(
                     last_price = float(ticker.get("last", 0))
 
                     if last_price > 0:
-                        # ✅ FIX: Price deduplication - skip original if unchanged,
-                        # but still allow stable strategy update_price + check_stability
-                        # Allows stability seconds to accumulate during flat markets
-                        with lock:
-                            old_price = current_prices.get(instId)
-                            price_unchanged = old_price == last_price
-                            # Always update for consistency
-                            current_prices[instId] = last_price
-
-                            if (
-                                instId in reference_price_fetch_attempts
-                                and reference_price_fetch_attempts[instId] > 0
-                            ):
-                                reference_price_fetch_attempts[instId] = 0
-                                logger.debug(
-                                    f"📊 Reset reference_price_fetch_attempts "
-                                    f"for {instId} on ticker update (coin is active)"
-                                )
-
-                        # Self-heal stale pending states for non-original strategies.
-                        # Original pending has dedicated fast cleanup below.
-                        import os
-
-                        now_ts = time.time()
-                        stable_pending_timeout = int(
-                            os.getenv("STABLE_PENDING_TIMEOUT_SECONDS", "180")
-                        )
-                        batch_pending_timeout = int(
-                            os.getenv("BATCH_PENDING_TIMEOUT_SECONDS", "2400")
-                        )
-                        gap_pending_timeout = int(
-                            os.getenv("GAP_PENDING_TIMEOUT_SECONDS", "180")
-                        )
-
-                        clear_stable_signal = False
-                        clear_batch_state = False
-                        with lock:
-                            if (
-                                instId in stable_pending_buys
-                                and instId not in stable_active_orders
-                            ):
-                                stable_elapsed = now_ts - stable_pending_buys[instId]
-                                if stable_elapsed > stable_pending_timeout:
-                                    del stable_pending_buys[instId]
-                                    clear_stable_signal = True
-                                    logger.warning(
-                                        f"🧹 Cleaned stale stable_pending_buys "
-                                        f"for {instId} (pending {stable_elapsed:.1f}s)"
-                                    )
-
-                            if (
-                                instId in batch_pending_buys
-                                and instId not in batch_active_orders
-                            ):
-                                batch_elapsed = now_ts - batch_pending_buys[instId]
-                                if batch_elapsed > batch_pending_timeout:
-                                    del batch_pending_buys[instId]
-                                    clear_batch_state = True
-                                    logger.warning(
-                                        f"🧹 Cleaned stale batch_pending_buys "
-                                        f"for {instId} (pending {batch_elapsed:.1f}s)"
-                                    )
-
-                            if (
-                                instId in gap_pending_buys
-                                and instId not in gap_active_orders
-                            ):
-                                gap_elapsed = now_ts - gap_pending_buys[instId]
-                                if gap_elapsed > gap_pending_timeout:
-                                    del gap_pending_buys[instId]
-                                    logger.warning(
-                                        f"🧹 Cleaned stale gap_pending_buys "
-                                        f"for {instId} (pending {gap_elapsed:.1f}s)"
-                                    )
-
-                        if clear_stable_signal and stable_strategy is not None:
-                            stable_strategy.clear_signal(instId)
-                        if clear_batch_state and batch_strategy is not None:
-                            batch_strategy.reset_crypto(instId)
-
-                        # ✅ FIX: Always update stable strategy (even if price unchanged)
-                        # Allows stability seconds to accumulate during flat markets
-                        # Runs independently, outside main lock to avoid deadlock
-                        # stable_strategy has its own RLock, so calling it is safe
-                        if stable_strategy is not None:
-                            stable_strategy.update_price(instId, last_price)
-                            # Check if stable strategy has pending signal ready
-                            limit_price_stable = stable_strategy.check_stability(instId)
-                            if limit_price_stable:
-                                # Check stable strategy state (thread-safe check)
-                                with lock:
-                                    if (
-                                        instId in stable_pending_buys
-                                        and instId not in stable_active_orders
-                                    ):
-                                        should_trigger_stable = True
-                                    else:
-                                        should_trigger_stable = False
-
-                                if should_trigger_stable:
-                                    # Price is stable, trigger buy
-                                    logger.warning(
-                                        f"✅ STABLE BUY READY: {instId}, "
-                                        f"limit={limit_price_stable:.6f}"
-                                    )
-                                    if thread_pool:
-                                        thread_pool.submit(
-                                            process_stable_buy_signal_func,
-                                            instId,
-                                            limit_price_stable,
-                                        )
-                                    else:
-                                        threading.Thread(
-                                            target=process_stable_buy_signal_func,
-                                            args=(instId, limit_price_stable),
-                                            daemon=True,
-                                        ).start()
-
-                        # ✅ FIX: Skip original if price unchanged
-                        # Already-active check done atomically later under lock
-                        # Stable strategy already ran above, accumulates stability
-                        if price_unchanged:
-                            continue
-
-                        # Get reference price and limit_percent outside lock
-                        with lock:
-                            ref_price = reference_prices.get(instId)
-                            limit_percent = crypto_limits[instId]
-
-                        if ref_price is None or ref_price <= 0:
-                            with lock:
-                                last_fetch = reference_price_fetch_time.get(instId, 0)
-                                fetch_attempts = reference_price_fetch_attempts.get(
-                                    instId, 0
-                                )
-                                time_since_fetch = time.time() - last_fetch
-                                min_wait = min(5 * (2 ** min(fetch_attempts, 4)), 60)
-
-                                if time_since_fetch < min_wait:
-                                    logger.debug(
-                                        f"⏳ Skipping reference price fetch "
-                                        f"for {instId}: backoff "
-                                        f"({time_since_fetch:.1f}s < {min_wait}s)"
-                                    )
-                                    continue
-
-                                reference_price_fetch_time[instId] = time.time()
-
-                            logger.warning(
-                                f"⚠️ No reference price for {instId}, "
-                                f"fetching current hour's open..."
-                            )
-                            ref_price = fetch_current_hour_open_price_func(instId)
-                            if ref_price and ref_price > 0:
-                                with lock:
-                                    if (
-                                        instId not in pending_buys
-                                        and instId not in active_orders
-                                    ):
-                                        reference_prices[instId] = ref_price
-                                        reference_price_fetch_attempts[instId] = 0
-                            else:
-                                with lock:
-                                    reference_price_fetch_attempts[instId] = (
-                                        fetch_attempts + 1
-                                    )
-                                logger.warning(
-                                    f"⚠️ Failed to get reference price for {instId}, "
-                                    f"skipping buy check (will retry after backoff, "
-                                    f"attempts={fetch_attempts + 1})"
-                                )
-                                continue
-
-                        limit_price = calculate_limit_price_func(
-                            ref_price, limit_percent, instId
+                        evaluate_ticker(
+                            instId,
+                            last_price,
+                            crypto_limits,
+                            current_prices,
+                            reference_prices,
+                            reference_price_fetch_time,
+                            reference_price_fetch_attempts,
+                            pending_buys,
+                            active_orders,
+                            stable_active_orders,
+                            stable_pending_buys,
+                            stable_strategy,
+                            batch_active_orders,
+                            batch_pending_buys,
+                            batch_strategy,
+                            gap_active_orders,
+                            gap_pending_buys,
+                            lock,
+                            fetch_current_hour_open_price_func,
+                            calculate_limit_price_func,
+                            process_buy_signal_func,
+                            process_stable_buy_signal_func,
+                            process_batch_buy_signal_func,
+                            process_gap_buy_signal_func,
+                            check_gap_recent_buy_func,
+                            check_2h_gain_filter_func,
+                            thread_pool,
+                            trigger_table,
+                            instrument_states,
+                            reference_rollover,
                         )
+    except Exception as e:
+        logger.error(f"Ticker message error: {msg_string}, {e}")
 
-                        # Check stable strategy buy signal independently
-                        # (before original strategy check)
-                        # This allows stable strategy to register even when
-                        # original strategy is active
-                        if stable_strategy is not None and last_price <= limit_price:
-                            # Check if not already registered or active
-                            # for stable strategy
-                            with lock:
-                                instId_not_in_stable = (
-                                    instId not in stable_pending_buys
-                                    and instId not in stable_active_orders
-                                )
-
-                            if instId_not_in_stable:
-                                # Check 2h gain filter for stable strategy too
-                                should_skip_buy_stable, gain_pct_stable = (
-                                    check_2h_gain_filter_func(instId, ref_price)
-                                )
-                                if not should_skip_buy_stable:
-                                    # Register stable buy signal
-                                    # (will wait for stability)
-                                    # register_buy_signal uses its own RLock,
-                                    # safe to call outside main lock
-                                    if stable_strategy.register_buy_signal(
-                                        instId, limit_price
-                                    ):
-                                        with lock:
-                                            stable_pending_buys[instId] = time.time()
-                                        logger.warning(
-                                            f"📝 STABLE BUY SIGNAL REGISTERED: "
-                                            f"{instId}, limit={limit_price:.6f}, "
-                                            f"waiting for stability"
-                                        )
-
-                        # Check batch strategy buy signal independently
-                        # (before original strategy check)
-                        # This allows batch strategy to register even when
-                        # other strategies are active
-                        if batch_strategy is not None and last_price <= limit_price:
-                            # Check if not already registered or active
-                            # for batch strategy
-                            with lock:
-                                instId_not_in_batch = (
-                                    instId not in batch_pending_buys
-                                    and instId not in batch_active_orders
-                                )
-
-                            if instId_not_in_batch:
-                                # Check 2h gain filter for batch strategy too
-                                should_skip_buy_batch, gain_pct_batch = (
-                                    check_2h_gain_filter_func(instId, ref_price)
-                                )
-                                if not should_skip_buy_batch:
-                                    # Register batch buy signal
-                                    # (will trigger first batch immediately)
-                                    # register_buy_signal uses its own RLock,
-                                    # safe to call outside main lock
-                                    if batch_strategy.register_buy_signal(
-                                        instId, limit_price
-                                    ):
-                                        with lock:
-                                            batch_pending_buys[instId] = time.time()
-                                        logger.warning(
-                                            f"📝 BATCH BUY SIGNAL REGISTERED: {instId}, "
-                                            f"limit={limit_price:.6f}, "
-                                            f"batches=30/30/40 USDT"
-                                        )
-                                        # Trigger first batch immediately
-                                        # ✅ FIX: Removed manual thread scheduling
-                                        # to avoid thread storm
-                                        # Batch strategy's get_next_batch() already
-                                        # checks time delays
-                                        # Subsequent batches will be triggered
-                                        # automatically when time is ready
-                                        if thread_pool:
-                                            thread_pool.submit(
-                                                process_batch_buy_signal_func,
-                                                instId,
-                                                limit_price,
-                                            )
-                                        else:
-                                            threading.Thread(
-                                                target=process_batch_buy_signal_func,
-                                                args=(instId, limit_price),
-                                                daemon=True,
-                                            ).start()
-
-                        # Original-gap strategy (cooldown-based)
-                        if last_price <= limit_price:
-                            with lock:
-                                instId_not_in_gap = (
-                                    instId not in gap_pending_buys
-                                    and instId not in gap_active_orders
-                                )
 
-                            if instId_not_in_gap:
-                                should_skip_buy_gap, gain_pct_gap = (
-                                    check_2h_gain_filter_func(instId, ref_price)
-                                )
-                                if should_skip_buy_gap:
-                                    msg = (
-                                        f"🚫 {instId} GAP BUY BLOCKED "
-                                        "by 2h gain filter: "
-                                        f"gain={gain_pct_gap:.2f}% > 5% "
-                                        f"(current_open=${ref_price:.6f})"
-                                    )
-                                    logger.warning(msg)
-                                elif check_gap_recent_buy_func(instId):
-                                    logger.warning(
-                                        f"⏳ {instId} GAP BUY BLOCKED: "
-                                        "global cooldown (any gap buy within 30m)"
-                                    )
-                                else:
-                                    with lock:
-                                        gap_pending_buys[instId] = time.time()
-                                    msg = (
-                                        f"🧭 GAP BUY SIGNAL: {instId}, "
-                                        f"current={last_price:.6f} <= "
-                                        f"limit={limit_price:.6f} "
-                                        f"(ref={ref_price:.6f}, {limit_percent}%)"
-                                    )
-                                    logger.warning(msg)
-                                    if thread_pool:
-                                        thread_pool.submit(
-                                            process_gap_buy_signal_func,
-                                            instId,
-                                            limit_price,
-                                        )
-                                    else:
-                                        threading.Thread(
-                                            target=process_gap_buy_signal_func,
-                                            args=(instId, limit_price),
-                                            daemon=True,
-                                        ).start()
-
-                        if last_price <= limit_price:
-                            # ✅ NEW: Check 2-hour gain filter before buying
-                            should_skip_buy, gain_pct = check_2h_gain_filter_func(
-                                instId, ref_price
-                            )
-                            if should_skip_buy:
-                                logger.warning(
-                                    f"🚫 {instId} BUY BLOCKED by 2h gain filter: "
-                                    f"gain={gain_pct:.2f}% > 5% "
-                                    f"(current_open=${ref_price:.6f})"
-                                )
-                                continue
-
-                            with lock:
-                                # ✅ NEW: Check for stale pending_buys (timeout > 60s)
-                                if instId in pending_buys:
-                                    pending_since = pending_buys[instId]
-                                    elapsed = time.time() - pending_since
-                                    if elapsed > 60:
-                                        # Stale pending, clean up and allow retry
-                                        logger.warning(
-                                            f"🧹 Cleaned stale pending_buys for "
-                                            f"{instId} (pending for {elapsed:.1f}s)"
-                                        )
-                                        del pending_buys[instId]
-                                    else:
-                                        logger.debug(
-                                            f"⏭️ {instId} ORIGIN SKIPPED: "
-                                            f"pending for {elapsed:.1f}s"
-                                        )
-                                        continue
+def on_ticker_message_conflated(
+    ws,
+    msg_string: str,
+    crypto_limits: dict,
+    ingest_queue,
+):
+    """Handle ticker WebSocket messages (receive stage only)
 
-                                if instId in active_orders:
-                                    logger.debug(
-                                        f"⏭️ {instId} ORIGIN SKIPPED: "
-                                        f"active order exists"
-                                    )
-                                    continue
+    Parses the frame and hands the latest price per instrument to a
+    ConflatingTickerQueue; strategies run on its evaluator workers.
+    """
+    if msg_string == "pong":
+        return
 
-                                pending_buys[instId] = time.time()
+    recv_ts = time.time()
+    try:
+        m = json.loads(msg_string)
+        ev = m.get("event")
+        data = m.get("data")
 
-                            gain_info = (
-                                f", 2h_gain={gain_pct:.2f}%"
-                                if gain_pct is not None
-                                else ""
-                            )
-                            logger.warning(
-                                f"🚀 BUY SIGNAL: {instId}, "
-                                f"current={last_price:.6f} <= limit={limit_price:.6f} "
-                                f"(ref={ref_price:.6f}, {limit_percent}%{gain_info})"
-                            )
-                            # ✅ OPTIMIZED: Use thread pool if available,
-                            # otherwise create thread
-                            if thread_pool:
-                                thread_pool.submit(
-                                    process_buy_signal_func, instId, limit_price
-                                )
-                            else:
-                                threading.Thread(
-                                    target=process_buy_signal_func,
-                                    args=(instId, limit_price),
-                                    daemon=True,
-                                ).start()
-                        else:
-                            # Reduce high-frequency market data logging
-                            import os
-
-                            reduce_market_logs = (
-                                os.getenv("REDUCE_MARKET_DATA_LOGS", "true").lower()
-                                == "true"
-                            )
-                            if not reduce_market_logs:
-                                price_diff_pct = (
-                                    (last_price - limit_price) / ref_price
-                                ) * 100
-                                if price_diff_pct < 2.0:
-                                    logger.debug(
-                                        f"📊 {instId} close to limit: "
-                                        f"current={last_price:.6f}, "
-                                        f"limit={limit_price:.6f}, "
-                                        f"diff={price_diff_pct:.2f}%"
-                                    )
+        if ev == "error":
+            logger.error(f"Ticker WebSocket error: {msg_string}")
+        elif ev in ["subscribe", "unsubscribe"]:
+            logger.info(f"Ticker {ev}: {msg_string}")
+        elif data and isinstance(data, list):
+            for ticker in data:
+                instId = ticker.get("instId")
+                if instId in crypto_limits:
+                    last_price = float(ticker.get("last", 0))
+                    if last_price > 0:
+                        ingest_queue.offer(instId, last_price, recv_ts)
+            ingest_queue.record_receive(time.time() - recv_ts)
     except Exception as e:
         logger.error(f"Ticker message error: {msg_string}, {e}")
 
@@ -476,6 +562,9 @@ def on_candle_message(
     lock: threading.Lock,
     process_sell_signal_func,
     thread_pool=None,  # Optional thread pool for async processing
+    record_confirmed_candle_func=None,  # Optional 1H candle buffer feed
+    trigger_table=None,  # Optional precomputed limit prices (TriggerTable)
+    reference_rollover=None,  # Optional ReferenceRollover (new-hour readiness)
 ):
     """Handle candle WebSocket messages"""
     if msg_string == "pong":
@@ -504,8 +593,9 @@ def on_candle_message(
                     open_price = float(candle_data[1])
                     confirm = str(candle_data[8])
 
+                    inst_lock = instrument_lock(lock, instId)
                     if instId in crypto_limits:
-                        with lock:
+                        with inst_lock:
                             current_hour = datetime.now().replace(
                                 minute=0, second=0, microsecond=0
                             )
@@ -514,6 +604,14 @@ def on_candle_message(
                             )
                             if time_diff <= 60:
                                 reference_prices[instId] = open_price
+                                if trigger_table is not None:
+                                    trigger_table.update(
+                                        instId, open_price, crypto_limits[instId]
+                                    )
+                                if reference_rollover is not None:
+                                    reference_rollover.observe_candle(
+                                        instId, int(candle_data[0])
+                                    )
                                 if (
                                     instId in reference_price_fetch_attempts
                                     and reference_price_fetch_attempts[instId] > 0
@@ -532,10 +630,14 @@ def on_candle_message(
 
                     if confirm == "1":
                         now = datetime.now()
-                        with lock:
+                        with inst_lock:
                             last_1h_candle_time[instId] = now
 
-                        with lock:
+                        # ✅ NEW: Keep 1H candle history current for 2h gain filter
+                        if record_confirmed_candle_func is not None:
+                            record_confirmed_candle_func(instId, candle_data)
+
+                        with inst_lock:
                             now = datetime.now()
 
                             # Check original strategy orders
@@ -584,11 +686,9 @@ def on_candle_message(
                                             "original",
                                         )
                                     else:
-                                        threading.Thread(
-                                            target=process_sell_signal_func,
-                                            args=(instId, "original"),
-                                            daemon=True,
-                                        ).start()
+                                        spawn(
+                                            process_sell_signal_func, instId, "original"
+                                        )
 
                             # Check stable strategy orders
                             if instId in stable_active_orders:
@@ -637,11 +737,9 @@ def on_candle_message(
                                             "stable",
                                         )
                                     else:
-                                        threading.Thread(
-                                            target=process_sell_signal_func,
-                                            args=(instId, "stable"),
-                                            daemon=True,
-                                        ).start()
+                                        spawn(
+                                            process_sell_signal_func, instId, "stable"
+                                        )
 
                             # Check batch strategy orders
                             if instId in batch_active_orders:
@@ -688,11 +786,7 @@ def on_candle_message(
                                             "batch",
                                         )
                                     else:
-                                        threading.Thread(
-                                            target=process_sell_signal_func,
-                                            args=(instId, "batch"),
-                                            daemon=True,
-                                        ).start()
+                                        spawn(process_sell_signal_func, instId, "batch")
 
                             # Check original-gap strategy orders
                             if instId in gap_active_orders:
@@ -737,11 +831,7 @@ def on_candle_message(
                                             "gap",
                                         )
                                     else:
-                                        threading.Thread(
-                                            target=process_sell_signal_func,
-                                            args=(instId, "gap"),
-                                            daemon=True,
-                                        ).start()
+                                        spawn(process_sell_signal_func, instId, "gap")
 
     except Exception as e:
         logger.error(f"Candle message error: {msg_string}, {e}")
@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebSocket Order Gateway
+Places and cancels orders as `order` / `batch-orders` / `cancel-order` ops on
+a logged-in private WebSocket, correlating responses by request id, with
+REST as the fallback whenever the socket is not ready or a request times out
+"""
+
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import websocket
+
+from .order_state import PRIVATE_WS_DEMO_URL, PRIVATE_WS_URL, _login_args
+from .rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+WS_ORDERS_ENABLED = os.getenv("WS_ORDERS_ENABLED", "true").lower() == "true"
+# Seconds to wait for an op response before falling back to REST
+WS_ORDER_TIMEOUT_SECONDS = float(os.getenv("WS_ORDER_TIMEOUT_SECONDS", "2.0"))
+# After a timeout the order may still be in flight: keep looking its clOrdId
+# up for this long before concluding it was not placed
+WS_ORDER_LOOKUP_GRACE_SECONDS = float(os.getenv("WS_ORDER_LOOKUP_GRACE_SECONDS", "5.0"))
+WS_ORDER_LOOKUP_INTERVAL_SECONDS = float(
+    os.getenv("WS_ORDER_LOOKUP_INTERVAL_SECONDS", "1.0")
+)
+
+# OKX: clOrdId already used by a pending order
+DUPLICATE_CLORDID_SCODE = "51016"
+
+
+class GatewayUnavailable(RuntimeError):
+    """Request was not sent (socket down or not logged in): REST is safe"""
+
+
+class GatewayTimeout(RuntimeError):
+    """Request was sent but no response arrived (it may have been executed)"""
+
+
+def new_client_order_id() -> str:
+    """clOrdId for idempotent REST retries (alphanumeric, max 32 chars)"""
+    return uuid.uuid4().hex
+
+
+class WsOrderGateway:
+    """Logged-in private socket submitting order ops
+
+    on_open/on_message/on_close follow the WebSocketApp callback signature
+    (like PrivateOrdersStream), so the gateway runs under run_forever()
+    (thread mode) or AsyncEngine.add_socket (asyncio mode). Calls block the
+    calling thread until the matching response, and return the same
+    {"code", "msg", "data"} shape as the REST TradeAPI methods.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        secret: str,
+        passphrase: str,
+        demo: bool = False,
+        url: Optional[str] = None,
+        timeout_seconds: float = WS_ORDER_TIMEOUT_SECONDS,
+    ):
+        self.api_key = api_key
+        self.secret = secret
+        self.passphrase = passphrase
+        self.url = url or (PRIVATE_WS_DEMO_URL if demo else PRIVATE_WS_URL)
+        self.timeout_seconds = timeout_seconds
+        self._ws = None
+        self._ready = False
+        self._ids = itertools.count(1)
+        self._pending: Dict[str, list] = {}  # id -> [Event, response]
+        self._lock = threading.Lock()
+        # Stats
+        self.sent = 0
+        self.timeouts = 0
+        self.fallbacks = 0  # Calls routed to REST after a WebSocket failure
+        self.latency_total_ms = 0.0
+        self.latency_max_ms = 0.0
+
+    # Socket callbacks -------------------------------------------------
+
+    def on_open(self, ws):
+        logger.warning("Order gateway WebSocket opened, logging in")
+        with self._lock:
+            self._ws = ws
+            self._ready = False
+        ws.send(
+            json.dumps(
+                {
+                    "op": "login",
+                    "args": [_login_args(self.api_key, self.secret, self.passphrase)],
+                }
+            )
+        )
+
+    def on_message(self, ws, msg_string):
+        if msg_string == "pong":
+            return
+        try:
+            m = json.loads(msg_string)
+            if m.get("event") == "login":
+                if m.get("code") == "0":
+                    self._ready = True
+                    logger.warning(
+                        "✅ Order gateway logged in, orders go over WebSocket"
+                    )
+                else:
+                    logger.error(f"❌ Order gateway login failed: {msg_string}")
+                return
+            if m.get("event") == "error":
+                logger.error(f"Order gateway WebSocket error: {msg_string}")
+                return
+            request_id = m.get("id")
+            if request_id is None:
+                return
+            with self._lock:
+                entry = self._pending.get(request_id)
+            if entry is not None:
+                entry[1] = m
+                entry[0].set()
+        except Exception as e:
+            logger.error(f"Order gateway message error: {e}")
+
+    def on_close(self, ws, close_status_code=None, close_msg=None):
+        with self._lock:
+            self._ws = None
+            self._ready = False
+            pending = list(self._pending.values())
+        # Wake waiters now instead of at their timeout
+        for event, _ in pending:
+            event.set()
+        logger.warning(
+            f"Order gateway WebSocket closed: code={close_status_code}, msg={close_msg}"
+        )
+
+    def is_ready(self) -> bool:
+        return self._ready
+
+    # Requests ---------------------------------------------------------
+
+    def request(self, op: str, args: List[dict], method: str) -> dict:
+        """Send one op and wait for its response
+
+        Raises:
+            GatewayUnavailable: not sent, the caller may use REST
+            GatewayTimeout: sent without a response, the order may exist
+        """
+        if not self._ready:
+            raise GatewayUnavailable("order gateway not logged in")
+        # Same per-user budget as the REST endpoint (OKX shares the limit)
+        get_rate_limiter().acquire("trade", method)
+        request_id = str(next(self._ids))
+        entry = [threading.Event(), None]
+        with self._lock:
+            ws = self._ws
+            if ws is None or not self._ready:
+                raise GatewayUnavailable("order gateway not logged in")
+            self._pending[request_id] = entry
+        started = time.perf_counter()
+        try:
+            try:
+                ws.send(json.dumps({"id": request_id, "op": op, "args": args}))
+            except Exception as e:
+                raise GatewayUnavailable(f"send failed: {e}")
+            self.sent += 1
+            entry[0].wait(self.timeout_seconds)
+            response = entry[1]
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+        if response is None:
+            self.timeouts += 1
+            raise GatewayTimeout(f"no response to {op} id={request_id}")
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.latency_total_ms += elapsed_ms
+        self.latency_max_ms = max(self.latency_max_ms, elapsed_ms)
+        return {
+            "code": response.get("code", ""),
+            "msg": response.get("msg", ""),
+            "data": response.get("data", []),
+            "source": "ws",
+        }
+
+    def place_order(self, **order) -> dict:
+        return self.request("order", [order], "place_order")
+
+    def place_multiple_orders(self, orders_data: List[dict]) -> dict:
+        return self.request("batch-orders", list(orders_data), "place_multiple_orders")
+
+    def cancel_order(self, instId: str, ordId: str = "", clOrdId: str = "") -> dict:
+        args = {"instId": instId}
+        if ordId:
+            args["ordId"] = ordId
+        if clOrdId:
+            args["clOrdId"] = clOrdId
+        return self.request("cancel-order", [args], "cancel_order")
+
+    # Thread mode ------------------------------------------------------
+
+    def run_forever(self):
+        """Thread-mode loop: connect, keep alive with pings, reconnect"""
+        reconnect_delay = 1.0
+        while True:
+            connected_at = time.time()
+            try:
+                ws = websocket.WebSocketApp(
+                    self.url,
+                    on_open=self.on_open,
+                    on_message=self.on_message,
+                    on_error=lambda ws, error: logger.warning(
+                        f"Order gateway WebSocket error: {error}"
+                    ),
+                    on_close=self.on_close,
+                )
+
+                def send_ping(ws=ws):
+                    while True:
+                        time.sleep(20)
+                        try:
+                            ws.send("ping")
+                        except Exception:
+                            break
+
+                threading.Thread(
+                    target=send_ping, daemon=True, name="OrderGatewayPing"
+                ).start()
+                ws.run_forever()
+            except Exception as e:
+                logger.error(f"Order gateway WebSocket connection failed: {e}")
+            self.on_close(None)
+            if time.time() - connected_at >= 60:
+                reconnect_delay = 1.0
+            time.sleep(reconnect_delay)
+            reconnect_delay = min(reconnect_delay * 2, 60.0)
+
+    def format_stats(self, reset: bool = False) -> str:
+        answered = self.sent - self.timeouts
+        avg_ms = self.latency_total_ms / answered if answered else 0.0
+        line = (
+            f"🔌 Order gateway: ready={self._ready}, sent={self.sent}, "
+            f"timeouts={self.timeouts}, REST fallbacks={self.fallbacks}, "
+            f"avg {avg_ms:.0f}ms, "
+            f"max {self.latency_max_ms:.0f}ms"
+        )
+        if reset:
+            self.sent = self.timeouts = self.fallbacks = 0
+            self.latency_total_ms = self.latency_max_ms = 0.0
+        return line
+
+
+_gateway: Optional[WsOrderGateway] = None
+
+
+def set_order_gateway(gateway: Optional[WsOrderGateway]):
+    """Route order placement/cancellation through gateway (None = REST only)"""
+    global _gateway
+    _gateway = gateway
+
+
+def get_order_gateway() -> Optional[WsOrderGateway]:
+    return _gateway
+
+
+class OrderRoutingAPI:
+    """TradeAPI proxy sending place/cancel calls through the gateway when it
+    is logged in, REST otherwise; every other method goes to REST
+
+    Orders get a clOrdId. After a WebSocket timeout the order may have been
+    placed (and filled: market sells, marketable limit buys), so its clOrdId
+    is looked up for a grace period first. Only limit orders OKX still does
+    not know are then sent over REST; a market order is never resent after
+    an ambiguous timeout (a duplicate clOrdId is only rejected while the
+    first order is pending, and a market order fills at once) and is left
+    to order_sync. A duplicate clOrdId rejection of the REST retry (51016)
+    is resolved to the existing ordId as a backstop.
+    """
+
+    def __init__(self, rest_api):
+        self._rest = rest_api
+
+    def __getattr__(self, name: str):
+        return getattr(self._rest, name)
+
+    def _gateway(self) -> Optional[WsOrderGateway]:
+        gateway = _gateway
+        if gateway is not None and gateway.is_ready():
+            return gateway
+        return None
+
+    def place_order(self, **order) -> dict:
+        gateway = self._gateway()
+        if gateway is None:
+            return self._rest.place_order(**order)
+        order.setdefault("clOrdId", new_client_order_id())
+        try:
+            return gateway.place_order(**order)
+        except GatewayUnavailable as e:
+            logger.warning(
+                f"⚠️ WS order for {order.get('instId')} not sent ({e}), using REST"
+            )
+        except GatewayTimeout as e:
+            logger.warning(
+                f"⚠️ WS order for {order.get('instId')} timed out ({e}), "
+                f"checking clOrdId {order['clOrdId']} before REST"
+            )
+            entry = self._find_placed([order])[0]
+            if entry is not None:
+                return _batch_result([entry])
+        gateway.fallbacks += 1
+        result = self._rest.place_order(**order)
+        self._resolve_duplicates(result, [order])
+        return result
+
+    def place_multiple_orders(self, orders_data: List[dict]) -> dict:
+        gateway = self._gateway()
+        if gateway is None:
+            return self._rest.place_multiple_orders(orders_data)
+        orders = [
+            dict(order, clOrdId=order.get("clOrdId") or new_client_order_id())
+            for order in orders_data
+        ]
+        entries: List[Optional[dict]] = [None] * len(orders)
+        try:
+            return gateway.place_multiple_orders(orders)
+        except GatewayUnavailable as e:
+            logger.warning(
+                f"⚠️ WS batch of {len(orders)} orders not sent ({e}), using REST"
+            )
+        except GatewayTimeout as e:
+            logger.warning(
+                f"⚠️ WS batch of {len(orders)} orders timed out ({e}), "
+                f"checking clOrdIds before REST"
+            )
+            entries = self._find_placed(orders)
+        resend = [i for i, entry in enumerate(entries) if entry is None]
+        if resend:
+            gateway.fallbacks += 1
+            retry = [orders[i] for i in resend]
+            result = self._rest.place_multiple_orders(retry)
+            self._resolve_duplicates(result, retry)
+            data = result.get("data") or []
+            for j, i in enumerate(resend):
+                entries[i] = (
+                    data[j]
+                    if j < len(data)
+                    else {
+                        "clOrdId": orders[i]["clOrdId"],
+                        "ordId": "",
+                        "sCode": result.get("code") or "1",
+                        "sMsg": result.get("msg", ""),
+                    }
+                )
+        return _batch_result(entries)
+
+    def cancel_order(self, instId: str, ordId: str = "", clOrdId: str = "") -> dict:
+        gateway = self._gateway()
+        if gateway is not None:
+            try:
+                return gateway.cancel_order(instId=instId, ordId=ordId, clOrdId=clOrdId)
+            except (GatewayUnavailable, GatewayTimeout) as e:
+                logger.warning(f"⚠️ WS cancel for {instId} failed ({e}), using REST")
+            gateway.fallbacks += 1
+        return self._rest.cancel_order(instId=instId, ordId=ordId, clOrdId=clOrdId)
+
+    def _resolve_duplicates(self, result: dict, orders: List[dict]):
+        """Fill in ordIds for orders the timed-out WebSocket request placed"""
+        data = result.get("data") or []
+        resolved = False
+        for order, entry in zip(orders, data):
+            if entry.get("sCode") != DUPLICATE_CLORDID_SCODE:
+                continue
+            try:
+                existing = self._rest.get_order(
+                    instId=order["instId"], clOrdId=order["clOrdId"]
+                )
+            except Exception as e:
+                logger.error(f"❌ Could not look up {order['clOrdId']}: {e}")
+                continue
+            if existing.get("code") == "0" and existing.get("data"):
+                entry.update(
+                    ordId=existing["data"][0].get("ordId", ""), sCode="0", sMsg=""
+                )
+                resolved = True
+        if resolved and all(entry.get("sCode") == "0" for entry in data):
+            result["code"] = "0"
+
+    def _find_placed(self, orders: List[dict]) -> List[Optional[dict]]:
+        """Placement entries for orders a timed-out request may have placed
+
+        Polls orders-pending, then orders-history, for each instrument until
+        every clOrdId is found or WS_ORDER_LOOKUP_GRACE_SECONDS have passed.
+        An entry is None only for a limit order no lookup found, i.e. one
+        that is safe to send over REST. Market orders not found and orders
+        whose lookup failed are reported as rejected, never sent again.
+        """
+        entries: List[Optional[dict]] = [None] * len(orders)
+        errors: Dict[int, str] = {}
+        deadline = time.monotonic() + WS_ORDER_LOOKUP_GRACE_SECONDS
+        while True:
+            by_instrument: Dict[str, List[int]] = {}
+            for i, order in enumerate(orders):
+                if entries[i] is None and i not in errors:
+                    by_instrument.setdefault(order["instId"], []).append(i)
+            for instId, indexes in by_instrument.items():
+                wanted = {orders[i]["clOrdId"] for i in indexes}
+                try:
+                    found = self._lookup_client_orders(instId, wanted)
+                except Exception as e:
+                    for i in indexes:
+                        errors[i] = str(e)
+                    continue
+                for i in indexes:
+                    existing = found.get(orders[i]["clOrdId"])
+                    if existing is not None:
+                        logger.warning(
+                            f"✅ WS order {orders[i]['clOrdId']} for {instId} was "
+                            f"placed, not retrying"
+                        )
+                        entries[i] = {
+                            "clOrdId": orders[i]["clOrdId"],
+                            "ordId": existing.get("ordId", ""),
+                            "sCode": "0",
+                            "sMsg": "",
+                        }
+            searching = any(
+                entry is None and i not in errors for i, entry in enumerate(entries)
+            )
+            if not searching or time.monotonic() >= deadline:
+                break
+            time.sleep(WS_ORDER_LOOKUP_INTERVAL_SECONDS)
+
+        for i, order in enumerate(orders):
+            if i in errors:
+                logger.error(
+                    f"❌ Lookup of {order['clOrdId']} after WS timeout failed "
+                    f"({errors[i]}), not retrying"
+                )
+                entries[i] = _unknown_entry(
+                    order, f"WS timeout, order state unknown: {errors[i]}"
+                )
+            elif entries[i] is None and order.get("ordType") == "market":
+                logger.error(
+                    f"❌ Market order {order['clOrdId']} for {order['instId']} not "
+                    f"found {WS_ORDER_LOOKUP_GRACE_SECONDS:.0f}s after WS timeout, "
+                    f"not resending (left to order sync)"
+                )
+                entries[i] = _unknown_entry(
+                    order, "WS timeout, market order not found, not resent"
+                )
+        return entries
+
+    def _lookup_client_orders(self, instId: str, clOrdIds: set) -> Dict[str, dict]:
+        """clOrdId -> order among instId's pending, then recent history orders
+
+        Raises:
+            RuntimeError: OKX answered with an error code
+        """
+        found: Dict[str, dict] = {}
+        for method in ("get_order_list", "get_orders_history"):
+            result = getattr(self._rest, method)(instType="SPOT", instId=instId)
+            if result.get("code") != "0":
+                raise RuntimeError(
+                    f"{method}: code={result.get('code')}: {result.get('msg')}"
+                )
+            for order in result.get("data") or []:
+                if order.get("clOrdId") in clOrdIds:
+                    found[order["clOrdId"]] = order
+            if clOrdIds <= found.keys():
+                break
+        return found
+
+
+def _unknown_entry(order: dict, message: str) -> dict:
+    """Rejected placement entry for an order whose state is unknown"""
+    return {
+        "clOrdId": order["clOrdId"],
+        "ordId": "",
+        "sCode": "1",
+        "sMsg": message,
+    }
+
+
+def _batch_result(entries: List[dict]) -> dict:
+    """TradeAPI-shaped result: code 0 all placed, 2 some, 1 none"""
+    placed = sum(1 for entry in entries if entry.get("sCode") == "0")
+    if placed == len(entries):
+        code = "0"
+    elif placed:
+        code = "2"
+    else:
+        code = "1"
+    return {"code": code, "msg": "", "data": entries}
@@ -6,11 +6,15 @@ Responsible for querying blacklisted cryptocurrencies from database
 
 import logging
 import os
-from typing import Optional, Set
+import threading
+import time
+from typing import Dict, Optional, Set
 
 import psycopg
 from psycopg.rows import dict_row
 
+from .db_pool import connection as db_connection
+
 # Load environment variables first
 try:
     from dotenv import load_dotenv
@@ -23,6 +27,19 @@ except ImportError:
 
     load_dotenv()
 
+# Postgres NOTIFY channel raised by the blacklist change trigger
+BLACKLIST_NOTIFY_CHANNEL = "blacklist_changed"
+# Trigger raising BLACKLIST_NOTIFY_CHANNEL (installed by init_database.py)
+BLACKLIST_NOTIFY_TRIGGER = "blacklist_changed_notify"
+# Max staleness of the in-process cache (backstop even while listening)
+BLACKLIST_CACHE_TTL_SECONDS = int(os.getenv("BLACKLIST_CACHE_TTL_SECONDS", "300"))
+BLACKLIST_NOTIFY_ENABLED = (
+    os.getenv("BLACKLIST_NOTIFY_ENABLED", "true").lower() == "true"
+)
+
+_shared_cache: Optional["BlacklistCache"] = None
+_shared_cache_lock = threading.Lock()
+
 
 class BlacklistManager:
     """Blacklist Manager for cryptocurrency monitoring"""
@@ -47,7 +64,7 @@ class BlacklistManager:
                 )
                 return set()
 
-            with psycopg.connect(self.db_config) as conn:
+            with db_connection(self.db_config) as conn:
                 with conn.cursor(row_factory=dict_row) as cursor:
                     cursor.execute(
                         """
@@ -72,13 +89,98 @@ class BlacklistManager:
             self.logger.error(f"❌ Error loading blacklist: {e}")
             return set()
 
+    def get_blacklist_entries(self) -> Optional[Dict[str, str]]:
+        """Get active blacklist entries as symbol -> "type: reason"
+
+        Returns:
+            Dict of blacklisted symbols, or None if the query failed
+            (so callers can keep their last known good copy)
+        """
+        try:
+            if not self.db_config:
+                return {}
+
+            with db_connection(self.db_config) as conn:
+                with conn.cursor(row_factory=dict_row) as cursor:
+                    cursor.execute(
+                        """
+                        SELECT crypto_symbol, reason, blacklist_type
+                        FROM blacklist
+                        WHERE is_active = TRUE
+                    """
+                    )
+                    return {
+                        row[
+                            "crypto_symbol"
+                        ]: f"{row['blacklist_type']}: {row['reason']}"
+                        for row in cursor.fetchall()
+                    }
+
+        except Exception as e:
+            self.logger.error(f"❌ Error loading blacklist entries: {e}")
+            return None
+
+    def install_change_trigger(self) -> bool:
+        """Install a trigger that NOTIFYs BLACKLIST_NOTIFY_CHANNEL on any change
+
+        Lets long-running processes keep an in-memory blacklist current
+        without polling (see BlacklistCache).
+        """
+        try:
+            if not self.db_config:
+                return False
+
+            with db_connection(self.db_config) as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        f"""
+                        CREATE OR REPLACE FUNCTION notify_blacklist_changed()
+                        RETURNS trigger AS $$
+                        BEGIN
+                            PERFORM pg_notify('{BLACKLIST_NOTIFY_CHANNEL}', '');
+                            RETURN NULL;
+                        END;
+                        $$ LANGUAGE plpgsql
+                    """
+                    )
+                    cursor.execute(
+                        f"DROP TRIGGER IF EXISTS {BLACKLIST_NOTIFY_TRIGGER} "
+                        "ON blacklist"
+                    )
+                    cursor.execute(
+                        f"""
+                        CREATE TRIGGER {BLACKLIST_NOTIFY_TRIGGER}
+                        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON blacklist
+                        FOR EACH STATEMENT EXECUTE FUNCTION notify_blacklist_changed()
+                    """
+                    )
+                conn.commit()
+            self.logger.info("✅ Installed blacklist change notification trigger")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"❌ Error installing blacklist change trigger: {e}")
+            return False
+
+    @classmethod
+    def get_shared_cache(cls) -> "BlacklistCache":
+        """Get the process-wide blacklist cache (loaded and started on first use)"""
+        global _shared_cache
+        if _shared_cache is None:
+            with _shared_cache_lock:
+                if _shared_cache is None:
+                    cache = BlacklistCache(cls())
+                    cache.start()
+                    _shared_cache = cache
+        return _shared_cache
+
     def is_blacklisted(self, crypto_symbol: str) -> bool:
         """Check if a cryptocurrency is blacklisted"""
         try:
             if not self.db_config:
                 return False
 
-            with psycopg.connect(self.db_config) as conn:
+            with db_connection(self.db_config) as conn:
                 with conn.cursor(row_factory=dict_row) as cursor:
                     cursor.execute(
                         """
@@ -101,7 +203,7 @@ class BlacklistManager:
             if not self.db_config:
                 return None
 
-            with psycopg.connect(self.db_config) as conn:
+            with db_connection(self.db_config) as conn:
                 with conn.cursor(row_factory=dict_row) as cursor:
                     cursor.execute(
                         """
@@ -122,3 +224,136 @@ class BlacklistManager:
                 f"❌ Error getting blacklist reason for {crypto_symbol}: {e}"
             )
             return None
+
+
+class BlacklistCache:
+    """Process-wide in-memory blacklist
+
+    Loaded once, then refreshed by Postgres LISTEN/NOTIFY on the blacklist
+    table. Entries older than BLACKLIST_CACHE_TTL_SECONDS are refreshed in
+    the background either way, in case notifications do not arrive.
+    Lookups never do I/O.
+
+    LISTEN needs a session, so the listener connects directly (not through
+    the PgBouncer pooler), and only listens once the change trigger exists.
+    """
+
+    def __init__(
+        self,
+        manager: BlacklistManager,
+        ttl_seconds: int = BLACKLIST_CACHE_TTL_SECONDS,
+        notify_enabled: bool = BLACKLIST_NOTIFY_ENABLED,
+    ):
+        self.manager = manager
+        self.logger = manager.logger
+        self.ttl_seconds = ttl_seconds
+        self.notify_enabled = notify_enabled
+        # Replaced wholesale on refresh, so readers never need a lock
+        self._entries: Dict[str, str] = {}
+        self._loaded_at = 0.0
+        self._listening = False
+        self._refresh_lock = threading.Lock()
+        self._listener_thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Load the blacklist and start the LISTEN thread"""
+        self.refresh()
+        if self.notify_enabled and self.manager.db_config:
+            self._listener_thread = threading.Thread(
+                target=self._listen_loop, daemon=True, name="BlacklistListener"
+            )
+            self._listener_thread.start()
+
+    @property
+    def loaded(self) -> bool:
+        """At least one load from the database succeeded"""
+        return self._loaded_at > 0
+
+    def refresh(self) -> bool:
+        """Reload entries from the database (keeps the old copy on failure)"""
+        with self._refresh_lock:
+            entries = self.manager.get_blacklist_entries()
+            if entries is None:
+                return False
+            self._entries = entries
+            self._loaded_at = time.time()
+        self.logger.info(
+            f"📋 Blacklist cache refreshed: {len(entries)} blacklisted cryptocurrencies"
+        )
+        return True
+
+    def _refresh_if_stale(self):
+        """Kick off a background refresh if the TTL expired"""
+        if time.time() - self._loaded_at < self.ttl_seconds:
+            return
+        if self._refresh_lock.locked():
+            return  # Refresh already in flight
+        threading.Thread(
+            target=self.refresh, daemon=True, name="BlacklistRefresh"
+        ).start()
+
+    def _listen_conninfo(self) -> str:
+        # Imported here: core imports this module at package import time
+        try:
+            from core.leader_election import direct_conninfo
+        except ImportError:
+            return self.manager.db_config
+        return direct_conninfo(self.manager.db_config)
+
+    def _listen_loop(self):
+        """Hold a dedicated connection on LISTEN and refresh on every NOTIFY"""
+        retry_delay = 5
+        conninfo = self._listen_conninfo()
+        while True:
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as conn:
+                    row = conn.execute(
+                        "SELECT EXISTS (SELECT 1 FROM pg_trigger "
+                        "WHERE tgname = %s AND NOT tgisinternal)",
+                        (BLACKLIST_NOTIFY_TRIGGER,),
+                    ).fetchone()
+                    if not row[0]:
+                        raise RuntimeError(
+                            f"{BLACKLIST_NOTIFY_TRIGGER} trigger not installed "
+                            f"(run python init_database.py)"
+                        )
+                    conn.execute(f"LISTEN {BLACKLIST_NOTIFY_CHANNEL}")
+                    self._listening = True
+                    retry_delay = 5
+                    # Pick up any change missed while (re)connecting
+                    self.refresh()
+                    self.logger.info(
+                        f"👂 Listening for blacklist changes on "
+                        f"'{BLACKLIST_NOTIFY_CHANNEL}'"
+                    )
+                    while True:
+                        changed = False
+                        for _ in conn.notifies(timeout=60):
+                            changed = True
+                            break
+                        if changed:
+                            self.refresh()
+                        else:
+                            # Idle: keep the connection alive / detect drops
+                            conn.execute("SELECT 1")
+            except Exception as e:
+                self.logger.warning(
+                    f"⚠️ Blacklist listener unavailable ({e}), "
+                    f"relying on {self.ttl_seconds}s TTL refresh"
+                )
+            self._listening = False
+            time.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 300)
+
+    def is_blacklisted(self, crypto_symbol: str) -> bool:
+        """Check if a cryptocurrency is blacklisted (no I/O)"""
+        self._refresh_if_stale()
+        return crypto_symbol in self._entries
+
+    def get_blacklist_reason(self, crypto_symbol: str) -> Optional[str]:
+        """Get the reason for blacklisting a cryptocurrency (no I/O)"""
+        return self._entries.get(crypto_symbol)
+
+    def get_blacklisted_cryptos(self) -> Set[str]:
+        """Get the cached set of blacklisted cryptocurrency symbols"""
+        return set(self._entries)
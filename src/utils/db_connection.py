@@ -8,9 +8,10 @@ import os
 from contextlib import contextmanager
 from typing import Optional
 
-import psycopg
 from psycopg.rows import dict_row
 
+from .db_pool import get_connection
+
 # Load environment variables
 try:
     from dotenv import load_dotenv
@@ -31,8 +32,8 @@ if not DATABASE_URL.startswith("postgresql://"):
 
 
 def get_database_connection():
-    """Get PostgreSQL database connection"""
-    return psycopg.connect(DATABASE_URL)
+    """Get PostgreSQL database connection (pooled; close() returns it)"""
+    return get_connection(DATABASE_URL)
 
 
 @contextmanager
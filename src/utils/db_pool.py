@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Database Connection Pool
+Process-wide psycopg_pool pools (one per DATABASE_URL) shared by every module
+"""
+
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import psycopg
+
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError:  # psycopg[pool] not installed: callers fall back to connect()
+    ConnectionPool = None
+
+logger = logging.getLogger(__name__)
+
+DB_POOL_ENABLED = os.getenv("DB_POOL_ENABLED", "true").lower() == "true"
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+# Seconds a checkout may wait for a free connection before PoolTimeout
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Connections are recycled after this age / idle time (Neon closes idle ones)
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+# Executions of the same query on a connection before psycopg prepares it
+# server-side ("none" disables, e.g. behind PgBouncer < 1.21)
+_prepare_threshold = os.getenv("DB_PREPARE_THRESHOLD", "2").strip().lower()
+DB_PREPARE_THRESHOLD: Optional[int] = (
+    None if _prepare_threshold == "none" else int(_prepare_threshold)
+)
+
+_pools: Dict[str, "ConnectionPool"] = {}
+_pools_lock = threading.Lock()
+
+
+def pool_available() -> bool:
+    return DB_POOL_ENABLED and ConnectionPool is not None
+
+
+def get_pool(
+    conninfo: Optional[str] = None,
+    min_size: int = DB_POOL_MIN_SIZE,
+    max_size: int = DB_POOL_MAX_SIZE,
+) -> Optional["ConnectionPool"]:
+    """Shared pool for conninfo (defaults to DATABASE_URL), created on first use
+
+    Returns:
+        The pool, or None if pooling is disabled or psycopg_pool is missing
+    """
+    if not pool_available():
+        return None
+    conninfo = conninfo or os.getenv("DATABASE_URL", "")
+    if not conninfo:
+        return None
+    pool = _pools.get(conninfo)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(conninfo)
+        if pool is None:
+            pool = ConnectionPool(
+                conninfo,
+                min_size=min_size,
+                max_size=max(max_size, min_size),
+                kwargs={
+                    "connect_timeout": DB_CONNECT_TIMEOUT,
+                    "prepare_threshold": DB_PREPARE_THRESHOLD,
+                },
+                # Validated on checkout, so a connection dropped by Neon
+                # is replaced instead of failing the caller's query
+                check=ConnectionPool.check_connection,
+                # conn.close() hands the connection back instead of closing it,
+                # so existing `conn = get(); ... conn.close()` callers need no change
+                close_returns=True,
+                timeout=DB_POOL_TIMEOUT,
+                max_lifetime=DB_POOL_MAX_LIFETIME,
+                max_idle=DB_POOL_MAX_IDLE,
+                name=f"db-pool-{len(_pools) + 1}",
+                open=True,
+            )
+            _pools[conninfo] = pool
+            logger.warning(
+                f"✅ Database pool ready: {pool.name} "
+                f"(min={min_size}, max={max(max_size, min_size)}, "
+                f"prepare_threshold={DB_PREPARE_THRESHOLD})"
+            )
+    return pool
+
+
+def get_connection(
+    conninfo: Optional[str] = None, timeout: Optional[float] = None
+) -> psycopg.Connection:
+    """Check out a pooled connection; close() returns it to the pool
+
+    Falls back to a direct psycopg.connect when pooling is unavailable.
+    Note `with conn:` does not return a pooled connection; use connection().
+    """
+    pool = get_pool(conninfo)
+    if pool is None:
+        return psycopg.connect(
+            conninfo or os.getenv("DATABASE_URL", ""),
+            connect_timeout=DB_CONNECT_TIMEOUT,
+            prepare_threshold=DB_PREPARE_THRESHOLD,
+        )
+    return pool.getconn(timeout=timeout)
+
+
+@contextmanager
+def connection(conninfo: Optional[str] = None) -> Iterator[psycopg.Connection]:
+    """`with psycopg.connect(...) as conn` replacement: commits on success,
+    rolls back on error, then returns the connection to the pool"""
+    pool = get_pool(conninfo)
+    if pool is None:
+        with get_connection(conninfo) as conn:
+            yield conn
+        return
+    with pool.connection() as conn:
+        yield conn
+
+
+def format_stats(reset: bool = False) -> str:
+    """One line per pool: size, checkouts and time spent waiting for one"""
+    lines = []
+    for pool in list(_pools.values()):
+        stats = pool.pop_stats() if reset else pool.get_stats()
+        checkouts = stats.get("requests_num", 0)
+        wait_ms = stats.get("requests_wait_ms", 0)
+        lines.append(
+            f"🗄️ DB pool {pool.name}: size={stats.get('pool_size', 0)}, "
+            f"idle={stats.get('pool_available', 0)}, "
+            f"waiting={stats.get('requests_waiting', 0)}, "
+            f"checkouts={checkouts}, queued={stats.get('requests_queued', 0)}, "
+            f"avg wait={wait_ms / checkouts if checkouts else 0:.1f}ms, "
+            f"timeouts={stats.get('requests_errors', 0)}, "
+            f"bad returns={stats.get('returns_bad', 0)}, "
+            f"conn errors={stats.get('connections_errors', 0)}"
+        )
+    return "\n".join(lines) if lines else "🗄️ DB pool: not in use"
+
+
+def close_pools(timeout: float = 5.0):
+    """Close every pool (on shutdown)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        try:
+            pool.close(timeout=timeout)
+        except Exception as e:
+            logger.warning(f"⚠️ Error closing {pool.name}: {e}")
@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# core/utils are imported from src, benchmark harnesses from the repo root
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, ROOT)
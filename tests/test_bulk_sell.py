@@ -0,0 +1,43 @@
+from core.bulk_sell import OKX_ORDERS_HISTORY_LIMIT, BulkSellExecutor
+
+NOW_MS = 1_800_000_000_000
+
+
+class _History:
+    """orders-history, newest first, paged with `after` like OKX"""
+
+    def __init__(self, count):
+        self.orders = [
+            {"ordId": str(1000 - i), "cTime": str(NOW_MS - i * 1000), "state": "filled"}
+            for i in range(count)
+        ]
+        self.calls = []
+
+    def get_orders_history(self, instType, ordType, after, limit):
+        self.calls.append(after)
+        start = 0
+        if after:
+            start = next(i for i, o in enumerate(self.orders) if o["ordId"] == after)
+            start += 1
+        return {"code": "0", "data": self.orders[start : start + int(limit)]}
+
+
+def _executor():
+    return BulkSellExecutor(None, None, None, None, {}, None, None)
+
+
+def test_history_pages_back_until_every_sell_is_found():
+    api = _History(count=350)
+    wanted = {"1000", "750"}  # Newest, and one on the third page
+    found = _executor()._history_since(api, wanted, since_ms=NOW_MS - 3600_000)
+    assert {order["ordId"] for order in found} == wanted
+    assert len(api.calls) == 3
+    assert api.calls[0] == ""
+
+
+def test_history_stops_at_the_batch_start():
+    api = _History(count=5 * OKX_ORDERS_HISTORY_LIMIT)
+    # A sell the history does not have yet: stop once pages predate the batch
+    found = _executor()._history_since(api, {"missing"}, since_ms=NOW_MS)
+    assert found == []
+    assert len(api.calls) < 5
@@ -0,0 +1,51 @@
+import time
+
+from core import gap_cooldown
+from core.gap_cooldown import GapCooldown
+
+
+class _Cursor:
+    def __init__(self, row):
+        self.row = row
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+class _Connection:
+    def __init__(self, row):
+        self.row = row
+
+    def cursor(self):
+        return _Cursor(self.row)
+
+    def close(self):
+        pass
+
+
+def test_failed_load_is_retried_without_the_listener(monkeypatch):
+    monkeypatch.setattr(gap_cooldown, "spawn", lambda target, *args: target(*args))
+    monkeypatch.setattr(gap_cooldown, "GAP_COOLDOWN_RETRY_SECONDS", 0)
+    last_buy_ms = int((time.time() - 10) * 1000)
+    database_up = [False]
+
+    def get_db():
+        if not database_up[0]:
+            raise OSError("database unreachable")
+        return _Connection((last_buy_ms,))
+
+    cooldown = GapCooldown(get_db, "original_gap", cooldown_seconds=3600)
+    cooldown.start()  # No database_url: notifications disabled
+    assert not cooldown.is_active()  # Still failing
+    assert cooldown.load_failures == 2
+
+    database_up[0] = True
+    assert cooldown.is_active()  # The check reloaded in the background
+    assert cooldown.last_buy_ts == last_buy_ms / 1000.0
+    assert cooldown.load_failures == 2
@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from core.instrument_meta import InstrumentQuantizer
+
+
+def _quantizer(tickSz="0.01", lotSz="0.001", minSz="0.01"):
+    return InstrumentQuantizer(
+        "A-USDT", {"tickSz": tickSz, "lotSz": lotSz, "minSz": minSz}
+    )
+
+
+def test_sell_size_never_exceeds_the_balance():
+    quantizer = _quantizer()
+    # Nearest would round 0.0019 up to 0.002: more than held, OKX rejects it
+    for balance in ("0.0019", "1.2345", "0.9999999", "3"):
+        size = quantizer.size(balance)
+        assert Decimal(size) <= Decimal(balance)
+        assert Decimal(balance) - Decimal(size) < Decimal("0.001")
+    assert quantizer.size("0.0019") == "0.001"
+
+
+def test_order_price_never_exceeds_the_limit():
+    quantizer = _quantizer()
+    assert quantizer.price(12.3499) == "12.34"
+    assert quantizer.price(0.019) == "0.01"
+
+
+def test_recorded_fill_price_rounds_to_nearest_tick():
+    quantizer = _quantizer()
+    # Average fill prices are not tick multiples; store the closest tick
+    assert quantizer.fill_price(12.3499) == "12.35"
+    assert quantizer.fill_price(12.3412) == "12.34"
+    assert _quantizer(tickSz="1").fill_price(1234.6) == "1235"
+
+
+def test_min_size_checked_after_rounding():
+    quantizer = _quantizer()
+    assert quantizer.meets_min_size("0.01")
+    assert not quantizer.meets_min_size("0.0099")
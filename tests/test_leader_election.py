@@ -0,0 +1,117 @@
+"""Leader lease fencing, and takeover against a real Postgres
+
+The takeover tests need Postgres 14+ (idle_session_timeout) and are skipped
+unless TEST_DATABASE_URL points at a database the tests may take advisory
+locks on, e.g. postgresql://postgres@localhost:5432/postgres
+"""
+
+import argparse
+import os
+import threading
+import time
+
+import pytest
+
+from benchmark_leader_takeover import measure
+from core import leader_election
+from core.leader_election import LeaderLease
+
+DSN = os.getenv("TEST_DATABASE_URL", "")
+LEASE_SECONDS = 2.0
+POLL_SECONDS = 0.25
+# Scheduling and connection setup on a loaded CI machine
+SLACK_SECONDS = 1.0
+
+needs_db = pytest.mark.skipif(not DSN, reason="TEST_DATABASE_URL not set")
+
+
+def _options():
+    return argparse.Namespace(dsn=DSN, lease=LEASE_SECONDS, poll=POLL_SECONDS)
+
+
+def _lease(on_acquired, name="test_leader_election"):
+    return LeaderLease(
+        on_acquired,
+        lambda: None,
+        conninfo=DSN,
+        name=name,
+        lease_seconds=LEASE_SECONDS,
+        poll_seconds=POLL_SECONDS,
+    )
+
+
+def _fenced_lease(lost):
+    lease = LeaderLease(
+        lambda: None,
+        lambda: lost.append(time.monotonic()),
+        conninfo="postgresql://unused",
+        lease_seconds=LEASE_SECONDS,
+    )
+    lease.is_leader = True
+    return lease
+
+
+def test_fence_stops_trading_when_renewals_stall(monkeypatch):
+    monkeypatch.setattr(leader_election, "_trading_enabled", True)
+    lost = []
+    lease = _fenced_lease(lost)
+
+    lease.renewed_at = time.monotonic() - LEASE_SECONDS / 3
+    assert not lease.check_fence()
+    assert leader_election.is_trading_enabled()
+
+    # A renewal blocked on a partitioned socket never returns or raises
+    lease.renewed_at = time.monotonic() - LEASE_SECONDS
+    assert lease.check_fence()
+    assert not leader_election.is_trading_enabled()
+    assert not lease.is_leader
+    assert len(lost) == 1 and lease.fenced == 1
+
+
+def test_fence_thread_fires_before_the_lease_lapses(monkeypatch):
+    monkeypatch.setattr(leader_election, "_trading_enabled", True)
+    lost = []
+    lease = _fenced_lease(lost)
+    lease.renewed_at = time.monotonic()  # Last renewal, then nothing
+    threading.Thread(target=lease._fence, daemon=True).start()
+
+    deadline = lease.renewed_at + LEASE_SECONDS
+    while not lost and time.monotonic() < deadline + 1:
+        time.sleep(0.01)
+    assert lost and lost[0] < deadline
+    assert not leader_election.is_trading_enabled()
+    # A failing renewal afterwards does not report the loss twice
+    lease._lose("renewal failed")
+    assert len(lost) == 1
+
+
+@needs_db
+def test_renewals_keep_a_live_leader():
+    leader_acquired = threading.Event()
+    standby_acquired = threading.Event()
+    leader = _lease(leader_acquired.set)
+    standby = _lease(standby_acquired.set)
+    try:
+        leader.start()
+        assert leader_acquired.wait(10)
+        standby.start()
+        # Several lease periods: idle_session_timeout must not end the session
+        assert not standby_acquired.wait(LEASE_SECONDS * 3)
+        assert leader.is_leader
+    finally:
+        standby.release()
+        leader.release()
+
+
+@needs_db
+def test_crash_takeover_within_one_poll():
+    takeover = measure(_options(), "crash")
+    assert takeover <= POLL_SECONDS + SLACK_SECONDS
+
+
+@needs_db
+def test_hang_takeover_within_lease():
+    takeover = measure(_options(), "hang")
+    # Session ends LEASE_SECONDS after the last renewal (every lease / 3)
+    assert LEASE_SECONDS * 2 / 3 - SLACK_SECONDS <= takeover
+    assert takeover <= LEASE_SECONDS + POLL_SECONDS + SLACK_SECONDS
@@ -0,0 +1,60 @@
+import threading
+import time
+from datetime import datetime
+
+from core import memory_sync
+from core.change_feed import OrdersChangeFeed
+from core.position_index import OpenPositionIndex
+
+
+class FakeConnection:
+    """Answers each query with the next of results"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.queries = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        self.queries += 1
+
+    def fetchall(self):
+        return self.results.pop(0)
+
+    def close(self):
+        pass
+
+
+def _strategies(active):
+    return [("hourly", active, {}, "original")]
+
+
+def test_delta_sync_keeps_the_watermark_while_the_index_reloads(monkeypatch):
+    index = OpenPositionIndex()
+    monkeypatch.setattr(memory_sync, "get_position_index", lambda: index)
+    feed = OrdersChangeFeed()
+    feed.watermark = datetime(2026, 1, 1)
+    changed_at = datetime(2026, 1, 1, 0, 5)
+    created_ms = int(time.time() * 1000)
+    change = ("hourly", "A-USDT", "o1", "filled", created_ms, None, changed_at)
+    open_position = ("hourly", "A-USDT", "o1", created_ms, "1", "0.5")
+    conn = FakeConnection([change], [open_position])
+    active = {}
+    lock = threading.Lock()
+
+    index._reload_lock.acquire()  # A full sync's reload is running
+    try:
+        memory_sync._sync_changes(conn, feed, _strategies(active), lock, None, None)
+    finally:
+        index._reload_lock.release()
+    assert conn.queries == 0
+    assert feed.watermark == datetime(2026, 1, 1)
+    assert active == {}
+
+    # The next sync applies the same rows and only then advances the watermark
+    memory_sync._sync_changes(conn, feed, _strategies(active), lock, None, None)
+    assert feed.watermark == changed_at
+    assert active["A-USDT"]["ordId"] == "o1"
+    assert index.find_unsold("hourly", "A-USDT", 0) is not None
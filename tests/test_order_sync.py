@@ -0,0 +1,68 @@
+import threading
+from datetime import datetime, timedelta
+
+from core import order_sync
+from core.order_sync import OrderSyncManager
+
+
+def _manager(monkeypatch, sold):
+    monkeypatch.setattr(order_sync, "spawn", lambda target, *args: target(*args))
+    orders = {}
+    return OrderSyncManager(
+        "hourly",
+        "stable",
+        "batch",
+        get_db_connection=None,
+        get_trade_api=lambda: None,
+        active_orders=orders,
+        stable_active_orders={},
+        batch_active_orders={},
+        stable_strategy=None,
+        batch_strategy=None,
+        lock=threading.Lock(),
+        process_sell_signal=sold.append,
+        process_stable_sell_signal=sold.append,
+        process_batch_sell_signal=sold.append,
+    )
+
+
+def _recover(manager, rows, now, spec_index=0):
+    spec = manager.strategies[spec_index]
+    handler = manager._recover_grouped if spec.grouped else manager._recover_single
+    return handler(spec, rows, now, {}, False, "RECOVER", False)
+
+
+def test_incomplete_history_defers_a_bounded_number_of_passes(monkeypatch):
+    sold = []
+    manager = _manager(monkeypatch, sold)
+    now = datetime.now()
+    created_ms = int((now - timedelta(minutes=90)).timestamp() * 1000)
+    rows = [("A-USDT", "o1", created_ms, "filled", "1")]
+
+    for _ in range(order_sync.RECOVERY_MAX_DEFERRALS):
+        assert _recover(manager, rows, now) == 0
+    assert sold == []
+
+    # History still incomplete: fall back to create_time as before
+    assert _recover(manager, rows, now) == 1
+    assert sold == ["A-USDT"]
+    assert manager.active_orders["A-USDT"]["fill_time"] == datetime.fromtimestamp(
+        created_ms / 1000
+    )
+    assert manager._deferrals == {}
+
+
+def test_old_buys_are_not_deferred(monkeypatch):
+    sold = []
+    manager = _manager(monkeypatch, sold)
+    now = datetime.now()
+    age = timedelta(seconds=order_sync.RECOVERY_MAX_DEFER_AGE_SECONDS + 60)
+    created_ms = int((now - age).timestamp() * 1000)
+    rows = [
+        ("B-USDT", "b1", created_ms, "filled", "1"),
+        ("B-USDT", "b2", created_ms + 1000, "filled", "2"),
+    ]
+
+    assert _recover(manager, rows, now, spec_index=2) == 1
+    assert manager.batch_active_orders["B-USDT"]["ordIds"] == ["b1", "b2"]
+    assert sold == ["B-USDT"]
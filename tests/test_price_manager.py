@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+from core.price_manager import HOUR_MS, PriceManager, current_hour_start_ms
+
+
+class FakeMarketAPI:
+    def __init__(self):
+        self.calls = 0
+        self.up = False
+
+    def get_candlesticks(self, instId, bar, limit):
+        self.calls += 1
+        if not self.up:
+            return {"code": "50011", "msg": "Too Many Requests", "data": []}
+        hour_ms = current_hour_start_ms()
+        # [ts, o, h, l, c, vol, volCcy, volCcyQuote, confirm], newest first
+        rows = [
+            [str(hour_ms - i * HOUR_MS), "1", "1", "1", str(10.0 + i)]
+            + ["", "", "", "1"]
+            for i in range(3)
+        ]
+        return {"code": "0", "data": rows}
+
+
+def test_gain_filter_fails_closed_while_the_fallback_is_throttled():
+    api = FakeMarketAPI()
+    manager = PriceManager(api, threading.Lock())
+
+    # The REST error itself still allows the buy, as before
+    assert manager.check_2h_gain_filter("A-USDT", 10.0) == (False, None)
+    assert manager.check_2h_gain_filter("A-USDT", 10.0) == (True, None)
+    assert api.calls == 1
+
+
+def test_gain_filter_serves_the_last_fallback_close_while_throttled():
+    api = FakeMarketAPI()
+    api.up = True
+    manager = PriceManager(api, threading.Lock())
+
+    should_skip, gain_pct = manager.check_2h_gain_filter("A-USDT", 13.2)
+    assert should_skip and gain_pct == pytest.approx(10.0)
+    manager.candle_buffer.remove("A-USDT")  # e.g. not recorded as confirmed
+    api.up = False
+    assert manager.get_2h_ago_close_price("A-USDT") == 12.0
+    assert api.calls == 1
@@ -0,0 +1,171 @@
+import threading
+import time
+import types
+
+import pytest
+
+from core import rate_limiter
+from core.rate_limiter import (
+    PRIORITY_BUY,
+    PRIORITY_RECOVERY,
+    PRIORITY_SELL,
+    TokenBucket,
+)
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def _grant(bucket, tokens=1):
+    """Hand out tokens by hand (the bucket itself never refills)"""
+    with bucket._cond:
+        bucket._tokens += tokens
+        bucket._cond.notify_all()
+
+
+def _queue(bucket, levels):
+    """Start one waiter per level, in order, each queued before the next"""
+    served = []
+    threads = []
+    for level in levels:
+        thread = threading.Thread(
+            target=lambda level=level: (bucket.acquire(level), served.append(level))
+        )
+        queued = len(bucket._waiters) + 1
+        thread.start()
+        _wait_for(lambda: len(bucket._waiters) == queued)
+        threads.append(thread)
+    return served, threads
+
+
+def test_waiters_served_by_priority_then_arrival():
+    bucket = TokenBucket("test", capacity=1, refill_per_second=1e-9)
+    bucket.acquire()  # Drain: every later caller waits
+
+    levels = [PRIORITY_RECOVERY, PRIORITY_BUY, PRIORITY_SELL, PRIORITY_RECOVERY]
+    served, threads = _queue(bucket, levels)
+    for count in range(1, len(levels) + 1):
+        _grant(bucket)
+        _wait_for(lambda: len(served) == count)
+    for thread in threads:
+        thread.join(5)
+
+    assert served == [PRIORITY_SELL, PRIORITY_BUY, PRIORITY_RECOVERY, PRIORITY_RECOVERY]
+    assert bucket._waiters == []
+
+
+def test_low_priority_waits_while_sell_is_queued():
+    bucket = TokenBucket("test", capacity=1, refill_per_second=1e-9)
+    bucket.acquire()
+    served, threads = _queue(bucket, [PRIORITY_RECOVERY, PRIORITY_SELL])
+
+    _grant(bucket)
+    _wait_for(lambda: served)
+    assert served == [PRIORITY_SELL]
+    assert bucket._waiters == [(PRIORITY_RECOVERY, 1)]
+
+    _grant(bucket)
+    for thread in threads:
+        thread.join(5)
+    assert served == [PRIORITY_SELL, PRIORITY_RECOVERY]
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.waits = []
+
+    def monotonic(self):
+        return self.now
+
+
+class _FakeCondition:
+    """Condition whose wait() advances the fake clock by the timeout"""
+
+    def __init__(self, clock):
+        self.clock = clock
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def wait(self, timeout=None):
+        assert timeout is not None, "single caller must never wait unbounded"
+        self.clock.waits.append(timeout)
+        self.clock.now += timeout
+
+    def notify_all(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _FakeClock()
+    monkeypatch.setattr(
+        rate_limiter, "time", types.SimpleNamespace(monotonic=clock.monotonic)
+    )
+    return clock
+
+
+def _bucket(clock, capacity, refill_per_second):
+    bucket = TokenBucket("test", capacity, refill_per_second)
+    bucket._cond = _FakeCondition(clock)
+    return bucket
+
+
+def test_burst_up_to_capacity_then_waits_for_refill(clock):
+    bucket = _bucket(clock, capacity=2, refill_per_second=4)
+
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert clock.waits == []
+
+    # Empty: the next token arrives after 1 / refill_per_second
+    assert bucket.acquire() == pytest.approx(0.25)
+    assert clock.waits == [pytest.approx(0.25)]
+    assert bucket.throttled == 1
+
+
+def test_partial_refill_shortens_the_wait(clock):
+    bucket = _bucket(clock, capacity=1, refill_per_second=2)
+    bucket.acquire()
+
+    clock.now += 0.3  # 0.6 tokens refilled
+    assert bucket.acquire() == pytest.approx(0.2)
+    assert clock.waits == [pytest.approx(0.2)]
+
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = _bucket(clock, capacity=2, refill_per_second=4)
+    bucket.acquire()
+    bucket.acquire()
+
+    clock.now += 60  # Idle for long: still only a burst of capacity
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(0.25)
+    assert bucket.calls == 5
+
+
+def test_rate_limited_api_uses_context_priority(monkeypatch):
+    limiter = rate_limiter.RateLimiter(enabled=True)
+    levels = []
+    monkeypatch.setattr(
+        TokenBucket, "acquire", lambda self, level=None: levels.append(level) or 0.0
+    )
+    api = rate_limiter.RateLimitedAPI(
+        types.SimpleNamespace(get_order=lambda **kwargs: kwargs), "trade", limiter
+    )
+
+    assert api.get_order(ordId="1") == {"ordId": "1"}
+    with rate_limiter.priority(PRIORITY_SELL):
+        api.get_order(ordId="2")
+    rate_limiter.at_priority(PRIORITY_RECOVERY)(api.get_order)(ordId="3")
+
+    assert levels == [rate_limiter.PRIORITY_NORMAL, PRIORITY_SELL, PRIORITY_RECOVERY]
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from core.scheduler import DeadlineScheduler
+
+
+def _recording_scheduler():
+    fired = []
+    done = threading.Event()
+
+    def dispatch(fn, *args):
+        fired.append((fn(*args), time.monotonic()))
+        done.set()
+
+    return DeadlineScheduler(dispatch, name="TestScheduler"), fired, done
+
+
+def test_fires_in_deadline_order_not_before_deadline():
+    scheduler, fired, done = _recording_scheduler()
+    now = time.monotonic()
+    deadlines = {"c": now + 0.06, "a": now + 0.02, "b": now + 0.04}
+    # Queue everything before the timer thread can pop anything
+    with scheduler._cond:
+        for name, deadline in deadlines.items():
+            scheduler.call_at(deadline, lambda name=name: name)
+
+    for _ in deadlines:
+        assert done.wait(5)
+        done.clear()
+
+    assert [name for name, _ in fired] == ["a", "b", "c"]
+    for name, fired_at in fired:
+        assert fired_at >= deadlines[name]
+    assert scheduler.fired == 3
+    assert scheduler.pending() == 0
+
+
+def test_cancelled_task_is_dropped():
+    scheduler, fired, done = _recording_scheduler()
+    with scheduler._cond:
+        cancelled = scheduler.call_later(0.01, lambda: "cancelled")
+        scheduler.call_later(0.03, lambda: "kept")
+        cancelled.cancel()
+
+    assert done.wait(5)
+    assert [name for name, _ in fired] == ["kept"]
+    assert scheduler.cancelled == 1
+    assert scheduler.fired == 1
+
+
+def test_earlier_deadline_wakes_the_timer():
+    scheduler, fired, done = _recording_scheduler()
+    scheduler.call_later(3600, lambda: "late")
+    time.sleep(0.05)  # Timer thread now waits on the hour-long deadline
+
+    scheduler.call_later(0.01, lambda: "early")
+    assert done.wait(5)
+    assert [name for name, _ in fired] == ["early"]
+    assert scheduler.pending() == 1
+
+
+def test_dispatch_error_does_not_stop_the_timer():
+    fired = []
+    done = threading.Event()
+
+    def dispatch(fn, *args):
+        fn(*args)
+        fired.append(fn.__name__)
+        done.set()
+
+    def fails():
+        raise RuntimeError("boom")
+
+    def works():
+        pass
+
+    scheduler = DeadlineScheduler(dispatch, name="TestScheduler")
+    with scheduler._cond:
+        scheduler.call_later(0.01, fails)
+        scheduler.call_later(0.02, works)
+
+    assert done.wait(5)
+    assert fired == ["works"]
+    assert scheduler.errors == 1
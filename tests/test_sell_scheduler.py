@@ -0,0 +1,126 @@
+import threading
+import time
+from datetime import datetime
+
+from core.sell_scheduler import SellDeadlineDict, SellScheduler, set_sell_deadline
+
+
+def _order(ordId, deadline_ts):
+    return {"ordId": ordId, "next_hour_close_time": datetime.fromtimestamp(deadline_ts)}
+
+
+def _pop(scheduler):
+    with scheduler._cond:
+        deadline, _, strategy_type, instId, ordId = scheduler._pop_due()
+    return strategy_type, instId, ordId
+
+
+def test_due_entries_pop_in_deadline_order():
+    scheduler = SellScheduler(lambda *args: None)
+    now = time.time()
+    scheduler.schedule("hourly", "C-USDT", _order("c", now - 1))
+    scheduler.schedule("hourly", "A-USDT", _order("a", now - 3))
+    scheduler.schedule("stable", "B-USDT", _order("b", now - 2))
+
+    assert [_pop(scheduler) for _ in range(3)] == [
+        ("hourly", "A-USDT", "a"),
+        ("stable", "B-USDT", "b"),
+        ("hourly", "C-USDT", "c"),
+    ]
+    assert len(scheduler) == 0
+
+
+def test_reschedule_supersedes_the_old_entry():
+    scheduler = SellScheduler(lambda *args: None)
+    now = time.time()
+    scheduler.schedule("hourly", "A-USDT", _order("a1", now - 10))
+    scheduler.schedule("hourly", "B-USDT", _order("b", now - 5))
+    # Moved to the next hour: the old (due) entry must not fire
+    scheduler.schedule("hourly", "A-USDT", _order("a1", now + 3600))
+
+    assert _pop(scheduler) == ("hourly", "B-USDT", "b")
+    assert len(scheduler) == 1
+    assert scheduler.next_deadline() == datetime.fromtimestamp(now + 3600)
+
+
+def test_reschedule_for_a_new_order_fires_that_order():
+    scheduler = SellScheduler(lambda *args: None)
+    now = time.time()
+    scheduler.schedule("hourly", "A-USDT", _order("old", now - 10))
+    scheduler.schedule("hourly", "A-USDT", _order("new", now - 5))
+
+    assert _pop(scheduler) == ("hourly", "A-USDT", "new")
+    assert len(scheduler) == 0
+
+
+def test_unscheduled_entry_is_skipped():
+    scheduler = SellScheduler(lambda *args: None)
+    now = time.time()
+    scheduler.schedule("hourly", "A-USDT", _order("a", now - 10))
+    scheduler.schedule("hourly", "B-USDT", _order("b", now - 5))
+    scheduler.unschedule("hourly", "A-USDT")
+
+    assert _pop(scheduler) == ("hourly", "B-USDT", "b")
+
+
+def test_same_deadline_is_not_pushed_twice():
+    scheduler = SellScheduler(lambda *args: None)
+    order = _order("a", time.time() + 3600)
+    assert scheduler.schedule("hourly", "A-USDT", order)
+    assert scheduler.schedule("hourly", "A-USDT", order)
+    assert len(scheduler._heap) == 1
+    assert not scheduler.schedule("hourly", "A-USDT", {"ordId": "a"})
+
+
+def test_fires_at_the_deadline():
+    fired = []
+    done = threading.Event()
+
+    def fire(strategy_type, instId):
+        fired.append((strategy_type, instId, time.time()))
+        done.set()
+
+    scheduler = SellScheduler(fire)
+    order = _order("a", time.time() + 0.1)
+    deadline = order["next_hour_close_time"].timestamp()
+    scheduler.schedule("hourly", "A-USDT", order)
+    scheduler.start()
+
+    assert done.wait(5)
+    assert fired[0][:2] == ("hourly", "A-USDT")
+    assert fired[0][2] >= deadline
+    assert scheduler.fired == 1
+
+
+def test_deadline_dict_keeps_scheduler_in_step():
+    scheduler = SellScheduler(lambda *args: None)
+    orders = SellDeadlineDict("batch", scheduler)
+    deadline = float(int(time.time()) + 3600)  # Exact through datetime
+
+    orders["A-USDT"] = {
+        "ordIds": ["a1", "a2"],
+        "next_hour_close_time": datetime.fromtimestamp(deadline),
+    }
+    orders["B-USDT"] = _order("b", deadline)
+    assert scheduler._latest[("batch", "A-USDT")] == (deadline, "a1")
+    assert len(scheduler) == 2
+
+    del orders["A-USDT"]
+    orders.pop("B-USDT")
+    orders.pop("missing", None)
+    assert len(scheduler) == 0
+
+
+def test_earlier_deadline_set_in_place_fires_on_time():
+    scheduler = SellScheduler(lambda *args: None)
+    orders = SellDeadlineDict("hourly", scheduler)
+    now = time.time()
+    orders["A-USDT"] = _order("a", now + 3600)
+
+    # A partial fill moves the sell from the order's hour to the fill's hour
+    set_sell_deadline(orders, "A-USDT", datetime.fromtimestamp(now - 1))
+    assert _pop(scheduler) == ("hourly", "A-USDT", "a")
+
+    plain = {"B-USDT": _order("b", now)}
+    set_sell_deadline(plain, "B-USDT", datetime.fromtimestamp(now - 1))
+    assert plain["B-USDT"]["next_hour_close_time"] == datetime.fromtimestamp(now - 1)
@@ -0,0 +1,105 @@
+import types
+
+import pytest
+
+from core import sharding
+from core.sharding import HashRing, ShardCoordinator
+
+
+class _Cursor:
+    def __init__(self, members):
+        self.members = members
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return [(member,) for member in self.members]
+
+    def close(self):
+        pass
+
+
+class _Connection:
+    def __init__(self, members):
+        self.members = members
+
+    def cursor(self):
+        return _Cursor(self.members)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Database:
+    """Connection factory that can be taken down"""
+
+    def __init__(self, members):
+        self.members = members
+        self.up = True
+
+    def __call__(self):
+        if not self.up:
+            raise OSError("database unreachable")
+        return _Connection(self.members)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(
+        sharding, "time", types.SimpleNamespace(monotonic=lambda: now[0])
+    )
+    return now
+
+
+def test_join_requires_cross_process_locks(monkeypatch):
+    monkeypatch.setattr(sharding, "CROSS_PROCESS_LOCKS", False)
+    database = _Database(["w1"])
+    coordinator = ShardCoordinator(database, ["A-USDT"], lambda *args: None, "w1")
+    assert not coordinator.join()
+    assert coordinator.owned() == set()
+
+
+def test_hash_ring_moves_only_the_leaving_workers_share():
+    universe = [f"C{i}-USDT" for i in range(2000)]
+    before = HashRing(["w1", "w2", "w3"])
+    after = HashRing(["w1", "w2"])
+    moved = [key for key in universe if before.owner(key) != after.owner(key)]
+    assert all(before.owner(key) == "w3" for key in moved)
+
+
+def test_shard_is_given_up_before_peers_take_it_over(clock):
+    database = _Database(["w1"])
+    changes, expired = [], []
+    universe = {"A-USDT", "B-USDT", "C-USDT"}
+    coordinator = ShardCoordinator(
+        database,
+        universe,
+        lambda added, removed: changes.append((added, removed)),
+        "w1",
+        on_expired=expired.append,
+    )
+    assert coordinator.heartbeat()
+    assert coordinator.owned() == universe
+
+    # Failures shorter than the expiry keep the shard
+    database.up = False
+    clock[0] += sharding.SHARD_EXPIRE_SECONDS - 1
+    assert not coordinator.heartbeat()
+    assert coordinator.owned() == universe and not expired
+
+    clock[0] += 1
+    assert not coordinator.heartbeat()
+    assert expired == [universe]
+    assert not coordinator.owns("A-USDT")
+    assert sharding.SHARD_EXPIRE_SECONDS < sharding.SHARD_MEMBER_TTL_SECONDS
+
+    # Reachable again: the same membership rejoins the shard
+    database.up = True
+    assert coordinator.heartbeat()
+    assert coordinator.owned() == universe
+    assert changes[-1] == (universe, set())
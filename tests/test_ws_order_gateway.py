@@ -0,0 +1,114 @@
+import pytest
+
+from core import ws_order_gateway
+from core.ws_order_gateway import GatewayTimeout, OrderRoutingAPI
+
+
+class _TimingOutGateway:
+    """Logged in, but every placement times out (it may still go through)"""
+
+    fallbacks = 0
+
+    def is_ready(self):
+        return True
+
+    def place_order(self, **order):
+        raise GatewayTimeout("no response")
+
+    def place_multiple_orders(self, orders_data):
+        raise GatewayTimeout("no response")
+
+
+class _Rest:
+    """OKX REST whose orders show up in history after `visible_after` polls"""
+
+    def __init__(self, visible_after=None, error=False):
+        self.visible_after = visible_after or {}  # clOrdId -> poll number
+        self.error = error
+        self.polls = 0
+        self.placed = []
+
+    def get_order_list(self, instType, instId):
+        self.polls += 1
+        if self.error:
+            return {"code": "50001", "msg": "service unavailable", "data": []}
+        return {"code": "0", "data": []}
+
+    def get_orders_history(self, instType, instId):
+        return {
+            "code": "0",
+            "data": [
+                {"clOrdId": clOrdId, "ordId": f"ord-{clOrdId}", "instId": instId}
+                for clOrdId, poll in self.visible_after.items()
+                if self.polls >= poll
+            ],
+        }
+
+    def place_order(self, **order):
+        self.placed.append(order)
+        return {"code": "0", "data": [{"ordId": "rest", "sCode": "0"}]}
+
+    def place_multiple_orders(self, orders_data):
+        self.placed.extend(orders_data)
+        return {
+            "code": "0",
+            "data": [
+                {"clOrdId": order["clOrdId"], "ordId": "rest", "sCode": "0"}
+                for order in orders_data
+            ],
+        }
+
+
+@pytest.fixture(autouse=True)
+def gateway(monkeypatch):
+    monkeypatch.setattr(ws_order_gateway, "WS_ORDER_LOOKUP_GRACE_SECONDS", 0.05)
+    monkeypatch.setattr(ws_order_gateway, "WS_ORDER_LOOKUP_INTERVAL_SECONDS", 0.001)
+    ws_order_gateway.set_order_gateway(_TimingOutGateway())
+    yield
+    ws_order_gateway.set_order_gateway(None)
+
+
+def _order(clOrdId, ordType="limit"):
+    return {"instId": "A-USDT", "ordType": ordType, "clOrdId": clOrdId, "sz": "1"}
+
+
+def test_in_flight_order_found_on_a_later_poll_is_not_resent():
+    rest = _Rest(visible_after={"c1": 3})
+    result = OrderRoutingAPI(rest).place_order(**_order("c1", "market"))
+    assert result["code"] == "0"
+    assert result["data"][0]["ordId"] == "ord-c1"
+    assert rest.polls == 3
+    assert rest.placed == []
+
+
+def test_market_order_not_found_is_never_resent():
+    rest = _Rest()
+    result = OrderRoutingAPI(rest).place_order(**_order("c1", "market"))
+    assert result["code"] == "1"
+    assert rest.polls > 1  # Looked up for the whole grace period
+    assert rest.placed == []
+
+
+def test_limit_order_not_found_is_resent_with_its_clordid():
+    rest = _Rest()
+    result = OrderRoutingAPI(rest).place_order(**_order("c1"))
+    assert result["code"] == "0"
+    assert [order["clOrdId"] for order in rest.placed] == ["c1"]
+
+
+def test_failed_lookup_is_reported_not_resent():
+    rest = _Rest(error=True)
+    result = OrderRoutingAPI(rest).place_order(**_order("c1"))
+    assert result["code"] == "1"
+    assert "unknown" in result["data"][0]["sMsg"]
+    assert rest.placed == []
+
+
+def test_batch_resends_only_limit_orders_not_found():
+    rest = _Rest(visible_after={"c1": 1})
+    orders = [_order("c1"), _order("c2"), _order("c3", "market")]
+    result = OrderRoutingAPI(rest).place_multiple_orders(orders)
+
+    assert [order["clOrdId"] for order in rest.placed] == ["c2"]
+    assert [entry["ordId"] for entry in result["data"]] == ["ord-c1", "rest", ""]
+    assert result["code"] == "2"
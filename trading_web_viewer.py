@@ -6,6 +6,7 @@ Display trading records grouped by cryptocurrency with profit calculation
 """
 
 import os
+import sys
 import time
 from collections import defaultdict
 from datetime import datetime, timedelta, timezone
@@ -18,6 +19,13 @@ from psycopg.rows import dict_row
 # Load environment variables
 load_dotenv()
 
+# Shared connection pool from src/utils (direct connects if unavailable)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+try:
+    from utils.db_pool import get_connection as get_pooled_connection  # noqa: E402
+except ImportError:
+    get_pooled_connection = None
+
 app = Flask(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -33,10 +41,27 @@ CACHE_TTL = 5  # seconds
 
 
 def get_db_connection():
-    """Get PostgreSQL database connection"""
+    """Get PostgreSQL database connection (pooled; close() returns it)"""
+    if get_pooled_connection is not None:
+        return get_pooled_connection(DATABASE_URL)
     return psycopg.connect(DATABASE_URL)
 
 
+# orders.price_num / size_num / sell_price_num (NUMERIC copies of the text
+# columns); None until the first query tells whether they exist
+_typed_columns = None
+
+
+def order_number(row, column):
+    """Typed NUMERIC column when present, else the text column parsed"""
+    value = row.get(f"{column}_num")
+    if value is None:
+        text = row.get(column)
+        return float(text) if text else 0.0
+    value = float(value)
+    return 0.0 if value != value else value  # NaN: text was not a number
+
+
 HTML_TEMPLATE = """  # noqa: E501
 <!DOCTYPE html>
 <html lang="en">
@@ -268,7 +293,7 @@ HTML_TEMPLATE = """  # noqa: E501
 
 def get_trading_records():
     """Get trading records from database grouped by cryptocurrency"""
-    global _cache_data, _cache_timestamp
+    global _cache_data, _cache_timestamp, _typed_columns
 
     # Check cache
     current_time = time.time()
@@ -284,20 +309,30 @@ def get_trading_records():
     cur = conn.cursor(row_factory=dict_row)
 
     try:
+        typed = (
+            ", price_num, size_num, sell_price_num"
+            if _typed_columns is not False
+            else ""
+        )
         # Get all orders for this strategy (including sell_price)
         # Use LIKE to match both 'hourly_limit_ws' and 'hourly_limit_ws_test'
         # Add LIMIT to improve performance
-        cur.execute(
-            """
+        query = f"""
             SELECT instId, ordId, create_time, orderType, state, price, size,
-                   sell_time, side, sell_price
+                   sell_time, side, sell_price{typed}
             FROM orders
             WHERE flag LIKE %s
             ORDER BY create_time DESC
             LIMIT 1000
-        """,
-            (f"{STRATEGY_NAME}%",),
-        )
+        """
+        try:
+            cur.execute(query, (f"{STRATEGY_NAME}%",))
+            _typed_columns = bool(typed)
+        except psycopg.errors.UndefinedColumn:
+            # Database not migrated yet: text columns only
+            conn.rollback()
+            _typed_columns = False
+            cur.execute(query.replace(typed, ""), (f"{STRATEGY_NAME}%",))
 
         rows = cur.fetchall()
         print(
@@ -329,9 +364,9 @@ def get_trading_records():
         process_start = time.time()
         for row in rows:
             instId = row["instid"]
-            buy_price = float(row["price"]) if row["price"] else 0.0
-            sell_price = float(row["sell_price"]) if row.get("sell_price") else 0.0
-            size = float(row["size"]) if row["size"] else 0.0
+            buy_price = order_number(row, "price")
+            sell_price = order_number(row, "sell_price")
+            size = order_number(row, "size")
             state = row["state"] if row["state"] else "active"
 
             # Optimize timestamp conversions - only convert once
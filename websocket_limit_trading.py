@@ -10,6 +10,7 @@ import functools
 import json
 import logging
 import os
+import signal
 import sys
 import threading
 import time
@@ -82,6 +83,15 @@ try:
 except ImportError:
     BatchBuyStrategy = None
 
+# Import striped per-instrument state locking
+try:
+    from core.instrument_state import InstrumentStateRegistry, instrument_lock
+except ImportError:
+    InstrumentStateRegistry = None
+
+    def instrument_lock(lock, instId):
+        return lock
+
 
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 
@@ -213,12 +223,16 @@ try:
     from core.okx_functions import format_number as _format_number
     from core.okx_functions import get_instrument_precision as _get_instrument_precision
     from core.okx_functions import get_market_api as _get_market_api
+    from core.okx_functions import get_precision_cache
     from core.okx_functions import get_public_api as _get_public_api
     from core.okx_functions import get_trade_api as _get_trade_api
+    from core.okx_functions import preload_instrument_precision
 except ImportError as e:
     logger.warning(f"Failed to import okx_functions (numpy/pandas may be missing): {e}")
     _format_number = None
     _get_instrument_precision = None
+    get_precision_cache = None
+    preload_instrument_precision = None
     _get_market_api = None
     _get_public_api = None
     _get_trade_api = None
@@ -249,19 +263,166 @@ if TYPE_CHECKING:
     from core.order_sync import OrderSyncManager as OrderSyncManagerType
 
 try:
+    from core.order_timeout import (
+        ORDER_TIMEOUT_SECONDS,
+    )
     from core.order_timeout import (
         check_and_cancel_unfilled_order_after_timeout as _check_and_cancel_unfilled_order_after_timeout,
     )
 except ImportError as e:
     logger.warning(f"Failed to import order_timeout: {e}")
+    ORDER_TIMEOUT_SECONDS = 60
     _check_and_cancel_unfilled_order_after_timeout = None
 
+try:
+    from core.task_runner import schedule_later, set_scheduler, set_spawner, spawn
+except ImportError as e:
+    logger.warning(f"Failed to import task_runner: {e}")
+    schedule_later = None
+    spawn = None
+    set_scheduler = None
+    set_spawner = None
+
+try:
+    from core.scheduler import DeadlineScheduler
+except ImportError as e:
+    logger.warning(f"Failed to import scheduler: {e}")
+    DeadlineScheduler = None
+
+try:
+    from core.sell_scheduler import SellDeadlineDict, SellScheduler
+except ImportError as e:
+    logger.warning(f"Failed to import sell_scheduler: {e}")
+    SellDeadlineDict = None
+    SellScheduler = None
+
+try:
+    from core.order_state import (
+        ORDERS_WS_ENABLED,
+        PrivateOrdersStream,
+        get_order_state_cache,
+    )
+except ImportError as e:
+    logger.warning(f"Failed to import order_state: {e}")
+    ORDERS_WS_ENABLED = False
+    PrivateOrdersStream = None
+    get_order_state_cache = None
+
+try:
+    from core.ws_order_gateway import (
+        WS_ORDERS_ENABLED,
+        WsOrderGateway,
+        set_order_gateway,
+    )
+except ImportError as e:
+    logger.warning(f"Failed to import ws_order_gateway: {e}")
+    WS_ORDERS_ENABLED = False
+    WsOrderGateway = None
+    set_order_gateway = None
+
+try:
+    from core.change_feed import ORDERS_CHANGE_FEED_ENABLED, OrdersChangeFeed
+except ImportError as e:
+    logger.warning(f"Failed to import change_feed: {e}")
+    ORDERS_CHANGE_FEED_ENABLED = False
+    OrdersChangeFeed = None
+
+try:
+    from core.orders_schema import configure_typed_reads
+    from core.schema_registry import (
+        SchemaError,
+        get_schema_capabilities,
+        load_schema_capabilities,
+    )
+except ImportError as e:
+    logger.warning(f"Failed to import schema_registry: {e}")
+    configure_typed_reads = None
+    SchemaError = None
+    get_schema_capabilities = None
+    load_schema_capabilities = None
+
+try:
+    from core.gap_cooldown import GapCooldown
+except ImportError as e:
+    logger.warning(f"Failed to import gap_cooldown: {e}")
+    GapCooldown = None
+
+try:
+    from core.bulk_sell import BULK_SELL_ENABLED, BulkSellExecutor
+except ImportError as e:
+    logger.warning(f"Failed to import bulk_sell: {e}")
+    BULK_SELL_ENABLED = False
+    BulkSellExecutor = None
+
+try:
+    from core.reference_rollover import REFERENCE_ROLLOVER_ENABLED, ReferenceRollover
+except ImportError as e:
+    logger.warning(f"Failed to import reference_rollover: {e}")
+    REFERENCE_ROLLOVER_ENABLED = False
+    ReferenceRollover = None
+
+try:
+    from core.rate_limiter import get_rate_limiter
+except ImportError as e:
+    logger.warning(f"Failed to import rate_limiter: {e}")
+    get_rate_limiter = None
+
+try:
+    from core import state_snapshot
+except ImportError as e:
+    logger.warning(f"Failed to import state_snapshot: {e}")
+    state_snapshot = None
+
+try:
+    from core.leader_election import (
+        LEADER_ELECTION_ENABLED,
+        LeaderLease,
+        set_trading_enabled,
+    )
+except ImportError as e:
+    logger.warning(f"Failed to import leader_election: {e}")
+    LEADER_ELECTION_ENABLED = False
+    LeaderLease = None
+    set_trading_enabled = None
+
+try:
+    from core.sharding import SHARD_ENABLED, ShardCoordinator, set_coordinator
+except ImportError as e:
+    logger.warning(f"Failed to import sharding: {e}")
+    SHARD_ENABLED = False
+    ShardCoordinator = None
+    set_coordinator = None
+
+try:
+    from core.position_index import get_position_index
+except ImportError as e:
+    logger.warning(f"Failed to import position_index: {e}")
+    get_position_index = None
+
+try:
+    from utils import db_pool
+except ImportError as e:
+    logger.warning(f"Failed to import db_pool: {e}")
+    db_pool = None
+
+try:
+    from core.async_engine import AsyncEngine
+except ImportError as e:
+    logger.warning(f"Failed to import async_engine: {e}")
+    AsyncEngine = None
+
 try:
     from core.price_manager import PriceManager
 except ImportError as e:
     logger.warning(f"Failed to import price_manager: {e}")
     PriceManager = None
 
+try:
+    from core.trigger_table import TriggerTable
+except ImportError as e:
+    logger.warning(f"Failed to import trigger_table: {e}")
+    TriggerTable = None
+
 try:
     from core.signal_processing import (
         process_batch_buy_signal as _process_batch_buy_signal,
@@ -289,12 +450,24 @@ except ImportError as e:
     _ticker_open = None
 
 try:
+    from core.websocket_handlers import evaluate_ticker as _evaluate_ticker
     from core.websocket_handlers import on_candle_message as _on_candle_message
     from core.websocket_handlers import on_ticker_message as _on_ticker_message
+    from core.websocket_handlers import (
+        on_ticker_message_conflated as _on_ticker_message_conflated,
+    )
 except ImportError as e:
     logger.warning(f"Failed to import websocket_handlers: {e}")
+    _evaluate_ticker = None
     _on_candle_message = None
     _on_ticker_message = None
+    _on_ticker_message_conflated = None
+
+try:
+    from core.ticker_ingest import ConflatingTickerQueue
+except ImportError as e:
+    logger.warning(f"Failed to import ticker_ingest: {e}")
+    ConflatingTickerQueue = None
 
 try:
     from core.memory_sync import start_periodic_sync as _start_periodic_sync
@@ -306,8 +479,19 @@ except ImportError as e:
     _start_periodic_sync = None
     _sync_active_orders_with_db = None
 
+
+def _new_orders_dict(strategy_type: str) -> Dict[str, Dict]:
+    """Active orders container; assignments feed the sell scheduler heap"""
+    if SellDeadlineDict is not None:
+        return SellDeadlineDict(strategy_type)
+    return {}
+
+
 # Global variables
 crypto_limits: Dict[str, float] = {}  # instId -> limit_percent
+# Sharded mode: every hour_limit instrument; crypto_limits holds this worker's shard
+all_crypto_limits: Dict[str, float] = {}
+shard_coordinator: Optional["ShardCoordinator"] = None
 current_prices: Dict[str, float] = {}  # instId -> last_price
 reference_prices: Dict[str, float] = (
     {}
@@ -318,21 +502,27 @@ reference_price_fetch_attempts: Dict[str, int] = (
     {}
 )  # instId -> consecutive fetch failures
 pending_buys: Dict[str, float] = {}  # instId -> timestamp when pending started
-active_orders: Dict[str, Dict] = (
-    {}
+active_orders: Dict[str, Dict] = _new_orders_dict(
+    "original"
 )  # instId -> {ordId, buy_price, buy_time, next_hour_close_time, fill_time, ...}
 # Original-gap strategy active orders
-gap_active_orders: Dict[str, Dict] = (
-    {}
+gap_active_orders: Dict[str, Dict] = _new_orders_dict(
+    "gap"
 )  # instId -> {ordId, buy_price, buy_time, next_hour_close_time, fill_time, ...}
 gap_pending_buys: Dict[str, float] = {}  # instId -> timestamp when pending started
-gap_last_buy_time: Dict[str, float] = {}
+# ✅ OPTIMIZED: Global gap cooldown held in memory (see init_gap_cooldown)
+gap_cooldown: Optional["GapCooldown"] = None
 # Stable strategy active orders
-stable_active_orders: Dict[str, Dict] = (
-    {}
+stable_active_orders: Dict[str, Dict] = _new_orders_dict(
+    "stable"
 )  # instId -> {ordId, buy_price, buy_time, next_hour_close_time, fill_time, ...}
 stable_pending_buys: Dict[str, float] = {}  # instId -> timestamp when pending started
-lock = threading.Lock()
+# ✅ OPTIMIZED: Striped state lock - `with lock:` still locks everything, while
+# per-instrument sections (ticker/candle/sell scan) use instrument_lock(lock, instId)
+instrument_states: Optional["InstrumentStateRegistry"] = (
+    InstrumentStateRegistry() if InstrumentStateRegistry is not None else None
+)
+lock = instrument_states.lock if instrument_states is not None else threading.Lock()
 
 # Initialize stable buy strategy
 stable_strategy: Optional[StableBuyStrategy] = None
@@ -343,8 +533,8 @@ else:
     logger.warning("⚠️ Stable Buy strategy not available")
 
 # Batch strategy active orders
-batch_active_orders: Dict[str, Dict] = (
-    {}
+batch_active_orders: Dict[str, Dict] = _new_orders_dict(
+    "batch"
 )  # instId -> {ordIds: [], buy_price, buy_time, next_hour_close_time, total_size, ...}
 batch_pending_buys: Dict[str, float] = {}  # instId -> timestamp when pending started
 
@@ -363,10 +553,27 @@ thread_pool = ThreadPoolExecutor(
     max_workers=thread_pool_max_workers, thread_name_prefix="trade"
 )
 
+# ✅ NEW: Execution engine - "threads" (default) or "asyncio" (one event loop
+# runs both sockets, the sell checker and order timeouts; blocking REST/DB
+# work goes through a bounded executor)
+ENGINE_MODE = os.getenv("ENGINE_MODE", "threads").lower()
+engine: Optional["AsyncEngine"] = None
+
+# ✅ NEW: Single timer thread for all deferred work (order timeouts, batch
+# delays); due callbacks run on thread_pool instead of sleeping threads
+deferred_scheduler: Optional["DeadlineScheduler"] = None
+if DeadlineScheduler is not None and set_scheduler is not None:
+    deferred_scheduler = DeadlineScheduler(
+        lambda fn, *args: thread_pool.submit(fn, *args), name="DeferredScheduler"
+    )
+    set_scheduler(deferred_scheduler.call_later)
+
 
 # WebSocket connections for unsubscribe (using dict refs for module compatibility)
 ticker_ws_ref: Dict[str, Optional[websocket.WebSocketApp]] = {"ws": None}
 candle_ws_ref: Dict[str, Optional[websocket.WebSocketApp]] = {"ws": None}
+orders_ws_ref: Dict[str, Optional[object]] = {"ws": None}  # private orders channel
+order_gateway_ws_ref: Dict[str, Optional[object]] = {"ws": None}  # order ops
 ws_lock = threading.Lock()
 
 # Backward compatibility
@@ -409,11 +616,20 @@ def get_instrument_precision(instId: str, use_cache: bool = True) -> Optional[Di
 def get_db_connection(max_retries=None, retry_delay=None):
     """Get PostgreSQL database connection with retry logic
 
-    Note: Neon database URL includes '-pooler' which provides connection pooling
-    at the database level. For high-load scenarios, consider implementing
-    application-level connection pooling (e.g., psycopg.pool) to further
-    reduce connection overhead.
+    Connections come from the shared application-level pool (see
+    utils/db_pool.py): they are health-checked on checkout, recycled after
+    DB_POOL_MAX_LIFETIME, and conn.close() returns them to the pool. Falls
+    back to a direct connect when pooling is unavailable or exhausted.
     """
+    # ✅ OPTIMIZED: Reuse pooled connections instead of connect + SELECT 1 per call
+    if db_pool is not None and db_pool.pool_available():
+        try:
+            return db_pool.get_connection(DATABASE_URL)
+        except Exception as e:
+            logger.warning(
+                f"⚠️ Database pool checkout failed ({e}), connecting directly"
+            )
+
     # Environment-configurable connection parameters
     max_retries = max_retries or int(os.getenv("DB_CONNECT_MAX_RETRIES", "3"))
     retry_delay = retry_delay or float(os.getenv("DB_CONNECT_RETRY_DELAY", "1.0"))
@@ -451,19 +667,21 @@ def play_sound(sound_type: str):
         logger.debug("play_sound not available - module import failed")
 
 
-def format_number(number, instId: Optional[str] = None):
+def format_number(number, instId: Optional[str] = None, kind: str = "size"):
     """Format number according to OKX precision requirements
-    If instId is provided, uses OKX instrument precision (lotSz) for better accuracy
+    If instId is provided, rounds to the instrument's lotSz (sizes) or
+    tickSz (kind="price" for order prices, "fill_price" for recorded prices)
     Falls back to heuristic precision if instrument info is not available
 
     Args:
         number: Number to format (price or size)
         instId: Optional instrument ID (e.g., 'BTC-USDT') to use instrument-specific precision
+        kind: "size", "price" or "fill_price"
     """
     if _format_number is None:
         logger.error("format_number module not available - module import failed")
         raise RuntimeError("format_number function not available")
-    return _format_number(number, instId, TRADING_FLAG)
+    return _format_number(number, instId, TRADING_FLAG, kind)
 
 
 def extract_base_currency(instId):
@@ -477,6 +695,13 @@ def extract_base_currency(instId):
 
 def remove_crypto_from_system(instId: str):
     """Remove crypto from hour_limit table, memory, and unsubscribe from WebSocket"""
+    if trigger_table is not None:
+        trigger_table.remove(instId)
+    if reference_rollover is not None:
+        reference_rollover.discard(instId)
+    if shard_coordinator is not None:
+        all_crypto_limits.pop(instId, None)
+        shard_coordinator.discard(instId)
     if _remove_crypto_from_system:
         return _remove_crypto_from_system(
             instId,
@@ -526,6 +751,142 @@ def unsubscribe_from_websocket(instId: str):
         logger.error(f"Error in unsubscribe_from_websocket for {instId}: {e}")
 
 
+def subscribe_to_websocket(instIds):
+    """Subscribe ticker and candle WebSocket to additional cryptos"""
+    instIds = sorted(instIds)
+    try:
+        with ws_lock:
+            for ws_ref, channel in (
+                (ticker_ws_ref, "tickers"),
+                (candle_ws_ref, "candle1H"),
+            ):
+                if not ws_ref["ws"]:
+                    continue  # Subscribed from crypto_limits on (re)connect
+                for i in range(0, len(instIds), 100):
+                    msg = {
+                        "op": "subscribe",
+                        "args": [
+                            {"channel": channel, "instId": instId}
+                            for instId in instIds[i : i + 100]
+                        ],
+                    }
+                    ws_ref["ws"].send(json.dumps(msg))
+        logger.warning(f"📡 Subscribed {len(instIds)} cryptos")
+    except Exception as e:
+        logger.error(f"Error in subscribe_to_websocket: {e}")
+
+
+def warm_up_instruments(limits: Dict[str, float]):
+    """Reference prices, triggers and candle history for newly owned cryptos"""
+    if price_manager is None:
+        return
+    price_manager.initialize_reference_prices(limits)
+    price_manager.seed_candle_history(limits)
+    with lock:
+        reference_prices.update(
+            {
+                instId: price
+                for instId, price in price_manager.reference_prices.items()
+                if instId in limits
+            }
+        )
+        reference_snapshot = dict(reference_prices)
+    if trigger_table is not None:
+        for instId, limit_percent in limits.items():
+            trigger_table.update(
+                instId, reference_snapshot.get(instId, 0), limit_percent
+            )
+
+
+def apply_shard_change(added, removed):
+    """Move instruments in/out of this worker's shard
+
+    Lost instruments stop being watched (no new buys); positions already
+    held here are still sold on schedule. Gained instruments are subscribed
+    and warmed up in the background.
+    """
+    with lock:
+        for instId in removed:
+            crypto_limits.pop(instId, None)
+        for instId in added:
+            if instId in all_crypto_limits:
+                crypto_limits[instId] = all_crypto_limits[instId]
+    if shard_coordinator is None:
+        return  # Initial shard: main() subscribes and warms up as usual
+
+    for instId in removed:
+        if trigger_table is not None:
+            trigger_table.remove(instId)
+        unsubscribe_from_websocket(instId)
+    if added:
+        subscribe_to_websocket(added)
+        limits = {
+            instId: all_crypto_limits[instId]
+            for instId in added
+            if instId in all_crypto_limits
+        }
+        if spawn is not None:
+            spawn(warm_up_instruments, limits, name="ShardWarmUp")
+        else:
+            thread_pool.submit(warm_up_instruments, limits)
+
+
+def expire_shard(removed):
+    """Heartbeats lost: peers are taking these instruments over
+
+    Unlike a rebalance, positions held here are dropped from memory too: this
+    worker cannot reach the database, so its sell locks would fail open, and
+    the new owner recovers the positions from the orders table.
+    """
+    apply_shard_change(set(), removed)
+    dropped = []
+    with lock:
+        for strategy_type, (_, orders) in _strategy_orders().items():
+            for instId in removed & orders.keys():
+                orders.pop(instId, None)
+                dropped.append(f"{strategy_type}:{instId}")
+    if dropped:
+        logger.error(
+            f"❌ Shard expired: handed {len(dropped)} positions over to the new "
+            f"owners: {', '.join(sorted(dropped))}"
+        )
+
+
+def start_sharding() -> bool:
+    """Restrict crypto_limits to this worker's shard of hour_limit
+
+    Returns:
+        False if sharding is enabled but could not join (caller exits)
+    """
+    global shard_coordinator
+    if not SHARD_ENABLED:
+        return True
+    if ShardCoordinator is None:
+        logger.error("❌ SHARD_ENABLED but sharding module not available")
+        return False
+    all_crypto_limits.clear()
+    all_crypto_limits.update(crypto_limits)
+    with lock:
+        crypto_limits.clear()
+    coordinator = ShardCoordinator(
+        get_db_connection,
+        all_crypto_limits,
+        apply_shard_change,
+        on_expired=expire_shard,
+    )
+    try:
+        if not coordinator.join():
+            return False
+    except Exception as e:
+        logger.error(f"❌ Failed to join shard ring: {e}")
+        return False
+    shard_coordinator = coordinator
+    set_coordinator(coordinator)
+    coordinator.start()
+    logger.warning(coordinator.format_stats())
+    return True
+
+
 def check_blacklist_before_buy(instId, auto_remove=True):
     """Check if crypto is blacklisted. If blacklisted and auto_remove=True, remove from system."""
     if _check_blacklist_before_buy is None or BlacklistManager is None:
@@ -573,9 +934,13 @@ if PriceManager is not None:
         logger.warning(f"⚠️ Failed to initialize PriceManager: {e}")
         price_manager = None
 
+# ✅ NEW: Precomputed per-hour limit prices for the ticker hot path
+trigger_table: Optional["TriggerTable"] = (
+    TriggerTable(calculate_limit_price) if TriggerTable is not None else None
+)
+
 # Order sync manager will be initialized after process_sell_signal is defined
 order_sync_manager: Optional["OrderSyncManager"] = None
-gap_order_sync_manager: Optional["OrderSyncManager"] = None
 
 
 def fetch_current_hour_open_price(instId: str) -> Optional[float]:
@@ -612,15 +977,71 @@ def check_2h_gain_filter(
     )
 
 
-def initialize_reference_prices():
-    """Initialize reference prices (current hour's open) for all cryptos"""
+def record_confirmed_candle(instId: str, candle_data: list):
+    """Feed a confirmed 1H candle from WebSocket into the candle buffer"""
+    if price_manager is not None:
+        price_manager.record_confirmed_candle(instId, candle_data)
+
+
+def seed_candle_history(limits: Optional[Dict[str, float]] = None):
+    """Seed 1H candle history once at startup (WebSocket keeps it current)"""
+    if price_manager is None:
+        logger.error("PriceManager not available, cannot seed candle history")
+        return
+    price_manager.seed_candle_history(crypto_limits if limits is None else limits)
+
+
+def initialize_reference_prices(limits: Optional[Dict[str, float]] = None):
+    """Initialize reference prices (current hour's open) for all cryptos
+
+    Args:
+        limits: Only fetch these (e.g. those missing from a state snapshot);
+            the trigger table is rebuilt for all of crypto_limits either way
+    """
     if price_manager is None:
         logger.error("PriceManager not available, cannot initialize reference prices")
         return
-    price_manager.initialize_reference_prices(crypto_limits)
+    price_manager.initialize_reference_prices(
+        crypto_limits if limits is None else limits
+    )
     # Sync with global reference_prices dict
     with lock:
         reference_prices.update(price_manager.reference_prices)
+        reference_snapshot = dict(reference_prices)
+    if trigger_table is not None:
+        trigger_table.rebuild(reference_snapshot, crypto_limits)
+
+
+# ✅ NEW: New-hour reference prices come from the WebSocket (first candle1H
+# frame or ticker of the hour); REST only for instruments still missing
+reference_rollover: Optional["ReferenceRollover"] = None
+
+
+def apply_rollover_reference(instId: str, price: float):
+    """Install a new-hour reference price taken from a ticker or REST"""
+    if price_manager is not None:
+        price_manager.set_reference_price(instId, price)
+    with instrument_lock(lock, instId):
+        limit_percent = crypto_limits.get(instId)
+        if limit_percent is None:
+            return
+        reference_prices[instId] = price
+        reference_price_fetch_attempts[instId] = 0
+        if trigger_table is not None:
+            trigger_table.update(instId, price, limit_percent)
+
+
+def start_reference_rollover():
+    global reference_rollover
+    if not REFERENCE_ROLLOVER_ENABLED or ReferenceRollover is None:
+        return
+    reference_rollover = ReferenceRollover(
+        apply_rollover_reference,
+        fetch_current_hour_open_price,
+        lambda: list(crypto_limits),
+    )
+    reference_rollover.start()
+    logger.warning("✅ Hour-rollover reference prices from WebSocket enabled")
 
 
 def buy_limit_order(
@@ -679,9 +1100,62 @@ def sell_market_order(
     return False
 
 
+def evaluate_ticker(instId: str, last_price: float):
+    """Run all strategies for one instrument's latest price (evaluator stage)"""
+    _evaluate_ticker(
+        instId,
+        last_price,
+        crypto_limits,
+        current_prices,
+        reference_prices,
+        reference_price_fetch_time,
+        reference_price_fetch_attempts,
+        pending_buys,
+        active_orders,
+        stable_active_orders,
+        stable_pending_buys,
+        stable_strategy,
+        batch_active_orders,
+        batch_pending_buys,
+        batch_strategy,
+        gap_active_orders,
+        gap_pending_buys,
+        lock,
+        fetch_current_hour_open_price,
+        calculate_limit_price,
+        process_buy_signal,
+        process_stable_buy_signal,
+        process_batch_buy_signal,
+        process_gap_buy_signal,
+        _has_recent_gap_buy,
+        check_2h_gain_filter,
+        thread_pool,
+        trigger_table,
+        instrument_states,
+        reference_rollover,
+    )
+
+
+# ✅ NEW: Two-stage ticker pipeline - the WS receive thread only parses and
+# conflates; evaluator workers run the strategies on the newest price
+TICKER_CONFLATION_ENABLED = (
+    os.getenv("TICKER_CONFLATION_ENABLED", "true").lower() == "true"
+)
+ticker_ingest: Optional["ConflatingTickerQueue"] = None
+if (
+    TICKER_CONFLATION_ENABLED
+    and ConflatingTickerQueue is not None
+    and _evaluate_ticker is not None
+    and _on_ticker_message_conflated is not None
+):
+    ticker_ingest = ConflatingTickerQueue(evaluate_ticker)
+
+
 def on_ticker_message(ws, msg_string):
     """Handle ticker WebSocket messages"""
-    if _on_ticker_message:
+    if ticker_ingest is not None:
+        _on_ticker_message_conflated(ws, msg_string, crypto_limits, ticker_ingest)
+    elif _on_ticker_message:
         _on_ticker_message(
             ws,
             msg_string,
@@ -710,6 +1184,9 @@ def on_ticker_message(ws, msg_string):
             _has_recent_gap_buy,
             check_2h_gain_filter,  # Pass 2h gain filter function
             thread_pool,  # Pass thread pool for async processing
+            trigger_table,  # Precomputed limit prices
+            instrument_states,  # Per-instrument tick state (striped locks)
+            reference_rollover,  # New-hour references from the first tick
         )
     else:
         logger.error("on_ticker_message not available - module import failed")
@@ -720,7 +1197,8 @@ def check_and_cancel_unfilled_order_after_timeout(
 ):
     """Check order status after 1 minute timeout, cancel if not filled"""
     if _check_and_cancel_unfilled_order_after_timeout:
-        _check_and_cancel_unfilled_order_after_timeout(
+        check = functools.partial(
+            _check_and_cancel_unfilled_order_after_timeout,
             instId,
             ordId,
             tradeAPI,
@@ -735,6 +1213,13 @@ def check_and_cancel_unfilled_order_after_timeout(
             BATCH_STRATEGY_NAME,
             lock,
         )
+        if schedule_later is not None:
+            # ✅ OPTIMIZED: Deferred via task runner (a loop timer in asyncio mode)
+            schedule_later(
+                ORDER_TIMEOUT_SECONDS, functools.partial(check, wait_seconds=0)
+            )
+        else:
+            check()
     else:
         logger.error(
             "check_and_cancel_unfilled_order_after_timeout not available - module import failed"
@@ -748,7 +1233,8 @@ def check_and_cancel_unfilled_order_after_timeout_gap(
     strategy_name is ignored (always uses ORIGINAL_GAP_STRATEGY_NAME) but accepted
     for compatibility with process_buy_signal callback signature."""
     if _check_and_cancel_unfilled_order_after_timeout:
-        _check_and_cancel_unfilled_order_after_timeout(
+        check = functools.partial(
+            _check_and_cancel_unfilled_order_after_timeout,
             instId,
             ordId,
             tradeAPI,
@@ -763,51 +1249,69 @@ def check_and_cancel_unfilled_order_after_timeout_gap(
             BATCH_STRATEGY_NAME,
             lock,
         )
+        if schedule_later is not None:
+            # ✅ OPTIMIZED: Deferred via task runner (a loop timer in asyncio mode)
+            schedule_later(
+                ORDER_TIMEOUT_SECONDS, functools.partial(check, wait_seconds=0)
+            )
+        else:
+            check()
     else:
         logger.error(
             "check_and_cancel_unfilled_order_after_timeout not available - module import failed"
         )
 
 
-def _record_gap_buy(instId: str, buy_time: datetime):
-    """Record global gap buy time (not per-instId, but global cooldown)"""
-    with lock:
-        gap_last_buy_time["__global__"] = buy_time.timestamp()
-
+def check_orders_schema() -> bool:
+    """Introspect orders once, log the self-check, pick typed or text reads
 
-def _has_recent_gap_buy(instId: str) -> bool:
-    """Check if there was ANY gap buy in the last 30 minutes (global cooldown)"""
-    now_ts = time.time()
-
-    # Check memory first (global cooldown)
-    with lock:
-        last_ts = gap_last_buy_time.get("__global__")
-    if last_ts and (now_ts - last_ts) < ORIGINAL_GAP_COOLDOWN_SECONDS:
+    Returns:
+        False when the schema cannot support this code (startup must stop)
+    """
+    if load_schema_capabilities is None:
         return True
-
-    # Fallback to DB: check if ANY coin was bought in the last 30 minutes
     try:
         conn = get_db_connection()
-        cur = conn.cursor()
-        cutoff_ms = int((now_ts - ORIGINAL_GAP_COOLDOWN_SECONDS) * 1000)
-        cur.execute(
-            """
-            SELECT MAX(create_time) FROM orders
-            WHERE side = 'buy' AND flag = %s AND create_time >= %s
-            """,
-            (ORIGINAL_GAP_STRATEGY_NAME, cutoff_ms),
-        )
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
-        if row and row[0]:
-            with lock:
-                gap_last_buy_time["__global__"] = float(row[0]) / 1000.0
-            return True
+        try:
+            capabilities = load_schema_capabilities(conn)
+        finally:
+            conn.close()
+    except SchemaError as e:
+        logger.error(f"❌ {e}")
+        return False
     except Exception as e:
-        logger.warning(f"Original gap global buy check failed: {e}")
+        logger.warning(f"⚠️ Orders schema self-check failed, using text columns: {e}")
+        return True
+    configure_typed_reads(capabilities.typed_columns)
+    return True
 
-    return False
+
+def init_gap_cooldown():
+    """Create the in-memory gap cooldown (loaded from the DB by start_trading)"""
+    global gap_cooldown
+    if GapCooldown is None:
+        return
+    gap_cooldown = GapCooldown(
+        get_db_connection,
+        ORIGINAL_GAP_STRATEGY_NAME,
+        ORIGINAL_GAP_COOLDOWN_SECONDS,
+        database_url=DATABASE_URL or "",
+    )
+
+
+def _record_gap_buy(instId: str, buy_time: datetime):
+    """Record global gap buy time (not per-instId, but global cooldown)"""
+    if gap_cooldown is not None:
+        gap_cooldown.record(buy_time.timestamp())
+
+
+def _has_recent_gap_buy(instId: str) -> bool:
+    """Check if there was ANY gap buy in the last 30 minutes (global cooldown)
+
+    ✅ OPTIMIZED: Answered from memory - the cooldown is loaded once from the
+    DB and other processes' gap buys arrive by NOTIFY, so ticks do no I/O
+    """
+    return gap_cooldown is not None and gap_cooldown.is_active()
 
 
 def process_buy_signal(instId: str, limit_price: float):
@@ -876,6 +1380,9 @@ def on_candle_message(ws, msg_string):
             lock,
             process_sell_signal,
             thread_pool,  # Pass thread pool for async processing
+            record_confirmed_candle,  # Feed 1H candle buffer (2h gain filter)
+            trigger_table,  # Recompute limit price when the hourly open changes
+            reference_rollover,  # New-hour reference readiness
         )
     else:
         logger.error("on_candle_message not available - module import failed")
@@ -1084,6 +1591,9 @@ if OrderSyncManager is not None and order_sync_manager is None:
         batch_process_sell_signal = functools.partial(
             process_sell_signal, strategy_type="batch"
         )
+        gap_process_sell_signal = functools.partial(
+            process_sell_signal, strategy_type="gap"
+        )
 
         order_sync_manager = OrderSyncManager(
             strategy_name=STRATEGY_NAME,
@@ -1101,43 +1611,16 @@ if OrderSyncManager is not None and order_sync_manager is None:
             process_stable_sell_signal=stable_process_sell_signal,
             process_batch_sell_signal=batch_process_sell_signal,
             simulation_mode=SIMULATION_MODE,
+            # ✅ OPTIMIZED: Gap orders share the single sync/recovery query
+            gap_strategy_name=ORIGINAL_GAP_STRATEGY_NAME,
+            gap_active_orders=gap_active_orders,
+            process_gap_sell_signal=gap_process_sell_signal,
         )
         logger.info("✅ OrderSyncManager initialized")
     except Exception as e:
         logger.warning(f"⚠️ Failed to initialize OrderSyncManager: {e}")
         order_sync_manager = None
 
-if OrderSyncManager is not None and gap_order_sync_manager is None:
-    try:
-        import functools
-
-        # Create wrapped functions with correct strategy_type for gap
-        gap_process_sell_signal = functools.partial(
-            process_sell_signal, strategy_type="gap"
-        )
-
-        gap_order_sync_manager = OrderSyncManager(
-            strategy_name=ORIGINAL_GAP_STRATEGY_NAME,
-            stable_strategy_name="__unused__",
-            batch_strategy_name="__unused__",
-            get_db_connection=get_db_connection,
-            get_trade_api=get_trade_api,
-            active_orders=gap_active_orders,
-            stable_active_orders={},
-            batch_active_orders={},
-            stable_strategy=None,
-            batch_strategy=None,
-            lock=lock,
-            process_sell_signal=gap_process_sell_signal,
-            process_stable_sell_signal=gap_process_sell_signal,
-            process_batch_sell_signal=gap_process_sell_signal,
-            simulation_mode=SIMULATION_MODE,
-        )
-        logger.info("✅ Gap OrderSyncManager initialized")
-    except Exception as e:
-        logger.warning(f"⚠️ Failed to initialize Gap OrderSyncManager: {e}")
-        gap_order_sync_manager = None
-
 
 def ticker_open(ws):
     """Handle ticker WebSocket connection open"""
@@ -1174,8 +1657,6 @@ def sync_orders_from_database():
         order_sync_manager.sync_orders_from_database()
     else:
         logger.warning("OrderSyncManager not available, skipping sync")
-    if gap_order_sync_manager:
-        gap_order_sync_manager.sync_orders_from_database()
 
 
 def recover_orders_from_database(now: datetime):
@@ -1193,8 +1674,6 @@ def recover_orders_from_database(now: datetime):
         order_sync_manager.recover_orders_from_database(now)
     else:
         logger.warning("OrderSyncManager not available, skipping recovery")
-    if gap_order_sync_manager:
-        gap_order_sync_manager.recover_orders_from_database(now)
 
 
 def monitor_websocket_health(now: datetime):
@@ -1252,6 +1731,119 @@ def monitor_thread_count():
         logger.debug(f"Thread count: {thread_count}")
 
 
+def _claim_due_sell(
+    strategy_type: str, orders_dict: dict, instId: str, now: datetime, source: str
+) -> bool:
+    """Mark an order as sell-triggered if its sell time has passed
+
+    Returns:
+        True if the caller should submit process_sell_signal for it
+    """
+    with instrument_lock(lock, instId):
+        order_info = orders_dict.get(instId)
+        if not order_info:
+            return False
+        next_hour_close = order_info.get("next_hour_close_time")
+        # Check if sell time has passed (from previous hours)
+        if not next_hour_close or now < next_hour_close:
+            return False
+        # Past sell time, check if already triggered
+        if order_info.get("sell_triggered", False):
+            return False
+        # ✅ STRICT DEDUP: Set sell_triggered BEFORE attempting sell
+        # Will be reset if sell fails
+        order_info["sell_triggered"] = True
+        order_info["last_sell_attempt_time"] = now
+        logger.warning(
+            f"⏰ SELL CHECK ({source}): {instId} ({strategy_type}) "
+            f"past sell_time={next_hour_close.strftime('%H:%M:%S')}, triggering sell"
+        )
+        return True
+
+
+# ✅ NEW: Sells due at the :55 boundary are batched (OKX batch orders, one
+# confirmation query, one DB transaction); per-instrument sells are the fallback
+bulk_sell_executor: Optional["BulkSellExecutor"] = None
+
+
+def dispatch_sell(instId: str, strategy_type: str):
+    """Hand a claimed sell to the bulk executor, or sell it on its own"""
+    if bulk_sell_executor is not None:
+        bulk_sell_executor.submit(instId, strategy_type)
+    else:
+        thread_pool.submit(process_sell_signal, instId, strategy_type)
+
+
+def start_bulk_sell():
+    """Create the bulk sell executor (live trading only)"""
+    global bulk_sell_executor
+    if SIMULATION_MODE or not BULK_SELL_ENABLED or BulkSellExecutor is None:
+        return
+    bulk_sell_executor = BulkSellExecutor(
+        get_trade_api,
+        get_db_connection,
+        format_number,
+        play_sound,
+        {
+            "original": (STRATEGY_NAME, active_orders),
+            "stable": (STABLE_STRATEGY_NAME, stable_active_orders),
+            "batch": (BATCH_STRATEGY_NAME, batch_active_orders),
+            "gap": (ORIGINAL_GAP_STRATEGY_NAME, gap_active_orders),
+        },
+        lock,
+        lambda instId, strategy_type: thread_pool.submit(
+            process_sell_signal, instId, strategy_type
+        ),
+    )
+    logger.warning("✅ Bulk sell executor enabled")
+
+
+# ✅ NEW: Exact-time sells - a min-heap of next_hour_close_time deadlines
+# (fed by the active orders dicts); the 55/59 scan remains as a backstop
+sell_scheduler: Optional["SellScheduler"] = None
+
+
+def fire_sell_deadline(strategy_type: str, instId: str):
+    """SellScheduler callback: re-validate the order and trigger its sell"""
+    orders_dict = {
+        "original": active_orders,
+        "stable": stable_active_orders,
+        "batch": batch_active_orders,
+        "gap": gap_active_orders,
+    }[strategy_type]
+    now = datetime.now()
+    if _claim_due_sell(strategy_type, orders_dict, instId, now, "deadline"):
+        dispatch_sell(instId, strategy_type)
+        return
+
+    # Deadline edited in place (e.g. late fill) - follow it
+    with instrument_lock(lock, instId):
+        order_info = orders_dict.get(instId)
+        next_hour_close = order_info.get("next_hour_close_time") if order_info else None
+        if next_hour_close and now < next_hour_close and sell_scheduler is not None:
+            sell_scheduler.schedule(strategy_type, instId, order_info)
+
+
+def start_sell_scheduler():
+    """Attach the sell scheduler to the active orders dicts and start it"""
+    global sell_scheduler
+    if SellScheduler is None:
+        logger.warning("⚠️ Sell scheduler not available, using 55/59 scan only")
+        return
+    sell_scheduler = SellScheduler(fire_sell_deadline)
+    for orders_dict in (
+        active_orders,
+        stable_active_orders,
+        batch_active_orders,
+        gap_active_orders,
+    ):
+        if isinstance(orders_dict, SellDeadlineDict):
+            orders_dict.scheduler = sell_scheduler
+            for instId, order_info in list(orders_dict.items()):
+                sell_scheduler.schedule(orders_dict.strategy_type, instId, order_info)
+    sell_scheduler.start()
+
+
 def check_sell_timeout():
     """Unified sell scheduler: robust fallback mechanism
 
@@ -1261,208 +1853,372 @@ def check_sell_timeout():
     3. Self-healing: recovers from WS packet loss, process restart, etc.
     4. Idempotent: prevents duplicate sells via DB state check
     """
-    sync_counter = 0
     while True:
+        time.sleep(TIMEOUT_CHECK_INTERVAL_SECONDS)
         try:
-            time.sleep(TIMEOUT_CHECK_INTERVAL_SECONDS)
-            now = datetime.now()
+            run_sell_timeout_check()
+        except Exception as e:
+            logger.error(f"Error in check_sell_timeout: {e}")
+            time.sleep(TIMEOUT_CHECK_INTERVAL_SECONDS)  # Wait on error
 
-            # ✅ OPTIMIZED: Sync with database only at 55 and 59 minutes
-            # This reduces DB load while still ensuring consistency
-            current_minute = now.minute
-            if current_minute == 55 or current_minute == 59:
-                sync_counter += 1
-                sync_orders_from_database()
-                # Reverse validation from DB - find filled orders not yet sold
-                recover_orders_from_database(now)
 
-            # ✅ NEW: Monitor WebSocket health - alert if candles not received
-            monitor_websocket_health(now)
+def run_sell_timeout_check():
+    """One pass of the sell timeout checker (thread loop or engine task)"""
+    now = datetime.now()
 
-            # ✅ NEW: Monitor thread count
-            monitor_thread_count()
+    # ✅ OPTIMIZED: Sync with database only at 55 and 59 minutes
+    # This reduces DB load while still ensuring consistency
+    current_minute = now.minute
+    if current_minute == 55 or current_minute == 59:
+        sync_orders_from_database()
+        # Reverse validation from DB - find filled orders not yet sold
+        recover_orders_from_database(now)
+
+    # ✅ NEW: Monitor WebSocket health - alert if candles not received
+    monitor_websocket_health(now)
+
+    # ✅ NEW: Monitor thread count
+    monitor_thread_count()
+
+    # ✅ ENHANCED: Check all orders (memory + DB) for sell triggers
+    # Check at 55 minutes and 59 minutes of each hour
+    current_minute = now.minute
+    should_check_sell = current_minute == 55 or current_minute == 59
+
+    orders_to_sell = []
+
+    if should_check_sell:
+        # ✅ OPTIMIZED: Check-and-mark each order under its own instrument
+        # stripe instead of holding the whole state lock for the scan
+        for strategy_type, orders_dict in (
+            ("original", active_orders),
+            ("stable", stable_active_orders),
+            ("batch", batch_active_orders),
+            ("gap", gap_active_orders),
+        ):
+            for instId in list(orders_dict.keys()):
+                if _claim_due_sell(
+                    strategy_type, orders_dict, instId, now, f"{current_minute}min"
+                ):
+                    orders_to_sell.append((instId, strategy_type))
+
+    # Trigger sells outside of lock (batched at the :55 boundary)
+    for instId, strategy_type in orders_to_sell:
+        logger.warning(
+            f"⏰ TIMEOUT SELL: {instId} ({strategy_type}), "
+            f"next_hour_close_time reached, triggering sell"
+        )
+        dispatch_sell(instId, strategy_type)
 
-            # ✅ ENHANCED: Check all orders (memory + DB) for sell triggers
-            # Check at 55 minutes and 59 minutes of each hour
-            current_minute = now.minute
-            should_check_sell = current_minute == 55 or current_minute == 59
-
-            orders_to_sell = []
-
-            if should_check_sell:
-                # Check original strategy orders from memory
-                with lock:
-                    for instId, order_info in list(active_orders.items()):
-                        next_hour_close = order_info.get("next_hour_close_time")
-                        # Check if sell time has passed (from previous hours)
-                        if next_hour_close and now >= next_hour_close:
-                            # Past sell time, check if already triggered
-                            if not order_info.get("sell_triggered", False):
-                                orders_to_sell.append((instId, "original"))
-                                # ✅ STRICT DEDUP: Set sell_triggered BEFORE attempting sell
-                                # Will be reset if sell fails
-                                order_info["sell_triggered"] = True
-                                order_info["last_sell_attempt_time"] = now
-                                logger.warning(
-                                    f"⏰ SELL CHECK ({current_minute}min): {instId} (original) "
-                                    f"past sell_time={next_hour_close.strftime('%H:%M:%S')}, triggering sell"
-                                )
-
-                    # Check stable strategy orders from memory
-                    for instId, order_info in list(stable_active_orders.items()):
-                        next_hour_close = order_info.get("next_hour_close_time")
-                        # Check if sell time has passed (from previous hours)
-                        if next_hour_close and now >= next_hour_close:
-                            # Past sell time, check if already triggered
-                            if not order_info.get("sell_triggered", False):
-                                orders_to_sell.append((instId, "stable"))
-                                # ✅ STRICT DEDUP: Set sell_triggered BEFORE attempting sell
-                                # Will be reset if sell fails
-                                order_info["sell_triggered"] = True
-                                order_info["last_sell_attempt_time"] = now
-                                logger.warning(
-                                    f"⏰ SELL CHECK ({current_minute}min): {instId} (stable) "
-                                    f"past sell_time={next_hour_close.strftime('%H:%M:%S')}, triggering sell"
-                                )
-
-                    # Check batch strategy orders from memory
-                    for instId, order_info in list(batch_active_orders.items()):
-                        next_hour_close = order_info.get("next_hour_close_time")
-                        # Check if sell time has passed (from previous hours)
-                        if next_hour_close and now >= next_hour_close:
-                            # Past sell time, check if already triggered
-                            if not order_info.get("sell_triggered", False):
-                                orders_to_sell.append((instId, "batch"))
-                                # ✅ STRICT DEDUP: Set sell_triggered BEFORE attempting sell
-                                # Will be reset if sell fails
-                                order_info["sell_triggered"] = True
-                                order_info["last_sell_attempt_time"] = now
-                                logger.warning(
-                                    f"⏰ SELL CHECK ({current_minute}min): {instId} (batch) "
-                                    f"past sell_time={next_hour_close.strftime('%H:%M:%S')}, triggering sell"
-                                )
-
-                    # Check original-gap strategy orders from memory
-                    for instId, order_info in list(gap_active_orders.items()):
-                        next_hour_close = order_info.get("next_hour_close_time")
-                        if next_hour_close and now >= next_hour_close:
-                            if not order_info.get("sell_triggered", False):
-                                orders_to_sell.append((instId, "gap"))
-                                order_info["sell_triggered"] = True
-                                order_info["last_sell_attempt_time"] = now
-                                logger.warning(
-                                    f"⏰ SELL CHECK ({current_minute}min): {instId} (gap) "
-                                    f"past sell_time={next_hour_close.strftime('%H:%M:%S')}, triggering sell"
-                                )
-
-            # Trigger sells outside of lock using thread pool
-            for instId, strategy_type in orders_to_sell:
-                logger.warning(
-                    f"⏰ TIMEOUT SELL: {instId} ({strategy_type}), "
-                    f"next_hour_close_time reached, triggering sell"
-                )
-                thread_pool.submit(process_sell_signal, instId, strategy_type)
-        except Exception as e:
-            logger.error(f"Error in check_sell_timeout: {e}")
-            time.sleep(TIMEOUT_CHECK_INTERVAL_SECONDS)  # Wait on error
 
+def start_orders_stream():
+    """Start push-based fill tracking on the private `orders` channel"""
+    if SIMULATION_MODE or not ORDERS_WS_ENABLED or PrivateOrdersStream is None:
+        return
+    if not (API_KEY and API_SECRET and API_PASSPHRASE):
+        logger.warning("⚠️ OKX credentials missing, fills tracked by REST polling")
+        return
 
-def main():
-    """Main function"""
-    logger.warning(f"Starting {STRATEGY_NAME} trading system")
+    stream = PrivateOrdersStream(
+        API_KEY, API_SECRET, API_PASSPHRASE, demo=TRADING_FLAG == "1"
+    )
+    if engine is not None:
+        engine.add_socket(
+            "orders",
+            stream.url,
+            stream.on_message,
+            stream.on_open,
+            orders_ws_ref,
+            ws_lock,
+            on_close=stream.on_close,
+        )
+    else:
+        threading.Thread(
+            target=stream.run_forever, daemon=True, name="OrdersWebSocket"
+        ).start()
+    logger.warning("✅ Private orders stream started (push-based fill tracking)")
 
-    # Load crypto limits
-    max_retries = 3
-    retry_delay = 2
-    for attempt in range(max_retries):
-        if load_crypto_limits():
-            break
-        if attempt < max_retries - 1:
-            logger.warning(
-                f"Failed to load crypto limits (attempt {attempt + 1}/{max_retries}), "
-                f"retrying in {retry_delay} seconds..."
-            )
-            time.sleep(retry_delay)
-        else:
-            logger.error("Failed to load crypto limits after all retries, exiting")
-            return
 
-    if not crypto_limits:
-        logger.error("No crypto limits loaded, exiting")
+order_gateway: Optional["WsOrderGateway"] = None
+
+
+def start_order_gateway():
+    """Place and cancel orders over the logged-in private WebSocket"""
+    global order_gateway
+    if SIMULATION_MODE or not WS_ORDERS_ENABLED or WsOrderGateway is None:
+        return
+    if not (API_KEY and API_SECRET and API_PASSPHRASE):
         return
 
-    logger.warning(f"Loaded {len(crypto_limits)} cryptos with limits")
+    gateway = WsOrderGateway(
+        API_KEY, API_SECRET, API_PASSPHRASE, demo=TRADING_FLAG == "1"
+    )
+    if engine is not None:
+        engine.add_socket(
+            "order_gateway",
+            gateway.url,
+            gateway.on_message,
+            gateway.on_open,
+            order_gateway_ws_ref,
+            ws_lock,
+            on_close=gateway.on_close,
+        )
+    else:
+        threading.Thread(
+            target=gateway.run_forever, daemon=True, name="OrderGatewayWebSocket"
+        ).start()
+    set_order_gateway(gateway)
+    order_gateway = gateway
+    logger.warning("✅ Order gateway started (orders over WebSocket, REST fallback)")
 
-    # Verify blacklist functionality is working
-    if BlacklistManager is None:
-        logger.error(
-            "❌ CRITICAL: BlacklistManager is None - blacklist checks will be bypassed!"
+
+def start_async_engine() -> Optional["AsyncEngine"]:
+    """Start the asyncio engine and route background work through it
+
+    Returns:
+        The running engine, or None if it is unavailable (thread mode is used)
+    """
+    global engine, thread_pool
+    if AsyncEngine is None or not AsyncEngine.available():
+        logger.warning(
+            "⚠️ ENGINE_MODE=asyncio but the websockets package is not installed, "
+            "falling back to threads"
         )
-    elif _check_blacklist_before_buy is None:
-        logger.error(
-            "❌ CRITICAL: check_blacklist_before_buy function is None - blacklist checks will be bypassed!"
+        return None
+
+    engine = AsyncEngine()
+    engine.start()
+    # Strategy code submits to thread_pool; the engine is a drop-in for it
+    thread_pool.shutdown(wait=False)
+    thread_pool = engine
+    if set_spawner is not None:
+        set_spawner(engine.submit)
+        set_scheduler(engine.call_later)
+    return engine
+
+
+def _strategy_orders() -> Dict[str, Tuple[str, dict]]:
+    """strategy_type -> (flag, active orders dict)"""
+    return {
+        "original": (STRATEGY_NAME, active_orders),
+        "stable": (STABLE_STRATEGY_NAME, stable_active_orders),
+        "batch": (BATCH_STRATEGY_NAME, batch_active_orders),
+        "gap": (ORIGINAL_GAP_STRATEGY_NAME, gap_active_orders),
+    }
+
+
+# ✅ NEW: Warm restart - in-memory state is snapshotted periodically and on
+# shutdown; startup restores it and fetches over REST/DB only what it lacks
+STATE_SNAPSHOT_ENABLED = state_snapshot is not None and (
+    state_snapshot.STATE_SNAPSHOT_ENABLED
+)
+snapshot_writer: Optional["state_snapshot.SnapshotWriter"] = None
+startup_snapshot: Optional[Dict] = None  # Consumed by start_trading()
+
+
+def capture_state() -> Dict:
+    """Everything a restart would otherwise rebuild through REST and DB scans"""
+    with lock:
+        state = {
+            "orders": {
+                strategy_type: {
+                    instId: dict(order_info) for instId, order_info in orders.items()
+                }
+                for strategy_type, (_, orders) in _strategy_orders().items()
+            },
+            "reference_prices": dict(reference_prices),
+            "reference_hour": int(time.time() // 3600),
+            "gap_last_buy_time": {
+                "__global__": gap_cooldown.last_buy_ts if gap_cooldown else 0.0
+            },
+        }
+    state.update(state_snapshot.capture_strategies(stable_strategy, batch_strategy))
+    if price_manager is not None:
+        state["candles"] = price_manager.candle_buffer.export()
+    if get_precision_cache is not None:
+        state["precision"] = dict(get_precision_cache())
+    return state
+
+
+def restore_snapshot_caches() -> Tuple[Dict[str, float], Dict[str, float]]:
+    """Load the state snapshot and restore its caches and strategy state
+
+    Returns:
+        (limits still needing reference prices, limits still needing candle
+        history); all of crypto_limits for both without a usable snapshot
+    """
+    global startup_snapshot
+    if not STATE_SNAPSHOT_ENABLED:
+        return crypto_limits, crypto_limits
+    state = state_snapshot.load()
+    if state is None:
+        return crypto_limits, crypto_limits
+    startup_snapshot = state
+
+    state_snapshot.restore_strategies(state, stable_strategy, batch_strategy)
+    if get_precision_cache is not None:
+        get_precision_cache().update(state.get("precision", {}))
+    if gap_cooldown is not None:
+        gap_cooldown.observe(state.get("gap_last_buy_time", {}).get("__global__", 0.0))
+
+    missing_candles = crypto_limits
+    if price_manager is not None:
+        price_manager.candle_buffer.restore(state.get("candles", {}))
+        buffered = price_manager.candle_buffer.export()
+        missing_candles = {
+            instId: limit
+            for instId, limit in crypto_limits.items()
+            if instId not in buffered
+        }
+
+    # Reference prices are the current hour's open: only valid within the hour
+    missing_prices = crypto_limits
+    if state.get("reference_hour") == int(time.time() // 3600):
+        saved = {
+            instId: price
+            for instId, price in state.get("reference_prices", {}).items()
+            if instId in crypto_limits
+        }
+        if price_manager is not None:
+            for instId, price in saved.items():
+                price_manager.set_reference_price(instId, price)
+        with lock:
+            reference_prices.update(saved)
+        missing_prices = {
+            instId: limit
+            for instId, limit in crypto_limits.items()
+            if instId not in saved
+        }
+
+    logger.warning(
+        f"💾 Warm restart from snapshot ({time.time() - state['saved_at']:.0f}s old): "
+        f"{len(crypto_limits) - len(missing_prices)} reference prices, "
+        f"{len(crypto_limits) - len(missing_candles)} candle histories restored"
+    )
+    return missing_prices, missing_candles
+
+
+def restore_snapshot_orders() -> bool:
+    """Restore active orders from the startup snapshot, checked against the DB
+
+    One query compares the snapshot's orders with the open ones in the
+    database. Orders since sold or canceled are dropped.
+
+    Returns:
+        True if the snapshot matched the database exactly (the full
+        recovery can be skipped)
+    """
+    global startup_snapshot
+    state, startup_snapshot = startup_snapshot, None
+    if state is None:
+        return False
+
+    strategies = _strategy_orders()
+    saved_orders = state.get("orders", {})
+    snapshot_keys = set()
+    for strategy_type, (flag, _) in strategies.items():
+        snapshot_keys |= state_snapshot.order_keys(
+            flag, saved_orders.get(strategy_type, {})
         )
-    else:
-        # Quick test: VRA should be blacklisted
-        test_result = check_blacklist_before_buy("VRA-USDT", auto_remove=False)
-        if not test_result:
-            logger.error(
-                "❌ CRITICAL: VRA-USDT should be blacklisted but check returned False!"
+    try:
+        conn = get_db_connection()
+        try:
+            missing, stale = state_snapshot.find_order_delta(
+                conn,
+                [flag for flag, _ in strategies.values()],
+                snapshot_keys,
+                int(os.getenv("RECOVERY_HOURS", "24")),
             )
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"⚠️ Snapshot order check failed, running full recovery: {e}")
+        return False
 
-    # Initialize reference prices (current hour's open prices)
-    initialize_reference_prices()
+    stale_positions = {(flag, instId) for flag, instId, _ in stale}
+    restored = 0
+    for strategy_type, (flag, orders) in strategies.items():
+        for instId, order_info in saved_orders.get(strategy_type, {}).items():
+            if (flag, instId) in stale_positions:
+                continue
+            # A sell in flight at shutdown is retried (the sell path re-checks the DB)
+            order_info.pop("sell_triggered", None)
+            with instrument_lock(lock, instId):
+                if instId not in orders:
+                    orders[instId] = order_info
+                    restored += 1
+
+    logger.warning(
+        f"💾 Restored {restored} active orders from snapshot "
+        f"({len(missing)} missing, {len(stale)} closed since)"
+    )
+    return not missing and not stale
 
-    # Initialize database connection with retry
+
+def start_snapshot_writer():
+    global snapshot_writer
+    if not STATE_SNAPSHOT_ENABLED or snapshot_writer is not None:
+        return
+    snapshot_writer = state_snapshot.SnapshotWriter(capture_state)
+    snapshot_writer.start()
+
+
+orders_change_feed: Optional["OrdersChangeFeed"] = None
+
+
+def start_change_feed():
+    """Enable delta memory syncs if orders.updated_at tracking is available"""
+    global orders_change_feed
+    if not ORDERS_CHANGE_FEED_ENABLED or OrdersChangeFeed is None:
+        return
+    feed = OrdersChangeFeed()
     try:
+        capabilities = (
+            get_schema_capabilities() if get_schema_capabilities is not None else None
+        )
         conn = get_db_connection()
-        conn.close()
-        logger.warning("✅ Connected to PostgreSQL database successfully")
+        try:
+            feed.ensure(conn, capabilities.change_tracking if capabilities else None)
+        finally:
+            conn.close()
     except Exception as e:
-        logger.error(f"Database error: {e}")
-        logger.error("Failed to connect to database, exiting")
-        return
+        logger.warning(f"⚠️ Orders change feed check failed: {e}")
+    if feed.available:
+        orders_change_feed = feed
 
-    # Start watchdog thread
-    watchdog_thread = threading.Thread(
-        target=_watchdog_loop, daemon=True, name="Watchdog"
-    )
-    watchdog_thread.start()
 
-    # Start ticker WebSocket
-    ticker_url = "wss://ws.okx.com:8443/ws/v5/public"
-    ticker_thread = threading.Thread(
-        target=connect_websocket,
-        args=(ticker_url, on_ticker_message, ticker_open, "ticker"),
-        daemon=True,
-        name="TickerWebSocket",
-    )
-    ticker_thread.start()
+def start_trading():
+    """Recover positions and start the sell paths, then allow buys
 
-    # Start candle WebSocket
-    candle_url = "wss://ws.okx.com:8443/ws/v5/business"
-    candle_thread = threading.Thread(
-        target=connect_websocket,
-        args=(candle_url, on_candle_message, candle_open, "candle"),
-        daemon=True,
-        name="CandleWebSocket",
-    )
-    candle_thread.start()
+    Runs at startup, or when a hot standby takes over the leader lease.
+    """
+    takeover_start = time.monotonic()
+    # Start exact-time sells before recovery so recovered orders are scheduled
+    start_bulk_sell()
+    start_sell_scheduler()
 
-    logger.warning("WebSocket connections started, waiting for messages...")
+    if gap_cooldown is not None:
+        gap_cooldown.start()
 
     # ✅ ENHANCED: Recover orders from database on startup
     # This handles process restart - restores active_orders from DB
     logger.warning("🔄 Recovering orders from database on startup...")
     now = datetime.now()
-    recover_orders_from_database(now)
-    sync_orders_from_database()
+    warm_start = restore_snapshot_orders()
+    if warm_start:
+        logger.warning("💾 Snapshot matches the database, skipping full recovery")
+    else:
+        recover_orders_from_database(now)
+        sync_orders_from_database()
     logger.warning("✅ Database recovery and sync completed")
 
+    # ✅ OPTIMIZED: Periodic syncs fetch only orders changed since the last one
+    start_change_feed()
+
     # ✅ NEW: Sync memory with database to prevent memory leaks
     if _sync_active_orders_with_db:
-        logger.warning("🔄 Running initial memory sync...")
-        _sync_active_orders_with_db(
+        initial_sync = functools.partial(
+            _sync_active_orders_with_db,
             get_db_connection,
             active_orders,
             pending_buys,
@@ -1479,8 +2235,18 @@ def main():
             ORIGINAL_GAP_STRATEGY_NAME,
             stable_strategy,
             batch_strategy,
+            change_feed=orders_change_feed,
         )
-        logger.warning("✅ Initial memory sync completed")
+        if warm_start:
+            # Snapshot already checked against the DB: only the position
+            # index reload is left, which buys fall back from until done
+            threading.Thread(
+                target=initial_sync, daemon=True, name="InitialMemorySync"
+            ).start()
+        else:
+            logger.warning("🔄 Running initial memory sync...")
+            initial_sync()
+            logger.warning("✅ Initial memory sync completed")
 
         # Start periodic sync (every 5 minutes)
         _start_periodic_sync(
@@ -1501,16 +2267,226 @@ def main():
             gap_strategy_name=ORIGINAL_GAP_STRATEGY_NAME,
             stable_strategy=stable_strategy,
             batch_strategy=batch_strategy,
+            change_feed=orders_change_feed,
         )
     else:
         logger.warning("⚠️ Memory sync module not available")
 
     # ✅ FIX: Start background thread to check sell timeouts (fallback mechanism)
-    timeout_check_thread = threading.Thread(
-        target=check_sell_timeout, daemon=True, name="SellTimeoutChecker"
+    if engine is not None:
+        engine.run_periodic(
+            "sell_timeout", TIMEOUT_CHECK_INTERVAL_SECONDS, run_sell_timeout_check
+        )
+        logger.warning("✅ Sell timeout checker task started")
+    else:
+        timeout_check_thread = threading.Thread(
+            target=check_sell_timeout, daemon=True, name="SellTimeoutChecker"
+        )
+        timeout_check_thread.start()
+        logger.warning("✅ Sell timeout checker thread started")
+
+    if set_trading_enabled is not None:
+        set_trading_enabled(True)
+    start_snapshot_writer()
+    logger.warning(
+        f"✅ Trading enabled ({time.monotonic() - takeover_start:.1f}s to recover)"
     )
-    timeout_check_thread.start()
-    logger.warning("✅ Sell timeout checker thread started")
+
+
+# ✅ NEW: Hot standby - with LEADER_ELECTION_ENABLED every instance runs warm
+# (WebSockets, reference prices, candles) and only the lease holder trades
+leader_lease: Optional["LeaderLease"] = None
+
+
+def on_leader_lost():
+    """Lease session ended or renewals stalled: another instance may trade"""
+    logger.error("❌ Leader lease lost, exiting to restart as standby")
+    os._exit(1)
+
+
+def start_leader_election() -> bool:
+    """Start trading now, or compete for the leader lease as a standby
+
+    Returns:
+        False if election is enabled but unavailable (caller exits)
+    """
+    global leader_lease
+    if not LEADER_ELECTION_ENABLED:
+        start_trading()
+        return True
+    if LeaderLease is None:
+        logger.error("❌ LEADER_ELECTION_ENABLED but leader_election not available")
+        return False
+    leader_lease = LeaderLease(
+        lambda: threading.Thread(
+            target=start_trading, daemon=True, name="LeaderTakeover"
+        ).start(),
+        on_leader_lost,
+    )
+    logger.warning(f"⏳ Standby: waiting for leader lease '{leader_lease.name}'")
+    leader_lease.start()
+    return True
+
+
+def _on_sigterm(signum, frame):
+    """Railway stops containers with SIGTERM: shut down like Ctrl+C"""
+    raise KeyboardInterrupt
+
+
+def main():
+    """Main function"""
+    logger.warning(f"Starting {STRATEGY_NAME} trading system")
+    signal.signal(signal.SIGTERM, _on_sigterm)
+
+    # Load crypto limits
+    max_retries = 3
+    retry_delay = 2
+    for attempt in range(max_retries):
+        if load_crypto_limits():
+            break
+        if attempt < max_retries - 1:
+            logger.warning(
+                f"Failed to load crypto limits (attempt {attempt + 1}/{max_retries}), "
+                f"retrying in {retry_delay} seconds..."
+            )
+            time.sleep(retry_delay)
+        else:
+            logger.error("Failed to load crypto limits after all retries, exiting")
+            return
+
+    if not crypto_limits:
+        logger.error("No crypto limits loaded, exiting")
+        return
+
+    logger.warning(f"Loaded {len(crypto_limits)} cryptos with limits")
+
+    # Verify blacklist functionality is working
+    if BlacklistManager is None:
+        logger.error(
+            "❌ CRITICAL: BlacklistManager is None - blacklist checks will be bypassed!"
+        )
+    elif _check_blacklist_before_buy is None:
+        logger.error(
+            "❌ CRITICAL: check_blacklist_before_buy function is None - blacklist checks will be bypassed!"
+        )
+    else:
+        # ✅ OPTIMIZED: Load the shared blacklist cache (and its LISTEN thread)
+        # now, so the first buy check on the tick path never waits on the DB
+        if hasattr(BlacklistManager, "get_shared_cache"):
+            started = time.perf_counter()
+            blacklist_cache = BlacklistManager.get_shared_cache()
+            if blacklist_cache.loaded:
+                logger.warning(
+                    f"✅ Blacklist cache loaded in "
+                    f"{(time.perf_counter() - started) * 1000:.0f}ms"
+                )
+            else:
+                logger.error("❌ Blacklist cache failed to load at startup")
+        # Quick test: VRA should be blacklisted
+        test_result = check_blacklist_before_buy("VRA-USDT", auto_remove=False)
+        if not test_result:
+            logger.error(
+                "❌ CRITICAL: VRA-USDT should be blacklisted but check returned False!"
+            )
+
+    # ✅ NEW: Keep only this worker's shard of hour_limit (SHARD_ENABLED)
+    if not start_sharding():
+        logger.error("Failed to join shard ring, exiting")
+        return
+
+    # ✅ OPTIMIZED: All SPOT tick/lot sizes in one call (or the disk cache),
+    # so formatting an order never waits on a per-instrument REST call
+    if preload_instrument_precision is not None:
+        preload_instrument_precision(TRADING_FLAG)
+
+    # ✅ NEW: Schema self-check (fail fast), typed columns once backfilled
+    if not check_orders_schema():
+        logger.error("Orders schema incompatible, exiting")
+        return
+
+    init_gap_cooldown()
+
+    # ✅ NEW: Restore caches from the state snapshot; REST fills in the rest
+    missing_prices, missing_candles = restore_snapshot_caches()
+
+    # Initialize reference prices (current hour's open prices)
+    initialize_reference_prices(missing_prices)
+
+    # Seed 1H candle history for the 2h gain filter (candle WS keeps it current)
+    if missing_candles:
+        seed_candle_history(missing_candles)
+
+    # Later hours take their reference prices from the WebSocket
+    start_reference_rollover()
+
+    # Initialize database connection with retry
+    try:
+        conn = get_db_connection()
+        conn.close()
+        logger.warning("✅ Connected to PostgreSQL database successfully")
+    except Exception as e:
+        logger.error(f"Database error: {e}")
+        logger.error("Failed to connect to database, exiting")
+        return
+
+    # Start watchdog thread
+    watchdog_thread = threading.Thread(
+        target=_watchdog_loop, daemon=True, name="Watchdog"
+    )
+    watchdog_thread.start()
+
+    # Start ticker evaluator workers before any ticks arrive
+    if ticker_ingest is not None:
+        ticker_ingest.start()
+
+    ticker_url = "wss://ws.okx.com:8443/ws/v5/public"
+    candle_url = "wss://ws.okx.com:8443/ws/v5/business"
+    ticker_thread = candle_thread = None
+    if ENGINE_MODE == "asyncio":
+        start_async_engine()
+
+    if engine is not None:
+        # Conflated ticks are only parsed on the loop; the direct handler may
+        # block (REST reference fetch), so it runs on the executor instead
+        engine.add_socket(
+            "ticker",
+            ticker_url,
+            on_ticker_message,
+            ticker_open,
+            ticker_ws_ref,
+            ws_lock,
+            inline=ticker_ingest is not None,
+        )
+        engine.add_socket(
+            "candle", candle_url, on_candle_message, candle_open, candle_ws_ref, ws_lock
+        )
+    else:
+        # Start ticker WebSocket
+        ticker_thread = threading.Thread(
+            target=connect_websocket,
+            args=(ticker_url, on_ticker_message, ticker_open, "ticker"),
+            daemon=True,
+            name="TickerWebSocket",
+        )
+        ticker_thread.start()
+
+        # Start candle WebSocket
+        candle_thread = threading.Thread(
+            target=connect_websocket,
+            args=(candle_url, on_candle_message, candle_open, "candle"),
+            daemon=True,
+            name="CandleWebSocket",
+        )
+        candle_thread.start()
+
+    start_orders_stream()
+    start_order_gateway()
+
+    logger.warning("WebSocket connections started, waiting for messages...")
+
+    # ✅ NEW: Trade now, or stay a warm standby until the leader lease is ours
+    if not start_leader_election():
+        return
 
     # Keep main thread alive
     last_refresh_hour = datetime.now().replace(minute=0, second=0, microsecond=0)
@@ -1519,14 +2495,51 @@ def main():
         while True:
             time.sleep(60)
             _heartbeat_tick()
-            # Periodic status log
-            with lock:
+            # Periodic status log (len() reads need no lock)
+            logger.info(
+                f"Status: {len(current_prices)} prices, "
+                f"{len(reference_prices)} reference prices, "
+                f"{len(active_orders)} original orders, "
+                f"{len(stable_active_orders)} stable orders"
+            )
+            if instrument_states is not None:
+                ticked = sum(
+                    1
+                    for _, last_tick, _ in instrument_states.snapshot().values()
+                    if time.time() - last_tick < 60
+                )
                 logger.info(
-                    f"Status: {len(current_prices)} prices, "
-                    f"{len(reference_prices)} reference prices, "
-                    f"{len(active_orders)} original orders, "
-                    f"{len(stable_active_orders)} stable orders"
+                    f"{ticked}/{len(instrument_states)} instruments ticked in last 60s; "
+                    f"{lock.format_stats(reset=True)}"
                 )
+            if ticker_ingest is not None:
+                logger.info(ticker_ingest.format_stats(reset=True))
+            if engine is None and deferred_scheduler is not None:
+                logger.info(deferred_scheduler.format_stats(reset=True))
+            if sell_scheduler is not None:
+                logger.info(sell_scheduler.format_stats(reset=True))
+            if get_order_state_cache is not None:
+                logger.info(get_order_state_cache().format_stats(reset=True))
+            if get_position_index is not None and get_position_index() is not None:
+                logger.info(get_position_index().format_stats(reset=True))
+            if db_pool is not None:
+                logger.info(db_pool.format_stats(reset=True))
+            if shard_coordinator is not None:
+                logger.info(shard_coordinator.format_stats())
+            if leader_lease is not None:
+                logger.info(leader_lease.format_stats())
+            if snapshot_writer is not None:
+                logger.info(snapshot_writer.format_stats())
+            if reference_rollover is not None:
+                logger.info(reference_rollover.format_stats())
+            if get_rate_limiter is not None:
+                logger.info(get_rate_limiter().format_stats(reset=True))
+            if order_gateway is not None:
+                logger.info(order_gateway.format_stats(reset=True))
+            if gap_cooldown is not None:
+                logger.info(gap_cooldown.format_stats())
+            if orders_change_feed is not None:
+                logger.info(orders_change_feed.format_stats(reset=True))
 
             # Monitor thread count in main loop
             monitor_thread_count()
@@ -1541,13 +2554,24 @@ def main():
             # OKX may not have the new hour's K-line immediately at 00:00,
             # so wait until 00:05
             if current_hour > last_refresh_hour and now.minute >= 1:
-                logger.warning(
-                    f"🔄 New hour detected ({current_hour.strftime('%H:00')}), "
-                    f"refreshing reference prices (hourly open)..."
-                )
-                initialize_reference_prices()
+                if reference_rollover is None:
+                    logger.warning(
+                        f"🔄 New hour detected ({current_hour.strftime('%H:00')}), "
+                        f"refreshing reference prices (hourly open)..."
+                    )
+                    initialize_reference_prices()
                 last_refresh_hour = current_hour
 
+            if engine is not None:
+                # Socket tasks reconnect on their own; only report
+                logger.info(engine.format_stats())
+                if not engine.is_alive() or engine.dead_tasks():
+                    logger.error(
+                        f"❌ Asyncio engine unhealthy: loop alive={engine.is_alive()}, "
+                        f"dead tasks={engine.dead_tasks()}"
+                    )
+                continue
+
             # Health check: verify WebSocket threads are alive
             if not ticker_thread.is_alive():
                 logger.error("Ticker WebSocket thread died, restarting...")
@@ -1571,6 +2595,14 @@ def main():
 
     except KeyboardInterrupt:
         logger.warning("Shutting down gracefully...")
+        if snapshot_writer is not None:
+            snapshot_writer.stop()
+        if leader_lease is not None:
+            leader_lease.release()
+        if shard_coordinator is not None:
+            shard_coordinator.leave()
+        if db_pool is not None:
+            db_pool.close_pools()
     except Exception as e:
         logger.error(f"Unexpected error in main loop: {e}")
         time.sleep(5)